@@ -0,0 +1,267 @@
+"""
+This module contains the asynchronous server of the node. It serves the same routes as `node.py` on an event loop, so a slow request doesn't stall the others:
+the routes run in a pool of threads, the mining and the resolution of conflicts in their own thread, the proofs of work in other processes and the broadcasts to the peer nodes in the background.
+The '/events' stream is served on the event loop itself, so its clients don't hold a thread while they wait for the events.
+The requests to the peer nodes are still sent with the blocking `requests` library, with timeouts, from the threads of the routes, of the mining and of the broadcasts: a slow peer holds one of these threads, never the event loop.
+
+It needs an ASGI server, uvicorn: `pip3 install uvicorn`.
+
+:function: build_environ(scope, body)
+:function: run_in_executor(executor, func, *args)
+:function: send_json(send, status, payload)
+:function: serve_events(scope, receive, send)
+:function: app(scope, receive, send)
+:main: __main__
+"""
+
+import asyncio
+import io
+import json
+import sys
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from queue import Empty
+from urllib.parse import parse_qs
+
+import node
+from blockchain import BlockChain
+
+# Routes doing CPU-bound work (mining, verifying whole chains), they run one at a time in their own thread
+CPU_ROUTES = {'/mine', '/resolve-conflicts'}
+# Threads serving the other routes
+IO_WORKERS = 64
+# Clients of the '/events' stream served at once, the next ones are answered with 503
+EVENTS_MAX_CLIENTS = 1024
+# Threads sending the broadcasts to the peer nodes
+BROADCAST_WORKERS = 16
+
+io_executor = ThreadPoolExecutor(
+    max_workers=IO_WORKERS, thread_name_prefix='io')
+cpu_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cpu')
+# Number of clients of the '/events' stream, only changed by the event loop
+events_clients = 0
+
+
+def build_environ(scope, body):
+    """
+    This function transforms an ASGI HTTP request into the WSGI environment expected by the Flask application.
+
+    :param scope dict: The ASGI scope of the request.
+    :param body bytes: The body of the request.
+    :var environ dict: The WSGI environment.
+    :returns dict: The WSGI environment.
+    """
+
+    server = scope.get('server') or ('127.0.0.1', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/{}'.format(scope['http_version']),
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for (name, value) in scope['headers']:
+        name = name.decode('latin1')
+        value = value.decode('latin1')
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'content-length':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+            environ[key] = environ[key] + \
+                ',' + value if key in environ else value
+    return environ
+
+
+async def run_in_executor(executor, func, *args):
+    """
+    This function runs a blocking function in an executor without blocking the event loop.
+
+    :param executor Executor: The executor running the function.
+    :param func function: The blocking function.
+    :param args tuple: The arguments of the function.
+    :returns: The result of the function.
+    """
+
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+
+async def send_json(send, status, payload):
+    """
+    This function sends a whole JSON response, like the error responses of the Flask application.
+
+    :param send function: Sends the messages to the client.
+    :param status int: The status code of the response.
+    :param payload dict: The body of the response.
+    :var body bytes: The body encoded in JSON.
+    :returns: None.
+    """
+
+    body = json.dumps(payload).encode('utf8')
+    await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode('latin1')), (b'access-control-allow-origin', b'*')]})
+    await send({'type': 'http.response.body', 'body': body, 'more_body': False})
+
+
+async def serve_events(scope, receive, send):
+    """
+    This function serves the '/events' stream of `node.py` on the event loop, after the body of the request has been read: the publisher of the events wakes the coroutine of the client up, which sends the events waiting in its queue, so a client waiting for the events holds no thread.
+
+    :param scope dict: The ASGI scope of the request.
+    :param receive function: Receives the messages of the client.
+    :param send function: Sends the messages to the client.
+    :var query dict: The parameters of the query string.
+    :var headers dict: The headers of the request.
+    :var wakeup Event: Set when an event is put in the queue of the client.
+    :var subscription tuple: The queue of the events of the client and its Bloom filter, None if the filter is unknown.
+    :var disconnected Future: Done when the client disconnects.
+    :var sent_txids set: The IDs of the open transactions sent to a filtered client.
+    :var texts list: The texts of the events waiting in the queue.
+    :returns: None.
+    """
+
+    global events_clients
+    if events_clients >= EVENTS_MAX_CLIENTS:
+        await send_json(send, 503, {'message': 'Too many clients of the events.'})
+        return
+    query = parse_qs(scope['query_string'].decode('latin1'))
+    headers = {name.decode('latin1').lower(): value.decode('latin1')
+               for (name, value) in scope['headers']}
+    loop = asyncio.get_running_loop()
+    wakeup = asyncio.Event()
+    subscription = node.subscribe_events(query.get('filter', [None])[0], headers.get(
+        'last-event-id'), lambda: loop.call_soon_threadsafe(wakeup.set))
+    if subscription == None:
+        await send_json(send, 404, {'message': 'Unknown filter.'})
+        return
+    (subscriber, bloom) = subscription
+    events_clients += 1
+    disconnected = asyncio.ensure_future(receive())
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'text/event-stream; charset=utf-8'), (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no'), (b'access-control-allow-origin', b'*')]})
+        await send({'type': 'http.response.body', 'body': b'retry: 3000\n\n', 'more_body': True})
+        sent_txids = set()
+        # The events missed by a reconnecting client are already in its queue
+        wakeup.set()
+        while True:
+            waiting = asyncio.ensure_future(wakeup.wait())
+            await asyncio.wait({waiting, disconnected}, timeout=node.EVENTS_KEEP_ALIVE, return_when=asyncio.FIRST_COMPLETED)
+            waiting.cancel()
+            if disconnected.done():
+                break
+            if not wakeup.is_set():
+                await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+                continue
+            # Cleared before reading the queue, so an event published meanwhile sets it again
+            wakeup.clear()
+            texts = []
+            while True:
+                try:
+                    event = subscriber.get_nowait()
+                except Empty:
+                    break
+                text = node.format_event(event, bloom, sent_txids)
+                if text != None:
+                    texts.append(text)
+            if len(texts) > 0:
+                await send({'type': 'http.response.body', 'body': ''.join(texts).encode('utf8'), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    finally:
+        events_clients -= 1
+        disconnected.cancel()
+        node.events.unsubscribe(subscriber)
+
+
+async def app(scope, receive, send):
+    """
+    This function is the ASGI application of the node, it runs the Flask application of `node.py` for each HTTP request, except the '/events' stream served on the event loop.
+
+    :param scope dict: The ASGI scope of the connection.
+    :param receive function: Receives the messages of the client.
+    :param send function: Sends the messages to the client.
+    :var executor Executor: The executor of the route, the CPU-bound routes have their own.
+    :var started dict: The status and the headers given by the Flask application.
+    :var chunks Iterator: The chunks of the body of the response, a streaming response can block between two chunks.
+    :returns: None.
+    """
+
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    if scope['path'] == '/events' and scope['method'] == 'GET':
+        await serve_events(scope, receive, send)
+        return
+
+    executor = cpu_executor if scope['path'] in CPU_ROUTES else io_executor
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [(name.lower().encode('latin1'), value.encode('latin1'))
+                              for (name, value) in headers]
+
+    response = await run_in_executor(executor, node.webApp.wsgi_app, build_environ(scope, body), start_response)
+    # The client may disconnect while a streaming response waits for its next chunk
+    disconnected = asyncio.ensure_future(receive())
+    try:
+        chunks = iter(response)
+        first_chunk = await run_in_executor(executor, next, chunks, None)
+        await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+        chunk = first_chunk
+        while chunk != None:
+            if len(chunk) > 0:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if disconnected.done():
+                break
+            chunk = await run_in_executor(executor, next, chunks, None)
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    finally:
+        disconnected.cancel()
+        if hasattr(response, 'close'):
+            await run_in_executor(executor, response.close)
+
+
+if __name__ == '__main__':
+    """
+    Main program of the asynchronous server, it takes the same options as `node.py` plus the number of processes searching the proofs of work.
+
+    How to use it: `python asgi_node.py -p <adress_of_node> --pow-workers 2`
+    """
+
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit('The asynchronous server needs uvicorn: pip3 install uvicorn')
+    parser = node.create_parser()
+    parser.add_argument('--pow-workers', type=int, default=1)
+    args = node.setup_node(parser)
+    BlockChain.broadcast_executor = ThreadPoolExecutor(
+        max_workers=BROADCAST_WORKERS, thread_name_prefix='broadcast')
+    BlockChain.pow_executor = ProcessPoolExecutor(
+        max_workers=args.pow_workers)
+    uvicorn.run(app, host='127.0.0.1', port=node.port, log_level='warning')
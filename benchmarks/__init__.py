@@ -0,0 +1,9 @@
+"""
+This module transforms the benchmarks directory (`~/benchmarks`) into a python package. The package measures the performance of the blockchain without any network, run it from the source folder with `python -m benchmarks`.
+
+:var __all__ list: A list of the helpers used by the benchmarks.
+"""
+
+from benchmarks.harness import time_call, generate_wallets, generate_chain
+
+__all__ = ['time_call', 'generate_wallets', 'generate_chain']
@@ -0,0 +1,283 @@
+"""
+This module runs the benchmarks of the core operations of the blockchain on a synthetic chain and prints the results as JSON, so the runs of two commits can be compared.
+
+How to use it, from the source folder:
+`python -m benchmarks --blocks 200 --txs-per-block 5 --output results.json`
+`python -m benchmarks --compare results.json` fails if an operation got slower than the threshold compared to a previous run.
+Every run also checks that a mined transaction sent again is rejected, before and after a restart of the node and after its block is pruned, and fails if it isn't.
+
+:function: run_checks()
+:function: run_benchmarks(blocks, txs_per_block, wallet_count, repeat)
+:function: compare_results(results, baseline, threshold)
+:function: main()
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+from argparse import ArgumentParser
+from itertools import count
+from time import time
+
+from benchmarks.harness import time_call, generate_wallets, generate_chain
+from blockchain import BlockChain
+from utility.admission import TRANSACTION_LIFETIME
+from utility.columnar import NUMPY_AVAILABLE
+from utility.hash_util import hash_block
+from utility.verification import Verification
+from wallet import Wallet
+
+# ID of the node whose files are written in the temporary directory of the benchmarks
+BENCH_NODE_ID = 'bench'
+
+
+def run_checks():
+    """
+    This function checks on fresh nodes in a temporary directory that a signed transfer can't be paid twice: the mined transaction sent again is rejected by the node, by the node restarted from its files, and by a pruned node which doesn't hold the block of the transaction anymore. A second transfer of the same amount created later is accepted, an expired one is rejected.
+
+    :var sender Wallet: The wallet mining the coins and sending them.
+    :var recipient Wallet: The wallet receiving the coins.
+    :var timestamp float: The time of creation of the transfer.
+    :var signature str: The signature of the transfer, sent twice.
+    :var checks dict: True for each check which passed.
+    :returns dict: True for each check which passed, false for each one which failed.
+    """
+
+    checks = {}
+    previous_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            (sender, recipient) = generate_wallets(2)
+            timestamp = time()
+            signature = sender.sign_transaction(
+                sender.public_key, recipient.public_key, 3, timestamp)
+
+            def replay(blockchain):
+                return blockchain.submit_transaction(recipient.public_key, sender.public_key, signature, 3, is_receiving=True, timestamp=timestamp) == (False, 'confirmed') \
+                    and blockchain.get_balance(recipient.public_key) == 3
+
+            def pay_again(blockchain, created):
+                return blockchain.submit_transaction(recipient.public_key, sender.public_key, sender.sign_transaction(
+                    sender.public_key, recipient.public_key, 3, created), 3, is_receiving=True, timestamp=created)[1]
+
+            for (name, prune_depth) in (('replayed_transaction_rejected', None), ('replayed_pruned_transaction_rejected', 1)):
+                node_id = '{}-{}'.format(BENCH_NODE_ID, name)
+                blockchain = BlockChain(
+                    sender.public_key, node_id, prune_depth)
+                blockchain.mine_block()
+                blockchain.add_transaction(
+                    recipient.public_key, sender.public_key, signature, 3, is_receiving=True, timestamp=timestamp)
+                blockchain.mine_block()
+                blockchain.mine_block()
+                checks[name] = replay(blockchain)
+                blockchain = BlockChain(
+                    sender.public_key, node_id, prune_depth)
+                checks[name + '_after_restart'] = replay(blockchain)
+            checks['same_amount_paid_again'] = pay_again(
+                blockchain, timestamp + 1) == 'accepted'
+            checks['expired_transaction_rejected'] = pay_again(
+                blockchain, timestamp - 2 * TRANSACTION_LIFETIME) == 'expired'
+        finally:
+            os.chdir(previous_directory)
+    return checks
+
+
+def run_benchmarks(blocks, txs_per_block, wallet_count, repeat):
+    """
+    This function generates a synthetic chain in a temporary directory and measures the core operations and the Flask endpoints on it.
+
+    :param blocks int: The number of blocks of the synthetic chain.
+    :param txs_per_block int: The maximum number of transactions per block.
+    :param wallet_count int: The number of wallets mining and sending coins.
+    :param repeat int: The number of calls of each measured operation.
+    :var wallets list: The generated wallets, the first one is the wallet of the node.
+    :var blockchain BlockChain: The blockchain loaded from the synthetic chain.
+    :var amounts Iterator: The distinct amounts of the transactions sent by the benchmarks.
+    :var client FlaskClient: The test client of the Flask application of node.py.
+    :var routes dict: The read routes, measured with and without the response cache.
+    :var results dict: The timings of each operation.
+    :returns dict: The timings of each operation.
+    """
+
+    import node
+
+    results = {}
+    previous_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            wallets = generate_wallets(wallet_count)
+            wallet = wallets[0]
+            generate_chain(BENCH_NODE_ID, wallets, blocks, txs_per_block)
+            # The first load rebuilds the headers, the states and the indexes of the generated file
+            results['load_data_rebuild'] = time_call(
+                lambda: BlockChain(wallet.public_key, BENCH_NODE_ID), 1)
+            blockchain = BlockChain(wallet.public_key, BENCH_NODE_ID)
+            results['save_data'] = time_call(blockchain.save_data, repeat)
+            results['save_data']['bytes'] = os.path.getsize(
+                'blockchain-{}.txt'.format(BENCH_NODE_ID))
+            results['load_data'] = time_call(blockchain.load_data, repeat)
+            results['get_balance'] = time_call(
+                lambda: blockchain.get_balance(wallets[1].public_key), repeat)
+            # Aggregates of the whole ledger on the columnar ledger, skipped without NumPy
+            if NUMPY_AVAILABLE:
+                results['get_ledger_analytics'] = time_call(
+                    blockchain.get_ledger_analytics, repeat)
+            tip = blockchain.chain.tip
+            # The chain view is not copied, so getting the last block doesn't depend on the length of the chain
+            results['chain_tip'] = time_call(
+                lambda: blockchain.chain.tip, repeat)
+            results['hash_block'] = time_call(lambda: hash_block(tip), repeat)
+            results['verify_chain'] = time_call(
+                lambda: Verification.verify_chain(blockchain.chain), repeat)
+            # Checked by worker processes whatever the length of the chain, to compare with the serial check
+            results['verify_chain_parallel'] = time_call(
+                lambda: Verification.find_invalid_block_parallel(blockchain.chain, min_blocks=0), repeat)
+            # Each transaction has its own time of creation: the signature of a transaction doesn't change, so a transaction sent again would only measure the rejection of the duplicate
+            timestamps = (time() + number / 1000 for number in count(1))
+
+            def add_transactions():
+                for _ in range(txs_per_block):
+                    timestamp = next(timestamps)
+                    if not blockchain.add_transaction(wallets[1].public_key, wallet.public_key, wallet.sign_transaction(
+                            wallet.public_key, wallets[1].public_key, 0.001, timestamp), 0.001, is_receiving=True, timestamp=timestamp):
+                        raise RuntimeError(
+                            'The wallet of the node has not enough coins, generate more blocks')
+
+            results['sign_transaction'] = time_call(lambda: wallet.sign_transaction(
+                wallet.public_key, wallets[1].public_key, 2, time()), repeat)
+            add_transactions()
+            open_tx = blockchain.get_open_transactions()[0]
+            results['verify_transaction'] = time_call(
+                lambda: Wallet.verify_transaction(open_tx), repeat)
+            results['proof_of_work'] = time_call(
+                blockchain.proof_of_work, repeat)
+            blockchain.mine_block()
+
+            # The routes read the module variables set by the main program of node.py
+            node.wallet = wallet
+            node.blockchain = blockchain
+            node.port = BENCH_NODE_ID
+            node.prune_depth = None
+            client = node.webApp.test_client()
+            routes = {
+                'GET /chain': lambda: client.get('/chain'),
+                'GET /chain?start=tip': lambda: client.get('/chain', query_string={'start': tip.index}),
+                'GET /transactions': lambda: client.get('/transactions'),
+                'GET /balance': lambda: client.get('/balance'),
+                'GET /nodes': lambda: client.get('/nodes'),
+                'GET /snapshot': lambda: client.get('/snapshot'),
+                'GET /address/<key>/history': lambda: client.get('/address/{}/history'.format(wallet.public_key))
+            }
+            # The responses are built again on each call, then served by the response cache of the node since the chain doesn't change
+            for (name, route) in routes.items():
+                results[name] = time_call(
+                    route, repeat, node.response_cache.clear)
+            for (name, route) in routes.items():
+                results[name + ' (cached)'] = time_call(route, repeat)
+
+            # The node signs each transaction with its time of creation, so the same payment sent again is a new transaction
+            def post_transaction():
+                response = client.post(
+                    '/transaction', json={'recipient': wallets[1].public_key, 'amount': 0.001})
+                if response.status_code != 201:
+                    raise RuntimeError(
+                        'POST /transaction answered {}'.format(response.status_code))
+
+            results['POST /transaction'] = time_call(post_transaction, repeat)
+            blockchain.mine_block()
+            # Each mined block has txs_per_block transactions
+            results['POST /mine'] = time_call(
+                lambda: client.post('/mine'), repeat, add_transactions)
+        finally:
+            os.chdir(previous_directory)
+    return results
+
+
+def compare_results(results, baseline, threshold):
+    """
+    This function compares the median durations of a run with the ones of a previous run.
+
+    :param results dict: The timings of the current run.
+    :param baseline dict: The timings of the previous run.
+    :param threshold float: The ratio of the medians above which an operation is a regression.
+    :var ratio float: The median of the current run divided by the median of the previous run.
+    :returns dict: The ratio of each operation measured by both runs, and the list of the regressions.
+    """
+
+    ratios = {}
+    regressions = []
+    for (name, timing) in results.items():
+        if name not in baseline or baseline[name]['median'] == 0:
+            continue
+        ratio = timing['median'] / baseline[name]['median']
+        ratios[name] = ratio
+        if ratio > threshold:
+            regressions.append(name)
+    return {'ratios': ratios, 'regressions': regressions}
+
+
+def main():
+    """
+    Main program of the benchmarks, parses the options, runs the benchmarks and writes the results as JSON.
+
+    :var report dict: The configuration of the run, its environment, its checks and its results.
+    :returns int: 1 if a check failed or a regression has been found compared to the baseline, 0 if not.
+    """
+
+    parser = ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('--blocks', type=int, default=200)
+    parser.add_argument('--txs-per-block', type=int, default=5)
+    parser.add_argument('--wallets', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', type=str, default=None)
+    parser.add_argument('--compare', type=str, default=None)
+    parser.add_argument('--threshold', type=float, default=1.25)
+    args = parser.parse_args()
+    if args.wallets < 2:
+        parser.error('--wallets must be at least 2')
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    report = {
+        'config': {
+            'blocks': args.blocks,
+            'txs_per_block': args.txs_per_block,
+            'wallets': args.wallets,
+            'repeat': args.repeat
+        },
+        'environment': {
+            'commit': commit or None,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time()
+        },
+        'checks': run_checks(),
+        'results': run_benchmarks(args.blocks, args.txs_per_block, args.wallets, args.repeat)
+    }
+    exit_code = 0 if all(report['checks'].values()) else 1
+    if args.compare != None:
+        with open(args.compare, mode='r') as file:
+            baseline = json.load(file)
+        report['comparison'] = compare_results(
+            report['results'], baseline['results'], args.threshold)
+        if len(report['comparison']['regressions']) > 0:
+            exit_code = 1
+    output = json.dumps(report, indent=2)
+    if args.output != None:
+        with open(args.output, mode='w') as file:
+            file.write(output)
+    print(output)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
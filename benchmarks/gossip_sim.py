@@ -0,0 +1,344 @@
+"""
+This module simulates a network of nodes in a single process and measures how fast the transactions and the blocks reach every node with the gossip relay, and how many messages it takes. It prints the results as JSON.
+
+The nodes are BlockChain instances connected to random peers, their requests to the peers are delivered in memory (PeerManager.transport) to the same functions as the '/broadcast-transaction', '/broadcast-block', '/broadcast-compact-block' and '/block/<block_hash>' routes of node.py, with an optional delay per message and per kilobyte of its JSON body.
+
+How to use it, from the source folder:
+`python -m benchmarks.gossip_sim --nodes 50 --degree 12 --fanout 8 --latency 0.005`
+Add `--full-blocks` to relay the full blocks like the nodes without compact blocks and compare the bytes and times of 'block_2'.
+
+:class SimulatedResponse: Class of the response of a simulated node.
+:class SimulatedNetwork: Class of the in-memory network of the nodes.
+:function: build_network(network, count, degree, wallet)
+:function: measure_propagation(network, has_item, timeout)
+:function: run_simulation(count, degree, fanout, latency, transactions, timeout, byte_latency=0, full_blocks=False)
+:function: main()
+"""
+
+import os
+import random
+import sys
+import tempfile
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from json import dumps
+from statistics import median
+from threading import Lock
+from time import perf_counter, sleep, time
+
+import requests
+
+from benchmarks.harness import generate_wallets
+from blockchain import BlockChain
+from utility.hash_util import hash_transaction
+from utility.peers import PeerManager
+
+# Threads delivering the messages of the simulated network
+SIMULATION_WORKERS = 64
+# Seconds between two checks of the nodes which received an item
+POLL_INTERVAL = 0.001
+
+
+class SimulatedResponse:
+    """
+    SimulatedResponse class is used to answer a simulated request like a response of requests.
+
+    :method: __init__(self, status_code, payload, height)
+    :method: json(self)
+    """
+
+    def __init__(self, status_code, payload, height):
+        """
+        Initialize the response.
+
+        :param status_code int: The HTTP status of the response.
+        :param payload dict: The JSON body of the response.
+        :param height int: The index of the last block of the node, sent like the X-Chain-Height header.
+        :returns SimulatedResponse: Yields a response's instance.
+        """
+
+        self.status_code = status_code
+        self.headers = {'X-Chain-Height': str(height)}
+        self.__payload = payload
+
+    def json(self):
+        """
+        Getter of the JSON body of the response.
+
+        :returns dict: The body of the response.
+        """
+
+        return self.__payload
+
+
+class SimulatedNetwork:
+    """
+    SimulatedNetwork class is used to deliver the requests of the nodes to each other in memory and to count them.
+
+    :method: __init__(self, latency=0, byte_latency=0, full_blocks=False)
+    :method: send(self, node, method, path, json=None, **kwargs)
+    :method: get_message_count(self)
+    :method: get_byte_count(self)
+    """
+
+    def __init__(self, latency=0, byte_latency=0, full_blocks=False):
+        """
+        Initialize an empty network.
+
+        :param latency float: The delay of each message in seconds. Default=0.
+        :param byte_latency float: The delay of each kilobyte of the body of a message in seconds, like a limited bandwidth. Default=0.
+        :param full_blocks bool: True to answer the compact blocks like a node without them, so the full blocks are relayed. Default=False.
+        :var nodes dict: Maps the URL of a node to its blockchain.
+        :var messages int: The number of delivered messages.
+        :var bytes int: The size of the JSON bodies of the delivered messages.
+        :var lock Lock: Protects the numbers of messages and bytes.
+        :returns SimulatedNetwork: Yields a network's instance.
+        """
+
+        self.latency = latency
+        self.byte_latency = byte_latency
+        self.full_blocks = full_blocks
+        self.nodes = {}
+        self.__messages = 0
+        self.__bytes = 0
+        self.__lock = Lock()
+
+    def send(self, node, method, path, json=None, **kwargs):
+        """
+        Delivers a request to a node, like the routes of node.py would handle it.
+
+        :param node str: The URL of the node.
+        :param method str: The HTTP method.
+        :param path str: The path of the route.
+        :param json dict: The JSON body of the request. Default=None.
+        :param kwargs dict: The other arguments of the request, ignored.
+        :var blockchain BlockChain: The blockchain of the node.
+        :returns SimulatedResponse: The response of the node.
+        :raises ConnectionError: If the node doesn't exist.
+        """
+
+        if self.full_blocks and path == '/broadcast-compact-block':
+            # Neither counted nor delayed, so the full blocks are measured like before the compact blocks
+            return SimulatedResponse(404, {'message': 'Not found'}, self.nodes[node].get_chain_info()['height'])
+        size = len(dumps(json)) if json != None else 0
+        with self.__lock:
+            self.__messages += 1
+            self.__bytes += size
+        if self.latency > 0 or self.byte_latency > 0:
+            sleep(self.latency + self.byte_latency * size / 1024)
+        blockchain = self.nodes.get(node)
+        if blockchain == None:
+            raise requests.exceptions.ConnectionError(node)
+        height = blockchain.get_chain_info()['height']
+        if path == '/broadcast-transaction':
+            if blockchain.add_transaction(json['recipient'], json['sender'], json['signature'], json['amount'],
+                                          is_receiving=True, scheme=json.get('scheme', 'rsa'), timestamp=json.get('timestamp')):
+                return SimulatedResponse(201, {'message': 'Successfully added transaction.'}, height)
+            return SimulatedResponse(500, {'message': 'Creating a transaction failed.'}, height)
+        if path == '/broadcast-block':
+            block = json['block']
+            if blockchain.is_known_block(block):
+                return SimulatedResponse(200, {'message': 'Block already known'}, height)
+            if blockchain.add_block(block):
+                return SimulatedResponse(201, {'message': 'Block added'}, blockchain.get_chain_info()['height'])
+            return SimulatedResponse(409, {'message': 'Block seems invalid or too old.'}, height)
+        if path == '/broadcast-compact-block':
+            (result, missing) = blockchain.add_compact_block(json['block'])
+            if result == 'added':
+                return SimulatedResponse(201, {'message': 'Block added'}, blockchain.get_chain_info()['height'])
+            if result == 'missing':
+                return SimulatedResponse(202, {'message': 'Transactions missing', 'missing': missing}, height)
+            if result == 'known':
+                return SimulatedResponse(200, {'message': 'Block already known'}, height)
+            return SimulatedResponse(409, {'message': 'Block seems invalid or too old.'}, height)
+        if path.startswith('/block/'):
+            block = blockchain.get_block(path[len('/block/'):])
+            if block == None:
+                return SimulatedResponse(404, {'message': 'Block not found'}, height)
+            return SimulatedResponse(200, {'block': block}, height)
+        return SimulatedResponse(404, {'message': 'Not found'}, height)
+
+    def get_message_count(self):
+        """
+        Getter of the number of delivered messages.
+
+        :returns int: The number of messages since the creation of the network.
+        """
+
+        with self.__lock:
+            return self.__messages
+
+    def get_byte_count(self):
+        """
+        Getter of the size of the delivered messages.
+
+        :returns int: The size in bytes of the JSON bodies of the messages since the creation of the network.
+        """
+
+        with self.__lock:
+            return self.__bytes
+
+
+def build_network(network, count, degree, wallet):
+    """
+    This function creates the nodes of the simulation and connects them: each node is connected to the next one (a ring, so the network is connected) and to random other nodes, in both directions.
+
+    :param network SimulatedNetwork: The network the nodes are added to.
+    :param count int: The number of nodes.
+    :param degree int: The number of peers added by each node, including the next node.
+    :param wallet Wallet: The wallet of the first node, which mines and sends the transactions.
+    :var peers set: The peers added by a node.
+    :returns list: The URLs of the nodes, the first one is the node of the wallet.
+    """
+
+    urls = ['sim-{}'.format(number) for number in range(count)]
+    for (number, url) in enumerate(urls):
+        public_key = wallet.public_key if number == 0 else None
+        network.nodes[url] = BlockChain(public_key, url)
+    for (number, url) in enumerate(urls):
+        peers = {urls[(number + 1) % count]}
+        others = [other for other in urls if other != url and other not in peers]
+        peers.update(random.sample(
+            others, min(max(degree - 1, 0), len(others))))
+        for peer in peers:
+            network.nodes[url].add_peer_node(peer)
+            network.nodes[peer].add_peer_node(url)
+    return urls
+
+
+def measure_propagation(network, has_item, timeout):
+    """
+    This function waits until every node has an item and measures when each node got it.
+
+    :param network SimulatedNetwork: The network of the nodes.
+    :param has_item function: Tells if a node (its blockchain) has the item.
+    :param timeout float: The maximum waiting time in seconds.
+    :var arrivals list: The time in seconds after which each node got the item.
+    :returns dict: The share of the nodes reached, the median and maximum arrival times in seconds, and the number and size in bytes of the messages.
+    """
+
+    start = perf_counter()
+    messages = network.get_message_count()
+    sent_bytes = network.get_byte_count()
+    waiting = dict(network.nodes)
+    arrivals = []
+    while len(waiting) > 0 and perf_counter() - start < timeout:
+        for (url, blockchain) in list(waiting.items()):
+            if has_item(blockchain):
+                arrivals.append(perf_counter() - start)
+                del waiting[url]
+        sleep(POLL_INTERVAL)
+    # Lets the last relays of duplicates arrive before counting the messages
+    sleep(max(network.latency * 4, 0.05))
+    return {
+        'coverage': len(arrivals) / len(network.nodes),
+        'median_seconds': median(arrivals) if len(arrivals) > 0 else None,
+        'max_seconds': max(arrivals) if len(arrivals) > 0 else None,
+        'messages': network.get_message_count() - messages,
+        'bytes': network.get_byte_count() - sent_bytes
+    }
+
+
+def run_simulation(count, degree, fanout, latency, transactions, timeout, byte_latency=0, full_blocks=False):
+    """
+    This function simulates a network in a temporary directory: the first node mines a block giving coins to its wallet, sends transactions and mines them, and the propagation of each of them is measured.
+
+    :param count int: The number of nodes.
+    :param degree int: The number of peers added by each node.
+    :param fanout int: The number of peers each node sends or relays a new item to.
+    :param latency float: The delay of each message in seconds.
+    :param transactions int: The number of sent transactions.
+    :param timeout float: The maximum waiting time of the propagation of an item in seconds.
+    :param byte_latency float: The delay of each kilobyte of a message in seconds. Default=0.
+    :param full_blocks bool: True to relay the full blocks instead of the compact blocks. Default=False.
+    :var results dict: The propagation of each item.
+    :returns dict: The propagation of the first block, of each transaction and of the block mining them.
+    """
+
+    network = SimulatedNetwork(latency, byte_latency, full_blocks)
+    previous_directory = os.getcwd()
+    previous_fanout = BlockChain.gossip_fanout
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        PeerManager.transport = network.send
+        BlockChain.gossip_fanout = fanout
+        BlockChain.broadcast_executor = ThreadPoolExecutor(
+            max_workers=SIMULATION_WORKERS)
+        try:
+            (wallet,) = generate_wallets(1)
+            urls = build_network(network, count, degree, wallet)
+            origin = network.nodes[urls[0]]
+
+            origin.mine_block()
+            results['block_1'] = measure_propagation(
+                network, lambda blockchain: blockchain.get_chain_info()['height'] >= 1, timeout)
+            for number in range(transactions):
+                recipient = urls[(number % (count - 1)) + 1]
+                timestamp = time()
+                signature = wallet.sign_transaction(
+                    wallet.public_key, recipient, 1, timestamp)
+                origin.add_transaction(recipient, wallet.public_key,
+                                       signature, 1, scheme=wallet.scheme, timestamp=timestamp)
+                txid = hash_transaction(origin.get_open_transactions()[-1])
+                results['transaction_{}'.format(number + 1)] = measure_propagation(network, lambda blockchain: txid in [
+                    hash_transaction(tx) for tx in blockchain.get_open_transactions()], timeout)
+            origin.mine_block()
+            results['block_2'] = measure_propagation(
+                network, lambda blockchain: blockchain.get_chain_info()['height'] >= 2, timeout)
+        finally:
+            BlockChain.broadcast_executor.shutdown(wait=True)
+            BlockChain.broadcast_executor = None
+            BlockChain.gossip_fanout = previous_fanout
+            PeerManager.transport = None
+            os.chdir(previous_directory)
+    return results
+
+
+def main():
+    """
+    Main program of the simulation, parses the options, runs the simulation and prints the results as JSON.
+
+    :var report dict: The configuration of the simulation and the propagation of each item.
+    :returns int: 1 if an item didn't reach every node, 0 if not.
+    """
+
+    parser = ArgumentParser(prog='python -m benchmarks.gossip_sim')
+    parser.add_argument('--nodes', type=int, default=20)
+    parser.add_argument('--degree', type=int, default=8)
+    parser.add_argument('--fanout', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.002)
+    parser.add_argument('--byte-latency', type=float, default=0)
+    parser.add_argument('--full-blocks', action='store_true')
+    parser.add_argument('--transactions', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    if args.nodes < 2:
+        parser.error('--nodes must be at least 2')
+    random.seed(args.seed)
+    # The messages printed by the nodes would mix with the JSON of the results
+    with redirect_stdout(sys.stderr):
+        results = run_simulation(args.nodes, args.degree, args.fanout,
+                                 args.latency, args.transactions, args.timeout, args.byte_latency, args.full_blocks)
+    report = {
+        'config': {
+            'nodes': args.nodes,
+            'degree': args.degree,
+            'fanout': args.fanout,
+            'latency': args.latency,
+            'byte_latency': args.byte_latency,
+            'full_blocks': args.full_blocks,
+            'transactions': args.transactions,
+            'seed': args.seed
+        },
+        'results': results
+    }
+    print(dumps(report, indent=2))
+    return 0 if all(result['coverage'] == 1 for result in results.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
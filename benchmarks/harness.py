@@ -0,0 +1,117 @@
+"""
+This module regroups the helpers of the benchmarks: timing a function and generating synthetic wallets and chains without any network.
+
+:function: time_call(func, repeat=5, setup=None)
+:function: generate_wallets(count, node_id='bench', scheme=DEFAULT_SCHEME)
+:function: generate_chain(node_id, wallets, blocks, txs_per_block)
+"""
+
+import json
+
+from statistics import mean, median
+from time import perf_counter, time
+
+from block import Block
+from blockchain import MINING_REWARD
+from transaction import Transaction, DEFAULT_SCHEME
+from utility.hash_util import hash_block
+from utility.verification import Verification
+from wallet import Wallet
+
+
+def time_call(func, repeat=5, setup=None):
+    """
+    This function calls a function several times and measures the duration of each call.
+
+    :param func function: The function to measure, called without arguments.
+    :param repeat int: The number of calls. Default=5.
+    :param setup function: Called without arguments before each call and not measured, like to fill the open transactions mined by the call. Default=None for no setup.
+    :var timings list: The duration of each call in seconds.
+    :returns dict: The number of calls and the minimum, mean, median and maximum durations in seconds.
+    """
+
+    timings = []
+    for _ in range(repeat):
+        if setup != None:
+            setup()
+        start = perf_counter()
+        func()
+        timings.append(perf_counter() - start)
+    return {
+        'repeat': repeat,
+        'min': min(timings),
+        'mean': mean(timings),
+        'median': median(timings),
+        'max': max(timings)
+    }
+
+
+def generate_wallets(count, node_id='bench', scheme=DEFAULT_SCHEME):
+    """
+    This function generates wallets with new keys, the keys are not saved on disk.
+
+    :param count int: The number of wallets.
+    :param node_id str: The prefix of the ID of the wallets. Default='bench'.
+    :param scheme str: The signature scheme of the keys. Default=DEFAULT_SCHEME.
+    :returns list: The generated wallets.
+    """
+
+    wallets = []
+    for number in range(count):
+        wallet = Wallet('{}-{}'.format(node_id, number), scheme)
+        wallet.create_keys()
+        wallets.append(wallet)
+    return wallets
+
+
+def generate_chain(node_id, wallets, blocks, txs_per_block):
+    """
+    This function generates a valid chain where the wallets mine in turn and send coins to each other, and writes it in the chain file of a node in the current directory.
+
+    The file only has the chain, the open transactions and the peer nodes, like the files saved before the headers, the states and the indexes existed, so loading it also rebuilds them.
+
+    :param node_id str: The ID of the node whose chain file is written.
+    :param wallets list: The wallets mining and sending the transactions.
+    :param blocks int: The number of blocks after the genesis block.
+    :param txs_per_block int: The maximum number of transactions in a block, without the mining reward.
+    :var balances dict: The balance of each wallet, so a wallet only sends coins it has.
+    :returns list: The generated chain.
+    """
+
+    balances = {}
+    chain = [Block(0, '', [], 100, 0)]
+    for height in range(1, blocks + 1):
+        transactions = []
+        for number in range(txs_per_block):
+            sender = wallets[(height + number) % len(wallets)]
+            recipient = wallets[(height + number + 1) % len(wallets)]
+            if balances.get(sender.public_key, 0) < 1:
+                continue
+            timestamp = time()
+            signature = sender.sign_transaction(
+                sender.public_key, recipient.public_key, 1, timestamp)
+            transactions.append(Transaction(
+                sender.public_key, recipient.public_key, signature, 1, sender.scheme, timestamp))
+            balances[sender.public_key] -= 1
+            balances[recipient.public_key] = balances.get(
+                recipient.public_key, 0) + 1
+        last_hash = hash_block(chain[-1])
+        proof = 0
+        while not Verification.valid_proof(transactions, last_hash, proof):
+            proof += 1
+        miner = wallets[height % len(wallets)]
+        transactions.append(Transaction(
+            'MINING', miner.public_key, '', MINING_REWARD))
+        balances[miner.public_key] = balances.get(
+            miner.public_key, 0) + MINING_REWARD
+        chain.append(Block(height, last_hash, transactions,
+                           proof, float(height)))
+    with open('blockchain-{}.txt'.format(node_id), mode='w') as file:
+        saveable_chain = [block.__dict__ for block in [Block(block_el.index, block_el.previous_hash, [
+            tx.__dict__ for tx in block_el.transactions], block_el.proof, block_el.timestamp) for block_el in chain]]
+        file.write(json.dumps(saveable_chain))
+        file.write('\n')
+        file.write(json.dumps([]))
+        file.write('\n')
+        file.write(json.dumps([]))
+    return chain
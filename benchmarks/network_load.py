@@ -0,0 +1,464 @@
+"""
+This module load-tests a network of real nodes on localhost and prints the results as JSON: the accepted and confirmed throughput of the transactions, the latency percentiles of the requests, how long the transactions and the blocks take to reach every node, and how often and how long the chains of the nodes diverge.
+
+The nodes are `node.py` (or `asgi_node.py`) processes on consecutive ports, each in its own temporary directory, connected to each other through the '/node' route in a ring, a full mesh or a random graph. They all start from the same generated chain, where the client wallets mined the first blocks so they have coins.
+The transactions are signed by the client wallets before the load starts, then sent at a fixed rate to the nodes in turn through the '/broadcast-transaction' route (the '/transaction' route signs with the wallet of the node), while blocks are mined at a fixed interval through the '/mine' route. Each node is followed through its '/events' stream, which tells when it receives each transaction and each block.
+
+How to use it, from the source folder:
+`python -m benchmarks.network_load --nodes 5 --topology random --degree 2 --rate 50 --duration 20 --mine-interval 2 --miners 2`
+
+:function: build_edges(count, topology, degree, rng)
+:function: follow_events(number, url, observations, stop)
+:function: sign_transactions(wallets, count, amount)
+:function: run_load(urls, transactions, rate, duration, mine_interval, miners, clients, observations)
+:function: wait_for_convergence(urls, timeout)
+:function: summarize(values)
+:function: main()
+"""
+
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from statistics import median
+from threading import Event, Lock, Thread
+from time import perf_counter, sleep, time
+
+import requests
+
+from benchmarks.harness import generate_wallets, generate_chain
+from benchmarks.server_load import SERVERS, start_server, wait_for_server
+from blockchain import MINING_REWARD
+from transaction import Transaction
+from utility.hash_util import hash_transaction
+
+# Topologies of the network: each node connected to the next one, to every node, or to the next one plus random nodes
+TOPOLOGIES = ('ring', 'full', 'random')
+# Seconds between two checks of the last block of each node, to measure the divergence of the chains
+DIVERGENCE_INTERVAL = 0.05
+# Number of times the client wallets can spend what they send during the load, so a wallet receiving less than it sends keeps enough coins
+FUNDING_MARGIN = 3
+
+
+def build_edges(count, topology, degree, rng):
+    """
+    This function chooses the connections between the nodes.
+
+    :param count int: The number of nodes.
+    :param topology str: 'ring', 'full' or 'random'.
+    :param degree int: The minimum number of peers of each node of the random topology.
+    :param rng Random: The random generator of the random topology.
+    :var edges set: The pairs of connected nodes, the smallest number first.
+    :returns list: The pairs of connected nodes, sorted.
+    """
+
+    edges = set()
+    if topology == 'full':
+        edges = {(first, second) for first in range(count)
+                 for second in range(first + 1, count)}
+    else:
+        # The ring keeps the random graph connected
+        edges = {tuple(sorted((number, (number + 1) % count)))
+                 for number in range(count) if count > 1}
+    if topology == 'random':
+        for number in range(count):
+            others = [other for other in range(count) if other != number]
+            rng.shuffle(others)
+            for other in others:
+                if sum(1 for edge in edges if number in edge) >= degree:
+                    break
+                edges.add(tuple(sorted((number, other))))
+    return sorted(edges)
+
+
+def follow_events(number, url, observations, stop):
+    """
+    This function reads the '/events' stream of a node until the load test stops, and records when the node received each transaction and each block and which block is its last block.
+
+    :param number int: The number of the node.
+    :param url str: The URL of the node.
+    :param observations dict: The shared observations: 'lock', 'ready' (events set once each stream is open), 'transactions' and 'blocks' (map an ID to the time each node received it), 'heights' (maps the hash of a block to its index), 'confirmed' (maps a transaction ID to the first time it was in a block) and 'tips' (the hash of the last block of each node).
+    :param stop Event: Set when the load test stops.
+    :var event_type str: The type of the event being read.
+    :returns: None.
+    """
+
+    try:
+        response = requests.get(url + '/events', stream=True, timeout=(5, 30))
+    except requests.exceptions.RequestException:
+        observations['ready'][number].set()
+        return
+    observations['streams'].append(response)
+    observations['ready'][number].set()
+    event_type = None
+    try:
+        for line in response.iter_lines(decode_unicode=True):
+            if stop.is_set():
+                break
+            if line.startswith('event: '):
+                event_type = line[len('event: '):]
+            elif line.startswith('data: '):
+                data = json.loads(line[len('data: '):])
+                now = perf_counter()
+                with observations['lock']:
+                    if event_type == 'mempool_add':
+                        observations['transactions'].setdefault(
+                            data['txid'], {}).setdefault(number, now)
+                    elif event_type == 'block':
+                        observations['blocks'].setdefault(
+                            data['header']['hash'], {}).setdefault(number, now)
+                        observations['heights'][data['header']['hash']] = data['header']['index']
+                        observations['tips'][number] = data['header']['hash']
+                        for txid in data['txids']:
+                            observations['confirmed'].setdefault(txid, now)
+                    elif event_type == 'chain_replaced':
+                        observations['tips'][number] = data['header']['hash']
+    except (requests.exceptions.RequestException, AttributeError, ValueError):
+        # The stream is closed at the end of the load test
+        pass
+
+
+def sign_transactions(wallets, count, amount):
+    """
+    This function signs the transactions of the load test, each wallet sending to the next one in turn. Each amount is slightly different, so no two transactions have the same ID.
+
+    :param wallets list: The client wallets.
+    :param count int: The number of transactions.
+    :param amount float: The amount of the transactions.
+    :var sender Wallet: The wallet sending a transaction.
+    :returns list: The transactions as the JSON bodies of the '/broadcast-transaction' route, with their IDs.
+    """
+
+    transactions = []
+    for number in range(count):
+        sender = wallets[number % len(wallets)]
+        recipient = wallets[(number + 1) % len(wallets)]
+        value = round(amount + number * 1e-6, 6)
+        timestamp = time()
+        signature = sender.sign_transaction(
+            sender.public_key, recipient.public_key, value, timestamp)
+        transaction = Transaction(
+            sender.public_key, recipient.public_key, signature, value, sender.scheme, timestamp)
+        transactions.append((hash_transaction(transaction), {
+            'sender': sender.public_key, 'recipient': recipient.public_key, 'amount': value,
+            'signature': signature, 'scheme': sender.scheme, 'timestamp': timestamp}))
+    return transactions
+
+
+def run_load(urls, transactions, rate, duration, mine_interval, miners, clients, observations):
+    """
+    This function sends the transactions at a fixed rate to the nodes in turn and mines blocks at a fixed interval, while the chains of the nodes are checked for divergence.
+
+    The transactions are sent on schedule whatever the answers of the nodes (open loop), and their latency is measured from their scheduled time, so a slow node doesn't hide its queue.
+
+    :param urls list: The URLs of the nodes.
+    :param transactions list: The signed transactions and their IDs.
+    :param rate float: The number of transactions sent per second.
+    :param duration float: The duration of the load in seconds.
+    :param mine_interval float: The seconds between two rounds of mining.
+    :param miners int: The number of nodes mining at the same time in each round, more than 1 creates competing blocks.
+    :param clients int: The number of concurrent requests.
+    :param observations dict: The shared observations, see follow_events.
+    :var sent dict: Maps the ID of each transaction to its scheduled time and to the answer of the node.
+    :var divergence dict: The number of checks, the checks where the nodes didn't have the same last block (because of a competing block or because a block had not reached every node yet), and the duration of each of these periods.
+    :returns dict: The sent transactions, the durations of the requests, the mining results and the divergence.
+    """
+
+    sent = {}
+    durations = {'transaction': [], 'mine': []}
+    mining = {'rounds': 0, 'blocks': 0, 'failures': 0}
+    divergence = {'checks': 0, 'diverged_checks': 0, 'max_distinct_tips': 1, 'episodes': []}
+    lock = Lock()
+    done = Event()
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=len(urls), pool_maxsize=clients)
+    session.mount('http://', adapter)
+
+    def send(number, scheduled):
+        (txid, body) = transactions[number]
+        try:
+            response = session.post(
+                urls[number % len(urls)] + '/broadcast-transaction', json=body, timeout=60)
+            status = response.status_code
+        except requests.exceptions.RequestException:
+            status = None
+        with lock:
+            sent[txid] = (scheduled, status)
+            durations['transaction'].append(perf_counter() - scheduled)
+
+    def mine(url):
+        start = perf_counter()
+        try:
+            response = session.post(url + '/mine', timeout=120)
+            success = response.status_code == 201
+        except requests.exceptions.RequestException:
+            success = False
+        with lock:
+            durations['mine'].append(perf_counter() - start)
+            mining['blocks' if success else 'failures'] += 1
+
+    def mine_rounds(executor):
+        next_round = perf_counter() + mine_interval
+        while not done.wait(max(0, next_round - perf_counter())):
+            first = mining['rounds'] * miners
+            for offset in range(min(miners, len(urls))):
+                executor.submit(mine, urls[(first + offset) % len(urls)])
+            mining['rounds'] += 1
+            next_round += mine_interval
+
+    def check_divergence():
+        diverged_since = None
+        while not done.wait(DIVERGENCE_INTERVAL):
+            with observations['lock']:
+                tips = set(observations['tips'])
+            divergence['checks'] += 1
+            divergence['max_distinct_tips'] = max(
+                divergence['max_distinct_tips'], len(tips))
+            if len(tips) > 1:
+                divergence['diverged_checks'] += 1
+                if diverged_since == None:
+                    diverged_since = perf_counter()
+            elif diverged_since != None:
+                divergence['episodes'].append(perf_counter() - diverged_since)
+                diverged_since = None
+
+    count = min(len(transactions), int(rate * duration))
+    with ThreadPoolExecutor(max_workers=clients) as executor, ThreadPoolExecutor(max_workers=max(1, miners)) as mining_executor:
+        threads = [Thread(target=mine_rounds, args=(mining_executor,), daemon=True),
+                   Thread(target=check_divergence, daemon=True)]
+        for thread in threads:
+            thread.start()
+        start = perf_counter()
+        for number in range(count):
+            scheduled = start + number / rate
+            sleep(max(0, scheduled - perf_counter()))
+            executor.submit(send, number, scheduled)
+        sleep(max(0, start + duration - perf_counter()))
+        done.set()
+        for thread in threads:
+            thread.join()
+        elapsed = perf_counter() - start
+    return {'sent': sent, 'durations': durations, 'mining': mining, 'divergence': divergence, 'seconds': elapsed}
+
+
+def wait_for_convergence(urls, timeout):
+    """
+    This function waits until every node has the same last block, after the load.
+
+    :param urls list: The URLs of the nodes.
+    :param timeout float: The maximum waiting time in seconds.
+    :var tips set: The hashes of the last blocks of the nodes.
+    :returns tuple: The seconds waited (None if the nodes didn't converge) and the index of their last block.
+    """
+
+    start = perf_counter()
+    while True:
+        tips = set()
+        height = None
+        for url in urls:
+            try:
+                response = requests.get(url + '/chain/info', timeout=10)
+                height = int(response.json()['height'])
+                header = requests.get(
+                    url + '/headers', params={'start': height, 'end': height}, timeout=10).json()[-1]
+                tips.add(header['hash'])
+            except (requests.exceptions.RequestException, ValueError, KeyError, IndexError):
+                tips.add(None)
+        if len(tips) == 1 and None not in tips:
+            return (perf_counter() - start, height)
+        if perf_counter() - start > timeout:
+            return (None, None)
+        sleep(0.2)
+
+
+def summarize(values):
+    """
+    This function gives the count and the percentiles of durations.
+
+    :param values list: The durations in seconds.
+    :var ordered list: The sorted durations.
+    :returns dict: The count, the median, the 95th and 99th percentiles and the maximum, None when there is no duration.
+    """
+
+    ordered = sorted(values)
+    if len(ordered) == 0:
+        return {'count': 0, 'p50': None, 'p95': None, 'p99': None, 'max': None}
+
+    def percentile(ratio):
+        return ordered[min(len(ordered) - 1, int(ratio * len(ordered)))]
+
+    return {'count': len(ordered), 'p50': median(ordered), 'p95': percentile(0.95), 'p99': percentile(0.99), 'max': ordered[-1]}
+
+
+def main():
+    """
+    Main program of the network load test, starts and connects the nodes, runs the load, waits for the nodes to converge and prints the results as JSON.
+
+    :var report dict: The configuration of the run and its results.
+    :returns int: 1 if a node didn't start or the nodes didn't converge, 0 if not.
+    """
+
+    parser = ArgumentParser(prog='python -m benchmarks.network_load')
+    parser.add_argument('--nodes', type=int, default=4)
+    parser.add_argument('--port', type=int, default=5200)
+    parser.add_argument('--server', type=str, default='flask',
+                        choices=list(SERVERS.keys()))
+    parser.add_argument('--storage', type=str, default='sqlite')
+    parser.add_argument('--topology', type=str,
+                        default='ring', choices=TOPOLOGIES)
+    parser.add_argument('--degree', type=int, default=2)
+    parser.add_argument('--wallets', type=int, default=10)
+    parser.add_argument('--scheme', type=str, default='ed25519')
+    parser.add_argument('--rate', type=float, default=20)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--amount', type=float, default=0.01)
+    parser.add_argument('--mine-interval', type=float, default=2)
+    parser.add_argument('--miners', type=int, default=1)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--settle', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    if args.nodes < 1 or args.wallets < 2 or args.rate <= 0 or args.duration <= 0 or args.mine_interval <= 0:
+        parser.error('--nodes must be at least 1, --wallets at least 2, --rate, --duration and --mine-interval positive')
+
+    rng = random.Random(args.seed)
+    urls = ['http://127.0.0.1:{}'.format(args.port + number)
+            for number in range(args.nodes)]
+    edges = build_edges(args.nodes, args.topology, args.degree, rng)
+    count = int(args.rate * args.duration)
+    report = {
+        'config': {
+            'nodes': args.nodes,
+            'server': args.server,
+            'storage': args.storage,
+            'topology': args.topology,
+            'edges': len(edges),
+            'wallets': args.wallets,
+            'rate': args.rate,
+            'duration': args.duration,
+            'mine_interval': args.mine_interval,
+            'miners': args.miners
+        }
+    }
+    processes = []
+    stop = Event()
+    observations = {'lock': Lock(), 'ready': [Event() for _ in urls], 'streams': [],
+                    'transactions': {}, 'blocks': {}, 'heights': {}, 'confirmed': {}, 'tips': [None] * args.nodes}
+    exit_code = 0
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            # The messages printed while generating would mix with the JSON of the results
+            with redirect_stdout(sys.stderr):
+                wallets = generate_wallets(
+                    args.wallets, 'load', args.scheme)
+                # Each wallet mines enough blocks to send its share of the transactions several times
+                rounds = max(1, int(FUNDING_MARGIN * count /
+                             args.wallets * args.amount / MINING_REWARD) + 1)
+                previous_directory = os.getcwd()
+                os.chdir(directory)
+                try:
+                    generate_chain('load', wallets, rounds * args.wallets, 0)
+                finally:
+                    os.chdir(previous_directory)
+                transactions = sign_transactions(wallets, count, args.amount)
+            for (number, url) in enumerate(urls):
+                node_directory = os.path.join(directory, str(number))
+                os.mkdir(node_directory)
+                shutil.copy(os.path.join(directory, 'blockchain-load.txt'),
+                            os.path.join(node_directory, 'blockchain-{}.txt'.format(args.port + number)))
+                processes.append(start_server(SERVERS[args.server], args.port + number, node_directory,
+                                              ['--storage', args.storage]))
+            if not all(wait_for_server(url) for url in urls):
+                report['results'] = {'message': 'A node did not start.'}
+                exit_code = 1
+                return exit_code
+            for url in urls:
+                requests.post(url + '/wallet', timeout=30).raise_for_status()
+            for (first, second) in edges:
+                requests.post(urls[first] + '/node', json={'node': urls[second][len('http://'):]},
+                              timeout=30).raise_for_status()
+                requests.post(urls[second] + '/node', json={'node': urls[first][len('http://'):]},
+                              timeout=30).raise_for_status()
+            for (number, url) in enumerate(urls):
+                Thread(target=follow_events, args=(number, url, observations, stop),
+                       daemon=True).start()
+            for ready in observations['ready']:
+                ready.wait(10)
+
+            load = run_load(urls, transactions, args.rate, args.duration,
+                            args.mine_interval, args.miners, args.clients, observations)
+            (convergence, height) = wait_for_convergence(urls, args.settle)
+            if convergence == None:
+                exit_code = 1
+            # The transactions of the last blocks may still be relayed
+            sleep(0.5)
+            with observations['lock']:
+                seen = {txid: dict(times) for (txid, times)
+                        in observations['transactions'].items()}
+                blocks = {block_hash: dict(times) for (block_hash, times)
+                          in observations['blocks'].items()}
+                confirmed = dict(observations['confirmed'])
+                heights = list(observations['heights'].values())
+            accepted = [txid for (txid, (scheduled, status))
+                        in load['sent'].items() if status == 201]
+            # The time a transaction takes to reach every node, only for the transactions every node received
+            propagation = [max(seen[txid].values()) - load['sent'][txid][0]
+                           for txid in accepted if txid in seen and len(seen[txid]) == args.nodes]
+            confirmation = [confirmed[txid] - load['sent'][txid][0]
+                            for txid in accepted if txid in confirmed]
+            # The time a block takes to reach every node from the first node having it
+            block_propagation = [max(times.values()) - min(times.values())
+                                 for times in blocks.values() if len(times) == args.nodes]
+            divergence = load['divergence']
+            report['results'] = {
+                'seconds': load['seconds'],
+                'transactions': {
+                    'sent': len(load['sent']),
+                    'accepted': len(accepted),
+                    'rejected': len(load['sent']) - len(accepted),
+                    'accepted_per_second': len(accepted) / load['seconds'],
+                    'confirmed': len(confirmation),
+                    'confirmed_per_second': len(confirmation) / load['seconds'],
+                    'request_latency': summarize(load['durations']['transaction']),
+                    'propagation_to_all_nodes': summarize(propagation),
+                    'confirmation_latency': summarize(confirmation)
+                },
+                'blocks': {
+                    'mined': load['mining']['blocks'],
+                    'mining_failures': load['mining']['failures'],
+                    'mine_latency': summarize(load['durations']['mine']),
+                    'seen_by_every_node': len(block_propagation),
+                    # Blocks mined at a height where another block was mined, only one of them stays in the chain
+                    'competing': len(heights) - len(set(heights)),
+                    'propagation_to_all_nodes': summarize(block_propagation)
+                },
+                # The nodes diverge while a block propagates or while competing blocks are resolved
+                'divergence': {
+                    'checks': divergence['checks'],
+                    'diverged_ratio': divergence['diverged_checks'] / divergence['checks'] if divergence['checks'] > 0 else None,
+                    'max_distinct_tips': divergence['max_distinct_tips'],
+                    'resolution_time': summarize(divergence['episodes'])
+                },
+                'final_convergence_seconds': convergence,
+                'final_height': height
+            }
+        finally:
+            stop.set()
+            for response in observations['streams']:
+                response.close()
+            for process in processes:
+                process.terminate()
+                process.wait()
+            print(json.dumps(report, indent=2))
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
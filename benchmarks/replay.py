@@ -0,0 +1,228 @@
+"""
+This module replays a capture of the traffic of a node (`node.py --capture <file>`) against fresh nodes of one or more builds and prints the latency and the throughput of each build as JSON, with their differences from the first build.
+
+Each build is started in a temporary directory with `--offline`, so its requests to the peer nodes are answered locally and the replay runs without a network (the builds must have this option). The node gets a new wallet and mines a few blocks, or starts from a copy of the node data given by `--data` (like the chain file of the captured node when the capture started), then receives the captured requests in their order, at their original times divided by `--speed` (0 to send them as fast as the clients can).
+The streams of the '/events' route and the requests whose body was too big to be captured are skipped. The statuses differing from the captured ones are counted, they show where the fresh node doesn't have the data of the captured node.
+
+How to use it, from the source folder:
+`python -m benchmarks.replay capture.jsonl.gz --builds ../old-build . --speed 2`
+
+:function: route_of(path)
+:function: prepare_data(data, directory, port)
+:function: replay(entries, url, speed, clients)
+:function: compare(baseline, result)
+:function: main()
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter, sleep
+
+import requests
+
+from benchmarks.network_load import summarize
+from benchmarks.server_load import SERVERS, SOURCE_DIRECTORY, start_server, wait_for_server, prepare_node
+from utility.capture import read_capture
+from utility.storage import STORAGE_BACKENDS
+
+# Routes not replayed: the event streams never end
+SKIPPED_ROUTES = ('/events',)
+# Minimum length of a part of a path considered as a key or a hash, replaced by '<key>' in the routes of the report
+KEY_LENGTH = 32
+
+
+def route_of(path):
+    """
+    This function gives the route of a captured path for the report, without its query string and with its keys and hashes replaced, so the requests to the same route are counted together.
+
+    :param path str: The captured path and query string.
+    :returns str: The route.
+    """
+
+    parts = path.split('?')[0].split('/')
+    return '/'.join('<key>' if len(part) >= KEY_LENGTH else part for part in parts)
+
+
+def prepare_data(data, directory, port):
+    """
+    This function copies the data of a node in the directory of a fresh node, read by the node as its own chain file.
+
+    :param data str: The chain file to copy, like 'blockchain-5000.txt'.
+    :param directory str: The directory of the fresh node.
+    :param port int: The port of the fresh node.
+    :returns: None.
+    """
+
+    shutil.copy(data, os.path.join(
+        directory, 'blockchain-{}.txt'.format(port)))
+
+
+def replay(entries, url, speed, clients):
+    """
+    This function sends the captured requests to a node, in their order and at their captured times divided by the speed.
+
+    :param entries list: The captured requests to send, ordered by start time.
+    :param url str: The URL of the node.
+    :param speed float: The factor dividing the captured times, 0 to send the requests without waiting.
+    :param clients int: The number of concurrent clients, a request waits for a free client.
+    :var results list: The route, the status (None if the request failed) and the duration of each request.
+    :var durations dict: The durations of the successful requests by route.
+    :returns dict: The number of requests, of failed requests and of statuses differing from the capture, the duration of the replay, the throughput, and the percentiles of the durations overall and by route.
+    """
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=clients, pool_maxsize=clients)
+    session.mount('http://', adapter)
+
+    def send(entry):
+        headers = {'Content-Type': entry['c']} if 'c' in entry else {}
+        start = perf_counter()
+        try:
+            response = session.request(entry['m'], url + entry['p'], data=entry.get('b', '').encode('utf8'),
+                                       headers=headers, timeout=120)
+        except requests.exceptions.RequestException:
+            return (route_of(entry['p']), None, None)
+        return (route_of(entry['p']), response.status_code, perf_counter() - start)
+
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        futures = []
+        for entry in entries:
+            if speed > 0:
+                delay = start + entry['t'] / speed - perf_counter()
+                if delay > 0:
+                    sleep(delay)
+            futures.append(executor.submit(send, entry))
+        results = [future.result() for future in futures]
+    elapsed = perf_counter() - start
+    durations = {}
+    for (route, status, duration) in results:
+        if status != None:
+            durations.setdefault(route, []).append(duration)
+    mismatches = sum(1 for (entry, (_, status, _)) in zip(entries, results)
+                     if status != None and status != entry['s'])
+    completed = sum(len(values) for values in durations.values())
+    return {
+        'requests': len(results),
+        'errors': len(results) - completed,
+        'status_mismatches': mismatches,
+        'seconds': elapsed,
+        'throughput': completed / elapsed if elapsed > 0 else None,
+        'latency': summarize([duration for values in durations.values() for duration in values]),
+        'routes': {route: summarize(values) for (route, values) in sorted(durations.items())}
+    }
+
+
+def compare(baseline, result):
+    """
+    This function gives the ratios of the throughput and of the latencies of a build to the ones of the first build, a latency ratio above 1 means the build is slower.
+
+    :param baseline dict: The result of the first build.
+    :param result dict: The result of the compared build.
+    :returns dict: The ratio of the throughputs, of the median and 95th percentile latencies, and of the median latency of each route of both results.
+    """
+
+    def ratio(value, reference):
+        if value == None or reference == None or reference == 0:
+            return None
+        return value / reference
+
+    return {
+        'throughput_ratio': ratio(result['throughput'], baseline['throughput']),
+        'p50_ratio': ratio(result['latency']['p50'], baseline['latency']['p50']),
+        'p95_ratio': ratio(result['latency']['p95'], baseline['latency']['p95']),
+        'routes': {route: ratio(summary['p50'], baseline['routes'][route]['p50'])
+                   for (route, summary) in result['routes'].items() if route in baseline['routes']}
+    }
+
+
+def main():
+    """
+    Main program of the replay, replays the capture against a fresh node of each build and prints the results as JSON.
+
+    :var replayed list: The captured requests replayed, ordered by start time.
+    :var report dict: The configuration of the run, the summary of the capture, and the results and the differences of each build.
+    :returns int: 1 if a node didn't start, 0 if not.
+    """
+
+    parser = ArgumentParser(prog='python -m benchmarks.replay')
+    parser.add_argument('capture', type=str)
+    parser.add_argument('--builds', type=str, nargs='+',
+                        default=[SOURCE_DIRECTORY])
+    parser.add_argument('--speed', type=float, default=1.0)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--blocks', type=int, default=3)
+    parser.add_argument('--data', type=str, default=None)
+    parser.add_argument('--server', type=str, default='flask',
+                        choices=list(SERVERS.keys()))
+    parser.add_argument('--storage', type=str, default='file',
+                        choices=list(STORAGE_BACKENDS.keys()))
+    parser.add_argument('--port', type=int, default=5300)
+    args = parser.parse_args()
+    if args.speed < 0 or args.clients < 1:
+        parser.error('--speed must not be negative and --clients must be at least 1')
+
+    (header, entries) = read_capture(args.capture)
+    replayed = sorted((entry for entry in entries if 'x' not in entry and route_of(entry['p']) not in SKIPPED_ROUTES),
+                      key=lambda entry: entry['t'])
+    report = {
+        'config': {
+            'capture': args.capture,
+            'builds': {'build{}'.format(number + 1): os.path.abspath(build) for (number, build) in enumerate(args.builds)},
+            'speed': args.speed,
+            'clients': args.clients,
+            'blocks': args.blocks,
+            'data': args.data,
+            'server': args.server,
+            'storage': args.storage
+        },
+        'capture': {
+            'started': header['started'],
+            'requests': len(entries),
+            'skipped': len(entries) - len(replayed),
+            'seconds': replayed[-1]['t'] if len(replayed) > 0 else 0,
+            'latency': summarize([entry['d'] for entry in replayed])
+        },
+        'results': {},
+        'differences': {}
+    }
+    exit_code = 0
+    for (number, build) in enumerate(args.builds):
+        name = 'build{}'.format(number + 1)
+        port = args.port + number
+        url = 'http://127.0.0.1:{}'.format(port)
+        with tempfile.TemporaryDirectory() as directory:
+            if args.data != None:
+                prepare_data(args.data, directory, port)
+            process = start_server(SERVERS[args.server], port, directory,
+                                   ['--offline', '--storage', args.storage], os.path.abspath(build))
+            try:
+                if not wait_for_server(url):
+                    report['results'][name] = {
+                        'message': 'The server did not start.'}
+                    exit_code = 1
+                    continue
+                prepare_node(url, args.blocks, None)
+                report['results'][name] = replay(
+                    replayed, url, args.speed, args.clients)
+            finally:
+                process.terminate()
+                process.wait()
+    baseline = report['results'].get('build1')
+    if baseline != None and 'latency' in baseline:
+        for (name, result) in report['results'].items():
+            if name != 'build1' and 'latency' in result:
+                report['differences'][name] = compare(baseline, result)
+    print(json.dumps(report, indent=2))
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
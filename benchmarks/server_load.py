@@ -0,0 +1,253 @@
+"""
+This module compares the throughput of the Flask server of `node.py` with the asynchronous server of `asgi_node.py` under concurrent requests and prints the results as JSON.
+
+Each server is started in a temporary directory with a new wallet and a few mined blocks, then receives a mix of reads, transactions and mining from many clients at once.
+With `--slow-peer`, the nodes have a peer node answering slowly, so the broadcasts of the transactions and the blocks show how much a slow peer blocks each server.
+The report states the limit of the asynchronous server measured here: its requests to the peer nodes are not sent from the event loop but with the blocking `requests` library from its threads, so enough slow peers to hold all these threads stall it like the Flask server.
+
+How to use it, from the source folder:
+`python -m benchmarks.server_load --clients 32 --requests 2000 --slow-peer 0.5`
+
+:function: start_slow_peer(delay)
+:function: start_server(script, port, directory, options=(), source=SOURCE_DIRECTORY)
+:function: wait_for_server(url, timeout=30)
+:function: prepare_node(url, blocks, slow_peer)
+:function: run_load(url, clients, requests_count, mine_every)
+:function: main()
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from statistics import median
+from threading import Thread
+from time import perf_counter, sleep
+
+import requests
+
+# Folder of node.py and asgi_node.py
+SOURCE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Scripts of the compared servers
+SERVERS = {'flask': 'node.py', 'asgi': 'asgi_node.py'}
+# Routes read by the clients, in turn
+READ_ROUTES = ['/chain', '/balance', '/transactions', '/nodes']
+# Limits of the compared servers, given with their results
+LIMITATIONS = ['The asynchronous server runs its routes in threads and only serves the /events stream on its event loop: the requests to the peer nodes (broadcasts, resolution of conflicts, discovery) are still sent with the blocking requests library from threads (IO_WORKERS threads for the routes and BROADCAST_WORKERS for the broadcasts in asgi_node.py), not with an asynchronous client.',
+               'A slow peer holds one of these threads per request for up to the timeout of the request, so the --slow-peer results hold while the slow requests in flight are fewer than these threads; beyond that the asynchronous server waits for a free thread like the Flask server.']
+
+
+def start_slow_peer(delay):
+    """
+    This function starts a local HTTP server answering every request with a success after a delay, registered as a peer node of the tested nodes.
+
+    :param delay float: The delay in seconds before each answer.
+    :var server ThreadingHTTPServer: The slow server, on a free port of 127.0.0.1.
+    :returns ThreadingHTTPServer: The running slow server, to stop with shutdown().
+    """
+
+    class SlowPeerHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            self.rfile.read(length)
+            sleep(delay)
+            body = json.dumps({'message': 'Slow peer'}).encode()
+            try:
+                self.send_response(201)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except ConnectionError:
+                # The node stopped waiting, like when it is terminated at the end of its load
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowPeerHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_server(script, port, directory, options=(), source=SOURCE_DIRECTORY):
+    """
+    This function starts a node server in a subprocess, its files are written in a temporary directory.
+
+    :param script str: The script of the server, 'node.py' or 'asgi_node.py'.
+    :param port int: The port of the server.
+    :param directory str: The directory of the files of the node.
+    :param options list: The other options of the server, like ['--storage', 'sqlite']. Default=().
+    :param source str: The source folder of the server, like another build of the node. Default=SOURCE_DIRECTORY.
+    :returns Popen: The process of the server.
+    """
+
+    return subprocess.Popen([sys.executable, os.path.join(source, script), '-p', str(port)] + list(options), cwd=directory,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_for_server(url, timeout=30):
+    """
+    This function waits until a server answers.
+
+    :param url str: The URL of the server.
+    :param timeout float: The maximum waiting time in seconds. Default=30.
+    :returns bool: True if the server answers, False if not before the timeout.
+    """
+
+    deadline = perf_counter() + timeout
+    while perf_counter() < deadline:
+        try:
+            requests.get(url + '/nodes', timeout=1)
+            return True
+        except requests.exceptions.RequestException:
+            sleep(0.2)
+    return False
+
+
+def prepare_node(url, blocks, slow_peer):
+    """
+    This function creates the wallet of a node, mines its first blocks and registers the slow peer node.
+
+    :param url str: The URL of the node.
+    :param blocks int: The number of mined blocks, so the wallet has coins to send.
+    :param slow_peer str: The host:port of the slow peer node, None for no peer.
+    :returns: None.
+    """
+
+    requests.post(url + '/wallet', timeout=30).raise_for_status()
+    for _ in range(blocks):
+        requests.post(url + '/mine', timeout=60).raise_for_status()
+    if slow_peer != None:
+        requests.post(url + '/node', json={'node': slow_peer},
+                      timeout=30).raise_for_status()
+
+
+def run_load(url, clients, requests_count, mine_every):
+    """
+    This function sends a mix of requests to a node from concurrent clients and measures their durations.
+
+    :param url str: The URL of the node.
+    :param clients int: The number of concurrent clients.
+    :param requests_count int: The total number of requests.
+    :param mine_every int: One request out of mine_every mines a block, one out of 10 sends a transaction, the others read.
+    :var durations list: The duration of each successful request in seconds.
+    :var errors int: The number of failed requests.
+    :returns dict: The throughput, the number of errors and the percentiles of the durations.
+    """
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=clients, pool_maxsize=clients)
+    session.mount('http://', adapter)
+    recipient = 'load-test-recipient'
+
+    def send(number):
+        start = perf_counter()
+        try:
+            if number % mine_every == 0:
+                response = session.post(url + '/mine', timeout=120)
+            elif number % 10 == 0:
+                response = session.post(
+                    url + '/transaction', json={'recipient': recipient, 'amount': 0.01}, timeout=120)
+            else:
+                response = session.get(
+                    url + READ_ROUTES[number % len(READ_ROUTES)], timeout=120)
+        except requests.exceptions.RequestException:
+            return None
+        if response.status_code >= 500:
+            return None
+        return perf_counter() - start
+
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(send, range(1, requests_count + 1)))
+    elapsed = perf_counter() - start
+    durations = sorted(
+        duration for duration in results if duration != None)
+    errors = len(results) - len(durations)
+
+    def percentile(ratio):
+        if len(durations) == 0:
+            return None
+        return durations[min(len(durations) - 1, int(ratio * len(durations)))]
+
+    return {
+        'requests': requests_count,
+        'errors': errors,
+        'seconds': elapsed,
+        'throughput': len(durations) / elapsed,
+        'p50': median(durations) if len(durations) > 0 else None,
+        'p95': percentile(0.95),
+        'p99': percentile(0.99)
+    }
+
+
+def main():
+    """
+    Main program of the load test, starts each server, loads it and prints the results as JSON.
+
+    :var report dict: The configuration of the run, the results of each server and the limits of the servers.
+    :returns int: 1 if a server didn't start, 0 if not.
+    """
+
+    parser = ArgumentParser(prog='python -m benchmarks.server_load')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--blocks', type=int, default=3)
+    parser.add_argument('--mine-every', type=int, default=100)
+    parser.add_argument('--slow-peer', type=float, default=None)
+    parser.add_argument('--port', type=int, default=5100)
+    parser.add_argument('--servers', type=str, nargs='+',
+                        default=list(SERVERS.keys()), choices=list(SERVERS.keys()))
+    args = parser.parse_args()
+
+    slow_server = None
+    slow_peer = None
+    if args.slow_peer != None:
+        slow_server = start_slow_peer(args.slow_peer)
+        slow_peer = '127.0.0.1:{}'.format(slow_server.server_address[1])
+    report = {
+        'config': {
+            'clients': args.clients,
+            'requests': args.requests,
+            'blocks': args.blocks,
+            'mine_every': args.mine_every,
+            'slow_peer': args.slow_peer
+        },
+        'results': {},
+        'limitations': LIMITATIONS
+    }
+    exit_code = 0
+    try:
+        for (offset, name) in enumerate(args.servers):
+            port = args.port + offset
+            url = 'http://127.0.0.1:{}'.format(port)
+            with tempfile.TemporaryDirectory() as directory:
+                process = start_server(SERVERS[name], port, directory)
+                try:
+                    if not wait_for_server(url):
+                        report['results'][name] = {
+                            'message': 'The server did not start.'}
+                        exit_code = 1
+                        continue
+                    prepare_node(url, args.blocks, slow_peer)
+                    report['results'][name] = run_load(
+                        url, args.clients, args.requests, args.mine_every)
+                finally:
+                    process.terminate()
+                    process.wait()
+    finally:
+        if slow_server != None:
+            slow_server.shutdown()
+    print(json.dumps(report, indent=2))
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
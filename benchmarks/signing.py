@@ -0,0 +1,96 @@
+"""
+This module measures the throughput of signing and verifying transactions with each signature scheme of the wallets and prints the results as JSON.
+
+How to use it, from the source folder:
+`python -m benchmarks.signing --transactions 500`
+
+:function: run_signing_benchmarks(scheme, count, repeat)
+:function: main()
+"""
+
+import json
+import sys
+
+from argparse import ArgumentParser
+from time import time
+
+from benchmarks.harness import time_call, generate_wallets
+from transaction import Transaction, signed_payload
+from wallet import Wallet, SIGNATURE_SCHEMES
+
+
+def run_signing_benchmarks(scheme, count, repeat):
+    """
+    This function signs and verifies a batch of transactions with a signature scheme and measures the throughput of each operation.
+
+    'sign_parsing_key' parses the private key before each signature like the wallet did before keeping its signer, to compare with the current 'sign_transaction'.
+
+    :param scheme str: The tag of the signature scheme.
+    :param count int: The number of transactions of the batch.
+    :param repeat int: The number of times each batch is measured.
+    :var payloads list: The (sender, recipient, amount, timestamp) of the transactions of the batch.
+    :var results dict: The timings of each operation, with the number of transactions per second of the median.
+    :returns dict: The timings of each operation and the sizes in characters of an address and of a signature.
+    """
+
+    (wallet, recipient) = generate_wallets(2, scheme=scheme)
+    signature_scheme = SIGNATURE_SCHEMES[scheme]
+    now = time()
+    payloads = [(wallet.public_key, recipient.public_key, number + 1, now)
+                for number in range(count)]
+
+    def sign_parsing_key():
+        for payload in payloads:
+            signature_scheme.sign(signature_scheme.load_signer(
+                wallet.private_key), signed_payload(*payload))
+
+    def sign_transaction():
+        for payload in payloads:
+            wallet.sign_transaction(*payload)
+
+    transactions = [Transaction(sender, recipient_key, signature, amount, scheme, timestamp) for ((sender, recipient_key, amount, timestamp), signature)
+                    in zip(payloads, wallet.sign_transactions(payloads))]
+
+    def verify_transactions():
+        for transaction in transactions:
+            Wallet.verify_transaction(transaction)
+
+    results = {
+        'sign_parsing_key': time_call(sign_parsing_key, repeat),
+        'sign_transaction': time_call(sign_transaction, repeat),
+        'sign_transactions': time_call(lambda: wallet.sign_transactions(payloads), repeat),
+        'verify_transaction': time_call(verify_transactions, repeat)
+    }
+    for timing in results.values():
+        timing['per_second'] = count / timing['median']
+    results['address_size'] = len(wallet.public_key)
+    results['signature_size'] = len(transactions[0].signature)
+    return results
+
+
+def main():
+    """
+    Main program of the signing benchmarks, parses the options, runs the benchmarks of each scheme and prints the results as JSON.
+
+    :returns int: 0.
+    """
+
+    parser = ArgumentParser(prog='python -m benchmarks.signing')
+    parser.add_argument('--transactions', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--schemes', type=str, nargs='+', default=list(SIGNATURE_SCHEMES.keys()),
+                        choices=list(SIGNATURE_SCHEMES.keys()))
+    args = parser.parse_args()
+    report = {
+        'config': {
+            'transactions': args.transactions,
+            'repeat': args.repeat
+        },
+        'results': {scheme: run_signing_benchmarks(scheme, args.transactions, args.repeat) for scheme in args.schemes}
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+This module measures the storage engines of the node data (utility.storage) on a synthetic chain and prints the results as JSON: the cost of the saves done on every new open transaction and every new block, of loading the data, and the size of the stored data.
+
+How to use it, from the source folder:
+`python -m benchmarks.storage --blocks 500 --txs-per-block 5`
+
+:function: run_storage_benchmarks(storage, wallets, repeat)
+:function: main()
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from time import time
+
+from benchmarks.harness import time_call, generate_wallets, generate_chain
+from blockchain import BlockChain
+from utility.storage import STORAGE_BACKENDS
+from utility.admission import AdmissionPipeline
+
+# ID of the node whose generated chain file is copied for each storage engine
+CHAIN_NODE_ID = 'storage'
+
+
+def run_storage_benchmarks(storage, wallets, repeat):
+    """
+    This function loads the generated chain with a storage engine, in the current directory, and measures its operations.
+
+    The node of each storage engine starts from a copy of the generated chain file, SQLite imports it on its first save.
+
+    :param storage str: The name of the storage engine.
+    :param wallets list: The wallets of the generated chain, the first one is the wallet of the node.
+    :param repeat int: The number of calls of each measured operation.
+    :var blockchain BlockChain: The blockchain of the node.
+    :var signatures list: The amounts and signatures of the added transactions.
+    :var results dict: The timings of each operation.
+    :returns dict: The timings of each operation and the size of the stored data in bytes.
+    """
+
+    (wallet, recipient) = (wallets[0], wallets[1])
+    shutil.copy('blockchain-{}.txt'.format(CHAIN_NODE_ID),
+                'blockchain-{}.txt'.format(storage))
+    # Without rate limits, so every measured transaction from the single sender is admitted whatever the repeat
+    blockchain = BlockChain(wallet.public_key, storage,
+                            storage=storage, admission=AdmissionPipeline(0, 0))
+    results = {'first_save': time_call(blockchain.save_data, 1)}
+    results['save_data_unchanged'] = time_call(blockchain.save_data, repeat)
+    # Signed in advance so only the verification and the save are measured, a different time of creation makes each transaction new
+    timestamps = [time() + number * 0.001 for number in range(repeat)]
+    signatures = [(timestamp, wallet.sign_transaction(wallet.public_key, recipient.public_key, 1, timestamp))
+                  for timestamp in timestamps]
+
+    def add_transaction():
+        (timestamp, signature) = signatures.pop()
+        blockchain.add_transaction(recipient.public_key, wallet.public_key,
+                                   signature, 1, is_receiving=True, scheme=wallet.scheme, timestamp=timestamp)
+
+    # Each call verifies and saves one new open transaction
+    results['add_transaction'] = time_call(add_transaction, repeat)
+    # Each call mines the open transactions (a single one after the first call) and saves the new block
+    results['mine_block'] = time_call(blockchain.mine_block, repeat)
+    results['load_data'] = time_call(
+        lambda: BlockChain(wallet.public_key, storage, storage=storage), repeat)
+    # The database and its WAL file, the copied chain file only counts for the file engine
+    results['bytes'] = sum(os.path.getsize(path) for path in os.listdir('.')
+                           if path.startswith('blockchain-{}.'.format(storage)) and (storage == 'file' or not path.endswith('.txt')))
+    return results
+
+
+def main():
+    """
+    Main program of the storage benchmarks, parses the options, generates the chain, runs the benchmarks of each storage engine and prints the results as JSON.
+
+    :returns int: 0.
+    """
+
+    parser = ArgumentParser(prog='python -m benchmarks.storage')
+    parser.add_argument('--blocks', type=int, default=200)
+    parser.add_argument('--txs-per-block', type=int, default=5)
+    parser.add_argument('--wallets', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--storages', type=str, nargs='+', default=list(STORAGE_BACKENDS.keys()),
+                        choices=list(STORAGE_BACKENDS.keys()))
+    args = parser.parse_args()
+    if args.wallets < 2:
+        parser.error('--wallets must be at least 2')
+    results = {}
+    previous_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            # The messages printed by the nodes would mix with the JSON of the results
+            with redirect_stdout(sys.stderr):
+                wallets = generate_wallets(args.wallets)
+                generate_chain(CHAIN_NODE_ID, wallets,
+                               args.blocks, args.txs_per_block)
+                for storage in args.storages:
+                    results[storage] = run_storage_benchmarks(
+                        storage, wallets, args.repeat)
+        finally:
+            os.chdir(previous_directory)
+    report = {
+        'config': {
+            'blocks': args.blocks,
+            'txs_per_block': args.txs_per_block,
+            'wallets': args.wallets,
+            'repeat': args.repeat
+        },
+        'results': results
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -13,6 +13,7 @@ class Block(Printable):
     Block class is used to create a block.
 
     :method: __init__(self, index, previous_hash, transactions, proof, time=time())
+    :method: to_header(self, block_hash)
     """
 
     def __init__(self, index, previous_hash, transactions, proof, time=time()):
@@ -31,3 +32,19 @@ class Block(Printable):
         self.timestamp = time
         self.transactions = transactions
         self.proof = proof
+
+    def to_header(self, block_hash):
+        """
+        This function gives the header of the block, ie the block without its transactions plus its hash.
+
+        :param block_hash str: The hash of the block.
+        :returns dict: The index, previous hash, timestamp, proof and hash of the block.
+        """
+
+        return {
+            'index': self.index,
+            'previous_hash': self.previous_hash,
+            'timestamp': self.timestamp,
+            'proof': self.proof,
+            'hash': block_hash
+        }
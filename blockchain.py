@@ -4,63 +4,138 @@ This module implements the creation of a BlockChain. It allows the user to creat
 :class BlockChain: Class of the blockchain.
 """
 
-import json
-import requests
+import random
 
-from functools import reduce
-from utility.hash_util import hash_block
+from threading import Thread, RLock
+from time import perf_counter, time
+from utility.hash_util import hash_block, hash_transaction
+from utility.address_index import AddressIndex
+from utility.state import BalanceState
 from block import Block
-from transaction import Transaction
+from transaction import Transaction, DEFAULT_SCHEME
 from utility.verification import Verification
+from utility.metrics import metrics
+from utility.events import events
+from utility.peers import PeerManager
+from utility.seen_set import SeenSet
+from utility.compact_block import to_compact_block, rebuild_block
+from utility.block_tree import BlockTree, BLOCK_WORK
+from utility.chain_view import ChainView
+from utility.columnar import ColumnarLedger, NUMPY_AVAILABLE
+from utility.admission import AdmissionPipeline, TRANSACTION_LIFETIME, MAX_CLOCK_DRIFT
+from utility.storage import STORAGE_BACKENDS, SqliteStorage
 from wallet import Wallet
 
 # Reward that we give to miners for creating a new block
 MINING_REWARD = 10
+# Maximum number of entries returned by one page of an address history
+HISTORY_PAGE_LIMIT = 500
+# Maximum number of top holders and top senders given by the analytics
+ANALYTICS_TOP_LIMIT = 100
+# Maximum number of matching blocks given by one page of the filtered blocks
+FILTERED_BLOCKS_LIMIT = 500
+# Number of random peer nodes a new transaction or block is sent to, each node relaying it once to as many peers
+GOSSIP_FANOUT = 8
+# Seconds of blocks whose transaction IDs are remembered to reject the replays, a transaction older than its lifetime is rejected as expired anyway
+REPLAY_WINDOW = TRANSACTION_LIFETIME + 2 * MAX_CLOCK_DRIFT
 
 
 class BlockChain:
     """
     Blockchain class is used to create a blockchain, to update it, to verify it and broadcast it.
 
-    :method: __init__(self, public_key, node_id)
+    :method: __init__(self, public_key, node_id, prune_depth=None, storage='file', admission=None)
     :method: chain(self)
     :method: chain(self, val)
     :method: get_open_transactions(self)
+    :method: set_open_transactions(self, transactions)
     :method: save_data(self)
     :method: load_data(self)
-    :method: proof_of_work(self)
+    :method: proof_of_work(self, transactions=None)
     :method: get_last_blockchain_value(self)
-    :method: add_transaction(self, recipient, sender, signature, amount=1.0, is_receiving=False)
+    :method: add_transaction(self, recipient, sender, signature, amount=1.0, is_receiving=False, scheme=DEFAULT_SCHEME, peer=None, timestamp=None)
+    :method: submit_transaction(self, recipient, sender, signature, amount=1.0, is_receiving=False, scheme=DEFAULT_SCHEME, peer=None, timestamp=None)
     :method: mine_block(self)
     :method: get_balance(self, sender=None)
+    :method: get_transaction(self, txid)
     :method: add_peer_node(self, node)
     :method: remove_peer_node(self, node)
     :method: get_peer_nodes(self)
+    :method: get_peer_stats(self)
+    :method: discover_peers(self, exclude=())
+    :method: is_known_block(self, block)
     :method: add_block(self, block)
+    :method: add_compact_block(self, compact_block)
+    :method: get_block(self, block_hash)
     :method: to_resolve_conflicts(self)
+    :method: get_address_history(self, address, cursor=0, limit=50)
+    :method: get_filtered_blocks(self, bloom, start=None, limit=FILTERED_BLOCKS_LIMIT)
+    :method: get_snapshot(self)
+    :method: get_headers(self, start=0, end=None)
+    :method: bootstrap_from_snapshot(self, node)
+    :method: verify_chain(self, workers=None)
+    :method: get_chain_info(self)
+    :method: get_version(self)
+    :method: get_ledger_analytics(self, top=10, start=None)
+    :method: save_ledger_columns(self, file)
     """
 
-    def __init__(self, public_key, node_id):
+    # Executors set by the asynchronous server (asgi_node.py), None to do the work in the calling thread
+    broadcast_executor = None  # Sends the broadcasts to the peer nodes in the background
+    pow_executor = None  # Searches the proofs of work in other processes
+    # Worker processes of the validation of the chains received from the peers, None for the number of CPUs
+    validation_workers = None
+    gossip_fanout = GOSSIP_FANOUT
+
+    def __init__(self, public_key, node_id, prune_depth=None, storage='file', admission=None):
         """
         Initialize the blockchain with input values.
 
         :param public_key str: The unique ID of the host of the blockchain.
         :param node_id int: ID of the node, represented by the port.
+        :param prune_depth int: Number of full blocks kept by a pruned node, the older blocks are only kept as headers. Default=None for an archival node keeping every block.
+        :param storage str: The name of the storage engine of the node data (see utility.storage), 'file' or 'sqlite'. Default='file'.
+        :param admission AdmissionPipeline: The admission of the new transactions, with its rate limits. Default=None for the default rate limits.
         :var blockchain list: the list of blocks of the blockchain
         :var open_transactions list: The list of all unhandled transactions initialised by the empty list.
         :var chain list: Blockchain containing the genesis block.
         :var genesis_block Block: The first block to be generated in a blockchain.
-        :var peer_nodes set: Set of all the participants (nodes) in the network.
+        :var peers PeerManager: The participants (nodes) in the network, with their health.
+        :var seen SeenSet: The IDs of the transactions and blocks recently accepted, so the copies relayed by other peers are ignored without a lookup, seeded when the data is loaded.
+        :var storage FileStorage or SqliteStorage: The storage engine of the node data.
+        :var tree BlockTree: The blocks of the side branches and the orphan blocks received from the peers.
+        :var lock RLock: Protects the chain while a block is added or the end of the chain is replaced.
+        :var admission AdmissionPipeline: The cheap checks and the rate limits of the new transactions.
         :var resolve_conflicts bool: Manages resolving conflicts, no conflicts to solve at initialisation (False).
+        :var headers list: The headers of all the blocks since the genesis block.
+        :var base_state BalanceState: The balances after the first block of the chain (the anchor).
+        :var state BalanceState: The balances after the last block of the chain.
+        :var address_index AddressIndex: Index of the confirmed transactions of each address.
+        :var columns ColumnarLedger: Columns of the confirmed transactions for the analytics, None without NumPy.
+        :var mempool_version int: Incremented on every change of the open transactions.
+        :var txids dict: Maps the ID of each confirmed transaction of the full blocks (except the mining rewards) to the index of its block.
+        :var pruned_txids dict: Maps the ID of each transaction of the pruned blocks of the last REPLAY_WINDOW seconds to the index of its block, so a pruned node still rejects their replays.
         :returns BlockChain: Yields a blockchain's instance.
         """
 
+        self.prune_depth = prune_depth
         genesis_block = Block(0, '', [], 100, 0)
         self.chain = [genesis_block]
+        genesis_hash = hash_block(genesis_block)
+        self.__headers = [genesis_block.to_header(genesis_hash)]
+        self.__txids = {}
+        self.__pruned_txids = {}
+        self.__rebuild_state(BalanceState(0, genesis_hash))
         self.__open_transactions = []
+        self.__mempool_version = 0
         self.public_key = public_key
-        self.__peer_nodes = set()
+        self.__peers = PeerManager()
+        self.__seen = SeenSet()
+        self.__tree = BlockTree()
+        self.__lock = RLock()
         self.node_id = node_id
+        self.__storage = STORAGE_BACKENDS[storage].for_node(node_id)
+        self.admission = admission if admission != None else AdmissionPipeline()
         self.resolve_conflicts = False
         # Loading the data from file if it exists, must be at the end, after doing all above initialisations
         self.load_data()
@@ -68,23 +143,203 @@ class BlockChain:
     @property
     def chain(self):
         """
-        Getter of the chain of the blockchain.
+        Getter of the chain of the blockchain, as an immutable view which doesn't change with the chain, so it is not copied.
 
-        :returns list: Chain of the blockchain.
+        :returns ChainView: Chain of the blockchain.
         """
 
-        return self.__chain[:]
+        return self.__chain
 
     @chain.setter
     def chain(self, val):
         """
         Setter of the chain of the blockchain.
 
-        :param val list: New value of the blockchain.
+        :param val list or ChainView: New value of the blockchain, a list is owned by the blockchain from now on.
+        :returns: None.
+        """
+
+        self.__chain = val if isinstance(val, ChainView) else ChainView(val)
+
+    def __get_full_block(self, height):
+        """
+        Getter of a block of the chain by its index, the chain may not start at the genesis block.
+
+        :param height int: The index of the block.
+        :returns Block: The block, None if the block is not held by this node.
+        """
+
+        return self.__chain.get_block(height)
+
+    def __append_block(self, block, block_hash):
+        """
+        Appends a verified block to the chain, updates its header, the balance state, the address index and the columnar ledger, and publishes the new block.
+
+        :param block Block: The block to append.
+        :param block_hash str: The hash of the block.
         :returns: None.
         """
 
-        self.__chain = val
+        self.__chain = self.__chain.append(block)
+        self.__headers.append(block.to_header(block_hash))
+        self.__seen.add('block:' + block_hash)
+        txids = self.__add_txids(block)
+        self.__state.apply_block(block, block_hash)
+        self.__address_index.add_block(block)
+        if self.__columns != None:
+            self.__columns.add_block(block)
+        self.__prune()
+        events.publish('block', {'header': self.__headers[-1], 'txids': txids})
+
+    def __add_txids(self, block):
+        """
+        Adds the IDs of the transactions of a block of the chain to the confirmed IDs, the mining rewards are not added (two rewards of the same miner have the same ID). A transaction already confirmed keeps the index of its first block.
+
+        :param block Block: The block.
+        :var txids list: The IDs of the transactions of the block.
+        :returns list: The IDs of the transactions of the block, in order.
+        """
+
+        txids = [hash_transaction(tx) for tx in block.transactions]
+        for (tx, txid) in zip(block.transactions, txids):
+            if tx.sender != 'MINING':
+                self.__txids.setdefault(txid, block.index)
+        return txids
+
+    def __remove_txids(self, block):
+        """
+        Removes the IDs of the transactions of a block leaving the chain, like when a side branch replaces the end of the chain.
+
+        :param block Block: The block.
+        :returns: None.
+        """
+
+        for tx in block.transactions:
+            txid = hash_transaction(tx)
+            if self.__txids.get(txid) == block.index:
+                del self.__txids[txid]
+
+    def __rebuild_txids(self, pruned_txids):
+        """
+        Rebuilds the confirmed IDs from the full blocks of the chain and the IDs of the transactions of the pruned blocks, used when the chain is loaded or replaced.
+
+        :param pruned_txids dict: Maps the ID of each transaction of the pruned blocks to the index of its block, in the order of the blocks.
+        :returns: None.
+        """
+
+        self.__pruned_txids = dict(pruned_txids)
+        self.__txids = {}
+        for block in self.__chain:
+            self.__add_txids(block)
+        self.__expire_txids()
+
+    def __expire_txids(self):
+        """
+        Forgets the IDs of the transactions of the pruned blocks older than REPLAY_WINDOW, their transactions are expired so their replays are rejected without them. The IDs are in the order of the blocks, so the oldest ones are the first ones.
+
+        :var cutoff float: The time of the oldest block whose IDs are kept.
+        :returns: None.
+        """
+
+        cutoff = time() - REPLAY_WINDOW
+        while len(self.__pruned_txids) > 0:
+            txid = next(iter(self.__pruned_txids))
+            height = self.__pruned_txids[txid]
+            # The headers of the chain may not be loaded yet
+            if height >= len(self.__headers) or self.__headers[height]['timestamp'] >= cutoff:
+                return
+            del self.__pruned_txids[txid]
+
+    def __is_confirmed(self, txid):
+        """
+        Tells if a transaction is in a block of the chain, held in full or pruned.
+
+        :param txid str: The ID of the transaction.
+        :returns bool: True if the transaction is confirmed, false if not.
+        """
+
+        return txid in self.__txids or txid in self.__pruned_txids
+
+    def __is_open(self, transaction):
+        """
+        Tells if a transaction is in the open transactions, compared field by field so the open transactions are not hashed again.
+
+        :param transaction Transaction: The transaction.
+        :returns bool: True if the transaction is open, false if not.
+        """
+
+        return any(tx.signature == transaction.signature and tx.sender == transaction.sender and tx.recipient == transaction.recipient
+                   and tx.amount == transaction.amount and tx.scheme == transaction.scheme and tx.timestamp == transaction.timestamp for tx in self.__open_transactions)
+
+    def __publish_removed(self, transactions):
+        """
+        Publishes the open transactions removed from the open transactions, because they are in a block or the chain has been replaced.
+
+        :param transactions list: The removed transactions.
+        :returns: None.
+        """
+
+        if len(transactions) > 0:
+            events.publish('mempool_remove', {'txids': [
+                           hash_transaction(tx) for tx in transactions]})
+
+    def __prune(self):
+        """
+        Removes the oldest full blocks of a pruned node, so only prune_depth blocks are kept. The last removed block's successor becomes the anchor, the removed blocks are applied to the base state and stay known by their headers.
+
+        :var pruned_count int: The number of blocks to remove.
+        :returns: None.
+        """
+
+        if self.prune_depth == None or len(self.__chain) <= self.prune_depth:
+            return
+        pruned_count = len(self.__chain) - self.prune_depth
+        for block in self.__chain[1:pruned_count + 1]:
+            self.__base_state.apply_block(
+                block, self.__headers[block.index]['hash'])
+        # The IDs of the transactions of the removed blocks are kept while they are not expired, so their replays are still rejected
+        for block in self.__chain[:pruned_count]:
+            for tx in block.transactions:
+                txid = hash_transaction(tx)
+                if self.__txids.get(txid) == block.index:
+                    self.__pruned_txids[txid] = self.__txids.pop(txid)
+        self.__expire_txids()
+        self.__chain = self.__chain[pruned_count:]
+        self.__address_index.prune(
+            self.__chain[0].index, self.__base_state.get_balances())
+        if self.__columns != None:
+            self.__columns.prune(self.__chain[0].index,
+                                 self.__base_state.get_balances())
+
+    def __rebuild_state(self, base_state):
+        """
+        Rebuilds the balance state, the address index and the columnar ledger from the balances after the anchor, ie the first block of the chain, and the following blocks.
+
+        :param base_state BalanceState: The balances after the anchor.
+        :returns: None.
+        """
+
+        self.__base_state = base_state
+        self.__state = base_state.copy()
+        for block in self.__chain[1:]:
+            self.__state.apply_block(
+                block, self.__headers[block.index]['hash'])
+        self.__address_index = AddressIndex(base_state.get_balances())
+        self.__address_index.rebuild(self.__chain)
+        self.__rebuild_columns()
+        self.__prune()
+
+    def __rebuild_columns(self):
+        """
+        Rebuilds the columnar ledger from the balances after the anchor and the following blocks, there is no columnar ledger without NumPy.
+
+        :returns: None.
+        """
+
+        self.__columns = None
+        if NUMPY_AVAILABLE:
+            self.__columns = ColumnarLedger(self.__base_state.get_balances())
+            self.__columns.rebuild(self.__chain)
 
     def get_open_transactions(self):
         """
@@ -95,87 +350,187 @@ class BlockChain:
 
         return self.__open_transactions[:]
 
+    def set_open_transactions(self, transactions):
+        """
+        Replaces the open transactions by the ones of a primary node, used by a read replica (see utility.replication). The transactions have been verified by the primary so they are not verified again.
+
+        :param transactions list: The open transactions of the primary, as dictionaries.
+        :var updated list: The new open transactions.
+        :var previous dict: The previous open transactions by ID.
+        :var txids list: The IDs of the new open transactions.
+        :returns bool: True if the open transactions changed, false if not.
+        :raises KeyError, TypeError: If a transaction is not valid.
+        """
+
+        updated = [Transaction.from_dict(tx)
+                   for tx in transactions]
+        txids = [hash_transaction(tx) for tx in updated]
+        with self.__lock:
+            previous = {hash_transaction(tx): tx
+                        for tx in self.__open_transactions}
+            if list(previous) == txids:
+                return False
+            self.__publish_removed([tx for (txid, tx) in previous.items()
+                                    if txid not in set(txids)])
+            self.__open_transactions = updated
+            self.__mempool_version += 1
+            self.save_data()
+            for (txid, tx) in zip(txids, updated):
+                if txid not in previous:
+                    events.publish('mempool_add', {
+                                   'txid': txid, 'transaction': tx.__dict__})
+        return True
+
     def save_data(self):
         """
-        Saves the whole blockchain into a file named 'blockchain.txt'.
+        Saves the whole blockchain with the storage engine of the node, like the file 'blockchain-<node_id>.txt'.
 
-        :var saveable_chain list: Construction of the 
-        :var saveable_tx list: Construction of all of the transactions.
+        :var data dict: The chain, the open transactions, the peer nodes, the headers, the address index, the states and the IDs of the transactions of the pruned blocks, saved so they don't have to be rebuilt at startup.
+        :var size int: The size of the saved data in bytes.
         :returns: None.
-        :raises IOError: If the file is not created or not written properly an error is raised and it prints a message that the saving has failed.
+        :raises IOError: If the data is not written properly an error is raised and it prints a message that the saving has failed.
         """
 
+        start = perf_counter()
         try:
-            with open('blockchain-{}.txt'.format(self.node_id), mode='w') as file:
-                saveable_chain = [block.__dict__ for block in [Block(block_el.index, block_el.previous_hash, [
-                                                                     tx.__dict__ for tx in block_el.transactions], block_el.proof, block_el.timestamp) for block_el in self.__chain]]
-                file.write(json.dumps(saveable_chain))
-                file.write('\n')
-                saveable_tx = [tx.__dict__ for tx in self.__open_transactions]
-                file.write(json.dumps(saveable_tx))
-                file.write('\n')
-                # Updates the number of nodes in the network
-                file.write(json.dumps(list(self.__peer_nodes)))
+            data = {
+                'chain': self.__chain,
+                'open_transactions': self.__open_transactions,
+                'peers': self.__peers.get_peers(),
+                'headers': self.__headers,
+                'address_index': self.__address_index,
+                'state': self.__state,
+                'base_state': self.__base_state,
+                'pruned_txids': self.__pruned_txids
+            }
+            size = self.__storage.save(data)
+            metrics.set('storage_bytes', size, {'operation': 'save'})
+            metrics.observe('storage_duration_seconds',
+                            perf_counter() - start, {'operation': 'save'})
         except IOError:
+            metrics.inc('storage_failures_total', labels={'operation': 'save'})
             print('Saving failed!')
 
     def load_data(self):
         """
-        Loads the blockchain from the blockchain.txt file. Displays a failure message if there is an error.
+        Loads the blockchain with the storage engine of the node. Displays a failure message if there is an error.
 
-        :var file_content list: Reads the line of the file of the blockchain.
-        :var blockchain dict: Blockchain red from the file.
+        :var data dict: The data red by the storage engine.
+        :var size int: The size of the red data in bytes.
         :var updated_blockchain list: The updated blockchain after loading after loading from the file.
         :var updated_transactions list: The updated transactions after loading from the file.
         :var peer_nodes dict: All peer nodes of the network red from the file.
+        :var headers list: The headers red from the file, rebuilt if missing or outdated.
+        :var base_state BalanceState: The balances after the anchor red from the file, the empty balances of the genesis block if missing.
+        :var state BalanceState: The balances after the last block red from the file, rebuilt if missing or outdated.
+        :var address_index AddressIndex: The address index red from the file, rebuilt if missing or outdated.
         :returns: None.
-        :raises IOError: Error if the file is not properly red. 
+        :raises IOError: Error if the data is not properly red.
         :raises IndexError: Error in the loops on the blocks or on the transactions.
         """
 
+        start = perf_counter()
         try:
-            with open('blockchain-{}.txt'.format(self.node_id), mode='r') as file:
-                file_content = file.readlines()
-
-                # Part of the blockchain
-                blockchain = json.loads(file_content[0][:-1])
-                updated_blockchain = []
-                for block in blockchain:
-                    converted_tx = [Transaction(
-                        tx['sender'], tx['recipient'], tx['signature'], tx['amount']) for tx in block['transactions']]
-                    updated_block = Block(
-                        block['index'], block['previous_hash'], converted_tx, block['proof'], block['timestamp'])
-                    updated_blockchain.append(updated_block)
-                self.chain = updated_blockchain
-
-                # Part of the transaction
-                self.__open_transactions = json.loads(file_content[1][:-1])
-                updated_transactions = []
-                for tx in self.__open_transactions:
-                    updated_tx = Transaction(
-                        tx['sender'], tx['recipient'], tx['signature'], tx['amount'])
-                    updated_transactions.append(updated_tx)
-                self.__open_transactions = updated_transactions  # Loads the connected nodes
-                peer_nodes = json.loads(file_content[2])
-                self.__peer_nodes = set(peer_nodes)
+            (data, size) = self.__storage.load()
+            metrics.set('storage_bytes', size, {'operation': 'load'})
+
+            # Part of the blockchain
+            updated_blockchain = []
+            for block in data['chain']:
+                converted_tx = [Transaction.from_dict(tx) for tx in block['transactions']]
+                updated_block = Block(
+                    block['index'], block['previous_hash'], converted_tx, block['proof'], block['timestamp'])
+                updated_blockchain.append(updated_block)
+            self.chain = updated_blockchain
+            self.__rebuild_txids(data.get('pruned_txids') or {})
+
+            # Part of the transaction
+            updated_transactions = []
+            for tx in data['open_transactions']:
+                updated_tx = Transaction.from_dict(tx)
+                updated_transactions.append(updated_tx)
+            self.__open_transactions = updated_transactions  # Loads the connected nodes
+            self.__mempool_version += 1
+            peer_nodes = data['peers']
+            for node in self.__peers.get_peers():
+                if node not in peer_nodes:
+                    self.__peers.remove(node)
+            for node in peer_nodes:
+                self.__peers.add(node)
+
+            # Part of the headers and of the states, files saved before they existed don't have them
+            tip_index = self.__chain[-1].index
+            headers = data['headers']
+            if headers == None or len(headers) != tip_index + 1:
+                headers = [block.to_header(hash_block(block))
+                           for block in self.__chain]
+            self.__headers = headers
+            base_state = None
+            if data['base_state'] != None:
+                base_state = BalanceState.from_snapshot(data['base_state'])
+            if base_state == None:
+                base_state = BalanceState(0, self.__headers[0]['hash'])
+            state = None
+            if data['state'] != None:
+                state = BalanceState.from_snapshot(data['state'])
+            if state == None or state.height != tip_index:
+                self.__rebuild_state(base_state)
+            else:
+                self.__base_state = base_state
+                self.__state = state
+                self.__rebuild_columns()
+
+            # Part of the address index, files saved before the index existed don't have it
+            address_index = None
+            if data['address_index'] != None:
+                address_index = AddressIndex.from_dict(
+                    data['address_index'], base_state.get_balances())
+            if address_index == None or address_index.height != tip_index + 1:
+                address_index = AddressIndex(base_state.get_balances())
+                address_index.rebuild(self.__chain)
+            self.__address_index = address_index
+            # The prune depth may have been lowered since the file was saved
+            self.__prune()
+            self.__seed_seen()
+            metrics.observe('storage_duration_seconds',
+                            perf_counter() - start, {'operation': 'load'})
         except (IOError, IndexError):
+            metrics.inc('storage_failures_total', labels={'operation': 'load'})
             print('File not found!')
 
-    def proof_of_work(self):
+    def __seed_seen(self):
+        """
+        Fills the seen-set with the open transactions and the last blocks after loading, so the copies relayed by the peers after a restart are ignored without a lookup. The seen-set is only a cache: an item not in it is still looked up in the open transactions, the confirmed IDs and the headers.
+
+        :returns: None.
+        """
+
+        for header in self.__headers[-(self.__seen.max_entries // 2):]:
+            self.__seen.add('block:' + header['hash'])
+        for tx in self.__open_transactions:
+            self.__seen.add('tx:' + hash_transaction(tx))
+
+    def proof_of_work(self, transactions=None):
         """
         Verify the integrity of the blockchain.
 
-        :var last_block list: The last block of the blockchain.
-        :var last_hash Block: The hash of the last block of last_block.
+        :param transactions list: The transactions of the block to mine. Default=None for the open transactions.
+        :var last_hash Block: The hash of the last block of the blockchain.
         :var proof int: The proof number of the blockchain initialised at 0.
         :returns int: If the proof equals 0 then the block is valid, if it not it is invalid.
         """
 
-        last_block = self.__chain[-1]
-        last_hash = hash_block(last_block)
-        proof = 0
-        while not Verification.valid_proof(self.__open_transactions, last_hash, proof):
-            proof += 1
+        start = perf_counter()
+        if transactions == None:
+            transactions = self.__open_transactions
+        last_hash = self.__headers[-1]['hash']
+        if BlockChain.pow_executor != None:
+            proof = BlockChain.pow_executor.submit(
+                Verification.find_proof, transactions, last_hash).result()
+        else:
+            proof = Verification.find_proof(transactions, last_hash)
+        metrics.inc('pow_attempts_total', proof + 1)
+        metrics.observe('pow_duration_seconds', perf_counter() - start)
         return proof
 
     def get_last_blockchain_value(self):
@@ -185,103 +540,262 @@ class BlockChain:
         :returns list: The last block to the blockchain, None if its length is less than 1.
         """
 
-        if len(self.__chain) < 1:
-            return None
-        return self.__chain[-1]
+        return self.__chain.tip
 
-    def add_transaction(self, recipient, sender, signature, amount=1.0, is_receiving=False):
+    def add_transaction(self, recipient, sender, signature, amount=1.0, is_receiving=False, scheme=DEFAULT_SCHEME, peer=None, timestamp=None):
         """
-        Add a transaction to the blockchain and broadcasts the transactions into the network.
+        Add a transaction to the blockchain and broadcasts the transactions into the network, see submit_transaction.
 
         :param sender str: the sender's name of the transaction
         :param recipient str: the recipient's name of the transaction
         :param signature str: Signature of the transaction.
         :param amount: the amount of the transaction, Default=1.0.
         :param is_receiving: False when creating a new transaction on this node, True when receiving a broadcast transaction
-        :returns: True if transaction if verified, False if not.
-        :raises ConnectionError: If the POST is not sent properly.
+        :param scheme str: The tag of the signature scheme of the sender's keys. Default=DEFAULT_SCHEME.
+        :param peer str: The address of the peer node or client sending the transaction, for its rate limit. Default=None for no peer limit.
+        :param timestamp float: The signed time of creation of the transaction. Default=None, rejected as expired.
+        :returns: True if transaction if verified or already seen (and not declined by a peer node when the broadcast is not in the background), False if not.
+        """
+
+        return self.submit_transaction(recipient, sender, signature, amount, is_receiving, scheme, peer, timestamp)[0]
+
+    def submit_transaction(self, recipient, sender, signature, amount=1.0, is_receiving=False, scheme=DEFAULT_SCHEME, peer=None, timestamp=None):
         """
+        Admits a transaction through the stages of the admission (see utility.admission), from the cheapest check to the most expensive, then adds it to the open transactions and broadcasts it into the network.
 
-        transaction = Transaction(sender, recipient, signature, amount)
-        if Verification.verify_transaction(transaction, self.get_balance):
+        :param sender str: the sender's name of the transaction
+        :param recipient str: the recipient's name of the transaction
+        :param signature str: Signature of the transaction.
+        :param amount: the amount of the transaction, Default=1.0.
+        :param is_receiving: False when creating a new transaction on this node, True when receiving a broadcast transaction
+        :param scheme str: The tag of the signature scheme of the sender's keys. Default=DEFAULT_SCHEME.
+        :param peer str: The address of the peer node or client sending the transaction, for its rate limit. Default=None for no peer limit.
+        :param timestamp float: The signed time of creation of the transaction, two payments of the same amount to the same recipient differ by it. Default=None, rejected as expired.
+        :var admission AdmissionPipeline: The admission of the node.
+        :var txid str: The ID of the transaction, a transaction already open or confirmed is neither verified nor relayed again. The seen-set only saves the lookups of the copies relayed by the peers, the open and the confirmed transactions are the reference, so a transaction replayed after a restart of the node or after being forgotten by the seen-set is still rejected. A transaction is only admitted within TRANSACTION_LIFETIME of its creation, so only the IDs of the blocks of the last REPLAY_WINDOW are needed to reject the replays.
+        :var rejection str: The rate limit exceeded by the transaction, None if it is within the limits.
+        :returns tuple: True if transaction if verified or already open (and not declined by a peer node when the broadcast is not in the background), False if not, and the stage rejecting the transaction ('accepted' if it is added, 'duplicate' if it is already open, 'confirmed' if it is already in a block, 'expired' if it is too old or from the future).
+        """
+
+        admission = self.admission
+        if not admission.check_fields(sender, recipient, signature, amount, scheme, timestamp):
+            return (False, admission.count('schema'))
+        if AdmissionPipeline.is_expired(timestamp, time()):
+            return (False, admission.count('expired'))
+        transaction = Transaction(
+            sender, recipient, signature, amount, scheme, timestamp)
+        txid = hash_transaction(transaction)
+        # The signature of the same transaction doesn't change, so a confirmed transaction sent again would be paid twice
+        if self.__is_confirmed(txid):
+            return (False, admission.count('confirmed'))
+        if self.__seen.has('tx:' + txid) or self.__is_open(transaction):
+            metrics.inc('gossip_duplicates_total', labels={
+                        'kind': 'transaction'})
+            return (True, admission.count('duplicate'))
+        rejection = admission.check_rate(sender, peer)
+        if rejection != None:
+            return (False, admission.count(rejection))
+        if self.get_balance(sender) < amount:
+            admission.give_back(sender)
+            return (False, admission.count('balance'))
+        if not Wallet.verify_transaction(transaction):
+            admission.give_back(sender)
+            return (False, admission.count('signature'))
+        with self.__lock:
+            # Another copy may have been verified at the same time, or mined meanwhile
+            if self.__is_confirmed(txid):
+                admission.give_back(sender)
+                return (False, admission.count('confirmed'))
+            if not self.__seen.add('tx:' + txid) or self.__is_open(transaction):
+                admission.give_back(sender)
+                return (True, admission.count('duplicate'))
+            admission.count('accepted')
             self.__open_transactions.append(transaction)
+            self.__mempool_version += 1
             self.save_data()
-            if not is_receiving:
-                # Looping through all nodes to broadcast the infos:
-                for node in self.__peer_nodes:
-                    url = 'http://{}/broadcast-transaction'.format(node)
-                    try:
-                        response = requests.post(url, json={
-                                                 'sender': sender, 'recipient': recipient, 'amount': amount, 'signature': signature})
-                        if response.status_code == 400 or response.status_code == 500:
-                            print('Transaction declined, needs resolving')
-                            return False
-                    except requests.exceptions.ConnectionError:
-                        continue
-                    return True
-                else:
-                    return False
+        events.publish('mempool_add', {
+                       'txid': txid, 'transaction': transaction.__dict__})
+        if is_receiving:
+            # Relays the new transaction, in the background so the sending peer doesn't wait for the whole network
+            self.__run_in_background(self.__broadcast_transaction, transaction)
+            return (True, 'accepted')
+        if BlockChain.broadcast_executor != None:
+            BlockChain.broadcast_executor.submit(
+                self.__broadcast_transaction, transaction)
+            return (True, 'accepted')
+        return (self.__broadcast_transaction(transaction), 'accepted')
+
+    @staticmethod
+    def __run_in_background(func, *args):
+        """
+        Runs a function in the broadcast executor if it is set, in a new thread if not.
+
+        :param func function: The function to run.
+        :param args tuple: The arguments of the function.
+        :returns: None.
+        """
+
+        if BlockChain.broadcast_executor != None:
+            BlockChain.broadcast_executor.submit(func, *args)
+        else:
+            Thread(target=func, args=args, daemon=True).start()
+
+    def __get_gossip_peers(self):
+        """
+        Chooses the peer nodes a new transaction or block is sent to: gossip_fanout random healthy peers, so the cost of a broadcast doesn't grow with the size of the network.
+
+        :var peers list: The healthy peers.
+        :returns list: The chosen peers, all the healthy peers if there are not more than gossip_fanout.
+        """
+
+        peers = self.__peers.get_healthy_peers()
+        if len(peers) <= BlockChain.gossip_fanout:
+            return peers
+        return random.sample(peers, BlockChain.gossip_fanout)
+
+    def __broadcast_transaction(self, transaction):
+        """
+        Broadcasts (or relays) a new transaction to random healthy peer nodes.
+
+        :param transaction Transaction: The transaction to broadcast.
+        :var accepted bool: False as soon as a peer node declines the transaction.
+        :returns bool: True if no peer node declined the transaction, false if not.
+        """
+
+        accepted = True
+        peers_version = self.__peers.version
+        # Looping through some healthy nodes to broadcast the infos, they relay it to other nodes:
+        for node in self.__get_gossip_peers():
+            metrics.inc('gossip_messages_total', labels={
+                        'kind': 'transaction'})
+            response = self.__peers.request(node, 'post', '/broadcast-transaction', 'transaction', json={
+                'sender': transaction.sender, 'recipient': transaction.recipient, 'amount': transaction.amount, 'signature': transaction.signature, 'scheme': transaction.scheme, 'timestamp': transaction.timestamp})
+            if response == None:
+                continue
+            if response.status_code == 400 or response.status_code == 500:
+                metrics.inc('peer_request_failures_total', labels={
+                            'peer': node, 'kind': 'transaction'})
+                print('Transaction declined, needs resolving')
+                accepted = False
+        # Saves the peers if a dead one has been removed
+        if self.__peers.version != peers_version:
+            self.save_data()
+        return accepted
 
     def mine_block(self):
         """
         Mine a block for the blockchain.
         :var last_block Block:
         :var hashed_block str: Hash of the block.
+        :var now float: The time when the mining starts, the time of the block.
+        :var mined_transactions list: The open transactions not expired when the mining starts, the transactions added while mining stay open.
+        :var expired_transactions list: The open transactions expired when the mining starts, they are removed from the open transactions.
         :var proof int: Proof of work of the block. 0: valid, other: invalid.
         :var reward_transaction Transaction: A transacion corresponding to a mining's action.
         :var copied_transaction Transaction: A copy of the transactions of the blockchain.
         :var block Block: Block created with the copied_transaction variable.
         :returns bool: True if the block has been successfully added to the blockchain, false if not.
-        :raises ConnectionError: If the POST is not sent properly.
         """
 
         if self.public_key == None:
             return None
         last_block = self.__chain[-1]
-        hashed_block = hash_block(last_block)
+        hashed_block = self.__headers[-1]['hash']
+        now = time()
+        mined_transactions = [tx for tx in self.__open_transactions
+                              if not AdmissionPipeline.is_expired(tx.timestamp, now)]
+        expired_transactions = [tx for tx in self.__open_transactions
+                                if tx not in mined_transactions]
 
-        proof = self.proof_of_work()
+        proof = self.proof_of_work(mined_transactions)
 
         reward_transaction = Transaction(
             'MINING', self.public_key, '', MINING_REWARD)
-        copied_transaction = self.__open_transactions[:]
+        copied_transaction = mined_transactions[:]
         for tx in copied_transaction:
             if not Wallet.verify_transaction(tx):
                 return None
         copied_transaction.append(reward_transaction)
-        block = Block(len(self.__chain), hashed_block,
-                      copied_transaction, proof)
-        self.__chain.append(block)
-        self.__open_transactions = []
-        self.save_data()
-        # Broadcast the block to the network:
-        for node in self.__peer_nodes:
-            url = 'http://{}/broadcast-block'.format(node)
-            converted_block = block.__dict__.copy()
-            converted_block['transactions'] = [
-                tx.__dict__ for tx in converted_block['transactions']]
-            try:
-                response = requests.post(url, json={'block': converted_block})
-                if response.status_code == 400 or response.status_code == 500:
-                    print('Block declined, needs resolving')
-                if response.status_code == 409:
-                    self.resolve_conflicts = True
-            except requests.exceptions.ConnectionError:
-                continue
+        # The default time of a block is the time the module was imported, the replay window needs the time of the mining
+        block = Block(last_block.index + 1, hashed_block,
+                      copied_transaction, proof, now)
+        with self.__lock:
+            # Another block may have been added while mining, then the proof is useless
+            if self.__headers[-1]['hash'] != hashed_block:
+                return None
+            self.__append_block(block, hash_block(block))
+            self.__tree.prune(block.index)
+            self.__publish_removed(mined_transactions + expired_transactions)
+            self.__open_transactions = [
+                tx for tx in self.__open_transactions if tx not in mined_transactions and tx not in expired_transactions]
+            self.__mempool_version += 1
+            self.save_data()
+        if BlockChain.broadcast_executor != None:
+            BlockChain.broadcast_executor.submit(self.__broadcast_block, block)
+        else:
+            self.__broadcast_block(block)
         return block
 
+    def __broadcast_block(self, block):
+        """
+        Broadcasts (or relays) a new block to random healthy peer nodes.
+
+        The block is sent as a compact block (its header and the short IDs of its transactions), the peer answers with the positions of the transactions it doesn't have, which are sent in full in a second compact block. The peers which don't know the compact blocks get the full block.
+
+        :param block Block: The block to broadcast.
+        :var converted_block dict: The block transformed into a dictionnary.
+        :var compact_block dict: The compact block.
+        :returns: None.
+        """
+
+        converted_block = block.__dict__.copy()
+        converted_block['transactions'] = [
+            tx.__dict__ for tx in converted_block['transactions']]
+        block_hash = hash_block(block)
+        compact_block = to_compact_block(block, block_hash)
+        peers_version = self.__peers.version
+        # Broadcast the block to some healthy nodes of the network, they relay it to other nodes:
+        for node in self.__get_gossip_peers():
+            metrics.inc('gossip_messages_total', labels={'kind': 'block'})
+            response = self.__peers.request(
+                node, 'post', '/broadcast-compact-block', 'block', json={'block': compact_block})
+            if response == None:
+                continue
+            if response.status_code == 202:
+                # The peer asks for the transactions it couldn't find in its open transactions
+                try:
+                    missing = [position for position in response.json()['missing']
+                               if isinstance(position, int)]
+                except (ValueError, KeyError, TypeError):
+                    missing = range(len(block.transactions))
+                metrics.inc('compact_block_missing_transactions_total',
+                            len(missing))
+                response = self.__peers.request(node, 'post', '/broadcast-compact-block', 'block', json={
+                    'block': to_compact_block(block, block_hash, missing)})
+            elif response.status_code == 404:
+                # The peer doesn't know the compact blocks
+                response = self.__peers.request(
+                    node, 'post', '/broadcast-block', 'block', json={'block': converted_block})
+            if response == None:
+                continue
+            if response.status_code == 400 or response.status_code == 500:
+                metrics.inc('peer_request_failures_total', labels={
+                            'peer': node, 'kind': 'block'})
+                print('Block declined, needs resolving')
+            if response.status_code == 409:
+                self.resolve_conflicts = True
+        # Saves the peers if a dead one has been removed
+        if self.__peers.version != peers_version:
+            self.save_data()
+
     def get_balance(self, sender=None):
         """
         Get the balance of a sender via his transactions.
 
         :param sender str: The sender from whom the balance is requested. Default=None.
         :var participant str: Equals to the sender if there is a sender, equals to the public key if not.
-        :var tx_sender list: All the transactions made by the participant.
-        :var open_tx_sender list: All the open transactions made by the participant.
-        :var amount_sent float: All of the amount sent for all of tx_sender.
-        :var tx_recipient list: All of the transactions made by the recipient.
-        :var amount_received float: All of the amount received for all of tx_recipient.
-        :returns float: The balance between the amount received and the amount sent.
+        :var amount_sent float: All of the amount sent in the open transactions made by the participant.
+        :returns float: The balance of the participant in the balance state minus the amount sent in the open transactions.
         """
 
         if sender == None:
@@ -291,20 +805,47 @@ class BlockChain:
             participant = self.public_key
         else:
             participant = sender
-        tx_sender = [[tx.amount for tx in block.transactions
-                      if tx.sender == participant] for block in self.__chain]
-        open_tx_sender = [tx.amount for tx in self.__open_transactions
-                          if tx.sender == participant]
-        tx_sender.append(open_tx_sender)
-        amount_sent = reduce(lambda tx_sum, tx_amt: tx_sum + sum(tx_amt)
-                             if len(tx_amt) > 0 else tx_sum + 0, tx_sender, 0)
+        amount_sent = sum([tx.amount for tx in self.__open_transactions
+                           if tx.sender == participant])
+        queries = self.__get_queries()
+        if queries != None:
+            return queries.get_balance(participant) - amount_sent
+        return self.__state.get_balance(participant) - amount_sent
+
+    def __get_queries(self):
+        """
+        Getter of the storage engine when its indexed queries answer the lookups instead of the balances, the address index and the blocks held in memory: a SQLite storage whose last save is the chain of the node.
+
+        :returns SqliteStorage: The storage, None with the file storage or while the last block is not saved (or its save failed).
+        """
 
-        tx_recipient = [[tx.amount for tx in block.transactions
-                         if tx.recipient == participant] for block in self.__chain]
-        amount_received = reduce(lambda tx_sum, tx_amt: tx_sum + sum(tx_amt)
-                                 if len(tx_amt) > 0 else tx_sum + 0, tx_recipient, 0)
+        if not isinstance(self.__storage, SqliteStorage) or self.__storage.get_saved_tip() != self.__headers[-1]['hash']:
+            return None
+        return self.__storage
+
+    def get_transaction(self, txid):
+        """
+        Function that looks up a transaction by its ID in the full blocks and in the open transactions, with an indexed query of the database with the SQLite storage. The mining rewards are not looked up, the rewards of a miner have the same ID.
+
+        :param txid str: The ID of the transaction.
+        :var height int: The index of the block of the confirmed transaction, None if it is not confirmed.
+        :var block Block: The block of the confirmed transaction, None if it is pruned.
+        :returns dict: The transaction, with its height and its position in its block (None for an open transaction), None if it is unknown or in a pruned block.
+        """
 
-        return amount_received - amount_sent
+        queries = self.__get_queries()
+        if queries != None:
+            return queries.get_transaction(txid)
+        height = self.__txids.get(txid)
+        block = self.__get_full_block(height) if height != None else None
+        if block != None:
+            for (position, tx) in enumerate(block.transactions):
+                if hash_transaction(tx) == txid:
+                    return dict(tx.__dict__, height=height, position=position)
+        for tx in self.__open_transactions:
+            if hash_transaction(tx) == txid:
+                return dict(tx.__dict__, height=None, position=None)
+        return None
 
     def add_peer_node(self, node):
         """
@@ -314,7 +855,7 @@ class BlockChain:
         :returns: None.
         """
 
-        self.__peer_nodes.add(node)
+        self.__peers.add(node)
         self.save_data()
 
     def remove_peer_node(self, node):
@@ -325,7 +866,7 @@ class BlockChain:
         :returns: None.
         """
 
-        self.__peer_nodes.discard(node)
+        self.__peers.remove(node)
         self.save_data()
 
     def get_peer_nodes(self):
@@ -335,80 +876,727 @@ class BlockChain:
         :returns list: List of all connected peer nodes in the network.
         """
 
-        return list(self.__peer_nodes)
+        return self.__peers.get_peers()
+
+    def get_peer_stats(self):
+        """
+        Function that gives the health of the peer nodes.
+
+        :returns dict: Maps each peer node to its average latency, consecutive failures, last answer time, last known tip height and whether it is healthy.
+        """
+
+        return self.__peers.get_stats()
+
+    def discover_peers(self, exclude=()):
+        """
+        Function that adds the peer nodes of the peer nodes, so a node only has to know one peer to join the network.
+
+        :param exclude tuple: The URLs of this node, which must not become its own peer. Default=().
+        :var added list: The URLs of the added peers.
+        :returns list: The URLs of the added peers.
+        """
+
+        added = self.__peers.discover(exclude)
+        if len(added) > 0:
+            self.save_data()
+        return added
+
+    @staticmethod
+    def __block_from_dict(block):
+        """
+        Transforms a block received from a peer node into a Block.
+
+        :param block dict: The block and its transactions as dictionnaries.
+        :returns Block: The converted block.
+        :raises KeyError: If a field of the block or of a transaction is missing.
+        """
+
+        transactions = [Transaction.from_dict(tx)
+                        for tx in block['transactions']]
+        return Block(block['index'], block['previous_hash'], transactions, block['proof'], block['timestamp'])
+
+    def is_known_block(self, block):
+        """
+        Function that tells if a block received from a peer node has already been added, like a copy relayed by another peer.
+
+        :param block dict: The received block.
+        :var block_hash str: The hash of the block.
+        :returns bool: True if the block is already in the chain or in the block tree, false if not.
+        """
+
+        try:
+            block_hash = hash_block(self.__block_from_dict(block))
+        except (KeyError, TypeError):
+            return False
+        return self.__is_known_hash(block['index'], block_hash)
+
+    def __is_known_hash(self, index, block_hash):
+        """
+        Tells if a block has already been added to the chain or to the block tree.
+
+        :param index int: The index of the block.
+        :param block_hash str: The hash of the block.
+        :returns bool: True if the block is known, false if not.
+        """
+
+        if self.__seen.has('block:' + block_hash) or self.__tree.get_block(block_hash) != None:
+            return True
+        return isinstance(index, int) and 0 <= index < len(self.__headers) and self.__headers[index]['hash'] == block_hash
 
     def add_block(self, block):
         """
-        Function that adds a block to the blockchain.
+        Function that adds a block received from a peer node: the block extends the chain, or a side branch which replaces the end of the chain once it has more work than the chain, or it is kept as an orphan until its parent arrives. The orphans waiting for the block are connected after it.
+
+        The block is relayed to other peer nodes if it is on the chain, the parent of an orphan is asked to the peer nodes.
 
         :param block dict: The block to add to the blockchain.
-        :var transactions list: All transactions in the block.
-        :var proof_is_valid bool: True if the last transaction is valid, false if not.
-        :var hashes_match bool: True if the hash of the last block of the blockchain matches the hash of the block to add.
         :var converted_block Block: Conversion of the block parameter into a Block class
-        :var stored_transactions list: Copy of the open transactions of the blockchain.
-        :returns bool: False if the block was not added, true if it was.
-        :raises ValueError: Error raised if the block has already been added.
+        :var block_hash str: The hash of the block.
+        :var proof_is_valid bool: True if the proof of work of the block is valid, false if not.
+        :var result str: Where the block has been added, 'chain', 'side' or 'orphan', None if it has been rejected.
+        :var parents list: The hashes of the connected blocks whose orphans must be connected.
+        :returns bool: False if the block is invalid or too old to replace the end of the chain, true if it was added or already known.
+        :raises KeyError: If a field of the block or of a transaction is missing.
         """
 
         # Validation of the block
-        transactions = [Transaction(
-            tx['sender'], tx['recipient'], tx['signature'], tx['amount']) for tx in block['transactions']]
+        converted_block = self.__block_from_dict(block)
+        block_hash = hash_block(converted_block)
         proof_is_valid = Verification.valid_proof(
-            transactions[:-1], block['previous_hash'], block['proof'])
-        hashes_match = hash_block(self.chain[-1]) == block['previous_hash']
-        if not proof_is_valid or not hashes_match:
+            converted_block.transactions[:-1], converted_block.previous_hash, converted_block.proof)
+        if not proof_is_valid:
             return False
-        # Add the block
-        converted_block = Block(
-            block['index'], block['previous_hash'], transactions, block['proof'], block['timestamp'])
-        self.__chain.append(converted_block)
+        with self.__lock:
+            if self.__is_known_hash(converted_block.index, block_hash):
+                return True
+            result = self.__connect_block(converted_block, block_hash)
+            if result == None:
+                return False
+            parents = [block_hash] if result != 'orphan' else []
+            while len(parents) > 0:
+                for (orphan, orphan_hash) in self.__tree.pop_orphans(parents.pop()):
+                    if self.__connect_block(orphan, orphan_hash) != None:
+                        parents.append(orphan_hash)
+            self.__tree.prune(self.__chain[-1].index)
+            tree_stats = self.__tree.get_stats()
+            metrics.set('side_blocks', tree_stats['side_blocks'])
+            metrics.set('orphan_blocks', tree_stats['orphans'])
+            on_chain = converted_block.index < len(self.__headers) and self.__headers[
+                converted_block.index]['hash'] == block_hash
+            if result != 'orphan':
+                self.save_data()
+        if result == 'orphan':
+            self.__run_in_background(
+                self.__fetch_block, converted_block.previous_hash)
+        elif on_chain:
+            self.__run_in_background(self.__broadcast_block, converted_block)
+        return True
+
+    def __connect_block(self, block, block_hash):
+        """
+        Connects a valid block to the block tree: appends it to the chain if its parent is the last block, adds it to a side branch if its parent is another block of the chain or a side block, keeps it as an orphan if its parent is unknown.
+
+        :param block Block: The block to connect.
+        :param block_hash str: The hash of the block.
+        :var parent_index int: The index of the parent of the block.
+        :var parent_work int: The cumulative work of the parent.
+        :var work int: The cumulative work of the block.
+        :returns str: 'chain' if the block is at the end of the chain, after a replacement of the end of the chain or not, 'side' if it is in a side branch, 'orphan' if it is an orphan, None if it is rejected.
+        """
+
+        parent_index = block.index - 1
+        if block.previous_hash == self.__headers[-1]['hash']:
+            if block.index != len(self.__headers):
+                return None
+            self.__extend_chain(block, block_hash)
+            return 'chain'
+        # Neither a side branch nor an orphan can replace the blocks too old or pruned
+        if block.index <= self.__chain[-1].index - self.__tree.max_depth or parent_index < self.__chain[0].index:
+            return None
+        if 0 <= parent_index < len(self.__headers) and self.__headers[parent_index]['hash'] == block.previous_hash:
+            parent_work = (parent_index + 1) * BLOCK_WORK
+        elif self.__tree.get_side_block(block.previous_hash) != None:
+            (parent, parent_work) = self.__tree.get_side_block(
+                block.previous_hash)
+            if parent.index != parent_index:
+                return None
+        else:
+            self.__tree.add_orphan(block, block_hash)
+            return 'orphan'
+        work = parent_work + BLOCK_WORK
+        self.__tree.add_side_block(block, block_hash, work)
+        # The chain is only replaced by a branch with strictly more work, so the first block received wins the ties
+        if work > (self.__chain[-1].index + 1) * BLOCK_WORK and self.__reorganize(block_hash):
+            return 'chain'
+        return 'side'
+
+    def __extend_chain(self, block, block_hash):
+        """
+        Appends a block received from a peer node to the chain and removes its transactions from the open transactions.
+
+        :param block Block: The block whose parent is the last block of the chain.
+        :param block_hash str: The hash of the block.
+        :var stored_transactions list: Copy of the open transactions of the blockchain.
+        :returns: None.
+        """
+
+        self.__append_block(block, block_hash)
         # Manage open transactions and forces them to update
         stored_transactions = self.__open_transactions[:]
-        for itx in block['transactions']:
+        for itx in block.transactions:
             for opentx in stored_transactions:
-                if opentx.sender == itx['sender'] and opentx.recipient == itx['recipient'] and opentx.amount == itx['amount'] and opentx.signature == itx['signature']:
+                if opentx.sender == itx.sender and opentx.recipient == itx.recipient and opentx.amount == itx.amount and opentx.signature == itx.signature:
                     try:
                         self.__open_transactions.remove(opentx)
+                        self.__mempool_version += 1
+                        self.__publish_removed([opentx])
                     except ValueError:
                         print('Item was already removed')
-        self.save_data()
+
+    def __reorganize(self, tip_hash):
+        """
+        Replaces the end of the chain by a side branch with more work. Only the differing blocks are handled: the blocks of the chain after the fork are reverted from the balance state and the address index and become a side branch, the blocks of the branch are appended. The transactions of the reverted blocks go back to the open transactions if they are still valid, the ones of the branch leave them.
+
+        :param tip_hash str: The hash of the last side block of the branch.
+        :var branch list: The blocks of the branch and their hashes, from the fork.
+        :var fork_index int: The index of the last block shared by the chain and the branch.
+        :var disconnected list: The blocks of the chain after the fork.
+        :var reverted bool: False once a block can't be reverted from the balance state, then the balances are replayed from the anchor.
+        :var connected_txids set: The IDs of the transactions of the branch.
+        :var previous_transactions list: The open transactions before the replacement.
+        :returns bool: True if the end of the chain has been replaced, false if the fork is before the first full block of a pruned node.
+        """
+
+        branch = []
+        block_hash = tip_hash
+        while self.__tree.get_side_block(block_hash) != None:
+            block = self.__tree.get_side_block(block_hash)[0]
+            branch.insert(0, (block, block_hash))
+            block_hash = block.previous_hash
+        fork_index = branch[0][0].index - 1
+        if fork_index < self.__chain[0].index or self.__headers[fork_index]['hash'] != block_hash:
+            return False
+        disconnected = self.__chain[fork_index - self.__chain[0].index + 1:]
+        reverted = True
+        for block in reversed(disconnected):
+            reverted = reverted and self.__state.revert_block(block)
+            self.__remove_txids(block)
+            self.__address_index.remove_block(block)
+            if self.__columns != None:
+                self.__columns.remove_block(block)
+            self.__tree.add_side_block(
+                block, self.__headers[block.index]['hash'], (block.index + 1) * BLOCK_WORK)
+        self.__chain = self.__chain[:len(self.__chain) - len(disconnected)]
+        if not reverted:
+            # The previous balances are not known anymore (like after a restart of the node), the balances are the ones of a fresh replay
+            self.__state = self.__base_state.copy()
+            for block in self.__chain[1:]:
+                self.__state.apply_block(
+                    block, self.__headers[block.index]['hash'])
+        disconnected_hashes = [header['hash']
+                               for header in self.__headers[fork_index + 1:]]
+        self.__headers = self.__headers[:fork_index + 1]
+        for (block, block_hash) in branch:
+            self.__tree.remove_side_block(block_hash)
+            self.__append_block(block, block_hash)
+        # The open transactions are verified again against the balances of the new chain, the reverted transactions first, the expired ones are dropped
+        now = time()
+        connected_txids = {hash_transaction(
+            tx) for (block, block_hash) in branch for tx in block.transactions}
+        previous_transactions = self.__open_transactions
+        self.__open_transactions = []
+        kept_txids = set()
+        for tx in [tx for block in disconnected for tx in block.transactions if tx.sender != 'MINING'] + previous_transactions:
+            txid = hash_transaction(tx)
+            if txid in connected_txids or txid in kept_txids or AdmissionPipeline.is_expired(tx.timestamp, now):
+                continue
+            if Verification.verify_transaction(tx, self.get_balance):
+                self.__open_transactions.append(tx)
+                kept_txids.add(txid)
+        self.__mempool_version += 1
+        previous_txids = {hash_transaction(tx) for tx in previous_transactions}
+        self.__publish_removed(
+            [tx for tx in previous_transactions if hash_transaction(tx) not in kept_txids])
+        for tx in self.__open_transactions:
+            txid = hash_transaction(tx)
+            if txid not in previous_txids:
+                events.publish('mempool_add', {
+                               'txid': txid, 'transaction': tx.__dict__})
+        metrics.inc('chain_reorgs_total')
+        metrics.observe('chain_reorg_depth', len(disconnected))
+        events.publish('chain_replaced', {
+                       'header': self.__headers[-1], 'fork_height': fork_index, 'disconnected': disconnected_hashes})
         return True
 
+    def __fetch_block(self, block_hash):
+        """
+        Asks the peer nodes for a block by its hash, like the parent of an orphan, and adds it. The consensus is needed if no peer has it.
+
+        :param block_hash str: The hash of the block.
+        :var block dict: The block sent by a peer.
+        :returns: None.
+        """
+
+        for node in self.__peers.get_fastest_peers():
+            response = self.__peers.request(
+                node, 'get', '/block/{}'.format(block_hash), 'block')
+            if response == None or response.status_code != 200:
+                continue
+            try:
+                block = response.json()['block']
+                if hash_block(self.__block_from_dict(block)) != block_hash:
+                    continue
+                if self.add_block(block):
+                    return
+            except (ValueError, KeyError, TypeError):
+                continue
+        self.resolve_conflicts = True
+
+    def get_block(self, block_hash):
+        """
+        Function that gives a block of the chain or of the block tree by its hash.
+
+        :param block_hash str: The hash of the block.
+        :var block Block: The block, None if it is unknown or pruned.
+        :returns dict: The block and its transactions as dictionnaries, None if the block is unknown or pruned.
+        """
+
+        block = self.__tree.get_block(block_hash)
+        if block == None:
+            for header in reversed(self.__headers):
+                if header['hash'] == block_hash:
+                    block = self.__get_full_block(header['index'])
+                    break
+        if block == None:
+            return None
+        converted_block = block.__dict__.copy()
+        converted_block['transactions'] = [
+            tx.__dict__ for tx in converted_block['transactions']]
+        return converted_block
+
+    def add_compact_block(self, compact_block):
+        """
+        Function that rebuilds a compact block received from a peer node with the open transactions and adds it to the blockchain.
+
+        If open transactions have been used and the rebuilt block is invalid (two transactions with the same short ID), all its transactions are asked to the peer.
+
+        :param compact_block dict: The compact block (see utility.compact_block).
+        :var block dict: The rebuilt block, None if transactions are missing.
+        :var missing list: The positions of the transactions to ask to the peer.
+        :returns tuple: The result ('known', 'added', 'missing' or 'invalid') and the positions of the missing transactions.
+        :raises KeyError: If a field of the compact block is missing.
+        """
+
+        if self.__is_known_hash(compact_block['index'], compact_block['hash']):
+            return ('known', [])
+        (block, missing, used_open_transactions) = rebuild_block(
+            compact_block, self.__open_transactions[:])
+        if len(missing) > 0:
+            metrics.inc('compact_block_rebuilds_total',
+                        labels={'result': 'missing'})
+            return ('missing', missing)
+        if self.add_block(block):
+            metrics.inc('compact_block_rebuilds_total',
+                        labels={'result': 'added'})
+            return ('added', [])
+        metrics.inc('compact_block_rebuilds_total',
+                    labels={'result': 'invalid'})
+        if used_open_transactions:
+            return ('missing', [position for position in range(len(compact_block['short_ids']))
+                                if str(position) not in compact_block['prefilled']])
+        return ('invalid', [])
+
     def to_resolve_conflicts(self):
         """
         Function that resolve conflicts between nodes - Implementation of a consensus.
 
         :var winner_chain list: The blockchain with the greatest length.
         :var replace bool: False if the blockchain is not replaced, true if it has.
-        :var url str: URL where to send a request.
-        :var response int (status code): Send a GET request to the URL.
+        :var genesis_hash str: The hash of the local genesis block, the chains of the peers must start with it.
+        :var response Response: The chain of a peer node, None if the peer couldn't be reached.
         :var node_chain int (status code), list: Nested list of the block of each peer nodes and the transactions of each peer nodes.
-        :var node_chain_length int: Length of the var node_chain.
-        :var local_chain_length int: Length of the current blockchain.
+        :var node_chain_length int: Length of the var node_chain, from the genesis block.
+        :var local_chain_length int: Length of the current blockchain, from the genesis block.
         :returns: Returns true if the blockchain has been replaced, false if not
-        :raises ConnectionError: If the request is not satisfied an error if raised.
         """
 
         winner_chain = self.chain
         replace = False
-        for node in self.__peer_nodes:
-            url = 'https://{}/chain'.format(node)
+        genesis_hash = self.__headers[0]['hash']
+        # The fastest healthy peers first, the peers known to have a shorter chain are not downloaded
+        for node in self.__peers.get_fastest_peers(self.__chain[-1].index):
+            response = self.__peers.request(node, 'get', '/chain', 'chain')
+            if response == None:
+                continue  # We simply continue with the next peer node, we don't want to break the solving because of one node
             try:
-                response = requests.get(url)
                 node_chain = response.json()
-                node_chain = [Block(block['index'], block['previous_hash'], [Transaction(tx['sender'], tx['recipient'], tx['signature'], tx['amount'])
+                node_chain = [Block(block['index'], block['previous_hash'], [Transaction.from_dict(tx)
                                                                              for tx in block['transactions']], block['proof'], block['timestamp']) for block in node_chain]
-                node_chain_length = len(node_chain)
-                local_chain_length = len(self.chain)
-                if node_chain_length > local_chain_length and Verification.verify_chain(node_chain):
+                node_chain_length = node_chain[-1].index + 1
+                local_chain_length = winner_chain[-1].index + 1
+                # Only a chain starting at the same genesis block can be fully verified
+                if node_chain[0].index == 0 and hash_block(node_chain[0]) == genesis_hash and node_chain_length > local_chain_length and Verification.find_invalid_block_parallel(node_chain, BlockChain.validation_workers) == None:
                     winner_chain = node_chain  # We update the valid chain for the longest valid
                     replace = True
-            except requests.exceptions.ConnectionError:
-                continue  # We simply continue with the next peer node, we don't want to break the solving because of one node
-        self.resolve_conflicts = False
-        self.chain = winner_chain
-        if replace:
+            except (ValueError, KeyError, TypeError, IndexError):
+                continue  # The peer sent an invalid chain
+        with self.__lock:
+            self.resolve_conflicts = False
+            # Blocks may have been added while the chains of the peers were downloaded
+            if not replace or winner_chain[-1].index <= self.__chain[-1].index:
+                return False
+            self.chain = winner_chain
+            self.__publish_removed(self.__open_transactions)
             self.__open_transactions = []
-        self.save_data()
-        return replace
+            self.__mempool_version += 1
+            self.__headers = [block.to_header(hash_block(block))
+                              for block in self.__chain]
+            self.__rebuild_txids({})
+            self.__rebuild_state(BalanceState(0, self.__headers[0]['hash']))
+            self.__tree.clear()
+            self.save_data()
+            events.publish('chain_replaced', {'header': self.__headers[-1]})
+        return True
+
+    def get_address_history(self, address, cursor=0, limit=50):
+        """
+        Function that gives a page of the history of an address, its confirmed transactions first and then its open transactions. The confirmed transactions come from the address index and the blocks held in memory, from indexed queries of the database with the SQLite storage.
+
+        :param address str: The address whose history is requested.
+        :param cursor int: Position in the history of the first entry of the page. Default=0.
+        :param limit int: Maximum number of entries in the page, capped to HISTORY_PAGE_LIMIT. Default=50.
+        :var queries SqliteStorage: The storage answering the lookups, None if they are answered from memory.
+        :var confirmed list: The height, the position and the running balance of the confirmed entries of the address, with the transaction of the entry for the queries.
+        :var confirmed_count int: The number of confirmed entries.
+        :var balance float: The running balance of the address.
+        :var block Block: The block of a confirmed entry, None if the block is not held by this node.
+        :var pending list: The open transactions involving the address.
+        :var entries list: The entries of the page.
+        :returns dict: The entries of the page, the total number of entries and the cursor of the next page (None if it is the last page).
+        """
+
+        limit = max(1, min(limit, HISTORY_PAGE_LIMIT))
+        cursor = max(0, cursor)
+        queries = self.__get_queries()
+        if queries != None:
+            # The transactions of the anchor are part of the opening balances, like in the address index
+            start = self.__chain[0].index + 1
+            confirmed_count = queries.count_history(address, start)
+            confirmed = []
+            balance = self.__base_state.get_balance(address)
+            for row in queries.get_history(address, min(cursor + limit, confirmed_count), 0, start):
+                # The running balances are summed in the order of the chain, like the address index
+                if row['sender'] != row['recipient']:
+                    if row['recipient'] == address:
+                        balance += row['amount']
+                    else:
+                        balance -= row['amount']
+                confirmed.append(
+                    (row['height'], row['position'], balance, row))
+            balance = queries.get_balance(address)
+        else:
+            confirmed = self.__address_index.get_entries(address)
+            confirmed_count = len(confirmed)
+            balance = self.__state.get_balance(address)
+        pending = []
+        for tx in self.__open_transactions:
+            if tx.sender != address and tx.recipient != address:
+                continue
+            # Like get_balance, only the amounts sent are taken into account before being mined
+            if tx.sender == address:
+                balance -= tx.amount
+            pending.append((tx, balance))
+        total = confirmed_count + len(pending)
+        entries = []
+        for position in range(cursor, min(cursor + limit, total)):
+            if position < confirmed_count:
+                (height, tx_position, tx_balance) = confirmed[position][:3]
+                entry = {'height': height, 'position': tx_position,
+                         'confirmed': True, 'balance': tx_balance}
+                if queries != None:
+                    tx = confirmed[position][3]
+                    entry['sender'] = tx['sender']
+                    entry['recipient'] = tx['recipient']
+                    entry['amount'] = tx['amount']
+                    entries.append(entry)
+                    continue
+                block = self.__get_full_block(height)
+                if block == None:
+                    # The entry is still known but the block itself is not held by this node
+                    entry['sender'] = entry['recipient'] = entry['amount'] = None
+                    entry['pruned'] = True
+                    entries.append(entry)
+                    continue
+                tx = block.transactions[tx_position]
+            else:
+                (tx, tx_balance) = pending[position - confirmed_count]
+                entry = {'height': None, 'position': None,
+                         'confirmed': False, 'balance': tx_balance}
+            entry['sender'] = tx.sender
+            entry['recipient'] = tx.recipient
+            entry['amount'] = tx.amount
+            entries.append(entry)
+        next_cursor = cursor + limit if cursor + limit < total else None
+        return {'address': address, 'entries': entries, 'total': total, 'next_cursor': next_cursor}
+
+    def get_filtered_blocks(self, bloom, start=None, limit=FILTERED_BLOCKS_LIMIT):
+        """
+        Function that gives the blocks having transactions matching a Bloom filter, with only these transactions, for the lightweight clients. A transaction matches if its sender or its recipient matches.
+
+        :param bloom BloomFilter: The filter of the client.
+        :param start int: The index of the first block to search. Default=None for the first full block held by the node.
+        :param limit int: Maximum number of matching blocks, capped to FILTERED_BLOCKS_LIMIT. Default=FILTERED_BLOCKS_LIMIT.
+        :var chain ChainView: The chain when it is called, not copied.
+        :var headers list: The headers of the blocks of the chain, copied with the lock held so they match the chain.
+        :var first int: The index of the first searched block.
+        :var transactions list: The matching transactions of a block.
+        :var blocks list: The header and the matching transactions of each matching block.
+        :returns dict: The index of the first searched block, the index of the last block of the chain, the matching blocks and the index of the block to start the next page from (None if it is the last page).
+        """
+
+        limit = max(1, min(limit, FILTERED_BLOCKS_LIMIT))
+        with self.__lock:
+            chain = self.__chain
+            headers = self.__headers[chain.start:]
+        first = max(chain.start, start) if start != None else chain.start
+        blocks = []
+        for block in chain[first - chain.start:]:
+            transactions = [tx for tx in block.transactions
+                            if bloom.matches_any((tx.sender, tx.recipient))]
+            if len(transactions) == 0:
+                continue
+            if len(blocks) == limit:
+                return {'start': first, 'height': chain.height, 'blocks': blocks, 'next_start': block.index}
+            blocks.append({'header': headers[block.index - chain.start], 'transactions': [
+                          dict(tx.__dict__, txid=hash_transaction(tx)) for tx in transactions]})
+        return {'start': first, 'height': chain.height, 'blocks': blocks, 'next_start': None}
+
+    def get_snapshot(self):
+        """
+        Function that gives a snapshot of the balance state after the last block of the chain.
+
+        :returns dict: The height, the block hash, the balances and the hash committing to them.
+        """
+
+        return self.__state.to_snapshot()
+
+    def get_headers(self, start=0, end=None):
+        """
+        Function that gives the headers of a range of blocks.
+
+        :param start int: The index of the first header. Default=0.
+        :param end int: The index of the last header, included. Default=None for the last block.
+        :returns list: The headers of the blocks from start to end.
+        """
+
+        if end == None:
+            return self.__headers[start:]
+        return self.__headers[start:end + 1]
+
+    def __get_from_peer(self, node, path, params=None):
+        """
+        Gets the JSON answer of a route of a peer node with the pooled session of the peer.
+
+        :param node str: The URL of the peer node.
+        :param path str: The path of the route.
+        :param params dict: The query parameters of the request. Default=None.
+        :var response Response: The response of the peer, None if it couldn't be reached.
+        :returns: The decoded JSON answer, None if the peer couldn't be reached or didn't answer with 200.
+        :raises ValueError: If the answer is not JSON.
+        """
+
+        response = self.__peers.request(
+            node, 'get', path, 'snapshot', params=params)
+        if response == None or response.status_code != 200:
+            return None
+        return response.json()
+
+    @staticmethod
+    def __get_window_start(headers):
+        """
+        Finds the first block of the replay window before the last of a list of headers: the transactions of the blocks of the last REPLAY_WINDOW seconds can still be replayed, so their IDs are needed.
+
+        :param headers list: The headers from the genesis block.
+        :var cutoff float: The time of the oldest block of the window.
+        :returns int: The index of the first block of the window.
+        """
+
+        cutoff = headers[-1]['timestamp'] - REPLAY_WINDOW
+        height = len(headers) - 1
+        while height > 1 and headers[height - 1]['timestamp'] >= cutoff:
+            height -= 1
+        return height
+
+    def __verify_snapshot(self, state, headers, blocks):
+        """
+        Checks the blocks sent with a snapshot of a peer: the blocks must be contiguous and reach the snapshot, each block up to the snapshot must match its header, and every block must have a valid proof of work. The blocks before the window are not downloaded, so the balances of the snapshot are trusted.
+
+        :param state BalanceState: The balance state of the snapshot.
+        :param headers list: The headers of the peer up to the block of the snapshot, linked together.
+        :param blocks list: The blocks of the peer, from the start of the replay window.
+        :var first int: The index of the first sent block.
+        :returns bool: True if the blocks are consistent with the headers, false if not.
+        """
+
+        first = blocks[0].index
+        if first > state.height or len(blocks) < state.height - first + 1:
+            return False
+        for (position, block) in enumerate(blocks):
+            if block.index != first + position:
+                return False
+            if block.index <= state.height and block.to_header(hash_block(block)) != headers[block.index]:
+                return False
+        # The links and the proofs of work of the blocks after the first one are checked like a chain received from a peer
+        if first > 0 and not Verification.valid_proof(blocks[0].transactions[:-1], blocks[0].previous_hash, blocks[0].proof):
+            return False
+        return Verification.find_invalid_block_parallel(blocks, BlockChain.validation_workers) == None
+
+    def bootstrap_from_snapshot(self, node):
+        """
+        Function that replaces the local chain by a snapshot of the balances of a peer node and the blocks after it, so the node neither downloads nor replays the blocks before the snapshot.
+
+        The snapshot is verified against its hash and against the headers of the peer, which must start at the same genesis block, be linked together and end at the block of the snapshot. The balances of the snapshot are trusted, a node which doesn't trust its peer must sync the whole chain. Only the blocks of the replay window before the snapshot (REPLAY_WINDOW seconds) are downloaded, with the blocks after it: they must match their headers and have valid proofs of work, and the IDs of their transactions are kept so the node rejects the same replays as a node holding the whole chain. A pruned peer may not hold the whole window, then only the IDs of the blocks it holds are kept.
+
+        :param node str: The URL of the peer node (host:port).
+        :var snapshot dict: The snapshot of the balances sent by the peer.
+        :var state BalanceState: The balance state of the snapshot.
+        :var headers list: The headers sent by the peer up to the block of the snapshot.
+        :var window_start int: The index of the first block of the replay window before the snapshot.
+        :var blocks list: The blocks sent by the peer, from the start of the window (or its first full block).
+        :var pruned_txids dict: The IDs of the transactions of the window before the snapshot, mapped to the index of their block.
+        :returns bool: True if the chain has been replaced, false if not.
+        """
+
+        try:
+            snapshot = self.__get_from_peer(node, '/snapshot')
+            state = BalanceState.from_snapshot(snapshot) if snapshot != None else None
+            if state == None or state.height <= self.__chain[-1].index:
+                return False
+            headers = self.__get_from_peer(
+                node, '/headers', {'end': state.height})
+            if headers == None or len(headers) != state.height + 1 or headers[0] != self.__headers[0]:
+                return False
+            if not Verification.verify_headers(headers) or headers[-1]['hash'] != state.block_hash:
+                return False
+            window_start = self.__get_window_start(headers)
+            blocks = self.__get_from_peer(
+                node, '/chain', {'start': window_start})
+            if blocks == None or len(blocks) == 0:
+                return False
+            blocks = [self.__block_from_dict(block) for block in blocks]
+            if not self.__verify_snapshot(state, headers, blocks):
+                return False
+        except (ValueError, KeyError, TypeError, IndexError):
+            return False  # The peer sent invalid data
+        pruned_txids = {}
+        for block in blocks[:state.height - blocks[0].index]:
+            for tx in block.transactions:
+                if tx.sender != 'MINING' and tx.timestamp != None:
+                    pruned_txids.setdefault(hash_transaction(tx), block.index)
+        blocks = blocks[state.height - blocks[0].index:]
+        with self.__lock:
+            # Blocks may have been added while the snapshot was downloaded
+            if state.height <= self.__chain[-1].index:
+                return False
+            self.chain = blocks
+            self.__headers = headers[:-1] + \
+                [block.to_header(hash_block(block)) for block in blocks]
+            self.__rebuild_txids(pruned_txids)
+            self.__rebuild_state(state)
+            self.__tree.clear()
+            self.__publish_removed(self.__open_transactions)
+            self.__open_transactions = []
+            self.__mempool_version += 1
+            self.__peers.add(node)
+            self.save_data()
+            events.publish('chain_replaced', {'header': self.__headers[-1]})
+        return True
+
+    def verify_chain(self, workers=None):
+        """
+        Function that checks the links and the proofs of work of every block held by the node, like after loading a chain file which is trusted as it is. The ranges of blocks are checked in worker processes.
+
+        :param workers int: The number of worker processes. Default=None for the number of CPUs.
+        :var chain ChainView: The chain when it is called, not copied.
+        :var invalid_height int: The index of the first invalid block, None if the chain is valid.
+        :returns dict: True if the chain is valid, the index of the first invalid block, the number of checked blocks and the duration of the check in seconds.
+        """
+
+        start = perf_counter()
+        chain = self.__chain
+        invalid_height = Verification.find_invalid_block_parallel(
+            chain, workers)
+        duration = perf_counter() - start
+        metrics.observe('chain_validation_duration_seconds', duration)
+        return {
+            'valid': invalid_height == None,
+            'first_invalid_height': invalid_height,
+            'blocks': len(chain),
+            'seconds': duration
+        }
+
+    def get_chain_info(self):
+        """
+        Function that gives the range of blocks this node can serve in full.
+
+        :var chain ChainView: The chain when it is called, so the range is consistent if a block arrives meanwhile.
+        :returns dict: The mode of the node (archival or pruned), the index of the first and of the last full block, and the prune depth.
+        """
+
+        chain = self.__chain
+        return {
+            'mode': 'archival' if self.prune_depth == None else 'pruned',
+            'start': chain.start,
+            'height': chain.height,
+            'prune_depth': self.prune_depth
+        }
+
+    def get_version(self):
+        """
+        Function that gives the version of the data of the blockchain, which changes on every change of the chain, of the open transactions or of the peer nodes. It is used to know when a cached response is stale.
+
+        :returns tuple: The hash of the last block, the index of the first full block, the version of the open transactions and the version of the peer nodes.
+        """
+
+        return (self.__headers[-1]['hash'], self.__chain.start, self.__mempool_version, self.__peers.version)
+
+    def get_ledger_analytics(self, top=10, start=None):
+        """
+        Function that gives the aggregates of the confirmed transactions, computed on the columnar ledger.
+
+        :param top int: The number of top holders and top senders, capped to ANALYTICS_TOP_LIMIT. Default=10.
+        :param start int: The index of the first block of the volumes. Default=None for the block after the anchor.
+        :var stats dict: The size of the columnar ledger.
+        :returns dict: The range of blocks, the number of transactions and addresses, the top holders, the top senders since the anchor and the volume of each block, None without NumPy.
+        """
+
+        if self.__columns == None:
+            return None
+        top = max(0, min(top, ANALYTICS_TOP_LIMIT))
+        with self.__lock:
+            stats = self.__columns.get_stats()
+            return {
+                'start': self.__columns.start,
+                'height': self.__columns.height - 1,
+                'transactions': stats['transactions'],
+                'addresses': stats['addresses'],
+                'top_holders': [{'address': address, 'balance': balance}
+                                for (address, balance) in self.__columns.get_top_holders(top)],
+                'top_senders': [{'address': address, 'amount': amount}
+                                for (address, amount) in self.__columns.get_top_senders(top)],
+                'block_volumes': self.__columns.get_block_volumes(start)
+            }
+
+    def save_ledger_columns(self, file):
+        """
+        Function that saves the columns of the confirmed transactions in the NumPy .npz format (see ColumnarLedger.save_npz).
+
+        :param file str or file: The path or the file object to write.
+        :returns bool: True if the columns are saved, false without NumPy.
+        """
+
+        if self.__columns == None:
+            return False
+        with self.__lock:
+            self.__columns.save_npz(file)
+        return True
@@ -6,6 +6,8 @@ This module contains the main program of this project.
 :function: get_open_transation()
 :function: create_keys()
 :function: load_keys()
+:function: create_hosted_wallet()
+:function: get_hosted_wallets()
 :function: add_transaction()
 :function: get_chain()
 :function: get_balance()
@@ -13,23 +15,272 @@ This module contains the main program of this project.
 :function: add_node()
 :function: remove_node(node_url)
 :function: get_nodes()
+:function: get_nodes_health()
+:function: discover_nodes()
 :function: broadcast_transaction()
 :function: broadcast_block()
+:function: broadcast_compact_block()
+:function: get_block(block_hash)
 :function: resolve_conflicts()
+:function: get_address_history(key)
+:function: get_transaction(txid)
+:function: load_filter()
+:function: remove_filter(filter_id)
+:function: get_filtered_blocks(filter_id)
+:function: get_filtered_transactions(filter_id)
+:function: get_snapshot()
+:function: get_headers()
+:function: get_analytics()
+:function: get_analytics_columns()
+:function: get_chain_info()
+:function: get_replication()
+:function: start_timer()
+:function: redirect_to_primary()
+:function: record_request(response)
+:function: end_profiling(error)
+:function: admin_route(route_function)
+:function: start_profile()
+:function: get_profile()
+:function: stop_profile()
+:function: start_tracemalloc()
+:function: get_tracemalloc()
+:function: stop_tracemalloc()
+:function: rejected_transaction_response(stage)
+:function: cached_json_response(key, version, build_payload, headers=None)
+:function: get_metrics()
+:function: subscribe_events(filter_id=None, last_event_id=None, notify=None)
+:function: filter_event(event, bloom, sent_txids)
+:function: format_event(event, bloom, sent_txids)
+:function: get_events()
+:function: own_addresses()
+:function: create_parser()
+:function: setup_node(parser)
 :main: __main__
 """
 
 # request import is usefull to extract incoming requests from servers
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, jsonify, request, send_from_directory, g, Response
 from flask_cors import CORS
 # To access the arguments at the launch of the program.
 from argparse import ArgumentParser
+from functools import wraps
+from time import perf_counter, time
+from queue import Empty
+from io import BytesIO
+import atexit
+import hmac
+import json
+import os
+import signal
+import sys
 
-from wallet import Wallet
-from blockchain import BlockChain
+from wallet import Wallet, SIGNATURE_SCHEMES
+from transaction import DEFAULT_SCHEME
+from blockchain import BlockChain, FILTERED_BLOCKS_LIMIT
+from utility.metrics import metrics
+from utility.events import events
+from utility.hash_util import hash_transaction
+from utility.response_cache import ResponseCache
+from utility.storage import STORAGE_BACKENDS
+from utility.columnar import NUMPY_AVAILABLE
+from utility.profiling import profiler, DEFAULT_SAMPLE_INTERVAL, DEFAULT_TRACE_FRAMES
+from utility.admission import AdmissionPipeline, DEFAULT_SENDER_RATE, DEFAULT_PEER_RATE
+from utility.wallet_manager import WalletManager
+from utility.bloom import BloomFilter, FilterRegistry
+from utility.capture import TrafficCapture, offline_transport
+from utility.peers import PeerManager
+from utility.replication import Follower, FOLLOW_INTERVAL
+
+# Seconds without event after which a comment is sent on the event stream to keep the connection open
+EVENTS_KEEP_ALIVE = 15
+# Routes a read replica serves itself although they change something: the Bloom filters of its own clients and the admin routes
+REPLICA_LOCAL_ROUTES = ('/filter', '/admin/')
+# Read routes a read replica redirects to its primary, they depend on the wallets of the primary
+PRIMARY_READ_ROUTES = ('/wallet', '/wallets')
 
 webApp = Flask(__name__)
 CORS(webApp)
+# Serialized responses of the read routes, valid as long as the version of the blockchain doesn't change
+response_cache = ResponseCache()
+# Bloom filters loaded by the lightweight clients
+filters = FilterRegistry()
+# Set by setup_node and read by the routes
+port = None
+prune_depth = None
+storage = 'file'
+admin_token = None
+admission = None
+capture = None
+wallet = None
+wallets = None
+blockchain = None
+follower = None
+
+
+@webApp.before_request
+def start_timer():
+    """
+    This function is called before every request and stores the time the request started, for the metrics, and starts to profile the request if a profiling session wants it (the admin routes are never profiled).
+
+    :returns: None.
+    """
+
+    g.request_start = perf_counter()
+    if profiler.active and request.url_rule != None and not request.url_rule.rule.startswith('/admin/'):
+        g.profile = profiler.begin_request(request.url_rule.rule)
+
+
+@webApp.before_request
+def redirect_to_primary():
+    """
+    This function is called before every request of a read replica (--follow) and redirects the writes to the primary node with a 307 response, so the clients send them again with the same method and body. The reads are served by the replica, except the ones depending on the wallets of the primary.
+
+    :var rule str: The rule of the route of the request.
+    :var response dict: The redirection message and the URL of the primary.
+    :returns json: A JSON response of 307 with the URL of the request on the primary in the Location header, None to serve the request.
+    """
+
+    if follower == None or request.url_rule == None:
+        return None
+    rule = request.url_rule.rule
+    if rule.startswith(REPLICA_LOCAL_ROUTES):
+        return None
+    if request.method in ('GET', 'HEAD', 'OPTIONS') and rule not in PRIMARY_READ_ROUTES \
+            and not (rule == '/balance' and request.args.get('wallet') == None):
+        return None
+    response = {
+        'message': 'This node is a read replica, send the request to the primary node.',
+        'primary': follower.primary
+    }
+    return jsonify(response), 307, {'Location': 'http://{}{}'.format(follower.primary, request.full_path.rstrip('?'))}
+
+
+@webApp.after_request
+def record_request(response):
+    """
+    This function is called after every request and records its duration and status in the metrics, and in the capture of the traffic if the node captures it (the admin routes are never captured).
+    The index of the last block is sent in the X-Chain-Height header of every response, so the peer nodes learn the height of this node from any request.
+
+    :param response Response: The response of the request.
+    :var route str: The rule of the route rather than the path, so the node URLs and keys don't create a label each.
+    :var duration float: The duration of the request in seconds.
+    :returns Response: The response with the X-Chain-Height header.
+    """
+
+    route = request.url_rule.rule if request.url_rule != None else 'unknown'
+    duration = perf_counter() - g.request_start
+    metrics.observe('http_request_duration_seconds', duration,
+                    {'route': route, 'method': request.method})
+    if capture != None and not route.startswith('/admin/'):
+        capture.record(request.method, request.path, request.query_string, request.get_data(),
+                       request.content_type, response.status_code, duration, g.request_start)
+    metrics.inc('http_requests_total', labels={
+                'route': route, 'method': request.method, 'status': response.status_code})
+    if blockchain != None and 'X-Chain-Height' not in response.headers:
+        response.headers['X-Chain-Height'] = str(
+            blockchain.get_chain_info()['height'])
+    return response
+
+
+@webApp.teardown_request
+def end_profiling(error):
+    """
+    This function is called after every request, even a failed one, and ends the profiling of the request if it was profiled.
+
+    :param error Exception: The error of the request, None if it succeeded.
+    :returns: None.
+    """
+
+    if 'profile' in g:
+        profiler.end_request(g.pop('profile'))
+
+
+def admin_route(route_function):
+    """
+    This decorator guards an admin route: the route doesn't exist if the node has no admin token (--admin-token), and the requests must give the token in the X-Admin-Token header.
+
+    :param route_function function: The function of the route.
+    :returns function: The guarded function of the route.
+    """
+
+    @wraps(route_function)
+    def guarded_route(*args, **kwargs):
+        if admin_token == None:
+            response = {
+                'message': 'Not found.'
+            }
+            return jsonify(response), 404
+        if not hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(), admin_token.encode()):
+            response = {
+                'message': 'Invalid admin token.'
+            }
+            return jsonify(response), 403
+        return route_function(*args, **kwargs)
+
+    return guarded_route
+
+
+def rejected_transaction_response(stage):
+    """
+    This function gives the failure response of a transaction rejected by the admission, by stage.
+
+    :param stage str: The stage rejecting the transaction (see utility.admission).
+    :var response dict: The failure message and the stage.
+    :returns json: A JSON failure response of 400 if the fields are invalid or the transaction is expired, 409 if the transaction is already in a block, 429 (with a Retry-After header) if a rate limit is exceeded, 500 if the balance or the signature are invalid or a peer node declined the transaction.
+    """
+
+    if stage == 'schema':
+        response = {
+            'message': 'Invalid transaction data.',
+            'stage': stage
+        }
+        return jsonify(response), 400
+    if stage == 'expired':
+        response = {
+            'message': 'Transaction expired or created in the future.',
+            'stage': stage
+        }
+        return jsonify(response), 400
+    if stage == 'confirmed':
+        response = {
+            'message': 'Transaction already confirmed.',
+            'stage': stage
+        }
+        return jsonify(response), 409
+    if stage in ('peer_rate', 'sender_rate'):
+        response = {
+            'message': 'Too many transactions, retry later.',
+            'stage': stage
+        }
+        return jsonify(response), 429, {'Retry-After': '1'}
+    response = {
+        'message': 'Creating a transaction failed.',
+        'stage': stage
+    }
+    return jsonify(response), 500
+
+
+def cached_json_response(key, version, build_payload, headers=None):
+    """
+    This function gives a JSON response from the response cache, the payload is only built and serialized if the blockchain changed since it was cached. The response has a strong ETag, and is a 304 response without body if the client already has it (If-None-Match).
+
+    :param key str: The key of the response in the cache, like the route and its parameters.
+    :param version tuple: The part of the version of the blockchain the payload depends on.
+    :param build_payload function: Builds the payload, called without arguments if the response is not cached.
+    :param headers dict: Other headers of the response. Default=None.
+    :var entry tuple: The serialized body and the ETag of the response.
+    :returns Response: A 200 JSON response or a 304 response.
+    """
+
+    entry = response_cache.get(key, version)
+    if entry == None:
+        entry = response_cache.put(
+            key, version, webApp.json.dumps(build_payload()).encode())
+    (body, etag) = entry
+    response = Response(body, status=200,
+                        mimetype='application/json', headers=headers)
+    response.set_etag(etag)
+    return response.make_conditional(request)
 
 
 @webApp.route('/', methods=['GET'])
@@ -58,12 +309,17 @@ def get_open_transation():
     This GET function gets the open transactions of the blockchain via the '/transactions' route.
 
     :var all_transactions list: The list of all transactions of the blockchain.
-    :var dict_transactions dict: All open transactions transformed into a dictionnary.
-    :returns json: A JSON success response (200) of the dictionnary of all transactions.
+    :var dict_transactions dict: All open transactions transformed into a dictionnary, with their ID to match the events of the '/events' route.
+    :returns json: A JSON success response (200) of the dictionnary of all transactions, a 304 response if the client already has it.
     """
-    all_transactions = blockchain.get_open_transactions()
-    dict_transactions = [tx.__dict__ for tx in all_transactions]
-    return jsonify(dict_transactions), 200
+
+    def build_payload():
+        all_transactions = blockchain.get_open_transactions()
+        dict_transactions = [dict(tx.__dict__, txid=hash_transaction(tx))
+                             for tx in all_transactions]
+        return dict_transactions
+
+    return cached_json_response('transactions', blockchain.get_version()[2], build_payload)
 
 
 @webApp.route('/wallet', methods=['POST'])
@@ -71,15 +327,14 @@ def create_keys():
     """
     This POST function creates the keys for the wallet via the '/wallet' route.
 
-    :var blockchain BlockChain: Blockchain associated with the wallet (or the node).
     :var response dict: Contains a failure message if the keys are not saved. Contains the public key, private key and the funds of the wallet if the keys are saved successfully.
     :returns json: A JSON response of 500 if there is an error in the key creation, 201 if it succeeds plus the public and private key.
     """
     wallet.create_keys()
     if wallet.save_keys():
-        # TODO: why using a global variable?
-        global blockchain  # We must define a global variable blockchain because
-        blockchain = BlockChain(wallet.public_key, port)
+        # The blockchain is kept, only the key receiving the mining rewards changes
+        blockchain.public_key = wallet.public_key
+        response_cache.clear()
         response = {
             'public_key': wallet.public_key,
             'private_key': wallet.private_key,
@@ -98,14 +353,13 @@ def load_keys():
     """
     This GET function loads the keys of a wallet via the '/wallet' route.
 
-    :var blockchain BlockChain: The blockchain of the wallet (or of the node).
     :var response dict: Contains a failure message if the keys are not loaded. Contains the public key, private key and the funds of the wallet if the keys are saved successfully.
     :returns json: A JSON response of 500 if the keys failed loading, 201 if it succeeds plus the public key, the private key and the funds.
     """
     if wallet.load_keys():
-        # TODO: why using a global variable?
-        global blockchain  # We must define a global variable blockchain because
-        blockchain = BlockChain(wallet.public_key, port)
+        # The blockchain is kept, only the key receiving the mining rewards changes
+        blockchain.public_key = wallet.public_key
+        response_cache.clear()
         response = {
             'public_key': wallet.public_key,
             'private_key': wallet.private_key,
@@ -119,33 +373,103 @@ def load_keys():
         return jsonify(response), 500
 
 
+@webApp.route('/wallets', methods=['POST'])
+def create_hosted_wallet():
+    """
+    This POST function creates a wallet hosted by the node via the '/wallets' route, sharing the blockchain of the node.
+
+    :var values dict: The optional signature scheme of the keys, the scheme of the node by default.
+    :var scheme str: The tag of the signature scheme of the keys.
+    :var hosted_wallet Wallet: The new wallet.
+    :var token str: The access token of the wallet, needed in the X-Wallet-Token header to send its transactions.
+    :var response dict: Contains a failure message if the wallet is not created. Contains the public key, the scheme and the access token of the wallet if it is created.
+    :returns json: A JSON response of 400 if the scheme is unknown, 503 if the wallet can't be created or saved, 201 if it succeeds.
+    """
+
+    values = request.get_json(silent=True) or {}
+    scheme = values.get('scheme', wallet.scheme)
+    if scheme not in SIGNATURE_SCHEMES:
+        response = {
+            'message': 'Unknown signature scheme.'
+        }
+        return jsonify(response), 400
+    (hosted_wallet, token) = wallets.create_wallet(scheme)
+    if hosted_wallet == None:
+        response = {
+            'message': 'Creating the wallet failed.'
+        }
+        return jsonify(response), 503
+    response = {
+        'public_key': hosted_wallet.public_key,
+        'scheme': hosted_wallet.scheme,
+        'token': token,
+        'funds': blockchain.get_balance(hosted_wallet.public_key)
+    }
+    return jsonify(response), 201
+
+
+@webApp.route('/wallets', methods=['GET'])
+def get_hosted_wallets():
+    """
+    This GET function gets the wallets hosted by the node and their funds via the '/wallets' route.
+
+    :var response dict: The public key and the funds of each hosted wallet.
+    :returns json: A JSON response of 200 with the hosted wallets.
+    """
+
+    response = {
+        'wallets': [{'public_key': public_key, 'funds': blockchain.get_balance(public_key)}
+                    for public_key in wallets.get_public_keys()]
+    }
+    return jsonify(response), 200
+
+
 @webApp.route('/transaction', methods=['POST'])
 def add_transaction():
     """
     This POST function manages the addition of new transactions into the blockchain via the '/transaction' route.
 
-    :var response dict: Contains the public key, the amount, the signature, the sender,  and the recipient of the transaction plus the funds of the wallet if adding the transaction is a success, contains an error message if not.
+    The transaction is sent from the wallet of the node, or from a hosted wallet if its public key is given in the 'wallet' field and its access token in the X-Wallet-Token header.
+
+    :var response dict: Contains the public key, the amount, the signature, the sender, the recipient and the time of creation of the transaction plus the funds of the wallet if adding the transaction is a success, contains an error message if not.
     :var required_fields list: List of the required fields to have (the amount and the recipient) in the received data.
     :var incoming_values dict: The actual incoming values of the transaction to be compared with the required_fields var.
+    :var sender_wallet Wallet: The wallet sending the transaction.
     :var recipient str: The recipient of the transaction.
     :var amount float: The amount of the transaction.
+    :var timestamp float: The time of creation of the transaction, signed with it so two payments of the same amount to the same recipient are different transactions.
     :var signature str: The signature of the transacion.
     :var success bool: True if the transaction has been added successfully into the blockchain, false if not.
-    :returns json: A JSON response of 400 if the public key doesn't exists or if a data is missing is the incoming_values var or if incoming_values is empty or of 500 if the creation of the transaction in the blockchain failed, 201 if the transaction is successfully added.
+    :returns json: A JSON response of 400 if the public key doesn't exists or if a data is missing is the incoming_values var or if incoming_values is empty or if the wallet field is not a string, 403 if the hosted wallet is unknown or its token is wrong, 409 if the same transaction is already in a block, 429 if a rate limit is exceeded or of 500 if the creation of the transaction in the blockchain failed, 201 if the transaction is successfully added.
     """
 
     # Verification of the data
-    if wallet.public_key == None:
-        response = {
-            'message': 'No wallet set up.'
-        }
-        return jsonify(response), 400
     incoming_values = request.get_json()
     if not incoming_values:
         response = {
             'message': 'No data found.'
         }
         return jsonify(response), 400
+    if 'wallet' in incoming_values:
+        if not isinstance(incoming_values['wallet'], str):
+            response = {
+                'message': 'The wallet must be a public key.'
+            }
+            return jsonify(response), 400
+        sender_wallet = wallets.get_wallet(
+            incoming_values['wallet'], request.headers.get('X-Wallet-Token', ''))
+        if sender_wallet == None:
+            response = {
+                'message': 'Unknown wallet or wrong token.'
+            }
+            return jsonify(response), 403
+    else:
+        sender_wallet = wallet
+    if sender_wallet.public_key == None:
+        response = {
+            'message': 'No wallet set up.'
+        }
+        return jsonify(response), 400
     required_fields = ['recipient', 'amount']
     if not all(field in incoming_values for field in required_fields):
         response = {
@@ -155,63 +479,98 @@ def add_transaction():
     # At this stage, we have proper data
     recipient = incoming_values['recipient']
     amount = incoming_values['amount']
-    signature = wallet.sign_transaction(wallet.public_key, recipient, amount)
-    success = blockchain.add_transaction(
-        recipient, wallet.public_key, signature, amount)
+    timestamp = time()
+    signature = sender_wallet.sign_transaction(
+        sender_wallet.public_key, recipient, amount, timestamp)
+    (success, stage) = blockchain.submit_transaction(
+        recipient, sender_wallet.public_key, signature, amount, scheme=sender_wallet.scheme, peer=request.remote_addr, timestamp=timestamp)
     if success:
         response = {
             'message': 'Successfully added transaction.',
             'transaction': {
-                'sender': wallet.public_key,
+                'sender': sender_wallet.public_key,
                 'recipient': recipient,
                 'amount': amount,
-                'signature': signature
+                'signature': signature,
+                'scheme': sender_wallet.scheme,
+                'timestamp': timestamp
             },
-            'funds': blockchain.get_balance()
+            'funds': blockchain.get_balance(sender_wallet.public_key)
         }
         return jsonify(response), 201
     else:
-        response = {
-            'message': 'Creating a transaction failed.',
-        }
-        return jsonify(response), 500
+        return rejected_transaction_response(stage)
 
 
 @webApp.route('/chain', methods=['GET'])
 def get_chain():
     """
-    This GET function gets the chain of the blockchain via the '/chain' route.
+    This GET function gets the chain of the blockchain via the '/chain?start=' route.
 
-    :var chain_snapshot: The blockchain of the wallet (or the node).
+    :var start int: The index of the first block to send, 0 by default.
+    :var chain ChainView: The blockchain of the wallet (or the node), not copied.
+    :var chain_snapshot ChainView: The blocks from start.
     :var dictionnary_chain list: The list of all blocks in the blockchain transformed into a dictionnary.
-    :returns json: A JSON response of 200 with the dictionnary_chain var.
+    :var chain_info dict: The range of full blocks held by the node, sent in the X-Chain-* headers of the response since a pruned node can't serve the oldest blocks.
+    :returns json: A JSON response of 400 if start is not an integer, a JSON response of 200 with the dictionnary_chain var, a 304 response if the client already has it.
     """
 
-    chain_snapshot = blockchain.chain
-    dictionnary_chain = [block.__dict__.copy() for block in chain_snapshot]
-    for dict_block in dictionnary_chain:
-        dict_block['transactions'] = [
-            tx.__dict__ for tx in dict_block['transactions']]
-    return jsonify(dictionnary_chain), 200
+    try:
+        start = int(request.args.get('start', 0))
+    except ValueError:
+        response = {
+            'message': 'Start must be an integer.'
+        }
+        return jsonify(response), 400
+
+    def build_payload():
+        # The chain view is sliced without copying the blocks before start
+        chain = blockchain.chain
+        chain_snapshot = chain[max(0, start - chain.start):]
+        dictionnary_chain = [block.__dict__.copy()
+                             for block in chain_snapshot]
+        for dict_block in dictionnary_chain:
+            dict_block['transactions'] = [
+                tx.__dict__ for tx in dict_block['transactions']]
+        return dictionnary_chain
+
+    chain_info = blockchain.get_chain_info()
+    headers = {
+        'X-Chain-Mode': chain_info['mode'],
+        'X-Chain-Start': str(chain_info['start']),
+        'X-Chain-Height': str(chain_info['height'])
+    }
+    return cached_json_response('chain:{}'.format(start), blockchain.get_version()[:2], build_payload, headers)
 
 
 @webApp.route('/balance', methods=['GET'])
 def get_balance():
     """
-    This GET function gets the balance of the funds of the wallet via the '/balance' route.
+    This GET function gets the balance of the funds of the wallet via the '/balance?wallet=' route.
 
+    :var public_key str: The public key of the hosted wallet given in the wallet parameter (any address on a read replica), the wallet of the node by default.
     :var balance float: The balance of the wallet (or the node) requested.
     :response dict: The success or failure response send.
-    :returns json: A JSON response of 200 if the balance is successfully returned, 500 if it failed.
+    :returns json: A JSON response of 200 if the balance is successfully returned, a 304 response if the client already has it, 404 if the hosted wallet is unknown, 500 if it failed.
     """
 
-    balance = blockchain.get_balance()
-    if balance != None:
+    public_key = request.args.get('wallet')
+    if public_key != None and follower == None and wallets.get_wallet(public_key) == None:
         response = {
-            'message': 'Fetched balance successfully.',
-            'funds': balance
+            'message': 'Unknown wallet.'
         }
-        return jsonify(response), 200
+        return jsonify(response), 404
+    if public_key == None:
+        public_key = blockchain.public_key
+    if public_key != None:
+        def build_payload():
+            response = {
+                'message': 'Fetched balance successfully.',
+                'funds': blockchain.get_balance(public_key)
+            }
+            return response
+
+        return cached_json_response('balance:{}'.format(public_key), blockchain.get_version()[:3], build_payload)
     else:
         response = {
             'message': 'Loading balance failed.',
@@ -317,12 +676,49 @@ def get_nodes():
 
     :var nodes list: List of all peer nodes of the network.
     :var response dict: The response containing all peer nodes.
-    :returns json: A 200 JSON success response for all nodes being returned.
+    :returns json: A 200 JSON success response for all nodes being returned, a 304 response if the client already has it.
+    """
+
+    def build_payload():
+        nodes = blockchain.get_peer_nodes()
+        response = {
+            'all_nodes': nodes
+        }
+        return response
+
+    return cached_json_response('nodes', blockchain.get_version()[3], build_payload)
+
+
+@webApp.route('/nodes/health', methods=['GET'])
+def get_nodes_health():
+    """
+    This GET function gives the health of the peer nodes via the '/nodes/health' route.
+
+    :var response dict: The statistics of each peer node: average latency in seconds, consecutive failures, last answer time, last known tip height and whether it is healthy (not in backoff).
+    :returns json: A 200 JSON response with the statistics of the peer nodes.
+    """
+
+    response = {
+        'nodes': blockchain.get_peer_stats()
+    }
+    return jsonify(response), 200
+
+
+@webApp.route('/nodes/discover', methods=['POST'])
+def discover_nodes():
+    """
+    This POST function adds the peer nodes of the peer nodes via the '/nodes/discover' route.
+
+    :var added list: The added peer nodes.
+    :var response dict: The added peer nodes and all the peer nodes.
+    :returns json: A 200 JSON response with the added and all the peer nodes.
     """
 
-    nodes = blockchain.get_peer_nodes()
+    added = blockchain.discover_peers(own_addresses())
     response = {
-        'all_nodes': nodes
+        'message': 'Discovered {} nodes'.format(len(added)),
+        'added_nodes': added,
+        'all_nodes': blockchain.get_peer_nodes()
     }
     return jsonify(response), 200
 
@@ -336,7 +732,7 @@ def broadcast_transaction():
     :var respone dict: Contains a message of failure if no data are found or are missing in the values var or the transaction is not correctly created , contains a success message if the transaction is broadcasted successfully plus the sender, recipient, amount and signature.
     :var required list: List of the relevant infos ie the sender, the recipient, the amount and the signature.
     :var success bool: True if the transaction has been added successfully, false if not.
-    :returns json: A 400 status code if the data are not found or some data is missing, a 500 status code if the transaction failed to be created, a 201 status code if the transaction is successfully added.
+    :returns json: A 400 status code if the data are not found or some data is missing or the transaction is expired (or has no time of creation), a 409 status code if the transaction is already in a block, a 500 status code if the transaction failed to be created, a 201 status code if the transaction is successfully added.
     """
 
     values = request.get_json()
@@ -353,8 +749,10 @@ def broadcast_transaction():
             'message': 'Some data is missing'
         }
         return jsonify(response), 400
-    success = blockchain.add_transaction(
-        values['recipient'], values['sender'], values['signature'], values['amount'], is_receiving=True)
+    # The transactions broadcast before the schemes existed have no scheme, they are RSA transactions
+    scheme = values.get('scheme', DEFAULT_SCHEME)
+    (success, stage) = blockchain.submit_transaction(
+        values['recipient'], values['sender'], values['signature'], values['amount'], is_receiving=True, scheme=scheme, peer=request.remote_addr, timestamp=values.get('timestamp'))
     if success:
         response = {
             'message': 'Successfully added transaction.',
@@ -362,15 +760,14 @@ def broadcast_transaction():
                 'sender': values['sender'],
                 'recipient': values['recipient'],
                 'amount': values['amount'],
-                'signature': values['signature']
+                'signature': values['signature'],
+                'scheme': scheme,
+                'timestamp': values.get('timestamp')
             }
         }
         return jsonify(response), 201
     else:
-        response = {
-            'message': 'Creating a transaction failed.',
-        }
-        return jsonify(response), 500
+        return rejected_transaction_response(stage)
 
 
 @webApp.route('/broadcast-block', methods=['POST'])
@@ -380,7 +777,9 @@ def broadcast_block():
 
     :var values json: Retreiving the block inside the JSON request.
     :var block Block: The block to be broadcasted.
-    :returns json: A 400 failure message if there is no block or if some data are missing, a 409 conflict message if the block seems invalid or the blockchain seems to be shorter. A 201 success message if the block is correctly added or a 200 message to signify that the error comes from the local node.
+    The block may extend the blockchain, a side branch (which replaces the end of the blockchain once it has more work) or be kept until its parent arrives.
+
+    :returns json: A 400 failure message if there is no block or if some data are missing, a 409 conflict message if the block seems invalid or is too old to replace the end of the blockchain. A 201 success message if the block is correctly added or a 200 message if the block is already known.
     """
 
     values = request.get_json()
@@ -397,29 +796,101 @@ def broadcast_block():
         return jsonify(response), 400
     # Getting the block and checking its index with the index of the last block of the blockchain
     block = values['block']
-    if block['index'] == blockchain.chain[-1].index + 1:
-        if blockchain.add_block(block):
-            response = {
-                'message': 'Block added'
-            }
-            return jsonify(response), 201
-        else:
-            response = {
-                'Message': 'Block seems invalid.'
-            }
-            return jsonify(response), 409
-    #
-    elif block['index'] > blockchain.chain[-1].index:
+    # A copy of a block already added, relayed by another peer node
+    if blockchain.is_known_block(block):
+        metrics.inc('gossip_duplicates_total', labels={'kind': 'block'})
         response = {
-            'message': 'BlockChain seems to differ from local blockchain'
+            'message': 'Block already known'
         }
-        blockchain.resolve_conflicts = True
         return jsonify(response), 200
-    else:
+    try:
+        added = blockchain.add_block(block)
+    except (KeyError, TypeError, AttributeError):
         response = {
-            'message': 'BlockChain seems to be shorter, block not added'
+            'message': 'Some data is missing'
         }
-        return jsonify(response), 409
+        return jsonify(response), 400
+    if added:
+        response = {
+            'message': 'Block added'
+        }
+        return jsonify(response), 201
+    response = {
+        'message': 'Block seems invalid or too old.'
+    }
+    return jsonify(response), 409
+
+
+@webApp.route('/broadcast-compact-block', methods=['POST'])
+def broadcast_compact_block():
+    """
+    This POST function manages compact blocks (the header of a block and the short IDs of its transactions) broadcasted through the network, the block is rebuilt with the open transactions.
+
+    :var values json: Retreiving the compact block inside the JSON request.
+    :var result str: The result of the rebuild of the block.
+    :var missing list: The positions of the transactions which are not in the open transactions.
+    :returns json: A 400 failure message if there is no block or if some data are missing, a 202 message with the positions of the missing transactions to send them in full, a 409 conflict message if the block seems invalid or is too old to replace the end of the blockchain. A 201 success message if the block is correctly added or a 200 message if the block is already known.
+    """
+
+    values = request.get_json()
+    # Verifications of the validity of the block
+    if not values:
+        response = {
+            'message': 'No data found'
+        }
+        return jsonify(response), 400
+    if 'block' not in values:
+        response = {
+            'message': 'Some data is missing'
+        }
+        return jsonify(response), 400
+    try:
+        (result, missing) = blockchain.add_compact_block(values['block'])
+    except (KeyError, TypeError, AttributeError):
+        response = {
+            'message': 'Some data is missing'
+        }
+        return jsonify(response), 400
+    if result == 'known':
+        metrics.inc('gossip_duplicates_total', labels={'kind': 'block'})
+        response = {
+            'message': 'Block already known'
+        }
+        return jsonify(response), 200
+    if result == 'added':
+        response = {
+            'message': 'Block added'
+        }
+        return jsonify(response), 201
+    if result == 'missing':
+        response = {
+            'message': 'Transactions missing',
+            'missing': missing
+        }
+        return jsonify(response), 202
+    response = {
+        'message': 'Block seems invalid or too old.'
+    }
+    return jsonify(response), 409
+
+
+@webApp.route('/block/<block_hash>', methods=['GET'])
+def get_block(block_hash):
+    """
+    This GET function gets a block of the blockchain or of a side branch by its hash via the '/block/<block_hash>' route, used by the peer nodes to get the parent of an orphan block.
+
+    :param block_hash str: The hash of the block.
+    :var block dict: The block and its transactions.
+    :returns json: A 200 JSON success response with the block, a 404 failure message if the block is unknown or pruned.
+    """
+
+    block = blockchain.get_block(block_hash)
+    if block == None:
+        response = {
+            'message': 'Block not found'
+        }
+        return jsonify(response), 404
+    return jsonify({'block': block}), 200
 
 
 @webApp.route('/resolve-conflicts', methods=['POST'])
@@ -438,12 +909,721 @@ def resolve_conflicts():
             'message': 'Chain was replaced'
         }
     else:
-        respones = {
+        response = {
             'message': 'Local chain kept'
         }
     return jsonify(response), 200
 
 
+@webApp.route('/address/<key>/history', methods=['GET'])
+def get_address_history(key):
+    """
+    This GET function gets a page of the history of an address via the '/address/<key>/history?cursor=&limit=' route.
+
+    :param key str: The public key of the address.
+    :var cursor int: Position of the first entry of the page, 0 by default.
+    :var limit int: Maximum number of entries of the page, 50 by default.
+    :var history dict: The page of the history of the address with its running balance.
+    :returns json: A 400 failure message if the cursor or the limit are not integers, a 200 success message with the page of the history.
+    """
+
+    try:
+        cursor = int(request.args.get('cursor', 0))
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        response = {
+            'message': 'Cursor and limit must be integers.'
+        }
+        return jsonify(response), 400
+    history = blockchain.get_address_history(key, cursor, limit)
+    return jsonify(history), 200
+
+
+@webApp.route('/transaction/<txid>', methods=['GET'])
+def get_transaction(txid):
+    """
+    This GET function gets a confirmed or open transaction by its ID via the '/transaction/<txid>' route.
+
+    :param txid str: The ID of the transaction.
+    :var transaction dict: The transaction with its height and its position in its block.
+    :returns json: A 200 JSON success response with the transaction, a 404 failure message if the transaction is unknown, pruned or a mining reward.
+    """
+
+    transaction = blockchain.get_transaction(txid)
+    if transaction == None:
+        response = {
+            'message': 'Transaction not found'
+        }
+        return jsonify(response), 404
+    return jsonify({'transaction': transaction}), 200
+
+
+@webApp.route('/filter', methods=['POST'])
+def load_filter():
+    """
+    This POST function loads the Bloom filter of the addresses of a lightweight client via the '/filter' route (see utility.bloom for the positions of the bits).
+
+    :var values dict: The bits of the filter in hexadecimal, its number of hash functions and its tweak.
+    :var bloom BloomFilter: The filter.
+    :var filter_id str: The ID of the filter, used by the filtered routes and events.
+    :returns json: A JSON response of 400 if the filter is missing or invalid, 201 with the ID of the filter.
+    """
+
+    values = request.get_json(silent=True)
+    try:
+        bloom = BloomFilter.from_dict(values)
+    except (ValueError, TypeError, KeyError, AttributeError):
+        response = {
+            'message': 'Invalid filter.'
+        }
+        return jsonify(response), 400
+    filter_id = filters.add(bloom)
+    metrics.set('bloom_filters', len(filters))
+    response = {
+        'message': 'Filter loaded.',
+        'filter_id': filter_id
+    }
+    return jsonify(response), 201
+
+
+@webApp.route('/filter/<filter_id>', methods=['DELETE'])
+def remove_filter(filter_id):
+    """
+    This DELETE function removes a Bloom filter via the '/filter/<filter_id>' route.
+
+    :param filter_id str: The ID of the filter.
+    :returns json: A JSON response of 404 if the filter is unknown, 200 if it is removed.
+    """
+
+    if not filters.remove(filter_id):
+        response = {
+            'message': 'Unknown filter.'
+        }
+        return jsonify(response), 404
+    metrics.set('bloom_filters', len(filters))
+    response = {
+        'message': 'Filter removed.'
+    }
+    return jsonify(response), 200
+
+
+@webApp.route('/filter/<filter_id>/blocks', methods=['GET'])
+def get_filtered_blocks(filter_id):
+    """
+    This GET function gets the blocks having transactions matching a Bloom filter via the '/filter/<filter_id>/blocks?start=&limit=' route, each with its header and only its matching transactions.
+
+    :param filter_id str: The ID of the filter.
+    :var bloom BloomFilter: The filter.
+    :var start int: The index of the first block to search, the first full block by default.
+    :var limit int: Maximum number of matching blocks of the page.
+    :returns json: A JSON response of 404 if the filter is unknown, 400 if start or limit are not integers, 200 with the page of matching blocks and the start of the next page.
+    """
+
+    bloom = filters.get(filter_id)
+    if bloom == None:
+        response = {
+            'message': 'Unknown filter.'
+        }
+        return jsonify(response), 404
+    try:
+        start = request.args.get('start')
+        start = int(start) if start != None else None
+        limit = int(request.args.get('limit', FILTERED_BLOCKS_LIMIT))
+    except ValueError:
+        response = {
+            'message': 'Start and limit must be integers.'
+        }
+        return jsonify(response), 400
+    return jsonify(blockchain.get_filtered_blocks(bloom, start, limit)), 200
+
+
+@webApp.route('/filter/<filter_id>/transactions', methods=['GET'])
+def get_filtered_transactions(filter_id):
+    """
+    This GET function gets the open transactions matching a Bloom filter via the '/filter/<filter_id>/transactions' route.
+
+    :param filter_id str: The ID of the filter.
+    :var bloom BloomFilter: The filter.
+    :var dict_transactions list: The matching open transactions as dictionnaries, with their ID.
+    :returns json: A JSON response of 404 if the filter is unknown, 200 with the matching transactions.
+    """
+
+    bloom = filters.get(filter_id)
+    if bloom == None:
+        response = {
+            'message': 'Unknown filter.'
+        }
+        return jsonify(response), 404
+    dict_transactions = [dict(tx.__dict__, txid=hash_transaction(tx)) for tx in blockchain.get_open_transactions()
+                         if bloom.matches_any((tx.sender, tx.recipient))]
+    return jsonify(dict_transactions), 200
+
+
+@webApp.route('/snapshot', methods=['GET'])
+def get_snapshot():
+    """
+    This GET function gets the snapshot of the balances after the last block via the '/snapshot' route, used by the nodes bootstrapping from a snapshot.
+
+    :var snapshot dict: The height, the block hash, the balances and the hash of the state.
+    :returns json: A 200 JSON success response with the snapshot.
+    """
+
+    snapshot = blockchain.get_snapshot()
+    return jsonify(snapshot), 200
+
+
+@webApp.route('/headers', methods=['GET'])
+def get_headers():
+    """
+    This GET function gets the headers of a range of blocks via the '/headers?start=&end=' route.
+
+    :var start int: The index of the first header, 0 by default.
+    :var end int: The index of the last header (included), the last block by default.
+    :var headers list: The headers of the blocks.
+    :returns json: A 400 failure message if start or end are not integers, a 200 success message with the headers.
+    """
+
+    try:
+        start = int(request.args.get('start', 0))
+        end = request.args.get('end')
+        end = int(end) if end != None else None
+    except ValueError:
+        response = {
+            'message': 'Start and end must be integers.'
+        }
+        return jsonify(response), 400
+    headers = blockchain.get_headers(start, end)
+    return jsonify(headers), 200
+
+
+@webApp.route('/analytics', methods=['GET'])
+def get_analytics():
+    """
+    This GET function gets the aggregates of the confirmed transactions (top holders, top senders, volume of each block) via the '/analytics?top=&start=' route, computed on the columnar ledger of the node.
+
+    :var top int: The number of top holders and top senders, 10 by default.
+    :var start int: The index of the first block of the volumes, the first full block by default.
+    :returns json: A 400 failure message if top or start are not integers, a 501 failure message if NumPy is not installed, a 200 success message with the aggregates, a 304 response if the client already has them.
+    """
+
+    try:
+        top = int(request.args.get('top', 10))
+        start = request.args.get('start')
+        start = int(start) if start != None else None
+    except ValueError:
+        response = {
+            'message': 'Top and start must be integers.'
+        }
+        return jsonify(response), 400
+    if not NUMPY_AVAILABLE:
+        response = {
+            'message': 'The analytics need NumPy: pip3 install numpy.'
+        }
+        return jsonify(response), 501
+    return cached_json_response('analytics:{}:{}'.format(top, start), blockchain.get_version()[:2],
+                                lambda: blockchain.get_ledger_analytics(top, start))
+
+
+@webApp.route('/analytics/columns.npz', methods=['GET'])
+def get_analytics_columns():
+    """
+    This GET function gets the columns of the confirmed transactions in the NumPy .npz format via the '/analytics/columns.npz' route, to load them with numpy.load.
+
+    :var version tuple: The version of the chain the columns are saved for.
+    :var entry tuple: The saved columns and their ETag, from the response cache.
+    :var buffer BytesIO: The saved columns.
+    :returns: A 501 failure message if NumPy is not installed, a 200 response with the .npz file, a 304 response if the client already has it.
+    """
+
+    if not NUMPY_AVAILABLE:
+        response = {
+            'message': 'The analytics need NumPy: pip3 install numpy.'
+        }
+        return jsonify(response), 501
+    version = blockchain.get_version()[:2]
+    entry = response_cache.get('analytics-columns', version)
+    if entry == None:
+        buffer = BytesIO()
+        blockchain.save_ledger_columns(buffer)
+        entry = response_cache.put(
+            'analytics-columns', version, buffer.getvalue())
+    (body, etag) = entry
+    response = Response(body, status=200, mimetype='application/octet-stream', headers={
+                        'Content-Disposition': 'attachment; filename=columns-{}.npz'.format(port)})
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+@webApp.route('/admin/profile', methods=['POST'])
+@admin_route
+def start_profile():
+    """
+    This POST function starts a profiling session via the '/admin/profile' route, for a duration or for the next requests (to a route), with cProfile or by sampling the stacks.
+
+    :var values dict: The settings of the session: 'mode' ('cprofile' or 'sample', 'sample' by default), 'seconds', 'requests', 'route' (like '/mine'), 'interval' (seconds between two samples) and 'all_threads' (true to sample every thread).
+    :var status dict: The status of the new session.
+    :returns json: A 400 failure message if the settings are invalid, a 409 failure message if a session is already running, a 201 success message with the status of the session.
+    """
+
+    values = request.get_json(silent=True) or {}
+    if profiler.active:
+        response = {
+            'message': 'A profiling session is already running.',
+            'profile': profiler.get_status()
+        }
+        return jsonify(response), 409
+    try:
+        seconds = values.get('seconds')
+        requests_count = values.get('requests')
+        status = profiler.start(values.get('mode', 'sample'),
+                                float(seconds) if seconds != None else None,
+                                int(requests_count) if requests_count != None else None,
+                                values.get('route'), float(values.get('interval', DEFAULT_SAMPLE_INTERVAL)), bool(values.get('all_threads', False)))
+    except (ValueError, TypeError) as error:
+        response = {
+            'message': 'Invalid profiling settings: {}.'.format(error)
+        }
+        return jsonify(response), 400
+    response = {
+        'message': 'Profiling started.',
+        'profile': status
+    }
+    return jsonify(response), 201
+
+
+@webApp.route('/admin/profile', methods=['GET'])
+@admin_route
+def get_profile():
+    """
+    This GET function gets the results of the last profiling session via the '/admin/profile?format=&limit=' route.
+
+    :var output_format str: 'pstats' (text, by default in cProfile mode) or 'raw' (pstats.Stats file) for cProfile, 'collapsed' (by default in sampling mode) for the sampling, the input of flamegraph.pl or speedscope.
+    :var limit int: The number of functions of the 'pstats' format, 50 by default.
+    :var status dict: The status of the session.
+    :var result str or bytes: The results of the session.
+    :returns: A 404 failure message if there has been no session, a 202 message with the status of the session while it runs, a 400 failure message if the format doesn't match the mode of the session, a 200 response with the results.
+    """
+
+    status = profiler.get_status()
+    if status == None:
+        response = {
+            'message': 'No profiling session.'
+        }
+        return jsonify(response), 404
+    if status['running']:
+        response = {
+            'message': 'Profiling is running.',
+            'profile': status
+        }
+        return jsonify(response), 202
+    output_format = request.args.get(
+        'format', 'pstats' if status['mode'] == 'cprofile' else 'collapsed')
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        limit = 50
+    result = profiler.get_result(output_format, limit)
+    if result == None:
+        response = {
+            'message': 'The {} format is not available in {} mode.'.format(output_format, status['mode'])
+        }
+        return jsonify(response), 400
+    if output_format == 'raw':
+        return Response(result, status=200, mimetype='application/octet-stream', headers={
+                        'Content-Disposition': 'attachment; filename=profile-{}.pstats'.format(port)})
+    return Response(result, status=200, mimetype='text/plain')
+
+
+@webApp.route('/admin/profile', methods=['DELETE'])
+@admin_route
+def stop_profile():
+    """
+    This DELETE function stops the running profiling session via the '/admin/profile' route, its results are kept.
+
+    :var status dict: The status of the session.
+    :returns json: A 404 failure message if there has been no session, a 200 success message with the status of the session.
+    """
+
+    status = profiler.stop()
+    if status == None:
+        response = {
+            'message': 'No profiling session.'
+        }
+        return jsonify(response), 404
+    response = {
+        'message': 'Profiling stopped.',
+        'profile': status
+    }
+    return jsonify(response), 200
+
+
+@webApp.route('/admin/tracemalloc', methods=['POST'])
+@admin_route
+def start_tracemalloc():
+    """
+    This POST function starts to trace the allocations via the '/admin/tracemalloc' route, tracemalloc slows the node down while it runs.
+
+    :var values dict: 'frames', the number of frames of each allocation traceback.
+    :var started bool: False if the tracing was already running.
+    :returns json: A 400 failure message if the number of frames is invalid, a 409 failure message if the tracing is already running, a 201 success message.
+    """
+
+    values = request.get_json(silent=True) or {}
+    try:
+        started = profiler.start_tracing(
+            int(values.get('frames', DEFAULT_TRACE_FRAMES)))
+    except (ValueError, TypeError):
+        response = {
+            'message': 'The number of frames must be a positive integer.'
+        }
+        return jsonify(response), 400
+    if not started:
+        response = {
+            'message': 'Tracing is already running.'
+        }
+        return jsonify(response), 409
+    response = {
+        'message': 'Tracing started.'
+    }
+    return jsonify(response), 201
+
+
+@webApp.route('/admin/tracemalloc', methods=['GET'])
+@admin_route
+def get_tracemalloc():
+    """
+    This GET function gets a snapshot of the memory allocated since the tracing started, and still alive, via the '/admin/tracemalloc?format=&limit=' route.
+
+    :var output_format str: 'top' (by default) for the lines allocating the most memory, 'collapsed' for the allocation tracebacks weighted by their bytes, the input of the flamegraph tools.
+    :var limit int: The number of lines of the 'top' format, 50 by default.
+    :var result str: The snapshot.
+    :returns: A 400 failure message if the format is unknown, a 409 failure message if the tracing is not running, a 200 response with the snapshot.
+    """
+
+    output_format = request.args.get('format', 'top')
+    if output_format not in ('top', 'collapsed'):
+        response = {
+            'message': 'The format must be top or collapsed.'
+        }
+        return jsonify(response), 400
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        limit = 50
+    result = profiler.get_allocations(output_format, limit)
+    if result == None:
+        response = {
+            'message': 'Tracing is not running.'
+        }
+        return jsonify(response), 409
+    return Response(result, status=200, mimetype='text/plain')
+
+
+@webApp.route('/admin/tracemalloc', methods=['DELETE'])
+@admin_route
+def stop_tracemalloc():
+    """
+    This DELETE function stops tracing the allocations via the '/admin/tracemalloc' route.
+
+    :returns json: A 409 failure message if the tracing is not running, a 200 success message.
+    """
+
+    if not profiler.stop_tracing():
+        response = {
+            'message': 'Tracing is not running.'
+        }
+        return jsonify(response), 409
+    response = {
+        'message': 'Tracing stopped.'
+    }
+    return jsonify(response), 200
+
+
+@webApp.route('/chain/info', methods=['GET'])
+def get_chain_info():
+    """
+    This GET function gets the range of full blocks the node can serve via the '/chain/info' route.
+
+    :var chain_info dict: The mode (archival or pruned), the index of the first and last full blocks and the prune depth.
+    :returns json: A 200 JSON success response with the chain_info var.
+    """
+
+    chain_info = blockchain.get_chain_info()
+    return jsonify(chain_info), 200
+
+
+@webApp.route('/replication', methods=['GET'])
+def get_replication():
+    """
+    This GET function gets the role of the node via the '/replication' route, and the state of the replication if the node is a read replica (--follow).
+
+    :var response dict: The role ('primary' or 'replica') and the index of the last block, with the URL of the primary, its last known height, the lag in blocks and in seconds and the failed synchronisations for a replica.
+    :returns json: A 200 JSON success response with the response var.
+    """
+
+    if follower == None:
+        response = {
+            'role': 'primary',
+            'height': blockchain.get_chain_info()['height']
+        }
+        return jsonify(response), 200
+    response = follower.get_status()
+    return jsonify(response), 200
+
+
+@webApp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    This GET function gets the metrics of the node in the Prometheus text format via the '/metrics' route.
+
+    :var chain_info dict: The range of full blocks of the node, for the height of the chain.
+    :returns str: A 200 text response with all the metrics.
+    """
+
+    chain_info = blockchain.get_chain_info()
+    metrics.set('chain_height', chain_info['height'])
+    metrics.set('mempool_size', len(blockchain.get_open_transactions()))
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
+def subscribe_events(filter_id=None, last_event_id=None, notify=None):
+    """
+    This function subscribes a client to the events of the blockchain, used by the '/events' route and by the asynchronous server.
+
+    :param filter_id str: The ID of the Bloom filter of the client. Default=None for all the events.
+    :param last_event_id str: The Last-Event-ID header of a reconnecting client. Default=None for a new client.
+    :param notify function: Called without arguments when an event is added to the queue of the client, like to wake up a coroutine. Default=None.
+    :var bloom BloomFilter: The filter of the client, None for all the events.
+    :returns tuple: The queue of the events of the client and its filter, None if the filter is unknown.
+    """
+
+    try:
+        last_event_id = int(last_event_id)
+    except (TypeError, ValueError):
+        last_event_id = None
+    bloom = None
+    if filter_id != None:
+        bloom = filters.get(filter_id)
+        if bloom == None:
+            return None
+    return (events.subscribe(last_event_id, notify), bloom)
+
+
+def filter_event(event, bloom, sent_txids):
+    """
+    This function keeps the part of an event matching the filter of a client.
+
+    :param event dict: The event.
+    :param bloom BloomFilter: The filter of the client.
+    :param sent_txids set: The IDs of the open transactions sent to the client and not removed yet.
+    :var block dict: The block of a 'block' event, None if it is not held anymore.
+    :var transactions list: The matching transactions of the block.
+    :var txids list: The removed transactions sent to the client.
+    :returns dict: The filtered data of the event, None if nothing matches.
+    """
+
+    data = event['data']
+    if event['type'] == 'mempool_add':
+        transaction = data['transaction']
+        if not bloom.matches_any((transaction['sender'], transaction['recipient'])):
+            return None
+        sent_txids.add(data['txid'])
+        return data
+    if event['type'] == 'mempool_remove':
+        txids = [txid for txid in data['txids'] if txid in sent_txids]
+        sent_txids.difference_update(txids)
+        return {'txids': txids} if len(txids) > 0 else None
+    if event['type'] == 'block':
+        block = blockchain.get_block(data['header']['hash'])
+        transactions = [dict(tx, txid=txid) for (tx, txid) in zip(block['transactions'], data['txids'])
+                        if bloom.matches_any((tx['sender'], tx['recipient']))] if block != None else []
+        return {'header': data['header'], 'txids': [tx['txid'] for tx in transactions], 'transactions': transactions}
+    return data
+
+
+def format_event(event, bloom, sent_txids):
+    """
+    This function gives the text of an event in the server-sent events format.
+
+    :param event dict: The event.
+    :param bloom BloomFilter: The filter of the client, None for all the events.
+    :param sent_txids set: The IDs of the open transactions sent to a filtered client.
+    :var data dict: The data of the event sent to the client.
+    :returns str: The text of the event, None if nothing matches the filter.
+    """
+
+    data = filter_event(
+        event, bloom, sent_txids) if bloom != None else event['data']
+    if data == None:
+        return None
+    return 'id: {}\nevent: {}\ndata: {}\n\n'.format(event['id'], event['type'], json.dumps(data))
+
+
+@webApp.route('/events', methods=['GET'])
+def get_events():
+    """
+    This GET function streams the events of the blockchain as server-sent events via the '/events?filter=' route: new block headers with the IDs of their transactions ('block'), open transactions added ('mempool_add') or removed ('mempool_remove'), chain replacements ('chain_replaced') and 'resync' when the client missed events and must reload everything.
+
+    With the ID of a Bloom filter, the stream only has the open transactions matching the filter, the removals of the transactions sent to the client, and the blocks with only their matching transactions ('transactions') and IDs.
+
+    :var subscription tuple: The queue of the events of this client and its Bloom filter (None for all the events), None if the filter is unknown.
+    :returns Response: A 404 response if the filter is unknown, a 200 streaming response of the events.
+    """
+
+    subscription = subscribe_events(request.args.get(
+        'filter'), request.headers.get('Last-Event-ID'))
+    if subscription == None:
+        response = {
+            'message': 'Unknown filter.'
+        }
+        return jsonify(response), 404
+    (subscriber, bloom) = subscription
+
+    def stream():
+        """
+        This generator function yields the events of the subscriber in the server-sent events format until the client disconnects.
+
+        :var event dict: The next event of the subscriber.
+        :var sent_txids set: The IDs of the open transactions sent to a filtered client.
+        :var text str: The text of the event, None if it doesn't match the filter.
+        :returns str: The text of each event, or a comment to keep the connection open.
+        """
+
+        sent_txids = set()
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event = subscriber.get(timeout=EVENTS_KEEP_ALIVE)
+                except Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                text = format_event(event, bloom, sent_txids)
+                if text != None:
+                    yield text
+        finally:
+            events.unsubscribe(subscriber)
+
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def own_addresses():
+    """
+    This function gives the URLs of this node, which the discovery must not add as a peer node.
+
+    :returns tuple: The URLs (host:port) of this node.
+    """
+
+    return ('127.0.0.1:{}'.format(port), 'localhost:{}'.format(port))
+
+
+def create_parser():
+    """
+    This function creates the parser of the options of the node, shared by `node.py` and `asgi_node.py`.
+
+    :var parser ArgumentParser: The parser of the options.
+    :returns ArgumentParser: The parser of the options.
+    """
+
+    parser = ArgumentParser()
+    parser.add_argument('-p', '--port', type=int, default=5000)
+    # Bootstraps the node from the balances snapshot of a peer (host:port) instead of keeping its whole chain
+    parser.add_argument('--snapshot-from', type=str, default=None,
+                        help='bootstrap from the balances snapshot of a peer (host:port). The snapshot is checked against the headers of the peer and its balances are trusted, only the blocks of the replay window before it and the blocks after it are downloaded')
+    # Keeps only the last N full blocks (plus all headers), without it the node is archival and keeps every block
+    parser.add_argument('--prune', type=int, default=None)
+    # Signature scheme of the keys created by the node, the loaded keys keep their own scheme
+    parser.add_argument('--scheme', type=str,
+                        default=DEFAULT_SCHEME, choices=list(SIGNATURE_SCHEMES.keys()))
+    # Storage engine of the node data, 'sqlite' writes only the changes in 'blockchain-<port>.db'
+    parser.add_argument('--storage', type=str, default='file',
+                        choices=list(STORAGE_BACKENDS.keys()))
+    # Token of the admin routes (profiling), read from NODE_ADMIN_TOKEN if not given so it doesn't show in the process list, the routes are disabled without it
+    parser.add_argument('--admin-token', type=str,
+                        default=os.environ.get('NODE_ADMIN_TOKEN'))
+    # Transactions per second admitted from each sender, 0 for no limit
+    parser.add_argument('--sender-rate', type=float,
+                        default=DEFAULT_SENDER_RATE)
+    # Transactions per second received from each peer node or client address, 0 for no limit
+    parser.add_argument('--peer-rate', type=float, default=DEFAULT_PEER_RATE)
+    # Checks the links and the proofs of work of the loaded chain before serving, the node stops at an invalid block
+    parser.add_argument('--verify-on-start', action='store_true')
+    # Worker processes checking the chain on start and the chains received from the peers, the number of CPUs by default
+    parser.add_argument('--verify-workers', type=int, default=None)
+    # Captures the received requests in this gzip file, replayed by `python -m benchmarks.replay`
+    parser.add_argument('--capture', type=str, default=None)
+    # Answers the requests to the peer nodes locally instead of sending them, used by the replays so they run without a network
+    parser.add_argument('--offline', action='store_true')
+    # Runs the node as a read replica of a primary node (host:port): it copies its blocks and open transactions, serves the reads and redirects the writes to it
+    parser.add_argument('--follow', type=str, default=None)
+    # Seconds between two synchronisations of a read replica with its primary
+    parser.add_argument('--follow-interval', type=float,
+                        default=FOLLOW_INTERVAL)
+    return parser
+
+
+def setup_node(parser):
+    """
+    This function parses the options of the node and creates its wallet and its blockchain, used by the routes through the global variables.
+
+    :param parser ArgumentParser: The parser of the options.
+    :var args Namespace: The parsed options.
+    :var report dict: The result of the validation of the loaded chain, with --verify-on-start.
+    :var follower Follower: The replication of the primary node, with --follow.
+    :returns Namespace: The parsed options.
+    """
+
+    global port, prune_depth, storage, admin_token, admission, capture, wallet, wallets, blockchain, follower
+    args = parser.parse_args()
+    if args.prune != None and args.prune < 1:
+        parser.error('--prune must keep at least 1 block')
+    if args.sender_rate < 0 or args.peer_rate < 0:
+        parser.error('--sender-rate and --peer-rate must not be negative')
+    if args.verify_workers != None and args.verify_workers < 1:
+        parser.error('--verify-workers must be at least 1')
+    if args.follow_interval <= 0:
+        parser.error('--follow-interval must be positive')
+    port = args.port
+    prune_depth = args.prune
+    storage = args.storage
+    admin_token = args.admin_token or None
+    admission = AdmissionPipeline(args.sender_rate, args.peer_rate)
+    if args.offline:
+        PeerManager.transport = offline_transport
+    wallet = Wallet(port, args.scheme)  # Initialize a wallet in the object wallet
+    wallets = WalletManager(port)
+    blockchain = BlockChain(wallet.public_key, port,
+                            prune_depth, storage, admission)
+    BlockChain.validation_workers = args.verify_workers
+    if args.verify_on_start:
+        report = blockchain.verify_chain(args.verify_workers)
+        if not report['valid']:
+            parser.exit(1, 'Invalid block {} in the loaded chain, the node is not started\n'.format(
+                report['first_invalid_height']))
+        print('Verified {} blocks in {:.2f}s'.format(
+            report['blocks'], report['seconds']))
+    if args.snapshot_from != None:
+        if blockchain.bootstrap_from_snapshot(args.snapshot_from):
+            print('Bootstrapped from the snapshot of {}'.format(
+                args.snapshot_from))
+        else:
+            print('Bootstrapping from snapshot failed, keeping local chain')
+    if args.follow != None:
+        # A read replica only talks to its primary, it never relays anything to other peers
+        for node in blockchain.get_peer_nodes():
+            blockchain.remove_peer_node(node)
+        follower = Follower(blockchain, args.follow, args.follow_interval)
+        follower.start()
+    else:
+        blockchain.discover_peers(own_addresses())
+    if args.capture != None:
+        capture = TrafficCapture(args.capture)
+        atexit.register(capture.close)
+        # A terminated node exits normally, so the capture is closed
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    return args
+
+
 if __name__ == '__main__':
     """
     Main program of the project.
@@ -451,12 +1631,8 @@ if __name__ == '__main__':
     How to use it (configuration of the flask server):
     In the url bar of a browser, write: `127.0.0.1` or `localhost`
     Then, in the terminal, write: `FLASK_APP=node.py flask run` or `python node.py -p <adress_of_node>` or `python node.py`
+    The same routes can be served by an asynchronous server with `python asgi_node.py -p <adress_of_node>`.
     """
 
-    parser = ArgumentParser()
-    parser.add_argument('-p', '--port', type=int, default=5000)
-    args = parser.parse_args()
-    port = args.port
-    wallet = Wallet(port)  # Initialize a wallet in the object wallet
-    blockchain = BlockChain(wallet.public_key, port)
+    setup_node(create_parser())
     webApp.run(host='127.0.0.1', port=port)
@@ -0,0 +1,196 @@
+"""
+This module implements the fixtures of the tests, run from the root of the repository with 'python -m pytest': every test runs its nodes in its own temporary directory, with wallets generated once for all the tests, and the peer nodes are reached through an in-memory transport instead of HTTP.
+
+:class Network: Class of the in-memory network of the nodes of a test.
+:class Clock: Class of the clock of the nodes of a test.
+:function: wallets()
+:function: node_directory(tmp_path, monkeypatch)
+:function: network(monkeypatch)
+:function: clock(monkeypatch)
+:function: pay(wallets)
+"""
+
+import json
+
+from time import time
+
+import pytest
+
+import blockchain
+
+from benchmarks.gossip_sim import SimulatedResponse
+from benchmarks.harness import generate_wallets
+from utility.peers import PeerManager
+
+
+class Network:
+    """
+    Network class is used to answer the requests of the nodes of a test to their peers from the nodes themselves, like the routes of node.py, and to record them.
+
+    :method: __init__(self)
+    :method: to_dict(block)
+    :method: transport(self, node, method, path, **kwargs)
+    """
+
+    def __init__(self):
+        """
+        Initialize the network without node.
+
+        :var nodes dict: The blockchain of each URL.
+        :var requests list: The path and the query parameters of each request.
+        :var tamper function: Called with the path and the JSON answer of each request and returns the answer sent, like a dishonest peer. None to send the answers unchanged.
+        :returns Network: Yields a network's instance.
+        """
+
+        self.nodes = {}
+        self.requests = []
+        self.tamper = None
+
+    @staticmethod
+    def to_dict(block):
+        """
+        This staticmethod function transforms a block into the dictionnary sent to the peer nodes.
+
+        :param block Block: The block.
+        :returns dict: The block and its transactions as dictionnaries.
+        """
+
+        converted_block = block.__dict__.copy()
+        converted_block['transactions'] = [
+            tx.__dict__ for tx in converted_block['transactions']]
+        return converted_block
+
+    def transport(self, node, method, path, **kwargs):
+        """
+        Answers a request to a node of the network, used as PeerManager.transport.
+
+        :param node str: The URL of the node.
+        :param method str: The HTTP method.
+        :param path str: The path of the route.
+        :param kwargs dict: The other arguments of the request, like params.
+        :var params dict: The query parameters of the request.
+        :var payload: The JSON answer of the node.
+        :returns SimulatedResponse: The answer of the node, 404 for the other routes.
+        """
+
+        peer = self.nodes[node]
+        params = kwargs.get('params') or {}
+        self.requests.append((path, dict(params)))
+        height = peer.get_chain_info()['height']
+        if path == '/snapshot':
+            payload = peer.get_snapshot()
+        elif path == '/headers':
+            end = params.get('end')
+            payload = [dict(header) for header in peer.get_headers(
+                int(params.get('start', 0)), int(end) if end != None else None)]
+        elif path == '/chain':
+            start = int(params.get('start', 0))
+            payload = [Network.to_dict(block)
+                       for block in peer.chain if block.index >= start]
+        else:
+            return SimulatedResponse(404, {'message': 'Not found.'}, height)
+        # The answers are copied like JSON, so the tampering doesn't change the node
+        payload = json.loads(json.dumps(payload))
+        if self.tamper != None:
+            payload = self.tamper(path, payload)
+        return SimulatedResponse(200, payload, height)
+
+
+class Clock:
+    """
+    Clock class is used as the time of the nodes of a test, so a test can create old transactions and blocks.
+
+    :method: __init__(self)
+    :method: __call__(self)
+    """
+
+    def __init__(self):
+        """
+        Initialize the clock at the current time.
+
+        :var now float: The time given by the clock, changed by the test.
+        :returns Clock: Yields a clock's instance.
+        """
+
+        self.now = time()
+
+    def __call__(self):
+        """
+        Getter of the time of the clock, like time.time.
+
+        :returns float: The time of the clock.
+        """
+
+        return self.now
+
+
+@pytest.fixture(scope='session')
+def wallets():
+    """
+    This fixture generates the wallets of the tests once, generating RSA keys is slow.
+
+    :returns list: Three wallets.
+    """
+
+    return generate_wallets(3, 'test')
+
+
+@pytest.fixture(autouse=True)
+def node_directory(tmp_path, monkeypatch):
+    """
+    This fixture runs each test in its own directory, the nodes save their files in the current directory.
+
+    :param tmp_path Path: The temporary directory of the test.
+    :param monkeypatch MonkeyPatch: Restores the current directory after the test.
+    :returns Path: The directory.
+    """
+
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def network(monkeypatch):
+    """
+    This fixture sends the requests of the nodes to the in-memory network of the test.
+
+    :param monkeypatch MonkeyPatch: Restores the transport of the peers after the test.
+    :returns Network: The network, its nodes are added by the test.
+    """
+
+    network = Network()
+    monkeypatch.setattr(PeerManager, 'transport', network.transport)
+    return network
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    This fixture replaces the time of the nodes by a clock set by the test.
+
+    :param monkeypatch MonkeyPatch: Restores the time of the nodes after the test.
+    :returns Clock: The clock, at the current time.
+    """
+
+    clock = Clock()
+    monkeypatch.setattr(blockchain, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def pay(wallets):
+    """
+    This fixture gives a function signing a payment between two wallets and submitting it to a node as if it was received from a peer.
+
+    :param wallets list: The wallets of the tests.
+    :returns function: pay(node, sender, recipient, amount, timestamp=None) returns the result of submit_transaction, the time of creation is the time of the nodes by default.
+    """
+
+    def pay(node, sender, recipient, amount, timestamp=None):
+        if timestamp == None:
+            timestamp = blockchain.time()
+        signature = sender.sign_transaction(
+            sender.public_key, recipient.public_key, amount, timestamp)
+        return node.submit_transaction(recipient.public_key, sender.public_key, signature, amount, is_receiving=True, scheme=sender.scheme, timestamp=timestamp)
+
+    return pay
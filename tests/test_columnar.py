@@ -0,0 +1,63 @@
+"""
+This module tests that pruning the columnar ledger keeps its balances and forgets the addresses of the removed transactions.
+"""
+
+import pytest
+
+from block import Block
+from blockchain import BlockChain
+from transaction import Transaction
+from utility.columnar import ColumnarLedger, NUMPY_AVAILABLE
+
+# The columnar ledger needs the optional NumPy
+pytestmark = pytest.mark.skipif(
+    not NUMPY_AVAILABLE, reason='NumPy is not installed')
+
+
+def make_block(index, transfers):
+    """
+    This function creates a block of transfers, followed by a mining reward of 10 for 'miner'.
+
+    :param index int: The index of the block.
+    :param transfers list: The sender, the recipient and the amount of each transfer.
+    :returns Block: The block.
+    """
+
+    transactions = [Transaction(sender, recipient, '', amount)
+                    for (sender, recipient, amount) in transfers]
+    transactions.append(Transaction('MINING', 'miner', '', 10))
+    return Block(index, '', transactions, 0, float(index))
+
+
+def test_prune_forgets_the_addresses_of_the_removed_transactions():
+    ledger = ColumnarLedger()
+    blocks = [Block(0, '', [], 100, 0), make_block(1, [('miner', 'alice', 4)]), make_block(
+        2, [('alice', 'bob', 1)]), make_block(3, [('miner', 'carol', 2), ('carol', 'dave', 1)])]
+    ledger.rebuild(blocks)
+    assert ledger.get_stats()['addresses'] == 5
+    # Alice and Bob only appear in the pruned blocks, Bob has spent nothing and has no balance anymore in this example
+    ledger.prune(2, {'miner': 16, 'alice': 3})
+    assert ledger.get_stats()['addresses'] == 4
+    assert ledger.get_balances() == {
+        'miner': 24, 'alice': 3, 'carol': 1, 'dave': 1}
+    assert ledger.get_top_senders(2) == [('miner', 2.0), ('carol', 1.0)]
+    assert ledger.get_block_volumes() == {
+        'start': 3, 'volumes': [3.0], 'transactions': [2]}
+    ledger.add_block(make_block(4, [('dave', 'alice', 1)]))
+    assert ledger.get_balances() == {
+        'miner': 34, 'alice': 4, 'carol': 1, 'dave': 0}
+
+
+def test_pruned_node_analytics_match_its_balances(wallets, pay):
+    (miner, first_recipient, second_recipient) = wallets
+    blockchain = BlockChain(miner.public_key, 'a', prune_depth=1)
+    blockchain.mine_block()
+    for recipient in (first_recipient, second_recipient):
+        assert pay(blockchain, miner, recipient, 2) == (True, 'accepted')
+        blockchain.mine_block()
+    blockchain.mine_block()
+    analytics = blockchain.get_ledger_analytics()
+    balances = blockchain.get_snapshot()['balances']
+    assert analytics['addresses'] == len(balances)
+    assert {holder['address']: holder['balance']
+            for holder in analytics['top_holders']} == balances
@@ -0,0 +1,91 @@
+"""
+This module tests the admission of the transactions signed with their time of creation: the same payment can be made twice, the exact replays are rejected while they can still be mined, and the nodes only remember the transactions of the replay window.
+"""
+
+import sqlite3
+
+import pytest
+
+from blockchain import BlockChain, REPLAY_WINDOW
+from utility.admission import TRANSACTION_LIFETIME, MAX_CLOCK_DRIFT
+
+
+def test_same_payment_twice_is_accepted(wallets, pay, clock):
+    (miner, recipient) = wallets[:2]
+    blockchain = BlockChain(miner.public_key, 'a')
+    blockchain.mine_block()
+    assert pay(blockchain, miner, recipient, 2) == (True, 'accepted')
+    clock.now += 1
+    assert pay(blockchain, miner, recipient, 2) == (True, 'accepted')
+    blockchain.mine_block()
+    assert blockchain.get_balance(recipient.public_key) == 4
+
+
+def test_exact_replays_are_rejected(wallets, pay, clock):
+    (miner, recipient) = wallets[:2]
+    blockchain = BlockChain(miner.public_key, 'a')
+    blockchain.mine_block()
+    timestamp = clock.now
+    assert pay(blockchain, miner, recipient, 2, timestamp) == (True, 'accepted')
+    assert pay(blockchain, miner, recipient, 2, timestamp) == (True, 'duplicate')
+    blockchain.mine_block()
+    assert pay(blockchain, miner, recipient, 2, timestamp) == (False, 'confirmed')
+    assert pay(BlockChain(miner.public_key, 'a'), miner, recipient, 2,
+               timestamp) == (False, 'confirmed')
+    assert blockchain.get_balance(recipient.public_key) == 2
+
+
+def test_expired_transactions_are_rejected(wallets, pay, clock):
+    (miner, recipient) = wallets[:2]
+    blockchain = BlockChain(miner.public_key, 'a')
+    blockchain.mine_block()
+    assert pay(blockchain, miner, recipient, 1, clock.now -
+               TRANSACTION_LIFETIME - 1) == (False, 'expired')
+    assert pay(blockchain, miner, recipient, 1, clock.now +
+               MAX_CLOCK_DRIFT + 1) == (False, 'expired')
+    signature = miner.sign_transaction(
+        miner.public_key, recipient.public_key, 1)
+    assert blockchain.submit_transaction(recipient.public_key, miner.public_key, signature,
+                                         1, is_receiving=True) == (False, 'schema')
+
+
+def test_expired_open_transactions_are_not_mined(wallets, pay, clock):
+    (miner, recipient) = wallets[:2]
+    blockchain = BlockChain(miner.public_key, 'a')
+    blockchain.mine_block()
+    assert pay(blockchain, miner, recipient, 1) == (True, 'accepted')
+    clock.now += TRANSACTION_LIFETIME + 1
+    block = blockchain.mine_block()
+    assert [tx.sender for tx in block.transactions] == ['MINING']
+    assert blockchain.get_open_transactions() == []
+
+
+@pytest.mark.parametrize('storage', ['file', 'sqlite'])
+def test_pruned_node_remembers_only_the_replay_window(wallets, pay, clock, storage):
+    (miner, recipient) = wallets[:2]
+    blockchain = BlockChain(miner.public_key, 'a',
+                            prune_depth=1, storage=storage)
+    blockchain.mine_block()
+    timestamp = clock.now
+    assert pay(blockchain, miner, recipient, 2, timestamp) == (True, 'accepted')
+    blockchain.mine_block()
+    blockchain.mine_block()
+    blockchain.mine_block()
+    # The block of the payment is pruned, its replay is still rejected
+    assert blockchain.get_chain_info()['start'] > 2
+    assert pay(blockchain, miner, recipient, 2, timestamp) == (False, 'confirmed')
+    assert pay(BlockChain(miner.public_key, 'a', prune_depth=1, storage=storage),
+               miner, recipient, 2, timestamp) == (False, 'confirmed')
+    assert len(blockchain._BlockChain__pruned_txids) == 1
+    clock.now += REPLAY_WINDOW + 1
+    blockchain.mine_block()
+    # The payment is expired, its ID is forgotten and its replay is still rejected
+    assert len(blockchain._BlockChain__pruned_txids) == 0
+    if storage == 'sqlite':
+        assert sqlite3.connect('blockchain-a.db').execute(
+            'SELECT COUNT(*) FROM pruned_txids').fetchone()[0] == 0
+    assert pay(blockchain, miner, recipient, 2, timestamp) == (False, 'expired')
+    restarted = BlockChain(miner.public_key, 'a',
+                           prune_depth=1, storage=storage)
+    assert len(restarted._BlockChain__pruned_txids) == 0
+    assert pay(restarted, miner, recipient, 2, timestamp) == (False, 'expired')
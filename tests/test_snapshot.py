@@ -0,0 +1,109 @@
+"""
+This module tests the bootstrap of a node from the snapshot of a peer: only the blocks of the replay window and after the snapshot are downloaded, the snapshot is checked against the headers, and the node rejects the same transactions as the peer.
+"""
+
+from blockchain import BlockChain, REPLAY_WINDOW
+from utility.state import BalanceState
+
+
+def build_peer(wallets, pay, network, clock):
+    """
+    This function builds a peer with old blocks, before the replay window, and recent blocks.
+
+    :param wallets list: The wallets of the tests, the first one mines and pays the second one.
+    :param pay function: The fixture paying between two wallets.
+    :param network Network: The network the peer is added to, as 'peer'.
+    :param clock Clock: The time of the nodes, set back for the old blocks.
+    :returns tuple: The peer and the times of creation of an old and of a recent payment, both confirmed.
+    """
+
+    (miner, recipient) = wallets[:2]
+    peer = BlockChain(miner.public_key, 'peer')
+    network.nodes['peer'] = peer
+    now = clock.now
+    clock.now = now - 2 * REPLAY_WINDOW
+    peer.mine_block()
+    old_timestamp = clock.now
+    assert pay(peer, miner, recipient, 2) == (True, 'accepted')
+    peer.mine_block()
+    clock.now = now
+    peer.mine_block()
+    recent_timestamp = clock.now
+    assert pay(peer, miner, recipient, 3) == (True, 'accepted')
+    peer.mine_block()
+    peer.mine_block()
+    return (peer, old_timestamp, recent_timestamp)
+
+
+def test_bootstrap_syncs_only_the_replay_window(wallets, pay, network, clock):
+    (peer, old_timestamp, recent_timestamp) = build_peer(
+        wallets, pay, network, clock)
+    node = BlockChain(wallets[2].public_key, 'node')
+    assert node.bootstrap_from_snapshot('peer')
+    # The first two blocks are older than the window, they are not downloaded
+    assert ('/chain', {'start': 3}) in network.requests
+    assert all(params.get('start', 3) >= 3 for (path, params) in network.requests if path == '/chain')
+    assert node.get_chain_info()['start'] == peer.get_chain_info()['height']
+    assert node.get_headers() == peer.get_headers()
+    assert node.get_snapshot() == peer.get_snapshot()
+
+
+def test_snapshot_node_rejects_the_replays_like_its_peer(wallets, pay, network, clock):
+    (miner, recipient) = wallets[:2]
+    (peer, old_timestamp, recent_timestamp) = build_peer(
+        wallets, pay, network, clock)
+    node = BlockChain(wallets[2].public_key, 'node')
+    assert node.bootstrap_from_snapshot('peer')
+    for blockchain in (peer, node):
+        assert pay(blockchain, miner, recipient, 3,
+                   recent_timestamp) == (False, 'confirmed')
+        assert pay(blockchain, miner, recipient, 2,
+                   old_timestamp) == (False, 'expired')
+
+
+def test_bootstrap_rejects_a_block_not_matching_its_header(wallets, pay, network, clock):
+    (peer, old_timestamp, recent_timestamp) = build_peer(
+        wallets, pay, network, clock)
+
+    def tamper(path, payload):
+        if path == '/chain':
+            payload[0]['transactions'][0]['amount'] = 1
+        return payload
+
+    network.tamper = tamper
+    node = BlockChain(wallets[2].public_key, 'node')
+    assert not node.bootstrap_from_snapshot('peer')
+    assert node.get_chain_info()['height'] == 0
+
+
+def test_bootstrap_rejects_a_snapshot_not_matching_the_headers(wallets, pay, network, clock):
+    (peer, old_timestamp, recent_timestamp) = build_peer(
+        wallets, pay, network, clock)
+
+    def tamper(path, payload):
+        # A snapshot with a valid hash, but of another block
+        if path == '/snapshot':
+            state = BalanceState(
+                payload['height'], peer.get_headers()[-2]['hash'], payload['balances'])
+            payload = state.to_snapshot()
+        return payload
+
+    network.tamper = tamper
+    node = BlockChain(wallets[2].public_key, 'node')
+    assert not node.bootstrap_from_snapshot('peer')
+    assert node.get_chain_info()['height'] == 0
+
+
+def test_bootstrap_rejects_headers_not_linked_together(wallets, pay, network, clock):
+    (peer, old_timestamp, recent_timestamp) = build_peer(
+        wallets, pay, network, clock)
+
+    def tamper(path, payload):
+        if path == '/headers':
+            payload[1]['previous_hash'] = payload[2]['hash']
+        return payload
+
+    network.tamper = tamper
+    node = BlockChain(wallets[2].public_key, 'node')
+    assert not node.bootstrap_from_snapshot('peer')
+    assert node.get_chain_info()['height'] == 0
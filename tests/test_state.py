@@ -0,0 +1,45 @@
+"""
+This module tests that reverting blocks from the balance state gives the balances of a replay of the chain, which the snapshots commit to.
+"""
+
+import shutil
+
+from blockchain import BlockChain
+from utility.state import BalanceState
+
+
+def test_revert_restores_the_previous_balances(wallets):
+    blockchain = BlockChain(wallets[0].public_key, 'a')
+    blockchain.mine_block()
+    before = blockchain.get_snapshot()['state_hash']
+    block = blockchain.mine_block()
+    state = BalanceState.from_snapshot(blockchain.get_snapshot())
+    # The state of a snapshot doesn't know the previous balances of its blocks
+    assert not state.revert_block(block)
+    assert state.state_hash() == blockchain.get_snapshot()['state_hash']
+    state = BalanceState(0, blockchain.get_headers()[0]['hash'])
+    for chain_block in blockchain.chain[1:]:
+        state.apply_block(
+            chain_block, blockchain.get_headers()[chain_block.index]['hash'])
+    assert state.revert_block(block)
+    assert state.state_hash() == before
+
+
+def test_reorganization_after_restart_matches_a_replay(wallets, pay, network):
+    (miner, other_miner, recipient) = wallets
+    blockchain = BlockChain(miner.public_key, 'a')
+    blockchain.mine_block()
+    blockchain.mine_block()
+    shutil.copy('blockchain-a.txt', 'blockchain-b.txt')
+    other_blockchain = BlockChain(other_miner.public_key, 'b')
+    # The reverted block creates the balance of an address unknown before it
+    assert pay(blockchain, miner, recipient, 1) == (True, 'accepted')
+    blockchain.mine_block()
+    branch = [other_blockchain.mine_block(), other_blockchain.mine_block()]
+    # Restarted from its files, the node doesn't know the previous balances of its blocks anymore
+    blockchain = BlockChain(miner.public_key, 'a')
+    for block in branch:
+        assert blockchain.add_block(network.to_dict(block))
+    assert blockchain.get_headers()[-1] == other_blockchain.get_headers()[-1]
+    assert recipient.public_key not in blockchain.get_snapshot()['balances']
+    assert blockchain.get_snapshot()['state_hash'] == other_blockchain.get_snapshot()['state_hash']
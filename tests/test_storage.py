@@ -0,0 +1,68 @@
+"""
+This module tests that a node with the SQLite storage, which answers its lookups with indexed queries of its database, gives the same balances, histories and transactions as a node with the file storage, also when it is pruned.
+"""
+
+import pytest
+
+from blockchain import BlockChain
+from utility.hash_util import hash_transaction
+
+
+def build_nodes(wallets, pay, prune_depth):
+    """
+    This function builds a node of each storage engine with the same blocks and open transactions.
+
+    :param wallets list: The wallets of the tests, the first one mines and pays the other ones.
+    :param pay function: The fixture paying between two wallets.
+    :param prune_depth int: The number of full blocks kept by the nodes, None to keep all of them.
+    :returns tuple: The node with the file storage and the node with the SQLite storage.
+    """
+
+    (miner, first_recipient, second_recipient) = wallets
+    nodes = (BlockChain(miner.public_key, 'file', prune_depth=prune_depth, storage='file'),
+             BlockChain(miner.public_key, 'sqlite', prune_depth=prune_depth, storage='sqlite'))
+    for node in nodes:
+        node.mine_block()
+        node.mine_block()
+    for (sender, recipient, amount) in [(miner, first_recipient, 3), (first_recipient, second_recipient, 1), (miner, miner, 2), (miner, second_recipient, 1)]:
+        # Both nodes get the same transaction, with the same time of creation
+        signature = sender.sign_transaction(
+            sender.public_key, recipient.public_key, amount, 1000.0 + amount)
+        for node in nodes:
+            assert node.submit_transaction(recipient.public_key, sender.public_key, signature, amount,
+                                           is_receiving=True, scheme=sender.scheme, timestamp=1000.0 + amount) == (True, 'accepted')
+        for node in nodes:
+            node.mine_block()
+    for node in nodes:
+        assert pay(node, miner, first_recipient, 1, 2000.0) == (True, 'accepted')
+    return nodes
+
+
+@pytest.mark.parametrize('prune_depth', [None, 2])
+def test_sqlite_lookups_match_the_memory(wallets, pay, clock, prune_depth):
+    clock.now = 2000.0
+    (file_node, sqlite_node) = build_nodes(wallets, pay, prune_depth)
+    assert sqlite_node._BlockChain__get_queries() != None
+    for wallet in wallets:
+        address = wallet.public_key
+        assert sqlite_node.get_balance(address) == file_node.get_balance(address)
+        for limit in (1, 2, 50):
+            cursor = 0
+            while cursor != None:
+                page = sqlite_node.get_address_history(address, cursor, limit)
+                assert page == file_node.get_address_history(
+                    address, cursor, limit)
+                cursor = page['next_cursor']
+    for block in file_node.chain[1:]:
+        for tx in block.transactions:
+            transaction = file_node.get_transaction(hash_transaction(tx))
+            assert sqlite_node.get_transaction(
+                hash_transaction(tx)) == transaction
+            if tx.sender == 'MINING':
+                assert transaction == None
+            else:
+                assert transaction['height'] == block.index
+    open_transaction = file_node.get_open_transactions()[0]
+    assert sqlite_node.get_transaction(hash_transaction(open_transaction)) == file_node.get_transaction(
+        hash_transaction(open_transaction)) == dict(open_transaction.__dict__, height=None, position=None)
+    assert sqlite_node.get_transaction('unknown') == file_node.get_transaction('unknown') == None
@@ -1,22 +1,46 @@
 """
 This module implements the creation of a transaction. It allows the user to simply create a transaction with the required informations.
 
+:var DEFAULT_SCHEME str: The signature scheme of the transactions created before the schemes existed, kept out of their ordered dictionnary so their hashes don't change.
+
+:function: signed_payload(sender, recipient, amount, timestamp=None)
 :class Transaction: Class of the transaction.
 """
 
 from collections import OrderedDict
 from utility.printable import Printable
 
+DEFAULT_SCHEME = 'rsa'
+
+
+def signed_payload(sender, recipient, amount, timestamp=None):
+    """
+    This function gives the data signed by the sender of a transaction. The time of creation is part of it, so two payments of the same amount to the same recipient have different signatures and IDs, and a transaction sent again is only a replay of the same payment.
+
+    :param sender str: The sender of the transaction.
+    :param recipient str: The recipient of the transaction.
+    :param amount float: The amount of the transaction.
+    :param timestamp float: The time of creation of the transaction (time.time). Default=None for the transactions created before it was signed.
+    :returns bytes: The payload to sign, encoded in UTF8.
+    """
+
+    payload = str(sender) + str(recipient) + str(amount)
+    if timestamp != None:
+        # The separator can't be in the amount, so the amount and the time can't be shifted into each other
+        payload += ' ' + repr(timestamp)
+    return payload.encode('utf8')
+
 
 class Transaction(Printable):
     """
     Transaction class is used to create a transaction.
 
-    :method: __init__(self, sender, recipient, signature, amount)
+    :method: __init__(self, sender, recipient, signature, amount, scheme=DEFAULT_SCHEME, timestamp=None)
     :method: to_ordered_dict(self)
+    :method: from_dict(cls, tx)
     """
 
-    def __init__(self, sender, recipient, signature, amount):
+    def __init__(self, sender, recipient, signature, amount, scheme=DEFAULT_SCHEME, timestamp=None):
         """
         Initialize the transaction with input values.
 
@@ -24,6 +48,8 @@ class Transaction(Printable):
         :param recipient str: The name of the recipient of the transaction.
         :param amount float: The amount of the transaction
         :param signature str: the signature of the transaction
+        :param scheme str: The tag of the signature scheme of the sender's keys, 'rsa' or 'ed25519'. Default=DEFAULT_SCHEME.
+        :param timestamp float: The time of creation of the transaction, signed with it. Default=None for the mining rewards and the transactions created before it was signed.
         :returns Transaction: Yields a transaction's instance.
         """
 
@@ -31,12 +57,33 @@ class Transaction(Printable):
         self.recipient = recipient
         self.amount = amount
         self.signature = signature
+        self.scheme = scheme
+        self.timestamp = timestamp
 
     def to_ordered_dict(self):
         """
-        This function transforms the information of a transaction into an Ordered Dictionary.
+        This function transforms the information of a transaction into an Ordered Dictionary, the scheme is only included when it is not the default one and the time of creation when it is set, so the hashes of the older transactions don't change.
 
+        :var ordered_tx OrderedDict: The ordered dictionnary of the transaction.
         :returns dict: The ordered dictionnary of the transaction.
         """
 
-        return OrderedDict([('sender', self.sender), ('recipient', self.recipient), ('amount', self.amount)])
+        ordered_tx = OrderedDict(
+            [('sender', self.sender), ('recipient', self.recipient), ('amount', self.amount)])
+        if self.scheme != DEFAULT_SCHEME:
+            ordered_tx['scheme'] = self.scheme
+        if self.timestamp != None:
+            ordered_tx['timestamp'] = self.timestamp
+        return ordered_tx
+
+    @classmethod
+    def from_dict(cls, tx):
+        """
+        This classmethod function creates a transaction from its dictionnary, like a transaction received from a peer node or loaded from the storage.
+
+        :param tx dict: The fields of the transaction, the scheme and the time of creation are optional.
+        :returns Transaction: The transaction.
+        :raises KeyError: If a required field is missing.
+        """
+
+        return cls(tx['sender'], tx['recipient'], tx['signature'], tx['amount'], tx.get('scheme', DEFAULT_SCHEME), tx.get('timestamp'))
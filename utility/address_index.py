@@ -0,0 +1,171 @@
+"""
+This module implements an index of the transactions of each address of the blockchain. It allows the blockchain to find the activity of an address without walking through the whole chain.
+
+:class AddressIndex: Class of the address index.
+"""
+
+
+class AddressIndex:
+    """
+    AddressIndex class is used to map each address to the list of its confirmed transactions, built block after block alongside the chain.
+
+    An entry of the index is a list [height, position, balance] where height is the index of the block, position the position of the transaction inside the block and balance the running balance of the address after this transaction.
+    The running balances start from the opening balances, ie the balances after the first block (the anchor) of the chain that is indexed.
+
+    :method: __init__(self, opening_balances=None)
+    :method: add_block(self, block)
+    :method: remove_block(self, block)
+    :method: rebuild(self, chain)
+    :method: prune(self, anchor_height, opening_balances)
+    :method: get_entries(self, address)
+    :method: get_balance(self, address)
+    :method: to_dict(self)
+    :method: from_dict(cls, data, opening_balances=None)
+    """
+
+    def __init__(self, opening_balances=None):
+        """
+        Initialize an empty address index.
+
+        :param opening_balances dict: The balance of each address before the first indexed block. Default=None for no balances.
+        :var entries dict: Maps an address to the list of its entries.
+        :var height int: Index of the next block to index.
+        :returns AddressIndex: Yields an address index's instance.
+        """
+
+        self.__entries = {}
+        self.__opening_balances = opening_balances if opening_balances != None else {}
+        self.height = 0
+
+    def add_block(self, block):
+        """
+        Indexes all the transactions of a block, must be called in the order of the chain.
+
+        :param block Block: The block to index.
+        :var balance float: The running balance of the address before the transaction.
+        :returns: None.
+        """
+
+        for (position, tx) in enumerate(block.transactions):
+            if tx.sender == tx.recipient:
+                # Sending to oneself doesn't change the balance, it is indexed only once
+                self.__add_entry(tx.sender, block.index, position, 0)
+                continue
+            if tx.sender != 'MINING':
+                self.__add_entry(tx.sender, block.index, position, -tx.amount)
+            self.__add_entry(tx.recipient, block.index, position, tx.amount)
+        self.height = block.index + 1
+
+    def __add_entry(self, address, height, position, amount):
+        """
+        Appends an entry to the list of entries of an address.
+
+        :param address str: The address concerned by the transaction.
+        :param height int: The index of the block of the transaction.
+        :param position int: The position of the transaction inside the block.
+        :param amount float: The amount received (positive) or sent (negative) by the address.
+        :returns: None.
+        """
+
+        entries = self.__entries.setdefault(address, [])
+        balance = entries[-1][2] if len(entries) > 0 else self.__opening_balances.get(
+            address, 0)
+        entries.append([height, position, balance + amount])
+
+    def remove_block(self, block):
+        """
+        Removes the entries of a block, must be called on the last indexed block, like when a side branch replaces the end of the chain.
+
+        :param block Block: The last indexed block.
+        :var entries list: The entries of an address of the block.
+        :returns: None.
+        """
+
+        for tx in block.transactions:
+            for address in (tx.sender, tx.recipient):
+                entries = self.__entries.get(address)
+                while entries and entries[-1][0] == block.index:
+                    entries.pop()
+                if entries == []:
+                    del self.__entries[address]
+        self.height = block.index
+
+    def rebuild(self, chain):
+        """
+        Rebuilds the whole index from a chain, used when the chain is replaced. The first block of the chain is the anchor, its transactions are already part of the opening balances.
+
+        :param chain list: The list of blocks to index.
+        :returns: None.
+        """
+
+        self.__entries = {}
+        self.height = chain[0].index + 1
+        for block in chain[1:]:
+            self.add_block(block)
+
+    def prune(self, anchor_height, opening_balances):
+        """
+        Removes the entries of the blocks up to a new anchor, used when the older blocks are pruned so the index stays bounded.
+
+        :param anchor_height int: The index of the new anchor, its entries and the previous ones are removed.
+        :param opening_balances dict: The balance of each address after the new anchor.
+        :var kept list: The entries of an address after the new anchor.
+        :returns: None.
+        """
+
+        for address in list(self.__entries):
+            kept = [entry for entry in self.__entries[address]
+                    if entry[0] > anchor_height]
+            if len(kept) > 0:
+                self.__entries[address] = kept
+            else:
+                del self.__entries[address]
+        self.__opening_balances = opening_balances
+
+    def get_entries(self, address):
+        """
+        Getter of the entries of an address.
+
+        :param address str: The address whose entries are requested.
+        :returns list: The list of entries of the address, an empty list if the address is unknown.
+        """
+
+        return self.__entries.get(address, [])
+
+    def get_balance(self, address):
+        """
+        Getter of the confirmed balance of an address.
+
+        :param address str: The address whose balance is requested.
+        :returns float: The running balance after the last confirmed transaction of the address.
+        """
+
+        entries = self.__entries.get(address)
+        if not entries:
+            return self.__opening_balances.get(address, 0)
+        return entries[-1][2]
+
+    def to_dict(self):
+        """
+        This function transforms the index into a dictionnary that can be saved as JSON.
+
+        :returns dict: The height and the entries of the index.
+        """
+
+        return {'height': self.height, 'entries': self.__entries}
+
+    @classmethod
+    def from_dict(cls, data, opening_balances=None):
+        """
+        This classmethod function creates an index from a dictionnary made by to_dict.
+
+        :param data dict: The height and the entries of the index.
+        :param opening_balances dict: The balance of each address before the first indexed block. Default=None for no balances.
+        :var index AddressIndex: The index to return.
+        :returns AddressIndex: The index loaded from the dictionnary.
+        """
+
+        index = cls(opening_balances)
+        index.height = data['height']
+        index.__entries = data['entries']
+        return index
@@ -0,0 +1,225 @@
+"""
+This module implements the admission of the new transactions: the checks a transaction goes through before it is verified against the balances and its signature, ordered from the cheapest to the most expensive so junk or replayed transactions are rejected before they cost anything.
+
+The stages are, in order: the validation of the fields ('schema'), the rejection of the transactions created more than TRANSACTION_LIFETIME seconds ago or too far in the future ('expired'), of the transactions already open ('duplicate') or already in a block ('confirmed'), the rate limits of the peer node or client sending the transaction ('peer_rate') and of its sender ('sender_rate'), the balance of the sender ('balance') and the signature ('signature'). BlockChain.submit_transaction runs them and each rejection is counted by stage in the metrics.
+
+:class TokenBucket: Class of a rate limit.
+:class AdmissionPipeline: Class of the checks of the admission.
+"""
+
+import math
+
+from collections import OrderedDict
+from string import hexdigits
+from threading import Lock
+from time import monotonic
+
+from utility.metrics import metrics
+from wallet import SIGNATURE_SCHEMES
+
+# Stages of the admission in the order of the checks, the rejections are counted with these names
+ADMISSION_STAGES = ('schema', 'expired', 'duplicate', 'confirmed', 'peer_rate',
+                    'sender_rate', 'balance', 'signature')
+# Seconds a transaction can wait to be mined after its creation, so the nodes only remember the transactions of the blocks of this period to reject the replays
+TRANSACTION_LIFETIME = 3600
+# Seconds a transaction can be created ahead of the clock of the node, the clocks of the nodes are never exactly the same
+MAX_CLOCK_DRIFT = 300
+# Transactions per second admitted from each sender, 0 for no limit
+DEFAULT_SENDER_RATE = 50
+# Transactions per second received from each peer node or client, 0 for no limit
+DEFAULT_PEER_RATE = 1000
+# Seconds of transactions at the full rate a sender or a peer can send at once after a pause
+BURST_SECONDS = 10
+# Maximum number of rate limits kept for each kind, the least recently used ones are forgotten first
+MAX_BUCKETS = 10000
+# Maximum length of the keys and of the signatures, well above the RSA keys and signatures of the wallets
+MAX_FIELD_LENGTH = 4096
+# Characters of the keys and of the signatures
+HEX_CHARACTERS = frozenset(hexdigits)
+
+
+class TokenBucket:
+    """
+    TokenBucket class is used to limit a rate: a token is taken for each transaction and the tokens come back at the rate, up to the burst.
+
+    :method: __init__(self, rate, burst, now)
+    :method: take(self, now)
+    :method: give_back(self)
+    """
+
+    def __init__(self, rate, burst, now):
+        """
+        Initialize a full bucket.
+
+        :param rate float: The number of tokens coming back per second.
+        :param burst float: The maximum number of tokens.
+        :param now float: The current time in seconds (time.monotonic).
+        :returns TokenBucket: Yields a bucket's instance.
+        """
+
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now):
+        """
+        Takes a token if there is one.
+
+        :param now float: The current time in seconds (time.monotonic).
+        :returns bool: True if a token was taken, false if the rate is exceeded.
+        """
+
+        self.tokens = min(self.burst, self.tokens +
+                          (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def give_back(self):
+        """
+        Gives back a token taken for a transaction rejected afterwards.
+
+        :returns: None.
+        """
+
+        self.tokens = min(self.burst, self.tokens + 1)
+
+
+class AdmissionPipeline:
+    """
+    AdmissionPipeline class is used to run the cheap checks of the admission and to keep the rate limits of the senders and of the peers.
+
+    The token of the sender is given back when the transaction is rejected by a later stage, so someone sending transactions in the name of another sender without its key can't use up the rate of this sender: the sender limit only counts the admitted transactions, the peer limit counts every transaction that is well-formed and new.
+
+    :method: __init__(self, sender_rate=DEFAULT_SENDER_RATE, peer_rate=DEFAULT_PEER_RATE, burst_seconds=BURST_SECONDS, max_buckets=MAX_BUCKETS)
+    :method: check_fields(self, sender, recipient, signature, amount, scheme, timestamp)
+    :method: is_expired(timestamp, now)
+    :method: check_rate(self, sender, peer)
+    :method: give_back(self, sender)
+    :method: count(self, stage)
+    """
+
+    def __init__(self, sender_rate=DEFAULT_SENDER_RATE, peer_rate=DEFAULT_PEER_RATE, burst_seconds=BURST_SECONDS, max_buckets=MAX_BUCKETS):
+        """
+        Initialize the admission without rate limits used yet.
+
+        :param sender_rate float: The transactions per second admitted from each sender, 0 for no limit. Default=DEFAULT_SENDER_RATE.
+        :param peer_rate float: The transactions per second received from each peer node or client, 0 for no limit. Default=DEFAULT_PEER_RATE.
+        :param burst_seconds float: The seconds of transactions at the full rate that can be sent at once. Default=BURST_SECONDS.
+        :param max_buckets int: The maximum number of rate limits kept for each kind. Default=MAX_BUCKETS.
+        :var senders OrderedDict: Maps a sender to its rate limit, the least recently used first.
+        :var peers OrderedDict: Maps a peer to its rate limit, the least recently used first.
+        :var lock Lock: Protects the rate limits against the concurrent requests.
+        :returns AdmissionPipeline: Yields an admission's instance.
+        """
+
+        self.sender_rate = sender_rate
+        self.peer_rate = peer_rate
+        self.burst_seconds = burst_seconds
+        self.max_buckets = max_buckets
+        self.__senders = OrderedDict()
+        self.__peers = OrderedDict()
+        self.__lock = Lock()
+
+    @staticmethod
+    def check_fields(sender, recipient, signature, amount, scheme, timestamp):
+        """
+        This staticmethod function checks the types and the formats of the fields of a transaction, without decoding the keys.
+
+        :param sender str: The public key of the sender, hexadecimal.
+        :param recipient str: The recipient.
+        :param signature str: The signature, hexadecimal.
+        :param amount float: The amount, a positive finite number.
+        :param scheme str: The signature scheme, one of the schemes of the wallets.
+        :param timestamp float: The time of creation, a positive finite number. The transactions without it can't be told apart from their replays, they are not admitted anymore.
+        :returns bool: True if the fields are well-formed, false if not.
+        """
+
+        if not all(isinstance(field, str) and 0 < len(field) <= MAX_FIELD_LENGTH for field in (sender, recipient, signature)):
+            return False
+        for number in (amount, timestamp):
+            if isinstance(number, bool) or not isinstance(number, (int, float)) or not math.isfinite(number) or number <= 0:
+                return False
+        if scheme not in SIGNATURE_SCHEMES:
+            return False
+        return HEX_CHARACTERS.issuperset(sender) and HEX_CHARACTERS.issuperset(signature)
+
+    @staticmethod
+    def is_expired(timestamp, now):
+        """
+        This staticmethod function tells if a transaction can't be mined anymore, or not yet, at a given time.
+
+        :param timestamp float: The time of creation of the transaction, None for a transaction created before it was signed.
+        :param now float: The current time in seconds (time.time).
+        :returns bool: True if the transaction was created more than TRANSACTION_LIFETIME seconds ago, more than MAX_CLOCK_DRIFT seconds in the future or without time of creation, false if not.
+        """
+
+        return timestamp == None or timestamp < now - TRANSACTION_LIFETIME or timestamp > now + MAX_CLOCK_DRIFT
+
+    def __take(self, buckets, key, rate, now):
+        """
+        Takes a token from the rate limit of a key, created full if the key is new.
+
+        :param buckets OrderedDict: The rate limits of the kind of the key.
+        :param key str: The sender or the peer.
+        :param rate float: The rate of the kind of the key.
+        :param now float: The current time in seconds.
+        :var bucket TokenBucket: The rate limit of the key.
+        :returns bool: True if a token was taken, false if the rate is exceeded.
+        """
+
+        bucket = buckets.get(key)
+        if bucket == None:
+            bucket = TokenBucket(rate, max(1, rate * self.burst_seconds), now)
+            buckets[key] = bucket
+            if len(buckets) > self.max_buckets:
+                buckets.popitem(last=False)
+        else:
+            buckets.move_to_end(key)
+        return bucket.take(now)
+
+    def check_rate(self, sender, peer):
+        """
+        Takes a token from the rate limit of the peer, then from the rate limit of the sender.
+
+        :param sender str: The sender of the transaction.
+        :param peer str: The address of the peer node or client sending the transaction, None if it is not received from the network.
+        :var now float: The current time in seconds.
+        :returns str: 'peer_rate' or 'sender_rate' if a rate is exceeded, None if the transaction is within the limits.
+        """
+
+        now = monotonic()
+        with self.__lock:
+            if peer != None and self.peer_rate > 0 and not self.__take(self.__peers, peer, self.peer_rate, now):
+                return 'peer_rate'
+            if self.sender_rate > 0 and not self.__take(self.__senders, sender, self.sender_rate, now):
+                return 'sender_rate'
+        return None
+
+    def give_back(self, sender):
+        """
+        Gives back the token of a sender taken by check_rate, when the transaction is rejected by a later stage.
+
+        :param sender str: The sender of the transaction.
+        :returns: None.
+        """
+
+        with self.__lock:
+            bucket = self.__senders.get(sender)
+            if bucket != None:
+                bucket.give_back()
+
+    @staticmethod
+    def count(stage):
+        """
+        This staticmethod function counts the result of the admission of a transaction in the metrics.
+
+        :param stage str: The stage rejecting the transaction (see ADMISSION_STAGES), 'accepted' if it is admitted.
+        :returns str: The stage.
+        """
+
+        metrics.inc('transaction_admissions_total', labels={'stage': stage})
+        return stage
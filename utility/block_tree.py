@@ -0,0 +1,159 @@
+"""
+This module implements the tree of the blocks which are not on the main chain of a node: the blocks of the side branches, which may become the main chain if they get more work, and the orphan blocks, whose parent is not known yet.
+
+:class BlockTree: Class of the side branches and orphan blocks.
+:var BLOCK_WORK int: The work of a block.
+"""
+
+# Expected number of hashes to find a proof of work, whose hash must start with two hexadecimal zeros (see Verification.valid_proof)
+BLOCK_WORK = 16 ** 2
+# Maximum number of orphan blocks kept, the oldest ones are forgotten first
+MAX_ORPHANS = 100
+# Number of blocks below the last block of the main chain after which a side branch can't replace the main chain anymore
+MAX_REORG_DEPTH = 100
+
+
+class BlockTree:
+    """
+    BlockTree class is used to keep the side blocks and the orphan blocks by hash.
+
+    A side block is linked to the main chain by its ancestors and has a cumulative work, ie the work of all the blocks from the genesis block to it. The difficulty of the proof of work is fixed, so the cumulative work of a block is (index + 1) * BLOCK_WORK, but it is computed from the parent so the heaviest branch can be chosen whatever the work of each block.
+    An orphan block is kept until its parent arrives, then it is connected like a new block.
+
+    :method: __init__(self, max_orphans=MAX_ORPHANS, max_depth=MAX_REORG_DEPTH)
+    :method: add_side_block(self, block, block_hash, work)
+    :method: get_side_block(self, block_hash)
+    :method: remove_side_block(self, block_hash)
+    :method: add_orphan(self, block, block_hash)
+    :method: pop_orphans(self, parent_hash)
+    :method: get_block(self, block_hash)
+    :method: prune(self, tip_height)
+    :method: clear(self)
+    :method: get_stats(self)
+    """
+
+    def __init__(self, max_orphans=MAX_ORPHANS, max_depth=MAX_REORG_DEPTH):
+        """
+        Initialize an empty tree.
+
+        :param max_orphans int: The maximum number of orphan blocks. Default=MAX_ORPHANS.
+        :param max_depth int: The maximum depth of a side branch below the last block of the main chain. Default=MAX_REORG_DEPTH.
+        :var side_blocks dict: Maps the hash of a side block to the block and its cumulative work.
+        :var orphans dict: Maps the hash of an orphan block to the block, the oldest first.
+        :returns BlockTree: Yields a tree's instance.
+        """
+
+        self.max_orphans = max_orphans
+        self.max_depth = max_depth
+        self.__side_blocks = {}
+        self.__orphans = {}
+
+    def add_side_block(self, block, block_hash, work):
+        """
+        Adds a block of a side branch.
+
+        :param block Block: The block, its parent is on the main chain or is a side block.
+        :param block_hash str: The hash of the block.
+        :param work int: The cumulative work of the block.
+        :returns: None.
+        """
+
+        self.__side_blocks[block_hash] = (block, work)
+
+    def get_side_block(self, block_hash):
+        """
+        Getter of a side block and its cumulative work.
+
+        :param block_hash str: The hash of the block.
+        :returns tuple: The block and its cumulative work, None if it is not a side block.
+        """
+
+        return self.__side_blocks.get(block_hash)
+
+    def remove_side_block(self, block_hash):
+        """
+        Removes a side block, like a block which joins the main chain.
+
+        :param block_hash str: The hash of the block.
+        :returns: None.
+        """
+
+        self.__side_blocks.pop(block_hash, None)
+
+    def add_orphan(self, block, block_hash):
+        """
+        Adds an orphan block, the oldest orphan is forgotten if there are too many of them.
+
+        :param block Block: The block, its parent is unknown.
+        :param block_hash str: The hash of the block.
+        :returns bool: True if the block is new, false if it was already an orphan.
+        """
+
+        if block_hash in self.__orphans:
+            return False
+        self.__orphans[block_hash] = block
+        while len(self.__orphans) > self.max_orphans:
+            del self.__orphans[next(iter(self.__orphans))]
+        return True
+
+    def pop_orphans(self, parent_hash):
+        """
+        Removes and gives the orphan blocks whose parent has arrived.
+
+        :param parent_hash str: The hash of the parent.
+        :var children list: The orphan blocks whose previous hash is the parent.
+        :returns list: The blocks and their hashes.
+        """
+
+        children = [(block, block_hash) for (block_hash, block) in self.__orphans.items()
+                    if block.previous_hash == parent_hash]
+        for (block, block_hash) in children:
+            del self.__orphans[block_hash]
+        return children
+
+    def get_block(self, block_hash):
+        """
+        Getter of a side block or of an orphan block.
+
+        :param block_hash str: The hash of the block.
+        :returns Block: The block, None if it is neither a side block nor an orphan.
+        """
+
+        side_block = self.__side_blocks.get(block_hash)
+        if side_block != None:
+            return side_block[0]
+        return self.__orphans.get(block_hash)
+
+    def prune(self, tip_height):
+        """
+        Removes the side blocks and the orphan blocks too old to replace the main chain.
+
+        :param tip_height int: The index of the last block of the main chain.
+        :var min_height int: The index below which the blocks are removed.
+        :returns: None.
+        """
+
+        min_height = tip_height - self.max_depth
+        for block_hash in [block_hash for (block_hash, (block, work)) in self.__side_blocks.items() if block.index < min_height]:
+            del self.__side_blocks[block_hash]
+        for block_hash in [block_hash for (block_hash, block) in self.__orphans.items() if block.index < min_height]:
+            del self.__orphans[block_hash]
+
+    def clear(self):
+        """
+        Removes all the blocks, used when the main chain is replaced.
+
+        :returns: None.
+        """
+
+        self.__side_blocks = {}
+        self.__orphans = {}
+
+    def get_stats(self):
+        """
+        Getter of the size of the tree.
+
+        :returns dict: The number of side blocks and of orphan blocks.
+        """
+
+        return {'side_blocks': len(self.__side_blocks), 'orphans': len(self.__orphans)}
@@ -0,0 +1,256 @@
+"""
+This module implements the Bloom filters of the lightweight clients: a client loads a filter of its addresses in the node, which then only sends the transactions matching it (with a few false positives hiding which addresses are the client's).
+
+The position of the bits of an item are computed by double hashing: with h the SHA256 hash of the tweak, ':' and the item (UTF-8), h1 the first 8 bytes and h2 the next 8 bytes of h (big-endian, h2 made odd), the i-th position is (h1 + i * h2) modulo the number of bits. The bit p is the bit p % 8 (least significant first) of the byte p // 8.
+
+:class BloomFilter: Class of a Bloom filter.
+:class FilterRegistry: Class of the filters loaded by the clients.
+"""
+
+import binascii
+import hashlib
+import math
+import secrets
+
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+# Maximum size of a filter in bytes and maximum number of hash functions, so matching a transaction stays cheap
+MAX_FILTER_BYTES = 36000
+MAX_HASH_COUNT = 50
+# Maximum number of filters loaded in a node, the least recently used one is removed first
+MAX_FILTERS = 1024
+# Seconds after which a filter not used is removed, the clients load it again
+FILTER_TTL = 3600
+
+
+class BloomFilter:
+    """
+    BloomFilter class is used to test if an item may be in a set: an item of the set always matches, another item matches with a small probability.
+
+    :method: __init__(self, bits, hash_count, tweak=0)
+    :method: from_items(cls, items, false_positive_rate=0.001, tweak=None)
+    :method: from_dict(cls, values)
+    :method: to_dict(self)
+    :method: add(self, item)
+    :method: __contains__(self, item)
+    :method: matches_any(self, items)
+    """
+
+    def __init__(self, bits, hash_count, tweak=0):
+        """
+        Initialize a filter from its bits.
+
+        :param bits bytes: The bits of the filter.
+        :param hash_count int: The number of positions of each item.
+        :param tweak int: The number mixed in the hash of the items, so two filters of the same items have different false positives. Default=0.
+        :returns BloomFilter: Yields a filter's instance.
+        :raises ValueError: If the filter is empty or bigger than MAX_FILTER_BYTES, or if hash_count isn't between 1 and MAX_HASH_COUNT.
+        """
+
+        if not 0 < len(bits) <= MAX_FILTER_BYTES:
+            raise ValueError('A filter must have 1 to {} bytes'.format(
+                MAX_FILTER_BYTES))
+        if not 0 < hash_count <= MAX_HASH_COUNT:
+            raise ValueError('A filter must have 1 to {} hash functions'.format(
+                MAX_HASH_COUNT))
+        self.bits = bytearray(bits)
+        self.hash_count = hash_count
+        self.tweak = tweak
+
+    @classmethod
+    def from_items(cls, items, false_positive_rate=0.001, tweak=None):
+        """
+        This classmethod function creates the smallest filter of items with a false positive rate, used by the clients.
+
+        :param items list: The items of the filter, like the addresses of a wallet.
+        :param false_positive_rate float: The probability of an item not in the filter to match. Default=0.001.
+        :param tweak int: The tweak of the filter. Default=None for a random tweak.
+        :var count int: The number of items, at least 1.
+        :var size int: The number of bytes of the filter.
+        :var hash_count int: The number of positions of each item.
+        :returns BloomFilter: The filter with the items added.
+        """
+
+        count = max(1, len(items))
+        size = math.ceil(-count * math.log(false_positive_rate) /
+                         (math.log(2) ** 2) / 8)
+        size = max(1, min(MAX_FILTER_BYTES, size))
+        hash_count = round(size * 8 / count * math.log(2))
+        hash_count = max(1, min(MAX_HASH_COUNT, hash_count))
+        bloom = cls(bytes(size), hash_count,
+                    tweak if tweak != None else secrets.randbelow(2 ** 32))
+        for item in items:
+            bloom.add(item)
+        return bloom
+
+    @classmethod
+    def from_dict(cls, values):
+        """
+        This classmethod function creates a filter from its JSON form.
+
+        :param values dict: The bits in hexadecimal ('bits'), the number of hash functions ('hash_count') and the tweak ('tweak', 0 if missing).
+        :returns BloomFilter: The filter.
+        :raises ValueError, TypeError, KeyError: If a value is missing or invalid.
+        """
+
+        (hash_count, tweak) = (values['hash_count'], values.get('tweak', 0))
+        if not isinstance(hash_count, int) or not isinstance(tweak, int) or isinstance(hash_count, bool) or isinstance(tweak, bool):
+            raise TypeError('hash_count and tweak must be integers')
+        return cls(binascii.unhexlify(values['bits']), hash_count, tweak)
+
+    def to_dict(self):
+        """
+        Getter of the JSON form of the filter, read by from_dict.
+
+        :returns dict: The bits in hexadecimal, the number of hash functions and the tweak.
+        """
+
+        return {'bits': binascii.hexlify(self.bits).decode('ascii'), 'hash_count': self.hash_count, 'tweak': self.tweak}
+
+    def __positions(self, item):
+        """
+        Getter of the positions of the bits of an item.
+
+        :param item str: The item.
+        :var digest bytes: The SHA256 hash of the tweak and of the item.
+        :returns generator: The positions.
+        """
+
+        digest = hashlib.sha256('{}:{}'.format(
+            self.tweak, item).encode('utf8')).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        step = int.from_bytes(digest[8:16], 'big') | 1
+        size = len(self.bits) * 8
+        return ((first + number * step) % size for number in range(self.hash_count))
+
+    def add(self, item):
+        """
+        Adds an item to the filter.
+
+        :param item str: The item.
+        :returns: None.
+        """
+
+        for position in self.__positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        """
+        Tests if an item may be in the filter.
+
+        :param item str: The item.
+        :returns bool: True if the item may have been added, false if it has not.
+        """
+
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.__positions(item))
+
+    def matches_any(self, items):
+        """
+        Tests if one of several items may be in the filter, like the sender and the recipient of a transaction.
+
+        :param items iterable: The items.
+        :returns bool: True if an item may be in the filter, false if not.
+        """
+
+        return any(item in self for item in items)
+
+
+class FilterRegistry:
+    """
+    FilterRegistry class is used to keep the filters loaded by the clients by a random ID, the ID being the only way to use a filter. The filters not used for FILTER_TTL seconds are removed.
+
+    :method: __init__(self, max_filters=MAX_FILTERS, ttl=FILTER_TTL)
+    :method: __len__(self)
+    :method: add(self, bloom)
+    :method: get(self, filter_id)
+    :method: remove(self, filter_id)
+    """
+
+    def __init__(self, max_filters=MAX_FILTERS, ttl=FILTER_TTL):
+        """
+        Initialize a registry without filters.
+
+        :param max_filters int: The maximum number of filters. Default=MAX_FILTERS.
+        :param ttl float: The seconds after which a filter not used is removed. Default=FILTER_TTL.
+        :var filters OrderedDict: Maps the ID of a filter to the filter and the time it was last used, the least recently used first.
+        :var lock Lock: Protects the filters against the concurrent requests.
+        :returns FilterRegistry: Yields a registry's instance.
+        """
+
+        self.max_filters = max_filters
+        self.ttl = ttl
+        self.__filters = OrderedDict()
+        self.__lock = Lock()
+
+    def __len__(self):
+        """
+        Getter of the number of filters.
+
+        :returns int: The number of filters.
+        """
+
+        return len(self.__filters)
+
+    def __expire(self, now):
+        """
+        Removes the filters not used since ttl seconds, must be called with the lock held.
+
+        :param now float: The current time in seconds (time.monotonic).
+        :returns: None.
+        """
+
+        while len(self.__filters) > 0:
+            (filter_id, (_, used)) = next(iter(self.__filters.items()))
+            if now - used < self.ttl:
+                break
+            del self.__filters[filter_id]
+
+    def add(self, bloom):
+        """
+        Adds a filter.
+
+        :param bloom BloomFilter: The filter.
+        :var filter_id str: The random ID of the filter.
+        :returns str: The ID of the filter.
+        """
+
+        filter_id = secrets.token_hex(16)
+        now = monotonic()
+        with self.__lock:
+            self.__expire(now)
+            self.__filters[filter_id] = (bloom, now)
+            while len(self.__filters) > self.max_filters:
+                self.__filters.popitem(last=False)
+        return filter_id
+
+    def get(self, filter_id):
+        """
+        Getter of a filter, which is marked as used.
+
+        :param filter_id str: The ID of the filter.
+        :var entry tuple: The filter and the time it was last used.
+        :returns BloomFilter: The filter, None if it is unknown or expired.
+        """
+
+        now = monotonic()
+        with self.__lock:
+            self.__expire(now)
+            entry = self.__filters.get(filter_id)
+            if entry == None:
+                return None
+            self.__filters[filter_id] = (entry[0], now)
+            self.__filters.move_to_end(filter_id)
+            return entry[0]
+
+    def remove(self, filter_id):
+        """
+        Removes a filter.
+
+        :param filter_id str: The ID of the filter.
+        :returns bool: True if the filter has been removed, false if it is unknown.
+        """
+
+        with self.__lock:
+            return self.__filters.pop(filter_id, None) != None
@@ -0,0 +1,174 @@
+"""
+This module implements the capture of the traffic of a node, replayed against another build of the node by `python -m benchmarks.replay` to compare their performances under the same load.
+
+A capture is a gzip file of JSON lines: a first line describing the capture, then one line per request with its start time from the beginning of the capture ('t'), its method ('m'), its path and query string ('p'), its body ('b') and content type ('c') if it has one, its status ('s') and its duration in seconds ('d'). The headers are not captured, so the tokens of the admin routes and of the hosted wallets never are.
+
+:class TrafficCapture: Class of the capture of the requests.
+:class OfflineResponse: Class of the answer of a peer node during a replay.
+:function: offline_transport(node, method, path, **kwargs)
+:function: read_capture(path)
+"""
+
+import gzip
+import json
+
+from threading import Lock
+from time import perf_counter, time
+
+# Version of the format of the captures
+CAPTURE_VERSION = 1
+# Maximum size in bytes of a captured body, the bigger bodies are not captured and their request is marked truncated ('x')
+MAX_CAPTURED_BODY = 1024 * 1024
+# Number of requests and seconds between two flushes of the file, so the capture of a stopped node can be read up to its last flush
+FLUSH_EVERY = 100
+FLUSH_SECONDS = 1
+
+
+class TrafficCapture:
+    """
+    TrafficCapture class is used to write the requests received by a node in a capture file.
+
+    :method: __init__(self, path)
+    :method: record(self, method, path, query, body, content_type, status, duration, start)
+    :method: close(self)
+    """
+
+    def __init__(self, path):
+        """
+        Initialize the capture, the file is created or replaced.
+
+        :param path str: The path of the capture file.
+        :var file GzipFile: The capture file, written as text.
+        :var start float: The time the capture started (time.perf_counter), the start times of the requests are counted from it.
+        :var count int: The number of captured requests.
+        :var flushed float: The time of the last flush of the file (time.perf_counter).
+        :var lock Lock: Protects the file against the concurrent requests.
+        :returns TrafficCapture: Yields a capture's instance.
+        :raises IOError: If the file can't be created.
+        """
+
+        self.path = path
+        self.__file = gzip.open(path, mode='wt', encoding='utf8')
+        self.__start = perf_counter()
+        self.count = 0
+        self.__flushed = self.__start
+        self.__lock = Lock()
+        self.__file.write(json.dumps(
+            {'capture': CAPTURE_VERSION, 'started': time()}) + '\n')
+
+    def record(self, method, path, query, body, content_type, status, duration, start):
+        """
+        Writes a request in the capture.
+
+        :param method str: The HTTP method.
+        :param path str: The path of the request.
+        :param query bytes: The query string, empty for none.
+        :param body bytes: The body of the request, empty for none.
+        :param content_type str: The content type of the body, None for none.
+        :param status int: The status of the response.
+        :param duration float: The duration of the request in seconds.
+        :param start float: The time the request started (time.perf_counter).
+        :var entry dict: The captured request.
+        :var line str: The JSON line of the request.
+        :returns: None.
+        """
+
+        entry = {'t': round(start - self.__start, 6), 'm': method,
+                 'p': path + ('?' + query.decode('latin-1') if len(query) > 0 else '')}
+        if len(body) > MAX_CAPTURED_BODY:
+            entry['x'] = 1
+        elif len(body) > 0:
+            entry['b'] = body.decode('utf8', errors='replace')
+        if content_type != None and len(body) > 0:
+            entry['c'] = content_type
+        entry['s'] = status
+        entry['d'] = round(duration, 6)
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self.__lock:
+            if self.__file.closed:
+                return
+            self.__file.write(line)
+            self.count += 1
+            if self.count % FLUSH_EVERY == 0 or start - self.__flushed > FLUSH_SECONDS:
+                self.__file.flush()
+                self.__flushed = start
+
+    def close(self):
+        """
+        Ends the capture, the file is complete.
+
+        :returns: None.
+        """
+
+        with self.__lock:
+            if not self.__file.closed:
+                self.__file.close()
+
+
+class OfflineResponse:
+    """
+    OfflineResponse class is used to answer a request to a peer node like a response of requests, without sending it.
+
+    :method: __init__(self, status_code)
+    :method: json(self)
+    """
+
+    def __init__(self, status_code):
+        """
+        Initialize the response.
+
+        :param status_code int: The HTTP status of the response.
+        :returns OfflineResponse: Yields a response's instance.
+        """
+
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        """
+        Getter of the JSON body of the response.
+
+        :returns dict: The body of the response.
+        """
+
+        return {'message': 'Offline peer.'}
+
+
+def offline_transport(node, method, path, **kwargs):
+    """
+    This function answers the requests to the peer nodes in place of the network, set as PeerManager.transport during a replay so the node runs offline: the broadcasts are accepted (201) and the reads are not found (404), so no chain is ever downloaded.
+
+    :param node str: The URL of the peer.
+    :param method str: The HTTP method, like 'get' or 'post'.
+    :param path str: The path of the route.
+    :param kwargs dict: The other arguments of the request.
+    :returns OfflineResponse: The answer of the peer.
+    """
+
+    return OfflineResponse(201 if method == 'post' else 404)
+
+
+def read_capture(path):
+    """
+    This function reads a capture file, up to its last complete line if the capture has not been closed.
+
+    :param path str: The path of the capture file.
+    :var header dict: The description of the capture.
+    :var entries list: The captured requests, in the order they ended.
+    :returns (dict, list): The description of the capture and its requests.
+    :raises IOError: If the file can't be read.
+    :raises ValueError: If the file is not a capture.
+    """
+
+    entries = []
+    with gzip.open(path, mode='rt', encoding='utf8') as file:
+        header = json.loads(file.readline())
+        if not isinstance(header, dict) or header.get('capture') != CAPTURE_VERSION:
+            raise ValueError('Not a capture file: {}'.format(path))
+        try:
+            for line in file:
+                if line.endswith('\n'):
+                    entries.append(json.loads(line))
+        except EOFError:
+            pass  # The node stopped without closing the capture
+    return (header, entries)
@@ -0,0 +1,162 @@
+"""
+This module implements an immutable view of the blocks of a chain, shared between its versions instead of copied, so reading the chain costs the same whatever its length.
+
+:class ChainView: Class of the view of a chain.
+"""
+
+
+class ChainView:
+    """
+    ChainView class is used to read a range of a list of blocks shared by several views, like a snapshot of the chain that doesn't change when the chain does.
+
+    The views never modify the blocks they show: appending to a view gives a new view, which appends to the shared list only if no other view shows blocks after the end of the view (the list is copied otherwise), and slicing a view gives a new view of the same list. Getting the last block, the length or a slice of a view doesn't copy anything.
+
+    :method: __init__(self, blocks=None, begin=0, end=None)
+    :method: __len__(self)
+    :method: __getitem__(self, key)
+    :method: __iter__(self)
+    :method: __reversed__(self)
+    :method: tip(self)
+    :method: height(self)
+    :method: start(self)
+    :method: get_block(self, height)
+    :method: append(self, block)
+    :method: to_list(self)
+    """
+
+    def __init__(self, blocks=None, begin=0, end=None):
+        """
+        Initialize a view of blocks.
+
+        :param blocks list: The blocks, owned by the view from now on. Default=None for no blocks.
+        :param begin int: The position in the list of the first block of the view. Default=0.
+        :param end int: The position in the list after the last block of the view. Default=None for the end of the list.
+        :returns ChainView: Yields a view's instance.
+        """
+
+        self.__blocks = blocks if blocks != None else []
+        self.__begin = begin
+        self.__end = end if end != None else len(self.__blocks)
+
+    def __len__(self):
+        """
+        Getter of the number of blocks of the view.
+
+        :returns int: The number of blocks.
+        """
+
+        return self.__end - self.__begin
+
+    def __getitem__(self, key):
+        """
+        Getter of a block by its position in the view, or of a part of the view.
+
+        :param key int or slice: The position of the block, negative from the end, or a slice with a step of 1.
+        :returns Block or ChainView: The block, or a view of the part, sharing the blocks.
+        :raises IndexError: If the position is out of the view.
+        :raises ValueError: If the step of the slice isn't 1.
+        """
+
+        if isinstance(key, slice):
+            (begin, end, step) = key.indices(len(self))
+            if step != 1:
+                raise ValueError('A chain view can only be sliced with a step of 1')
+            return ChainView(self.__blocks, self.__begin + begin, self.__begin + max(begin, end))
+        if key < 0:
+            key += len(self)
+        if key < 0 or key >= len(self):
+            raise IndexError('Block position out of the chain view')
+        return self.__blocks[self.__begin + key]
+
+    def __iter__(self):
+        """
+        Iterates over the blocks of the view, from the first one.
+
+        :returns iterator: The blocks.
+        """
+
+        for position in range(self.__begin, self.__end):
+            yield self.__blocks[position]
+
+    def __reversed__(self):
+        """
+        Iterates over the blocks of the view, from the last one.
+
+        :returns iterator: The blocks.
+        """
+
+        for position in range(self.__end - 1, self.__begin - 1, -1):
+            yield self.__blocks[position]
+
+    @property
+    def tip(self):
+        """
+        Getter of the last block of the view.
+
+        :returns Block: The last block, None if the view is empty.
+        """
+
+        return self.__blocks[self.__end - 1] if self.__end > self.__begin else None
+
+    @property
+    def height(self):
+        """
+        Getter of the index of the last block of the view.
+
+        :returns int: The index of the last block, None if the view is empty.
+        """
+
+        return self.tip.index if self.__end > self.__begin else None
+
+    @property
+    def start(self):
+        """
+        Getter of the index of the first block of the view, which is not the genesis block on a pruned node.
+
+        :returns int: The index of the first block, None if the view is empty.
+        """
+
+        return self.__blocks[self.__begin].index if self.__end > self.__begin else None
+
+    def get_block(self, height):
+        """
+        Getter of a block by its index in the chain.
+
+        :param height int: The index of the block.
+        :var offset int: The position of the block in the view.
+        :returns Block: The block, None if it is not in the view.
+        """
+
+        if self.__end == self.__begin:
+            return None
+        offset = height - self.start
+        if offset < 0 or offset >= len(self):
+            return None
+        return self.__blocks[self.__begin + offset]
+
+    def append(self, block):
+        """
+        Gives a view with a block appended.
+
+        The shared list is only extended if the view shows its last block, the blocks before the view are dropped from the copy if they are more than the blocks of the view (like after a pruning).
+
+        :param block Block: The block to append.
+        :var blocks list: The blocks of the new view.
+        :returns ChainView: The new view, the current view doesn't change.
+        """
+
+        if self.__end == len(self.__blocks) and self.__begin <= len(self):
+            self.__blocks.append(block)
+            return ChainView(self.__blocks, self.__begin, self.__end + 1)
+        blocks = self.__blocks[self.__begin:self.__end]
+        blocks.append(block)
+        return ChainView(blocks)
+
+    def to_list(self):
+        """
+        Gives a copy of the blocks of the view, to modify it.
+
+        :returns list: The blocks.
+        """
+
+        return self.__blocks[self.__begin:self.__end]
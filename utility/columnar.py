@@ -0,0 +1,360 @@
+"""
+This module implements a columnar view of the confirmed transactions of the blockchain, kept in NumPy arrays so the aggregates over the whole ledger (balances of all addresses, volume of each block, top holders) are computed by vectorized operations instead of walking the blocks and the transactions.
+
+NumPy is an optional dependency (pip3 install numpy), NUMPY_AVAILABLE is False without it and the blockchain doesn't keep the columns.
+
+:class ColumnarLedger: Class of the columns of the transactions.
+:var NUMPY_AVAILABLE bool: True if NumPy can be imported.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# True if the columns can be built, the analytics are disabled without NumPy
+NUMPY_AVAILABLE = np != None
+# Number of rows allocated by an empty ledger, the capacity doubles when it is full
+INITIAL_CAPACITY = 1024
+# ID of the sender of the mining rewards, which is not an address and is never debited
+MINING_ID = -1
+# Type of each column, the sender and recipient columns hold address IDs
+COLUMN_TYPES = {'heights': 'int64', 'timestamps': 'float64',
+                'amounts': 'float64', 'senders': 'int32', 'recipients': 'int32'}
+
+
+class ColumnarLedger:
+    """
+    ColumnarLedger class is used to keep one row per confirmed transaction in columns: the index and the timestamp of its block, its amount, and the IDs of its sender and of its recipient. The addresses are interned, the ID of an address is its position in the list of addresses.
+
+    Like AddressIndex, the ledger starts from the opening balances, ie the balances after the first block (the anchor) of the chain, and is updated block after block. The rows are ordered by block, so the rows of a block are found by a binary search on the heights.
+    The balances are sums of floats made in another order than BalanceState, they may differ from it by rounding errors.
+
+    :method: __init__(self, opening_balances=None)
+    :method: add_block(self, block)
+    :method: remove_block(self, block)
+    :method: rebuild(self, chain)
+    :method: prune(self, anchor_height, opening_balances)
+    :method: get_balances(self)
+    :method: get_top_holders(self, count)
+    :method: get_top_senders(self, count)
+    :method: get_block_volumes(self, start=None)
+    :method: get_stats(self)
+    :method: save_npz(self, file)
+    """
+
+    def __init__(self, opening_balances=None):
+        """
+        Initialize an empty ledger.
+
+        :param opening_balances dict: The balance of each address before the first block of the ledger. Default=None for no balances.
+        :var addresses list: The interned addresses, by ID.
+        :var ids dict: Maps an address to its ID.
+        :var columns dict: Maps the name of a column to its array, see COLUMN_TYPES.
+        :var size int: The number of rows used in the columns.
+        :var start int: Index of the first block of the ledger, after the anchor.
+        :var height int: Index of the next block to add.
+        :returns ColumnarLedger: Yields a ledger's instance.
+        """
+
+        self.__addresses = []
+        self.__ids = {}
+        self.__columns = {}
+        self.__size = 0
+        self.__allocate(INITIAL_CAPACITY)
+        self.__set_opening_balances(opening_balances)
+        self.start = 0
+        self.height = 0
+
+    def __allocate(self, capacity):
+        """
+        Allocates the columns with a capacity, the used rows are copied.
+
+        :param capacity int: The number of rows of the new columns.
+        :returns: None.
+        """
+
+        columns = {name: np.zeros(capacity, dtype=dtype)
+                   for (name, dtype) in COLUMN_TYPES.items()}
+        for (name, column) in self.__columns.items():
+            columns[name][:self.__size] = column[:self.__size]
+        self.__columns = columns
+
+    def __set_opening_balances(self, opening_balances):
+        """
+        Setter of the opening balances, stored as a column by address ID.
+
+        :param opening_balances dict: The balance of each address. None for no balances.
+        :returns: None.
+        """
+
+        opening_balances = opening_balances if opening_balances != None else {}
+        ids = [self.__intern(address) for address in opening_balances]
+        self.__opening = np.zeros(len(self.__addresses), dtype=np.float64)
+        self.__opening[ids] = list(opening_balances.values())
+
+    def __intern(self, address):
+        """
+        Getter of the ID of an address, a new ID is given to a new address.
+
+        :param address str: The address.
+        :returns int: The ID of the address, MINING_ID for the sender of the mining rewards.
+        """
+
+        if address == 'MINING':
+            return MINING_ID
+        address_id = self.__ids.get(address)
+        if address_id == None:
+            address_id = len(self.__addresses)
+            self.__ids[address] = address_id
+            self.__addresses.append(address)
+        return address_id
+
+    def __append_rows(self, rows):
+        """
+        Appends rows to the columns, their capacity is doubled if needed.
+
+        :param rows list: The rows, each is the height, the timestamp, the amount, the sender ID and the recipient ID of a transaction.
+        :var end int: The number of rows used after the new rows.
+        :returns: None.
+        """
+
+        if len(rows) == 0:
+            return
+        end = self.__size + len(rows)
+        if end > len(self.__columns['heights']):
+            self.__allocate(max(end, 2 * len(self.__columns['heights'])))
+        for (name, values) in zip(COLUMN_TYPES, zip(*rows)):
+            self.__columns[name][self.__size:end] = values
+        self.__size = end
+
+    def __block_rows(self, block):
+        """
+        Getter of the rows of the transactions of a block.
+
+        :param block Block: The block.
+        :returns list: The rows of the transactions, in the order of the block.
+        """
+
+        return [(block.index, block.timestamp, tx.amount, self.__intern(tx.sender), self.__intern(tx.recipient))
+                for tx in block.transactions]
+
+    def add_block(self, block):
+        """
+        Adds the transactions of a block, must be called in the order of the chain.
+
+        :param block Block: The block to add.
+        :returns: None.
+        """
+
+        self.__append_rows(self.__block_rows(block))
+        self.height = block.index + 1
+
+    def remove_block(self, block):
+        """
+        Removes the transactions of a block, must be called on the last added block, like when a side branch replaces the end of the chain. The addresses stay interned.
+
+        :param block Block: The last added block.
+        :returns: None.
+        """
+
+        self.__size = int(np.searchsorted(
+            self.__column('heights'), block.index, side='left'))
+        self.height = block.index
+
+    def rebuild(self, chain):
+        """
+        Rebuilds the whole ledger from a chain, in one allocation. The first block of the chain is the anchor, its transactions are already part of the opening balances.
+
+        :param chain ChainView: The blocks to add.
+        :var rows list: The rows of the transactions of all the blocks.
+        :returns: None.
+        """
+
+        rows = [row for block in chain[1:] for row in self.__block_rows(block)]
+        self.__columns = {}
+        self.__size = 0
+        self.__allocate(max(INITIAL_CAPACITY, 2 * len(rows)))
+        self.__append_rows(rows)
+        self.start = chain[0].index + 1
+        self.height = chain[-1].index + 1
+
+    def prune(self, anchor_height, opening_balances):
+        """
+        Removes the transactions of the blocks up to a new anchor, used when the older blocks are pruned so the ledger stays bounded. The addresses are interned again, so the ones which are neither in the opening balances nor in the kept transactions are forgotten.
+
+        :param anchor_height int: The index of the new anchor, its transactions and the previous ones are removed.
+        :param opening_balances dict: The balance of each address after the new anchor.
+        :var removed int: The number of removed rows.
+        :returns: None.
+        """
+
+        removed = int(np.searchsorted(
+            self.__column('heights'), anchor_height, side='right'))
+        if removed > 0:
+            for column in self.__columns.values():
+                column[:self.__size - removed] = column[removed:self.__size]
+            self.__size -= removed
+        self.__compact_addresses(opening_balances)
+        self.start = anchor_height + 1
+
+    def __compact_addresses(self, opening_balances):
+        """
+        Interns again the addresses of the opening balances and of the rows, the address IDs of the rows are replaced by the new ones.
+
+        :param opening_balances dict: The balance of each address before the first row.
+        :var previous_addresses list: The interned addresses, by previous ID.
+        :var used ndarray: The previous IDs of the addresses of the rows, without MINING_ID.
+        :var new_ids ndarray: The new ID of each previous ID.
+        :returns: None.
+        """
+
+        previous_addresses = self.__addresses
+        self.__addresses = []
+        self.__ids = {}
+        self.__set_opening_balances(opening_balances)
+        used = np.unique(np.concatenate(
+            (self.__column('senders'), self.__column('recipients'))))
+        used = used[used != MINING_ID]
+        new_ids = np.full(len(previous_addresses), MINING_ID, dtype=np.int32)
+        new_ids[used] = [self.__intern(previous_addresses[address_id])
+                         for address_id in used.tolist()]
+        for name in ('senders', 'recipients'):
+            column = self.__column(name)
+            # The sender of the mining rewards keeps its ID, it is not an address
+            interned = column != MINING_ID
+            column[interned] = new_ids[column[interned]]
+
+    def __column(self, name):
+        """
+        Getter of the used rows of a column, without copying them.
+
+        :param name str: The name of the column, see COLUMN_TYPES.
+        :returns ndarray: The used rows.
+        """
+
+        return self.__columns[name][:self.__size]
+
+    def __balance_column(self):
+        """
+        Computes the balance of every address by address ID, the opening balance plus the amounts received minus the amounts sent.
+
+        :var count int: The number of addresses.
+        :var sent ndarray: Tells which rows are not mining rewards.
+        :returns ndarray: The balances.
+        """
+
+        count = len(self.__addresses)
+        senders = self.__column('senders')
+        amounts = self.__column('amounts')
+        sent = senders != MINING_ID
+        balances = np.zeros(count, dtype=np.float64)
+        balances[:len(self.__opening)] = self.__opening
+        balances += np.bincount(self.__column('recipients'),
+                                weights=amounts, minlength=count)
+        balances -= np.bincount(senders[sent],
+                                weights=amounts[sent], minlength=count)
+        return balances
+
+    def __top(self, column, count):
+        """
+        Getter of the addresses with the greatest values of a column by address ID.
+
+        :param column ndarray: The values by address ID.
+        :param count int: The number of addresses to give.
+        :var ids ndarray: The IDs of the addresses, the greatest value first.
+        :returns list: The addresses and their values.
+        """
+
+        count = min(count, len(column))
+        if count <= 0:
+            return []
+        ids = np.argpartition(-column, count - 1)[:count]
+        ids = ids[np.argsort(-column[ids], kind='stable')]
+        return [(self.__addresses[address_id], float(column[address_id])) for address_id in ids]
+
+    def get_balances(self):
+        """
+        Getter of the balances of all addresses at once.
+
+        :returns dict: The balance of each address.
+        """
+
+        return dict(zip(self.__addresses, self.__balance_column().tolist()))
+
+    def get_top_holders(self, count):
+        """
+        Getter of the addresses with the greatest balances.
+
+        :param count int: The number of addresses to give.
+        :returns list: The addresses and their balances, the greatest balance first.
+        """
+
+        return self.__top(self.__balance_column(), count)
+
+    def get_top_senders(self, count):
+        """
+        Getter of the addresses which sent the greatest amounts since the anchor.
+
+        :param count int: The number of addresses to give.
+        :var sent ndarray: Tells which rows are not mining rewards.
+        :var totals ndarray: The amount sent by each address ID.
+        :returns list: The addresses and the amounts they sent, the greatest amount first, the addresses which sent nothing are left out.
+        """
+
+        senders = self.__column('senders')
+        sent = senders != MINING_ID
+        totals = np.bincount(senders[sent], weights=self.__column(
+            'amounts')[sent], minlength=len(self.__addresses))
+        # The greatest amounts come first, so the addresses which sent nothing are the last ones
+        return [(address, amount) for (address, amount) in self.__top(totals, count) if amount > 0]
+
+    def get_block_volumes(self, start=None):
+        """
+        Getter of the amount transferred and of the number of transactions of each block, the mining rewards are not counted.
+
+        :param start int: The index of the first block. Default=None for the first block of the ledger.
+        :var first int: The index of the first block.
+        :var begin int: The first row of the block first.
+        :var offsets ndarray: The position of the block of each row from first.
+        :var sent ndarray: Tells which rows are not mining rewards.
+        :returns dict: The index of the first block, the volume and the number of transactions of each block from it to the last block.
+        """
+
+        first = max(self.start, start) if start != None else self.start
+        begin = int(np.searchsorted(
+            self.__column('heights'), first, side='left'))
+        offsets = self.__column('heights')[begin:] - first
+        sent = self.__column('senders')[begin:] != MINING_ID
+        length = max(0, self.height - first)
+        volumes = np.bincount(
+            offsets[sent], weights=self.__column('amounts')[begin:][sent], minlength=length)
+        counts = np.bincount(offsets[sent], minlength=length)
+        return {'start': first, 'volumes': volumes.tolist(), 'transactions': counts.tolist()}
+
+    def get_stats(self):
+        """
+        Getter of the size of the ledger.
+
+        :returns dict: The index of the next block, the number of transactions (mining rewards included) and of addresses, and the memory used by the columns in bytes.
+        """
+
+        return {
+            'height': self.height,
+            'transactions': self.__size,
+            'addresses': len(self.__addresses),
+            'bytes': sum(column.nbytes for column in self.__columns.values())
+        }
+
+    def save_npz(self, file):
+        """
+        Saves the used rows of the columns, the addresses and the opening balances in the NumPy .npz format. The sender ID of a mining reward is MINING_ID.
+
+        :param file str or file: The path or the file object to write.
+        :var columns dict: The used rows of each column.
+        :returns: None.
+        """
+
+        columns = {name: self.__column(name) for name in COLUMN_TYPES}
+        np.savez_compressed(file, addresses=np.array(self.__addresses, dtype=str),
+                            opening_balances=self.__opening, **columns)
@@ -0,0 +1,90 @@
+"""
+This module implements the compact blocks: a block relayed with the short IDs of its transactions instead of the transactions themselves, since the peer nodes already have most of them in their open transactions.
+
+:function: short_txid(txid, previous_hash)
+:function: to_compact_block(block, block_hash, prefilled_positions=())
+:function: rebuild_block(compact_block, open_transactions)
+"""
+
+from utility.hash_util import hash_string_256, hash_transaction
+
+# Number of hexadecimal characters of a short transaction ID (48 bits)
+SHORT_TXID_LENGTH = 12
+
+
+def short_txid(txid, previous_hash):
+    """
+    This function gives the short ID of a transaction in a block. It depends on the previous block, so transactions can't be crafted in advance to collide with others.
+
+    :param txid str: The ID of the transaction.
+    :param previous_hash str: The hash of the block before the block of the transaction.
+    :returns str: The short ID of the transaction.
+    """
+
+    return hash_string_256((previous_hash + txid).encode())[:SHORT_TXID_LENGTH]
+
+
+def to_compact_block(block, block_hash, prefilled_positions=()):
+    """
+    This function transforms a block into a compact block. The mining reward is always sent in full since it is never in the open transactions.
+
+    :param block Block: The block.
+    :param block_hash str: The hash of the block.
+    :param prefilled_positions tuple: The positions of other transactions to send in full, like the ones a peer node is missing. Default=().
+    :var prefilled set: The positions of the transactions sent in full.
+    :returns dict: The header of the block, its hash, the short ID of each transaction and the transactions sent in full by position.
+    """
+
+    prefilled = set(prefilled_positions)
+    if len(block.transactions) > 0:
+        prefilled.add(len(block.transactions) - 1)
+    return {
+        'index': block.index,
+        'previous_hash': block.previous_hash,
+        'timestamp': block.timestamp,
+        'proof': block.proof,
+        'hash': block_hash,
+        'short_ids': [short_txid(hash_transaction(tx), block.previous_hash) for tx in block.transactions],
+        'prefilled': {str(position): block.transactions[position].__dict__ for position in sorted(prefilled)
+                      if 0 <= position < len(block.transactions)}
+    }
+
+
+def rebuild_block(compact_block, open_transactions):
+    """
+    This function rebuilds a block from a compact block and the open transactions. Two open transactions with the same short ID are ignored, their position is missing.
+
+    :param compact_block dict: The compact block.
+    :param open_transactions list: The open transactions of the node.
+    :var candidates dict: Maps the short ID of each open transaction to the transaction, None if several transactions have it.
+    :var missing list: The positions of the transactions neither sent in full nor found in the open transactions.
+    :returns tuple: The block as a dictionnary (None if transactions are missing), the missing positions and True if open transactions have been used.
+    :raises KeyError: If a field of the compact block is missing.
+    """
+
+    candidates = {}
+    for tx in open_transactions:
+        short_id = short_txid(hash_transaction(tx),
+                              compact_block['previous_hash'])
+        candidates[short_id] = None if short_id in candidates else tx
+    transactions = []
+    missing = []
+    used_open_transactions = False
+    for (position, short_id) in enumerate(compact_block['short_ids']):
+        tx = compact_block['prefilled'].get(str(position))
+        if tx == None and candidates.get(short_id) != None:
+            tx = candidates[short_id].__dict__
+            used_open_transactions = True
+        if tx == None:
+            missing.append(position)
+        transactions.append(tx)
+    if len(missing) > 0:
+        return (None, missing, used_open_transactions)
+    block = {
+        'index': compact_block['index'],
+        'previous_hash': compact_block['previous_hash'],
+        'timestamp': compact_block['timestamp'],
+        'proof': compact_block['proof'],
+        'transactions': transactions
+    }
+    return (block, missing, used_open_transactions)
@@ -0,0 +1,109 @@
+"""
+This module implements the events of the node: new blocks, open transactions added or removed and chain replacements are published by the blockchain and streamed to the subscribers by the '/events' route.
+
+:class EventBus: Class of the publication of the events.
+:var events EventBus: The event bus shared by the whole node.
+"""
+
+from collections import deque
+from queue import Queue, Full
+from threading import Lock
+
+# Number of events a subscriber can have waiting before it is considered too slow
+SUBSCRIBER_QUEUE_SIZE = 256
+# Number of the last events kept so a reconnecting subscriber can get the events it missed
+HISTORY_SIZE = 256
+
+
+class EventBus:
+    """
+    EventBus class is used to publish events to all the subscribers without blocking the publisher.
+
+    An event is a dictionnary with an 'id' (increasing number), a 'type' and its 'data'. A subscriber too slow to keep up gets a 'resync' event instead of the events it missed, meaning it must reload the whole data.
+
+    :method: __init__(self)
+    :method: subscribe(self, last_event_id=None, notify=None)
+    :method: unsubscribe(self, subscriber)
+    :method: publish(self, event_type, data)
+    """
+
+    def __init__(self):
+        """
+        Initialize an event bus without subscribers.
+
+        :var subscribers dict: Maps the queue of each subscriber to the function notifying it, None if it isn't notified.
+        :var history deque: The last published events.
+        :var last_id int: The id of the last published event.
+        :var lock Lock: Protects the subscribers, the history and the last id.
+        :returns EventBus: Yields an event bus's instance.
+        """
+
+        self.__subscribers = {}
+        self.__history = deque(maxlen=HISTORY_SIZE)
+        self.__last_id = 0
+        self.__lock = Lock()
+
+    def subscribe(self, last_event_id=None, notify=None):
+        """
+        Adds a subscriber, which receives the events published from now on.
+
+        :param last_event_id int: The id of the last event received by a reconnecting subscriber, the events after it are sent again if they are still known. Default=None for a new subscriber.
+        :param notify function: Called without arguments, by the publisher, after each event put in the queue, so a subscriber can wait for the events without blocking a thread on get(). Default=None.
+        :var subscriber Queue: The queue of the events of the subscriber.
+        :var missed list: The events published after last_event_id.
+        :returns Queue: The queue of the subscriber, to read with get().
+        """
+
+        subscriber = Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self.__lock:
+            if last_event_id != None and last_event_id < self.__last_id:
+                missed = [
+                    event for event in self.__history if event['id'] > last_event_id]
+                if len(missed) == 0 or missed[0]['id'] != last_event_id + 1 or len(missed) > SUBSCRIBER_QUEUE_SIZE:
+                    subscriber.put(
+                        {'id': self.__last_id, 'type': 'resync', 'data': {}})
+                else:
+                    for event in missed:
+                        subscriber.put(event)
+            self.__subscribers[subscriber] = notify
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """
+        Removes a subscriber.
+
+        :param subscriber Queue: The queue returned by subscribe.
+        :returns: None.
+        """
+
+        with self.__lock:
+            self.__subscribers.pop(subscriber, None)
+
+    def publish(self, event_type, data):
+        """
+        Publishes an event to all the subscribers.
+
+        :param event_type str: The type of the event, like 'block', 'mempool_add', 'mempool_remove' or 'chain_replaced'.
+        :param data dict: The data of the event, must be serializable to JSON.
+        :var event dict: The published event.
+        :returns: None.
+        """
+
+        with self.__lock:
+            self.__last_id += 1
+            event = {'id': self.__last_id, 'type': event_type, 'data': data}
+            self.__history.append(event)
+            for (subscriber, notify) in self.__subscribers.items():
+                try:
+                    subscriber.put_nowait(event)
+                except Full:
+                    # The subscriber is too slow, it must reload everything once it has read its queue
+                    with subscriber.mutex:
+                        subscriber.queue.clear()
+                    subscriber.put_nowait(
+                        {'id': event['id'], 'type': 'resync', 'data': {}})
+                if notify != None:
+                    notify()
+
+
+events = EventBus()
@@ -3,6 +3,7 @@ This module is regroups all methods to generate hashes used by the blocks for id
 
 :method: hash_string_256(string)
 :method: hash_block(block)
+:method: hash_transaction(transaction)
 """
 
 import json
@@ -33,3 +34,17 @@ def hash_block(block):
     hashable_block['transactions'] = [tx.to_ordered_dict()
                                       for tx in hashable_block['transactions']]
     return hash_string_256(json.dumps(hashable_block, sort_keys=True).encode())
+
+
+def hash_transaction(transaction):
+    """
+    This function hashes a transaction, including its signature, and returns a string representation of it. The hash is used as the ID of the transaction.
+
+    :param transaction Transaction: The transaction that will be hashed.
+    :var hashable_tx dict: The transaction that is transformed into a dictionary.
+    :returns str: The hash code of the parameter transaction.
+    """
+
+    hashable_tx = dict(transaction.to_ordered_dict())
+    hashable_tx['signature'] = transaction.signature
+    return hash_string_256(json.dumps(hashable_tx, sort_keys=True).encode())
@@ -0,0 +1,233 @@
+"""
+This module implements the metrics of the node: counters, gauges and latency histograms, exposed in the Prometheus text format by the '/metrics' route.
+
+:class Metrics: Class of the registry of the metrics.
+:var metrics Metrics: The registry shared by the whole node, with all the metrics of the node described.
+:var DEFAULT_BUCKETS tuple: The upper bounds in seconds of the buckets of the latency histograms.
+"""
+
+from threading import Lock
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metrics:
+    """
+    Metrics class is used to describe the metrics, update their values and render them in the Prometheus text format.
+
+    A value is updated with a lock taken for a few instructions only, so the metrics can stay enabled in production.
+
+    :method: __init__(self)
+    :method: describe(self, name, metric_type, help_text, buckets=DEFAULT_BUCKETS)
+    :method: inc(self, name, value=1, labels=None)
+    :method: set(self, name, value, labels=None)
+    :method: observe(self, name, value, labels=None)
+    :method: render(self)
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty registry.
+
+        :var descriptions dict: Maps the name of a metric to its type, help text and buckets.
+        :var values dict: Maps the name of a metric to the values of each set of labels.
+        :var lock Lock: Protects the values against the concurrent requests.
+        :returns Metrics: Yields a registry's instance.
+        """
+
+        self.__descriptions = {}
+        self.__values = {}
+        self.__lock = Lock()
+
+    def describe(self, name, metric_type, help_text, buckets=DEFAULT_BUCKETS):
+        """
+        Describes a metric, must be done before updating it.
+
+        :param name str: The name of the metric.
+        :param metric_type str: The type of the metric, 'counter', 'gauge' or 'histogram'.
+        :param help_text str: The description of the metric.
+        :param buckets tuple: The upper bounds of the buckets of a histogram. Default=DEFAULT_BUCKETS.
+        :returns: None.
+        """
+
+        self.__descriptions[name] = (metric_type, help_text, buckets)
+        self.__values[name] = {}
+
+    @staticmethod
+    def __key(labels):
+        """
+        Transforms the labels of a value into a key of the dictionnary of the values.
+
+        :param labels dict: The labels of the value, None for no labels.
+        :returns tuple: The sorted pairs of the labels.
+        """
+
+        if not labels:
+            return ()
+        return tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, labels=None):
+        """
+        Increments a counter.
+
+        :param name str: The name of the counter.
+        :param value float: The increment. Default=1.
+        :param labels dict: The labels of the value. Default=None.
+        :returns: None.
+        """
+
+        key = self.__key(labels)
+        values = self.__values[name]
+        with self.__lock:
+            values[key] = values.get(key, 0) + value
+
+    def set(self, name, value, labels=None):
+        """
+        Sets the value of a gauge.
+
+        :param name str: The name of the gauge.
+        :param value float: The new value.
+        :param labels dict: The labels of the value. Default=None.
+        :returns: None.
+        """
+
+        key = self.__key(labels)
+        with self.__lock:
+            self.__values[name][key] = value
+
+    def observe(self, name, value, labels=None):
+        """
+        Adds an observation to a histogram.
+
+        :param name str: The name of the histogram.
+        :param value float: The observed value, a duration in seconds for the latency histograms.
+        :param labels dict: The labels of the value. Default=None.
+        :var histogram list: The count of each bucket followed by the sum and the count of the observations.
+        :returns: None.
+        """
+
+        key = self.__key(labels)
+        buckets = self.__descriptions[name][2]
+        values = self.__values[name]
+        with self.__lock:
+            histogram = values.get(key)
+            if histogram == None:
+                histogram = [0] * (len(buckets) + 2)
+                values[key] = histogram
+            for (position, bound) in enumerate(buckets):
+                if value <= bound:
+                    histogram[position] += 1
+                    break
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    @staticmethod
+    def __format_labels(key, extra=None):
+        """
+        Formats the labels of a value like {name="value",...}.
+
+        :param key tuple: The sorted pairs of the labels.
+        :param extra tuple: A last pair to add, like the bound of a bucket. Default=None.
+        :returns str: The formatted labels, an empty string if there are none.
+        """
+
+        pairs = list(key)
+        if extra != None:
+            pairs.append(extra)
+        if len(pairs) == 0:
+            return ''
+        formatted = ['{}="{}"'.format(label, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                     for (label, value) in pairs]
+        return '{' + ','.join(formatted) + '}'
+
+    def render(self):
+        """
+        Renders all the metrics in the Prometheus text format.
+
+        :var lines list: The lines of the text.
+        :var cumulative int: The number of observations of a histogram up to a bucket.
+        :returns str: The text of all the metrics.
+        """
+
+        lines = []
+        with self.__lock:
+            snapshot = {name: {key: (list(value) if isinstance(value, list) else value)
+                               for (key, value) in values.items()} for (name, values) in self.__values.items()}
+        for (name, (metric_type, help_text, buckets)) in self.__descriptions.items():
+            lines.append('# HELP {} {}'.format(name, help_text))
+            lines.append('# TYPE {} {}'.format(name, metric_type))
+            for (key, value) in snapshot[name].items():
+                if metric_type != 'histogram':
+                    lines.append('{}{} {}'.format(
+                        name, self.__format_labels(key), value))
+                    continue
+                cumulative = 0
+                for (position, bound) in enumerate(buckets):
+                    cumulative += value[position]
+                    lines.append('{}_bucket{} {}'.format(
+                        name, self.__format_labels(key, ('le', bound)), cumulative))
+                lines.append('{}_bucket{} {}'.format(
+                    name, self.__format_labels(key, ('le', '+Inf')), value[-1]))
+                lines.append('{}_sum{} {}'.format(
+                    name, self.__format_labels(key), value[-2]))
+                lines.append('{}_count{} {}'.format(
+                    name, self.__format_labels(key), value[-1]))
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+metrics.describe('http_requests_total', 'counter',
+                 'Number of HTTP requests by route, method and status.')
+metrics.describe('http_request_duration_seconds', 'histogram',
+                 'Duration of the HTTP requests by route and method.')
+metrics.describe('pow_attempts_total', 'counter',
+                 'Number of proofs tried by the proof of work.')
+metrics.describe('pow_duration_seconds', 'histogram',
+                 'Duration of the proofs of work.')
+metrics.describe('signature_verifications_total', 'counter',
+                 'Number of signature verifications by result.')
+metrics.describe('signature_verification_duration_seconds', 'histogram',
+                 'Duration of the signature verifications.')
+metrics.describe('chain_validation_duration_seconds', 'histogram',
+                 'Duration of the full validations of the chain.')
+metrics.describe('storage_duration_seconds', 'histogram',
+                 'Duration of saving and loading the node data by operation.')
+metrics.describe('storage_bytes', 'gauge',
+                 'Size in bytes of the node data of the last save or load by operation.')
+metrics.describe('storage_failures_total', 'counter',
+                 'Number of failed saves and loads by operation.')
+metrics.describe('peer_request_duration_seconds', 'histogram',
+                 'Duration of the requests to the peer nodes by peer and kind.')
+metrics.describe('peer_request_failures_total', 'counter',
+                 'Number of failed or declined requests to the peer nodes by peer and kind.')
+metrics.describe('gossip_messages_total', 'counter',
+                 'Number of transactions and blocks sent or relayed to the peer nodes by kind.')
+metrics.describe('transaction_admissions_total', 'counter',
+                 'Number of new transactions by admission stage, the stage rejecting the transaction or accepted.')
+metrics.describe('gossip_duplicates_total', 'counter',
+                 'Number of transactions and blocks received again from the peer nodes by kind.')
+metrics.describe('compact_block_rebuilds_total', 'counter',
+                 'Number of compact blocks received from the peer nodes by result of their rebuild with the open transactions.')
+metrics.describe('compact_block_missing_transactions_total', 'counter',
+                 'Number of transactions of the compact blocks sent in full because a peer node was missing them.')
+metrics.describe('chain_reorgs_total', 'counter',
+                 'Number of replacements of the end of the chain by a side branch with more work.')
+metrics.describe('chain_reorg_depth', 'histogram',
+                 'Number of blocks of the chain reverted by a replacement of the end of the chain.', (1, 2, 3, 5, 10, 25, 50, 100))
+metrics.describe('side_blocks', 'gauge',
+                 'Number of blocks of the side branches kept by the node.')
+metrics.describe('orphan_blocks', 'gauge',
+                 'Number of blocks kept until their parent arrives.')
+metrics.describe('bloom_filters', 'gauge',
+                 'Number of Bloom filters loaded by the lightweight clients.')
+metrics.describe('replication_lag_blocks', 'gauge',
+                 'Number of blocks a read replica is behind its primary node.')
+metrics.describe('replication_lag_seconds', 'gauge',
+                 'Seconds since a read replica was last at the height of its primary node.')
+metrics.describe('replication_errors_total', 'counter',
+                 'Number of failed synchronisations of a read replica with its primary node.')
+metrics.describe('mempool_size', 'gauge',
+                 'Number of open transactions.')
+metrics.describe('chain_height', 'gauge',
+                 'Index of the last block of the chain.')
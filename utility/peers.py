@@ -0,0 +1,288 @@
+"""
+This module implements the management of the peer nodes: the requests to the peers go through a pooled HTTP session per peer with timeouts, and their latency, failures and last known tip height are tracked so the dead peers are skipped and the fastest ones are used first.
+
+:class PeerManager: Class of the management of the peer nodes.
+"""
+
+import requests
+
+from threading import Lock
+from time import perf_counter, time
+from utility.metrics import metrics
+
+# Seconds to connect to a peer and to wait for its response
+CONNECT_TIMEOUT = 2
+READ_TIMEOUT = 10
+# Seconds a peer is skipped after its first failure, doubled after each other consecutive failure up to MAX_BACKOFF
+BASE_BACKOFF = 1
+MAX_BACKOFF = 300
+# Consecutive failures after which a peer is removed
+MAX_FAILURES = 8
+# Maximum number of peers added by the discovery
+MAX_PEERS = 32
+# Weight of the last request in the average latency of a peer
+LATENCY_WEIGHT = 0.3
+
+
+class PeerManager:
+    """
+    PeerManager class is used to keep the peer nodes, to send them requests and to choose which ones to contact.
+
+    A failed request (connection error or timeout) puts the peer in backoff: it is skipped by the broadcasts and the synchronisation for a time growing with its consecutive failures, and removed after MAX_FAILURES of them. A successful request resets its failures.
+
+    :method: __init__(self, peers=None)
+    :method: add(self, node)
+    :method: remove(self, node)
+    :method: get_peers(self)
+    :method: get_healthy_peers(self)
+    :method: get_fastest_peers(self, min_height=None)
+    :method: get_stats(self)
+    :method: record_tip(self, node, height)
+    :method: request(self, node, method, path, kind, **kwargs)
+    :method: discover(self, exclude=())
+    """
+
+    # Function sending the requests instead of HTTP, like transport(node, method, path, **kwargs), set by the network simulation of the benchmarks
+    transport = None
+
+    def __init__(self, peers=None):
+        """
+        Initialize the manager with known peer nodes.
+
+        :param peers list: The URLs (host:port) of the peer nodes. Default=None for no peers.
+        :var stats dict: Maps the URL of a peer to its statistics.
+        :var sessions dict: Maps the URL of a peer to its HTTP session, keeping its connections open between the requests.
+        :var version int: Incremented on every change of the peers.
+        :var lock Lock: Protects the statistics against the concurrent requests.
+        :returns PeerManager: Yields a manager's instance.
+        """
+
+        self.__stats = {}
+        self.__sessions = {}
+        self.version = 0
+        self.__lock = Lock()
+        for node in peers or []:
+            self.add(node)
+
+    @staticmethod
+    def __new_stats():
+        """
+        Gives the statistics of a new peer.
+
+        :returns dict: The average latency in seconds, the consecutive failures, the time until which the peer is skipped, the last time it answered and its last known tip height.
+        """
+
+        return {'latency': None, 'failures': 0, 'backoff_until': 0, 'last_seen': None, 'tip_height': None}
+
+    def add(self, node):
+        """
+        Adds a peer node.
+
+        :param node str: The URL of the peer (host:port).
+        :returns bool: True if the peer is new, false if it was already known.
+        """
+
+        with self.__lock:
+            if node in self.__stats:
+                return False
+            self.__stats[node] = self.__new_stats()
+            self.version += 1
+            return True
+
+    def remove(self, node):
+        """
+        Removes a peer node and closes its connections.
+
+        :param node str: The URL of the peer.
+        :returns bool: True if the peer was known, false if not.
+        """
+
+        with self.__lock:
+            if self.__stats.pop(node, None) == None:
+                return False
+            session = self.__sessions.pop(node, None)
+            self.version += 1
+        if session != None:
+            session.close()
+        return True
+
+    def get_peers(self):
+        """
+        Getter of all the peer nodes, healthy or not.
+
+        :returns list: The URLs of the peers.
+        """
+
+        with self.__lock:
+            return list(self.__stats.keys())
+
+    def get_healthy_peers(self):
+        """
+        Getter of the peer nodes which are not in backoff.
+
+        :returns list: The URLs of the healthy peers.
+        """
+
+        now = time()
+        with self.__lock:
+            return [node for (node, stats) in self.__stats.items() if stats['backoff_until'] <= now]
+
+    def get_fastest_peers(self, min_height=None):
+        """
+        Getter of the healthy peer nodes sorted by average latency, the peers never contacted come last.
+
+        :param min_height int: Skips the peers whose last known tip height is lower or equal, the peers with an unknown height are kept. Default=None to keep all the peers.
+        :returns list: The URLs of the peers, the fastest first.
+        """
+
+        now = time()
+        with self.__lock:
+            peers = [(node, stats['latency']) for (node, stats) in self.__stats.items()
+                     if stats['backoff_until'] <= now and (min_height == None or stats['tip_height'] == None or stats['tip_height'] > min_height)]
+        return [node for (node, latency) in sorted(peers, key=lambda peer: (peer[1] == None, peer[1] or 0))]
+
+    def get_stats(self):
+        """
+        Getter of the statistics of all the peer nodes.
+
+        :returns dict: Maps the URL of each peer to a copy of its statistics, with 'healthy' True if it is not in backoff.
+        """
+
+        now = time()
+        with self.__lock:
+            return {node: dict(stats, healthy=stats['backoff_until'] <= now) for (node, stats) in self.__stats.items()}
+
+    def record_tip(self, node, height):
+        """
+        Records the tip height of a peer node, like the index of a block it sent.
+
+        :param node str: The URL of the peer.
+        :param height int: The index of the last block of the peer.
+        :returns: None.
+        """
+
+        with self.__lock:
+            stats = self.__stats.get(node)
+            if stats != None:
+                stats['tip_height'] = height
+
+    def __get_session(self, node):
+        """
+        Gives the HTTP session of a peer node, created on its first request.
+
+        :param node str: The URL of the peer.
+        :returns Session: The session of the peer.
+        """
+
+        with self.__lock:
+            session = self.__sessions.get(node)
+            if session == None:
+                session = requests.Session()
+                self.__sessions[node] = session
+            return session
+
+    def __record_success(self, node, duration, response):
+        """
+        Records an answer of a peer node: updates its average latency, resets its failures and reads its tip height from the X-Chain-Height header.
+
+        :param node str: The URL of the peer.
+        :param duration float: The duration of the request in seconds.
+        :param response Response: The response of the peer.
+        :returns: None.
+        """
+
+        try:
+            height = int(response.headers.get('X-Chain-Height'))
+        except (TypeError, ValueError):
+            height = None
+        with self.__lock:
+            stats = self.__stats.get(node)
+            if stats == None:
+                return
+            if stats['latency'] == None:
+                stats['latency'] = duration
+            else:
+                stats['latency'] += LATENCY_WEIGHT * \
+                    (duration - stats['latency'])
+            stats['failures'] = 0
+            stats['backoff_until'] = 0
+            stats['last_seen'] = time()
+            if height != None:
+                stats['tip_height'] = height
+
+    def __record_failure(self, node):
+        """
+        Records a failed request to a peer node: puts it in backoff, or removes it after MAX_FAILURES consecutive failures.
+
+        :param node str: The URL of the peer.
+        :returns: None.
+        """
+
+        with self.__lock:
+            stats = self.__stats.get(node)
+            if stats == None:
+                return
+            stats['failures'] += 1
+            evict = stats['failures'] >= MAX_FAILURES
+            stats['backoff_until'] = time() + min(BASE_BACKOFF *
+                                                  2 ** (stats['failures'] - 1), MAX_BACKOFF)
+        if evict:
+            print('Peer node {} removed after {} failures'.format(
+                node, MAX_FAILURES))
+            self.remove(node)
+
+    def request(self, node, method, path, kind, **kwargs):
+        """
+        Sends a request to a peer node with its session and records the result.
+
+        :param node str: The URL of the peer.
+        :param method str: The HTTP method, like 'get' or 'post'.
+        :param path str: The path of the route, like '/chain'.
+        :param kind str: The kind of the request for the metrics, like 'transaction', 'block' or 'chain'.
+        :param kwargs dict: The other arguments of the request, like json or params.
+        :var labels dict: The labels of the metrics of the request.
+        :returns Response: The response of the peer, whatever its status, None if the peer couldn't be reached.
+        """
+
+        labels = {'peer': node, 'kind': kind}
+        kwargs.setdefault('timeout', (CONNECT_TIMEOUT, READ_TIMEOUT))
+        start = perf_counter()
+        try:
+            if PeerManager.transport != None:
+                response = PeerManager.transport(node, method, path, **kwargs)
+            else:
+                response = self.__get_session(node).request(
+                    method, 'http://{}{}'.format(node, path), **kwargs)
+        except requests.exceptions.RequestException:
+            metrics.inc('peer_request_failures_total', labels=labels)
+            self.__record_failure(node)
+            return None
+        duration = perf_counter() - start
+        metrics.observe('peer_request_duration_seconds', duration, labels)
+        self.__record_success(node, duration, response)
+        return response
+
+    def discover(self, exclude=()):
+        """
+        Asks the healthy peer nodes for their own peers ('/nodes' route) and adds the unknown ones, up to MAX_PEERS peers.
+
+        :param exclude tuple: The URLs never added, like the URLs of this node.
+        :var nodes list: The peers of a peer.
+        :returns list: The URLs of the added peers.
+        """
+
+        added = []
+        for node in self.get_fastest_peers():
+            response = self.request(node, 'get', '/nodes', 'discovery')
+            if response == None or response.status_code != 200:
+                continue
+            try:
+                nodes = response.json()['all_nodes']
+            except (ValueError, KeyError, TypeError):
+                continue
+            for new_node in nodes:
+                if len(self.get_peers()) >= MAX_PEERS:
+                    return added
+                if isinstance(new_node, str) and new_node not in exclude and self.add(new_node):
+                    added.append(new_node)
+        return added
@@ -0,0 +1,354 @@
+"""
+This module implements the on-demand profiling of the node: a profiling session with cProfile or with a sampling of the stacks, for a fixed window or for the next requests to a route, and the snapshots of the allocations traced by tracemalloc. It is driven by the admin routes of node.py.
+
+While no session is running, the cost for a request is a single test of an attribute.
+
+:class Profiler: Class of the profiling sessions and of the allocation tracing.
+:function: format_frame(code)
+:var profiler Profiler: The profiler shared by the whole node.
+"""
+
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import tracemalloc
+
+from collections import Counter
+from threading import Event, Lock, Thread, get_ident
+from time import monotonic
+
+# Profiling modes: cProfile records every call of the profiled requests, the sampling reads the stacks of the threads at a fixed interval
+PROFILE_MODES = ('cprofile', 'sample')
+# Duration in seconds of a session when neither a duration nor a number of requests is given
+DEFAULT_PROFILE_SECONDS = 10
+# Maximum duration in seconds of a session, so a forgotten session stops by itself
+MAX_PROFILE_SECONDS = 300
+# Seconds between two samples of the stacks
+DEFAULT_SAMPLE_INTERVAL = 0.005
+# Number of frames of the allocation tracebacks kept by tracemalloc
+DEFAULT_TRACE_FRAMES = 16
+
+
+def format_frame(code):
+    """
+    This function gives the name of a function in a stack, its file and its first line so the calls of a function are merged whatever the line they are at.
+
+    :param code code: The code object of the function.
+    :returns str: The name of the frame, like 'mine_block (blockchain.py:512)'.
+    """
+
+    return '{} ({}:{})'.format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+
+class Profiler:
+    """
+    Profiler class is used to run one profiling session at a time and to trace the allocations.
+
+    A session profiles the requests (all of them, or only those of a route) until its duration has elapsed or a number of requests has been profiled. With cProfile, a profiler is enabled in the thread of each profiled request and the statistics are merged. With the sampling, a thread reads the stacks of the threads of the profiled requests (or of every thread) at a fixed interval and counts the collapsed stacks, the format of the flamegraph tools.
+
+    :method: __init__(self)
+    :method: start(self, mode, seconds=None, requests=None, route=None, interval=DEFAULT_SAMPLE_INTERVAL, all_threads=False)
+    :method: stop(self)
+    :method: begin_request(self, route)
+    :method: end_request(self, token)
+    :method: get_status(self)
+    :method: get_result(self, output_format='pstats', limit=50)
+    :method: start_tracing(self, frames=DEFAULT_TRACE_FRAMES)
+    :method: stop_tracing(self)
+    :method: get_allocations(self, output_format='top', limit=50)
+    """
+
+    def __init__(self):
+        """
+        Initialize a profiler without session.
+
+        :var active bool: True while a session is running, the only attribute read by the requests when there is no session.
+        :var session dict: The settings and the progress of the running or last session, None before the first session.
+        :var stats Stats: The merged cProfile statistics of the session.
+        :var stacks Counter: The number of samples of each collapsed stack of the session.
+        :var threads set: The IDs of the threads running a profiled request.
+        :var stopped Event: Set when the session stops, wakes the sampling thread up.
+        :var lock Lock: Protects the session against the concurrent requests.
+        :returns Profiler: Yields a profiler's instance.
+        """
+
+        self.active = False
+        self.__session = None
+        self.__stats = None
+        self.__stacks = Counter()
+        self.__threads = set()
+        self.__stopped = Event()
+        self.__lock = Lock()
+
+    def start(self, mode, seconds=None, requests=None, route=None, interval=DEFAULT_SAMPLE_INTERVAL, all_threads=False):
+        """
+        Starts a profiling session, the results of the previous session are forgotten.
+
+        :param mode str: 'cprofile' or 'sample'.
+        :param seconds float: The duration of the session, capped to MAX_PROFILE_SECONDS. Default=None for MAX_PROFILE_SECONDS if a number of requests is given, DEFAULT_PROFILE_SECONDS if not.
+        :param requests int: The number of requests to profile before the session stops. Default=None for no limit.
+        :param route str: The rule of the route whose requests are profiled, like '/mine'. Default=None for every route.
+        :param interval float: The seconds between two samples of the sampling. Default=DEFAULT_SAMPLE_INTERVAL.
+        :param all_threads bool: True to sample every thread of the node (like the broadcasts), not only the profiled requests. Default=False.
+        :returns dict: The status of the new session.
+        :raises ValueError: If the settings are invalid or if a session is already running.
+        """
+
+        if mode not in PROFILE_MODES:
+            raise ValueError('The mode must be one of {}'.format(', '.join(PROFILE_MODES)))
+        if (seconds != None and seconds <= 0) or (requests != None and requests <= 0) or interval <= 0:
+            raise ValueError('The duration, the number of requests and the interval must be positive')
+        if seconds == None:
+            seconds = MAX_PROFILE_SECONDS if requests != None else DEFAULT_PROFILE_SECONDS
+        with self.__lock:
+            if self.active:
+                raise ValueError('A profiling session is already running')
+            self.__session = {
+                'mode': mode,
+                'route': route,
+                'seconds': min(seconds, MAX_PROFILE_SECONDS),
+                'requests': requests,
+                'interval': interval,
+                'all_threads': all_threads,
+                'started': monotonic(),
+                'profiled_requests': 0,
+                'samples': 0,
+                'running': True
+            }
+            self.__stats = None
+            self.__stacks = Counter()
+            self.__threads = set()
+            self.__stopped = Event()
+            self.active = True
+            session = (self.__session, self.__stopped)
+        # The duration is enforced by the same thread as the sampling, which only waits in cProfile mode
+        Thread(target=self.__run, args=session,
+               name='profiler', daemon=True).start()
+        return self.get_status()
+
+    def __run(self, session, stopped):
+        """
+        Runs the session until its end: samples the stacks in sampling mode, waits in cProfile mode, then stops the session.
+
+        :param session dict: The session.
+        :param stopped Event: The event of the session, set when the session is stopped earlier.
+        :var deadline float: The end of the session.
+        :returns: None.
+        """
+
+        deadline = session['started'] + session['seconds']
+        if session['mode'] == 'sample':
+            while not stopped.wait(session['interval']) and monotonic() < deadline:
+                self.__sample(session)
+        else:
+            stopped.wait(deadline - monotonic())
+        with self.__lock:
+            if self.active and self.__session is session:
+                self.__end_session()
+
+    def __sample(self, session):
+        """
+        Reads the stack of the sampled threads and counts each collapsed stack, the outermost frame first.
+
+        :param session dict: The running session.
+        :var frames dict: Maps the ID of each thread to its current frame.
+        :returns: None.
+        """
+
+        frames = sys._current_frames()
+        sampler = get_ident()
+        with self.__lock:
+            threads = None if session['all_threads'] else set(self.__threads)
+        for (thread_id, frame) in frames.items():
+            if thread_id == sampler or (threads != None and thread_id not in threads):
+                continue
+            stack = []
+            while frame != None:
+                stack.append(format_frame(frame.f_code))
+                frame = frame.f_back
+            self.__stacks[';'.join(reversed(stack))] += 1
+        session['samples'] += 1
+
+    def __end_session(self):
+        """
+        Ends the running session, must be called with the lock taken.
+
+        :returns: None.
+        """
+
+        self.active = False
+        self.__session['running'] = False
+        self.__session['seconds'] = monotonic() - self.__session['started']
+        self.__stopped.set()
+
+    def stop(self):
+        """
+        Stops the running session before its end, its results are kept.
+
+        :returns dict: The status of the session, None if there has been no session.
+        """
+
+        with self.__lock:
+            if self.active:
+                self.__end_session()
+        return self.get_status()
+
+    def begin_request(self, route):
+        """
+        Starts to profile a request if a session is running and the request is one of its requests.
+
+        :param route str: The rule of the route of the request.
+        :var profile Profile: The cProfile profiler of the request, None in sampling mode.
+        :returns tuple: The session and the profiler of the request to give to end_request, None if the request is not profiled.
+        """
+
+        if not self.active:
+            return None
+        with self.__lock:
+            session = self.__session
+            if not self.active or (session['route'] != None and session['route'] != route):
+                return None
+            if session['requests'] != None and session['profiled_requests'] + len(self.__threads) >= session['requests']:
+                return None
+            self.__threads.add(get_ident())
+        profile = None
+        if session['mode'] == 'cprofile':
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Only one cProfile profiler can be enabled at a time on some versions of Python, the concurrent requests are not profiled
+                profile = None
+        return (session, profile)
+
+    def end_request(self, token):
+        """
+        Ends the profiling of a request, adds its statistics to the session and stops the session after its last request.
+
+        :param token tuple: The value returned by begin_request, None if the request was not profiled.
+        :returns: None.
+        """
+
+        if token == None:
+            return
+        (session, profile) = token
+        if profile != None:
+            profile.disable()
+        with self.__lock:
+            self.__threads.discard(get_ident())
+            if self.__session is not session:
+                return
+            if profile != None:
+                if self.__stats == None:
+                    self.__stats = pstats.Stats(profile)
+                else:
+                    self.__stats.add(profile)
+            session['profiled_requests'] += 1
+            if self.active and session['requests'] != None and session['profiled_requests'] >= session['requests']:
+                self.__end_session()
+
+    def get_status(self):
+        """
+        Getter of the status of the running or last session.
+
+        :returns dict: The settings of the session, its duration, the number of profiled requests and of samples, and if it is still running, None if there has been no session.
+        """
+
+        with self.__lock:
+            if self.__session == None:
+                return None
+            status = dict(self.__session)
+        if status['running']:
+            status['seconds'] = monotonic() - status['started']
+        del status['started']
+        return status
+
+    def get_result(self, output_format='pstats', limit=50):
+        """
+        Getter of the results of the last session.
+
+        :param output_format str: 'pstats' for the cProfile statistics as text sorted by cumulative time, 'raw' for the cProfile statistics in the binary format of pstats.Stats.dump_stats (for snakeviz or gprof2dot), 'collapsed' for the stacks counted by the sampling, one 'frame;frame;frame count' line per stack. Default='pstats'.
+        :param limit int: The number of functions of the 'pstats' format. Default=50.
+        :var output StringIO: The text of the statistics.
+        :returns str or bytes: The results, None if the format doesn't match the mode of the session or if there has been no session.
+        """
+
+        with self.__lock:
+            if self.__session == None:
+                return None
+            mode = self.__session['mode']
+            if output_format == 'collapsed' and mode == 'sample':
+                return ''.join('{} {}\n'.format(stack, count) for (stack, count) in self.__stacks.most_common())
+            if output_format not in ('pstats', 'raw') or mode != 'cprofile':
+                return None
+            if self.__stats == None:
+                return b'' if output_format == 'raw' else 'No request has been profiled.\n'
+            if output_format == 'raw':
+                return marshal.dumps(self.__stats.stats)
+            output = io.StringIO()
+            self.__stats.stream = output
+            self.__stats.sort_stats('cumulative').print_stats(limit)
+        return output.getvalue()
+
+    def start_tracing(self, frames=DEFAULT_TRACE_FRAMES):
+        """
+        Starts to trace the allocations with tracemalloc, the allocations made before are not traced.
+
+        :param frames int: The number of frames of the traceback of each allocation. Default=DEFAULT_TRACE_FRAMES.
+        :returns bool: True if the tracing started, false if it was already running.
+        :raises ValueError: If the number of frames is not positive.
+        """
+
+        if frames <= 0:
+            raise ValueError('The number of frames must be positive')
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(frames)
+        return True
+
+    def stop_tracing(self):
+        """
+        Stops tracing the allocations and forgets the traced allocations.
+
+        :returns bool: True if the tracing stopped, false if it was not running.
+        """
+
+        if not tracemalloc.is_tracing():
+            return False
+        tracemalloc.stop()
+        return True
+
+    def get_allocations(self, output_format='top', limit=50):
+        """
+        Getter of a snapshot of the memory allocated since the tracing started and still alive.
+
+        :param output_format str: 'top' for the lines allocating the most memory as text, 'collapsed' for the allocation tracebacks, one 'frame;frame;frame bytes' line per traceback. Default='top'.
+        :param limit int: The number of lines of the 'top' format. Default=50.
+        :var snapshot Snapshot: The traced allocations, without the allocations of tracemalloc itself.
+        :var stacks Counter: The bytes allocated by each traceback, in the 'collapsed' format.
+        :returns str: The allocations, None if the tracing is not running or the format is unknown.
+        """
+
+        if not tracemalloc.is_tracing() or output_format not in ('top', 'collapsed'):
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>')))
+        if output_format == 'top':
+            statistics = snapshot.statistics('lineno')
+            lines = ['Total: {} bytes in {} blocks\n'.format(
+                sum(stat.size for stat in statistics), sum(stat.count for stat in statistics))]
+            lines += ['{}\n'.format(stat) for stat in statistics[:limit]]
+            return ''.join(lines)
+        stacks = Counter()
+        for stat in snapshot.statistics('traceback'):
+            # The frames of a traceback are sorted from the oldest one, like the collapsed stacks
+            stacks[';'.join('{}:{}'.format(os.path.basename(frame.filename), frame.lineno)
+                            for frame in stat.traceback)] += stat.size
+        return ''.join('{} {}\n'.format(stack, size) for (stack, size) in stacks.most_common())
+
+
+profiler = Profiler()
@@ -0,0 +1,243 @@
+"""
+This module implements the read replicas: a node started with `--follow <host:port>` copies the blocks and the open transactions of a primary node over HTTP and serves the reads from its own chain and indexes, while the writes are redirected to the primary. The replica is not a peer of the network, it never mines nor relays anything.
+
+:class Follower: Class of the replication of a primary node.
+"""
+
+import requests
+
+from threading import Event, Thread
+from time import time
+
+from utility.metrics import metrics
+from utility.peers import CONNECT_TIMEOUT, READ_TIMEOUT
+
+# Seconds between two requests of the replica to the primary
+FOLLOW_INTERVAL = 0.5
+# Number of last headers compared with the primary to find where its chain forks from the chain of the replica
+REORG_WINDOW = 100
+# Number of blocks behind the primary after which the replica bootstraps from the snapshot of the primary instead of downloading the blocks
+SNAPSHOT_LAG = 500
+
+
+class Follower:
+    """
+    Follower class is used to keep the blockchain of a replica up to date with a primary node, in a background thread.
+
+    Each synchronisation compares the last block of the replica with the headers of the primary. The new blocks are downloaded from the last common block ('/chain?start='), so a reorganisation of the primary is followed like a side branch received from a peer, and the replica bootstraps from the snapshot of the primary when it is too far behind or when the fork is too old. The open transactions are then copied if they changed ('/transactions' with its ETag).
+
+    :method: __init__(self, blockchain, primary, interval=FOLLOW_INTERVAL)
+    :method: start(self)
+    :method: stop(self)
+    :method: sync(self)
+    :method: get_status(self)
+    """
+
+    def __init__(self, blockchain, primary, interval=FOLLOW_INTERVAL):
+        """
+        Initialize the replication, not started yet.
+
+        :param blockchain BlockChain: The blockchain of the replica.
+        :param primary str: The URL of the primary node (host:port).
+        :param interval float: The seconds between two synchronisations. Default=FOLLOW_INTERVAL.
+        :var session Session: The HTTP session to the primary, keeping its connection open.
+        :var stopped Event: Set to stop the thread.
+        :var etag str: The ETag of the last copied open transactions, None before the first copy.
+        :var primary_height int: The index of the last block of the primary at the last synchronisation, None before the first one.
+        :var synced_at float: The time (time.time) of the last synchronisation which left the replica at the height of the primary, None before the first one.
+        :var errors int: The number of failed synchronisations.
+        :var last_error str: The error of the last failed synchronisation, None if the last one succeeded.
+        :returns Follower: Yields a follower's instance.
+        """
+
+        self.blockchain = blockchain
+        self.primary = primary
+        self.interval = interval
+        self.__session = requests.Session()
+        self.__stopped = Event()
+        self.__thread = None
+        self.__etag = None
+        self.primary_height = None
+        self.synced_at = None
+        self.errors = 0
+        self.last_error = None
+
+    def start(self):
+        """
+        Starts the synchronisations in a background thread.
+
+        :returns: None.
+        """
+
+        self.__thread = Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """
+        Stops the synchronisations after the current one.
+
+        :returns: None.
+        """
+
+        self.__stopped.set()
+
+    def __run(self):
+        """
+        Synchronises the replica until it is stopped, the failures are counted and the next synchronisation tries again.
+
+        :returns: None.
+        """
+
+        while not self.__stopped.is_set():
+            try:
+                self.sync()
+                self.last_error = None
+            except (requests.exceptions.RequestException, ValueError, KeyError, TypeError, IndexError) as error:
+                self.errors += 1
+                self.last_error = '{}: {}'.format(type(error).__name__, error)
+                metrics.inc('replication_errors_total')
+            self.__record_lag()
+            self.__stopped.wait(self.interval)
+
+    def __get(self, path, **kwargs):
+        """
+        Sends a GET request to the primary.
+
+        :param path str: The path of the route.
+        :param kwargs dict: The other arguments of the request, like params or headers.
+        :returns Response: The response of the primary.
+        :raises RequestException: If the primary can't be reached or answers with an error.
+        """
+
+        response = self.__session.get('http://{}{}'.format(self.primary, path),
+                                      timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), **kwargs)
+        if response.status_code >= 400:
+            raise requests.exceptions.HTTPError(
+                'The primary answered {}'.format(response.status_code))
+        return response
+
+    def __find_fork(self, height):
+        """
+        Finds the last block of the replica which is also in the chain of the primary, among the last REORG_WINDOW blocks.
+
+        :param height int: The index of the last block of the replica.
+        :var start int: The index of the first compared header.
+        :var fork int: The index of the last common block.
+        :returns int: The index of the last common block, None if the chains fork before the compared headers.
+        """
+
+        start = max(0, height - REORG_WINDOW)
+        theirs = self.__get(
+            '/headers', params={'start': start, 'end': height}).json()
+        fork = None
+        for (mine, their) in zip(self.blockchain.get_headers(start, height), theirs):
+            if mine['hash'] != their['hash']:
+                break
+            fork = mine['index']
+        return fork
+
+    def __bootstrap(self):
+        """
+        Replaces the chain of the replica by the snapshot of the primary, which is not kept as a peer node so the replica never relays anything to it.
+
+        :returns: None.
+        """
+
+        self.blockchain.bootstrap_from_snapshot(self.primary)
+        if self.primary in self.blockchain.get_peer_nodes():
+            self.blockchain.remove_peer_node(self.primary)
+
+    def __sync_chain(self):
+        """
+        Downloads the blocks of the primary after the last common block and adds them to the chain of the replica, or bootstraps from the snapshot of the primary.
+
+        :var height int: The index of the last block of the replica.
+        :var response Response: The headers of the primary from the last block of the replica.
+        :var headers list: The headers of the primary from the last block of the replica.
+        :var fork int: The index of the last common block.
+        :var blocks list: The blocks of the primary after the last common block.
+        :returns: None.
+        """
+
+        height = self.blockchain.get_chain_info()['height']
+        response = self.__get('/headers', params={'start': height})
+        headers = response.json()
+        self.primary_height = int(response.headers['X-Chain-Height'])
+        if len(headers) > 0 and headers[0]['hash'] == self.blockchain.get_headers(height, height)[0]['hash']:
+            fork = height
+        else:
+            fork = self.__find_fork(height)
+        if fork == None or self.primary_height - fork > SNAPSHOT_LAG:
+            self.__bootstrap()
+            return
+        if self.primary_height == fork:
+            return
+        blocks = self.__get('/chain', params={'start': fork + 1}).json()
+        for block in blocks:
+            if not self.blockchain.add_block(block):
+                # The primary replaced blocks the replica can't replace anymore
+                self.__bootstrap()
+                return
+
+    def __sync_transactions(self):
+        """
+        Copies the open transactions of the primary if they changed since the last copy.
+
+        :var response Response: The open transactions of the primary, a 304 response if they didn't change.
+        :returns: None.
+        """
+
+        headers = {'If-None-Match': self.__etag} if self.__etag != None else {}
+        response = self.__get('/transactions', headers=headers)
+        if response.status_code == 304:
+            return
+        self.blockchain.set_open_transactions(response.json())
+        self.__etag = response.headers.get('ETag')
+
+    def sync(self):
+        """
+        Synchronises the chain and then the open transactions of the replica with the primary.
+
+        :returns: None.
+        :raises RequestException: If the primary can't be reached or answers with an error.
+        :raises ValueError, KeyError, TypeError, IndexError: If the primary sends invalid data.
+        """
+
+        self.__sync_chain()
+        self.__sync_transactions()
+        if self.blockchain.get_chain_info()['height'] >= self.primary_height:
+            self.synced_at = time()
+
+    def __record_lag(self):
+        """
+        Records the lag of the replica in the metrics.
+
+        :var status dict: The status of the replication.
+        :returns: None.
+        """
+
+        status = self.get_status()
+        if status['lag_blocks'] != None:
+            metrics.set('replication_lag_blocks', status['lag_blocks'])
+        if status['lag_seconds'] != None:
+            metrics.set('replication_lag_seconds', status['lag_seconds'])
+
+    def get_status(self):
+        """
+        Getter of the state of the replication.
+
+        :var height int: The index of the last block of the replica.
+        :returns dict: The URL of the primary, the index of the last block of the replica and of the primary, the lag in blocks, the lag in seconds (since the replica was last at the height of the primary), the number of failed synchronisations and the last error.
+        """
+
+        height = self.blockchain.get_chain_info()['height']
+        return {
+            'role': 'replica',
+            'primary': self.primary,
+            'height': height,
+            'primary_height': self.primary_height,
+            'lag_blocks': max(0, self.primary_height - height) if self.primary_height != None else None,
+            'lag_seconds': time() - self.synced_at if self.synced_at != None else None,
+            'errors': self.errors,
+            'last_error': self.last_error
+        }
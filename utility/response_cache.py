@@ -0,0 +1,82 @@
+"""
+This module implements the cache of the serialized responses of the read routes of the node, so a route polled while nothing changes doesn't rebuild its response.
+
+:class ResponseCache: Class of the cache of the responses.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+
+from utility.hash_util import hash_string_256
+
+
+class ResponseCache:
+    """
+    ResponseCache class is used to keep the serialized body of a response and its strong ETag for a version of the blockchain.
+
+    An entry is found only if it was stored for the same version, so the entries become stale as soon as the chain or the open transactions change.
+
+    :method: __init__(self, max_entries=64)
+    :method: get(self, key, version)
+    :method: put(self, key, version, body)
+    :method: clear(self)
+    """
+
+    def __init__(self, max_entries=64):
+        """
+        Initialize an empty cache.
+
+        :param max_entries int: The maximum number of entries, the least recently used one is removed first. Default=64.
+        :var entries OrderedDict: Maps the key of a response to its version, body and ETag.
+        :var lock Lock: Protects the entries against the concurrent requests.
+        :returns ResponseCache: Yields a cache's instance.
+        """
+
+        self.max_entries = max_entries
+        self.__entries = OrderedDict()
+        self.__lock = Lock()
+
+    def get(self, key, version):
+        """
+        Getter of a cached response.
+
+        :param key str: The key of the response, like the route and its parameters.
+        :param version tuple: The version of the blockchain the response is requested for.
+        :returns tuple: The body and the ETag of the response, None if it is not cached for this version.
+        """
+
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry == None or entry[0] != version:
+                return None
+            self.__entries.move_to_end(key)
+            return (entry[1], entry[2])
+
+    def put(self, key, version, body):
+        """
+        Stores a response for a version, replacing the response of a previous version.
+
+        :param key str: The key of the response.
+        :param version tuple: The version of the blockchain the response has been built for.
+        :param body bytes: The serialized body of the response.
+        :var etag str: The hash of the body, the same body always has the same ETag.
+        :returns tuple: The body and the ETag of the response.
+        """
+
+        etag = hash_string_256(body)
+        with self.__lock:
+            self.__entries[key] = (version, body, etag)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+        return (body, etag)
+
+    def clear(self):
+        """
+        Removes all the entries, used when the blockchain of the node is replaced by another instance.
+
+        :returns: None.
+        """
+
+        with self.__lock:
+            self.__entries.clear()
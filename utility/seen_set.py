@@ -0,0 +1,62 @@
+"""
+This module implements the set of the items recently accepted by a node, so a transaction or a block relayed by several peer nodes is only verified and relayed once.
+
+:class SeenSet: Class of the set of the seen items.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+
+
+class SeenSet:
+    """
+    SeenSet class is used to remember the IDs of the last accepted items, the oldest ones are forgotten first.
+
+    The rejected items are not remembered: a transaction rejected because its sender has no funds yet can be accepted once the block giving the funds arrives.
+    It is only a cache: it starts empty and forgets its oldest items, so an item not in it must still be looked up in the data of the node (the open transactions, the IDs of the confirmed transactions and the headers of the blocks) before being accepted.
+
+    :method: __init__(self, max_entries=10000)
+    :method: has(self, item_id)
+    :method: add(self, item_id)
+    """
+
+    def __init__(self, max_entries=10000):
+        """
+        Initialize an empty set.
+
+        :param max_entries int: The maximum number of remembered items. Default=10000.
+        :var entries OrderedDict: The IDs of the items, the oldest first.
+        :var lock Lock: Protects the entries against the concurrent requests.
+        :returns SeenSet: Yields a set's instance.
+        """
+
+        self.max_entries = max_entries
+        self.__entries = OrderedDict()
+        self.__lock = Lock()
+
+    def has(self, item_id):
+        """
+        Tells if an item has been seen.
+
+        :param item_id str: The ID of the item, like 'tx:<txid>' or 'block:<hash>'.
+        :returns bool: True if the item has been seen, false if not.
+        """
+
+        with self.__lock:
+            return item_id in self.__entries
+
+    def add(self, item_id):
+        """
+        Remembers an item.
+
+        :param item_id str: The ID of the item.
+        :returns bool: True if the item is new, false if it had already been seen.
+        """
+
+        with self.__lock:
+            is_new = item_id not in self.__entries
+            self.__entries[item_id] = None
+            self.__entries.move_to_end(item_id)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+            return is_new
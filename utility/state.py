@@ -0,0 +1,161 @@
+"""
+This module implements the balance state of the blockchain. It allows the blockchain to know the balance of every address at a given height without replaying the whole history of the transactions.
+
+:class BalanceState: Class of the balance state.
+"""
+
+import json
+
+from collections import deque
+from utility.hash_util import hash_string_256
+
+# Number of last applied blocks whose previous balances are kept to revert them exactly, as deep as a replacement of the end of the chain can go (see utility.block_tree)
+UNDO_DEPTH = 100
+
+
+class BalanceState:
+    """
+    BalanceState class is used to keep the balance of each address after the block of a given height, and to commit to it by a hash in a snapshot.
+
+    :method: __init__(self, height=0, block_hash='', balances=None)
+    :method: apply_block(self, block, block_hash)
+    :method: revert_block(self, block)
+    :method: get_balance(self, address)
+    :method: get_balances(self)
+    :method: copy(self)
+    :method: state_hash(self)
+    :method: to_snapshot(self)
+    :method: from_snapshot(cls, snapshot)
+    """
+
+    def __init__(self, height=0, block_hash='', balances=None):
+        """
+        Initialize the balance state with input values.
+
+        :param height int: The index of the last block applied to the state. Default=0.
+        :param block_hash str: The hash of the last block applied to the state. Default=''.
+        :param balances dict: The balance of each address. Default=None for no balances.
+        :var undo deque: The hash of each last applied block and the balances of its addresses before it, None for the addresses which had no balance.
+        :returns BalanceState: Yields a balance state's instance.
+        """
+
+        self.height = height
+        self.block_hash = block_hash
+        self.__balances = balances if balances != None else {}
+        self.__undo = deque(maxlen=UNDO_DEPTH)
+
+    def apply_block(self, block, block_hash):
+        """
+        Applies all the transactions of a block to the balances, must be called in the order of the chain.
+
+        :param block Block: The block to apply.
+        :param block_hash str: The hash of the block.
+        :var previous_balances dict: The balances of the addresses of the block before it.
+        :returns: None.
+        """
+
+        previous_balances = {}
+        for tx in block.transactions:
+            for address in (tx.sender, tx.recipient):
+                if address not in previous_balances:
+                    previous_balances[address] = self.__balances.get(address)
+        self.__undo.append((block_hash, previous_balances))
+        for tx in block.transactions:
+            # Mining rewards are created from nothing, there is no sender to debit
+            if tx.sender != 'MINING':
+                self.__balances[tx.sender] = self.__balances.get(
+                    tx.sender, 0) - tx.amount
+            self.__balances[tx.recipient] = self.__balances.get(
+                tx.recipient, 0) + tx.amount
+        self.height = block.index
+        self.block_hash = block_hash
+
+    def revert_block(self, block):
+        """
+        Reverts all the transactions of a block, must be called on the last applied block, like when a side branch replaces the end of the chain. The previous balances are restored if they are still known. If not (like after a restart of the node), the state is left unchanged: subtracting the amounts would keep the addresses created by the block with a zero balance and round the floats, so the state would differ from a replay of the blocks.
+
+        :param block Block: The last applied block.
+        :var previous_balances dict: The balances of the addresses of the block before it.
+        :returns bool: True if the block has been reverted, false if its previous balances are not known, then the state must be rebuilt by replaying the blocks.
+        """
+
+        if len(self.__undo) == 0 or self.__undo[-1][0] != self.block_hash:
+            return False
+        (block_hash, previous_balances) = self.__undo.pop()
+        for (address, balance) in previous_balances.items():
+            if balance == None:
+                self.__balances.pop(address, None)
+            else:
+                self.__balances[address] = balance
+        self.height = block.index - 1
+        self.block_hash = block.previous_hash
+        return True
+
+    def get_balance(self, address):
+        """
+        Getter of the balance of an address.
+
+        :param address str: The address whose balance is requested.
+        :returns float: The balance of the address, 0 if the address is unknown.
+        """
+
+        return self.__balances.get(address, 0)
+
+    def get_balances(self):
+        """
+        Getter of a copy of the balances of all addresses.
+
+        :returns dict: The balance of each address.
+        """
+
+        return dict(self.__balances)
+
+    def copy(self):
+        """
+        This function copies the state, so the copy can be updated independently.
+
+        :returns BalanceState: A copy of the state.
+        """
+
+        return BalanceState(self.height, self.block_hash, dict(self.__balances))
+
+    def state_hash(self):
+        """
+        This function computes the hash committing to the height, the block hash and the balances of the state.
+
+        :var hashable_state dict: The state transformed into a dictionnary.
+        :returns str: The hash of the state.
+        """
+
+        hashable_state = {'height': self.height,
+                          'block_hash': self.block_hash, 'balances': self.__balances}
+        return hash_string_256(json.dumps(hashable_state, sort_keys=True).encode())
+
+    def to_snapshot(self):
+        """
+        This function transforms the state into a snapshot that can be saved on disk or sent to peers.
+
+        :returns dict: The height, the block hash, the balances and the hash of the state.
+        """
+
+        return {
+            'height': self.height,
+            'block_hash': self.block_hash,
+            'balances': self.get_balances(),
+            'state_hash': self.state_hash()
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """
+        This classmethod function creates a state from a snapshot made by to_snapshot.
+
+        :param snapshot dict: The snapshot of the state.
+        :returns BalanceState: The state of the snapshot, None if its hash doesn't match its content.
+        """
+
+        state = cls(snapshot['height'], snapshot['block_hash'],
+                    dict(snapshot['balances']))
+        if state.state_hash() != snapshot['state_hash']:
+            return None
+        return state
@@ -0,0 +1,542 @@
+"""
+This module implements the storage engines of the node data: the chain, the open transactions, the peer nodes, the headers, the balance states, the address index and the IDs of the transactions of the pruned blocks.
+
+A storage engine is created for a node by for_node(node_id) and has the methods save(data), which returns the size of the stored data in bytes, load(), which returns the stored data and its size and raises IOError if there is nothing stored, and close(). The data saved is a dictionnary of the objects of the blockchain: 'chain' (list of Block), 'open_transactions' (list of Transaction), 'peers' (list of URLs), 'headers' (list of dictionnaries), 'address_index' (AddressIndex), 'state' and 'base_state' (BalanceState), 'pruned_txids' (dictionnary mapping the ID of each transaction of the pruned blocks to the index of its block, in the order of the blocks). The data loaded has the same keys with their JSON forms: the blocks and transactions as dictionnaries, the index as made by AddressIndex.to_dict and the states as snapshots, None if they are not stored.
+
+:class FileStorage: Class of the storage in a text file.
+:class SqliteStorage: Class of the storage in a SQLite database.
+:var STORAGE_BACKENDS dict: Maps the name of a storage engine to its class.
+"""
+
+import json
+import sqlite3
+
+from threading import Lock
+from utility.hash_util import hash_transaction
+
+
+class FileStorage:
+    """
+    FileStorage class is used to save the whole node data in a text file, rewritten on every save, with one JSON document per line: the chain, the open transactions, the peer nodes, the address index, the state, the base state, the headers and the IDs of the transactions of the pruned blocks. The files saved before the last lines existed are still loaded.
+
+    :method: __init__(self, path)
+    :method: for_node(cls, node_id)
+    :method: save(self, data)
+    :method: load(self)
+    :method: close(self)
+    """
+
+    def __init__(self, path):
+        """
+        Initialize the storage in a file.
+
+        :param path str: The path of the file.
+        :returns FileStorage: Yields a storage's instance.
+        """
+
+        self.path = path
+
+    @classmethod
+    def for_node(cls, node_id):
+        """
+        This classmethod function creates the storage of a node in the current directory.
+
+        :param node_id int: ID of the node, represented by the port.
+        :returns FileStorage: The storage in the file 'blockchain-<node_id>.txt'.
+        """
+
+        return cls('blockchain-{}.txt'.format(node_id))
+
+    def save(self, data):
+        """
+        Rewrites the file with the node data.
+
+        :param data dict: The node data.
+        :var saveable_chain list: The blocks and their transactions as dictionnaries.
+        :returns int: The size of the file in bytes.
+        :raises IOError: If the file can't be written.
+        """
+
+        with open(self.path, mode='w') as file:
+            saveable_chain = [dict(block.__dict__, transactions=[tx.__dict__ for tx in block.transactions])
+                              for block in data['chain']]
+            file.write(json.dumps(saveable_chain))
+            file.write('\n')
+            file.write(json.dumps([tx.__dict__ for tx in data['open_transactions']]))
+            file.write('\n')
+            file.write(json.dumps(data['peers']))
+            file.write('\n')
+            file.write(json.dumps(data['address_index'].to_dict()))
+            file.write('\n')
+            file.write(json.dumps(data['state'].to_snapshot()))
+            file.write('\n')
+            file.write(json.dumps(data['base_state'].to_snapshot()))
+            file.write('\n')
+            file.write(json.dumps(data['headers']))
+            file.write('\n')
+            file.write(json.dumps(data['pruned_txids']))
+            return file.tell()
+
+    def load(self):
+        """
+        Reads the node data from the file.
+
+        :var file_content list: The lines of the file.
+        :returns tuple: The node data and the size of the file in bytes.
+        :raises IOError: If the file doesn't exist.
+        :raises IndexError: If the file doesn't have the chain, the open transactions and the peer nodes.
+        """
+
+        with open(self.path, mode='r') as file:
+            file_content = file.readlines()
+            size = file.tell()
+        data = {
+            'chain': json.loads(file_content[0]),
+            'open_transactions': json.loads(file_content[1]),
+            'peers': json.loads(file_content[2]),
+            'address_index': json.loads(file_content[3]) if len(file_content) > 3 else None,
+            'state': json.loads(file_content[4]) if len(file_content) > 4 else None,
+            'base_state': json.loads(file_content[5]) if len(file_content) > 5 else None,
+            'headers': json.loads(file_content[6]) if len(file_content) > 6 else None,
+            'pruned_txids': json.loads(file_content[7]) if len(file_content) > 7 else None
+        }
+        return (data, size)
+
+    def close(self):
+        """
+        Closes the storage, nothing stays open between two saves of a file.
+
+        :returns: None.
+        """
+
+        pass
+
+
+class SqliteStorage:
+    """
+    SqliteStorage class is used to save the node data in a SQLite database in WAL mode, so other processes can read it while the node writes it (see the query methods, usable with read_only=True). The node answers its balance, history and transaction lookups with the query methods while the stored chain is the chain it holds (see get_saved_tip).
+
+    A save only writes what changed since the previous save, in one transaction: the new blocks (and the removed ones after a replacement of the end of the chain), the added and removed open transactions, the changed balances, the IDs of the transactions of the newly pruned blocks. The transactions are indexed by ID, sender and recipient. The address index is not stored, it is rebuilt from the chain when loading.
+
+    The numbers are stored in columns without type, so an amount, a timestamp or a balance keeps its type (1 and 1.0 give different hashes).
+
+    :method: __init__(self, path, read_only=False, fallback=None)
+    :method: for_node(cls, node_id)
+    :method: save(self, data)
+    :method: load(self)
+    :method: get_saved_tip(self)
+    :method: get_balance(self, address)
+    :method: get_history(self, address, limit=50, offset=0, start=0)
+    :method: count_history(self, address, start=0)
+    :method: get_transaction(self, txid)
+    :method: close(self)
+    """
+
+    # Tables and indexes of the database, created if they don't exist
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS blocks (height INTEGER PRIMARY KEY, hash TEXT NOT NULL UNIQUE, previous_hash TEXT NOT NULL, timestamp, proof);
+        CREATE TABLE IF NOT EXISTS transactions (height INTEGER NOT NULL, position INTEGER NOT NULL, txid TEXT NOT NULL, sender TEXT NOT NULL, recipient TEXT NOT NULL, amount, signature TEXT NOT NULL, scheme TEXT NOT NULL, timestamp, PRIMARY KEY (height, position));
+        CREATE INDEX IF NOT EXISTS transactions_txid ON transactions (txid);
+        CREATE INDEX IF NOT EXISTS transactions_sender ON transactions (sender, height, position);
+        CREATE INDEX IF NOT EXISTS transactions_recipient ON transactions (recipient, height, position);
+        CREATE TABLE IF NOT EXISTS mempool (position INTEGER PRIMARY KEY, txid TEXT NOT NULL, sender TEXT NOT NULL, recipient TEXT NOT NULL, amount, signature TEXT NOT NULL, scheme TEXT NOT NULL, timestamp);
+        CREATE INDEX IF NOT EXISTS mempool_txid ON mempool (txid);
+        CREATE TABLE IF NOT EXISTS peers (node TEXT PRIMARY KEY);
+        CREATE TABLE IF NOT EXISTS balances (address TEXT PRIMARY KEY, balance);
+        CREATE TABLE IF NOT EXISTS pruned_txids (txid TEXT PRIMARY KEY, height INTEGER NOT NULL);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+    '''
+
+    def __init__(self, path, read_only=False, fallback=None):
+        """
+        Initialize the storage in a database, created if it doesn't exist, and reads what is already stored so the next save only writes the changes.
+
+        :param path str: The path of the database.
+        :param read_only bool: True to only query the database of a running node, like an offline analysis. Default=False.
+        :param fallback FileStorage: The storage loaded while no block is stored in the database, so a node switching to SQLite keeps its data, written in the database by the next save. Default=None.
+        :var connection Connection: The connection to the database, shared by the threads of the node.
+        :var saved_hashes list: The hash of each stored block, by height.
+        :var saved_start int: The index of the first stored full block.
+        :var saved_mempool list: The IDs of the stored open transactions, in order.
+        :var saved_peers list: The stored peer nodes.
+        :var saved_balances dict: The stored balances.
+        :var saved_state tuple: The height and block hash of the stored state.
+        :var saved_base_state str: The hash of the stored base state.
+        :var lock Lock: Protects the connection against the concurrent saves.
+        :returns SqliteStorage: Yields a storage's instance.
+        :raises IOError: If the database can't be opened.
+        """
+
+        self.path = path
+        self.fallback = fallback
+        self.__lock = Lock()
+        try:
+            if read_only:
+                self.__connection = sqlite3.connect(
+                    'file:{}?mode=ro'.format(path), uri=True, check_same_thread=False)
+                return
+            self.__connection = sqlite3.connect(
+                path, check_same_thread=False)
+            self.__connection.execute('PRAGMA journal_mode=WAL')
+            # A commit survives a crash of the node, only a power failure may lose the last ones, the database stays consistent
+            self.__connection.execute('PRAGMA synchronous=NORMAL')
+            self.__connection.executescript(SqliteStorage.SCHEMA)
+            # Databases created before the transactions were signed with their time of creation don't have its column
+            for table in ('transactions', 'mempool'):
+                columns = [row[1] for row in self.__connection.execute(
+                    'PRAGMA table_info({})'.format(table))]
+                if 'timestamp' not in columns:
+                    self.__connection.execute(
+                        'ALTER TABLE {} ADD COLUMN timestamp'.format(table))
+            self.__read_saved()
+        except sqlite3.Error as error:
+            raise IOError(error)
+
+    @classmethod
+    def for_node(cls, node_id):
+        """
+        This classmethod function creates the storage of a node in the current directory.
+
+        :param node_id int: ID of the node, represented by the port.
+        :returns SqliteStorage: The storage in the database 'blockchain-<node_id>.db', the file 'blockchain-<node_id>.txt' is loaded if the database is empty.
+        """
+
+        return cls('blockchain-{}.db'.format(node_id), fallback=FileStorage.for_node(node_id))
+
+    def __read_saved(self):
+        """
+        Reads what is stored in the database, so the next save only writes the changes.
+
+        :var state dict: The height, block hash and hash of the stored state.
+        :var base_state dict: The snapshot of the stored base state.
+        :returns: None.
+        :raises Error: If the database can't be read.
+        """
+
+        self.__saved_hashes = [row[0] for row in self.__connection.execute(
+            'SELECT hash FROM blocks ORDER BY height')]
+        self.__saved_start = int(self.__get_meta('chain_start') or 0)
+        self.__saved_mempool = [row[0] for row in self.__connection.execute(
+            'SELECT txid FROM mempool ORDER BY position')]
+        self.__saved_peers = [row[0] for row in self.__connection.execute(
+            'SELECT node FROM peers ORDER BY node')]
+        self.__saved_balances = dict(self.__connection.execute(
+            'SELECT address, balance FROM balances'))
+        state = json.loads(self.__get_meta('state') or 'null')
+        self.__saved_state = (
+            state['height'], state['block_hash']) if state != None else None
+        base_state = json.loads(self.__get_meta('base_state') or 'null')
+        self.__saved_base_state = base_state['state_hash'] if base_state != None else None
+
+    def __get_meta(self, key):
+        """
+        Getter of a value of the meta table.
+
+        :param key str: The key of the value.
+        :returns str: The value, None if it is not stored.
+        """
+
+        row = self.__connection.execute(
+            'SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row != None else None
+
+    def __set_meta(self, key, value):
+        """
+        Setter of a value of the meta table.
+
+        :param key str: The key of the value.
+        :param value str: The value.
+        :returns: None.
+        """
+
+        self.__connection.execute(
+            'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    @staticmethod
+    def __transaction_row(txid, tx):
+        """
+        Transforms a transaction into the columns stored after its position.
+
+        :param txid str: The ID of the transaction.
+        :param tx Transaction: The transaction.
+        :returns tuple: The ID, sender, recipient, amount, signature, scheme and time of creation of the transaction.
+        """
+
+        return (txid, tx.sender, tx.recipient, tx.amount, tx.signature, tx.scheme, tx.timestamp)
+
+    def save(self, data):
+        """
+        Writes the changes of the node data since the previous save, in one transaction.
+
+        :param data dict: The node data.
+        :var headers list: The headers of all the blocks.
+        :var fork int: The height of the first stored block which changed.
+        :var mempool list: The IDs and the open transactions.
+        :var balances dict: The balances after the last block.
+        :returns int: The size of the database in bytes.
+        :raises IOError: If the database can't be written.
+        """
+
+        headers = data['headers']
+        chain = data['chain']
+        state = data['state']
+        base_state = data['base_state']
+        with self.__lock:
+            try:
+                with self.__connection:
+                    # The blocks after the last stored block shared with the chain are replaced
+                    fork = min(len(self.__saved_hashes), len(headers))
+                    while fork > 0 and self.__saved_hashes[fork - 1] != headers[fork - 1]['hash']:
+                        fork -= 1
+                    if fork < len(self.__saved_hashes):
+                        self.__connection.execute(
+                            'DELETE FROM transactions WHERE height >= ?', (fork,))
+                        self.__connection.execute(
+                            'DELETE FROM blocks WHERE height >= ?', (fork,))
+                    self.__connection.executemany('INSERT INTO blocks (height, hash, previous_hash, timestamp, proof) VALUES (?, ?, ?, ?, ?)', [
+                        (header['index'], header['hash'], header['previous_hash'], header['timestamp'], header['proof']) for header in headers[fork:]])
+                    self.__connection.executemany('INSERT INTO transactions (height, position, txid, sender, recipient, amount, signature, scheme, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', [
+                        (block.index, position) + self.__transaction_row(hash_transaction(tx), tx) for block in chain[max(0, fork - chain[0].index):] for (position, tx) in enumerate(block.transactions)])
+                    # The transactions of the pruned blocks are removed, their headers and their IDs are kept
+                    if chain[0].index != self.__saved_start or fork < self.__saved_start:
+                        self.__save_pruned_txids(
+                            data['pruned_txids'], min(fork, self.__saved_start))
+                    if chain[0].index != self.__saved_start:
+                        self.__connection.execute(
+                            'DELETE FROM transactions WHERE height < ?', (chain[0].index,))
+                        self.__set_meta('chain_start', str(chain[0].index))
+
+                    mempool = [(hash_transaction(tx), tx)
+                               for tx in data['open_transactions']]
+                    self.__save_mempool(mempool)
+
+                    peers = sorted(data['peers'])
+                    if peers != self.__saved_peers:
+                        self.__connection.execute('DELETE FROM peers')
+                        self.__connection.executemany(
+                            'INSERT INTO peers (node) VALUES (?)', [(node,) for node in peers])
+
+                    # The balances only change with the blocks
+                    if (state.height, state.block_hash) != self.__saved_state:
+                        balances = state.get_balances()
+                        self.__connection.executemany('INSERT OR REPLACE INTO balances (address, balance) VALUES (?, ?)', [
+                            (address, balance) for (address, balance) in balances.items()
+                            if address not in self.__saved_balances or self.__saved_balances[address] != balance or type(self.__saved_balances[address]) != type(balance)])
+                        self.__connection.executemany('DELETE FROM balances WHERE address = ?', [
+                            (address,) for address in self.__saved_balances if address not in balances])
+                        self.__set_meta('state', json.dumps(
+                            {'height': state.height, 'block_hash': state.block_hash, 'state_hash': state.state_hash()}))
+                    base_state_hash = base_state.state_hash()
+                    if base_state_hash != self.__saved_base_state:
+                        self.__set_meta('base_state', json.dumps(
+                            base_state.to_snapshot()))
+                size = self.__get_size()
+            except sqlite3.Error as error:
+                # The transaction has been rolled back, the stored data is read again
+                try:
+                    self.__read_saved()
+                except sqlite3.Error:
+                    pass
+                raise IOError(error)
+            self.__saved_hashes = [header['hash'] for header in headers]
+            self.__saved_start = chain[0].index
+            self.__saved_mempool = [txid for (txid, tx) in mempool]
+            self.__saved_peers = peers
+            if (state.height, state.block_hash) != self.__saved_state:
+                self.__saved_balances = balances
+                self.__saved_state = (state.height, state.block_hash)
+            self.__saved_base_state = base_state_hash
+        return size
+
+    def __save_pruned_txids(self, pruned_txids, start):
+        """
+        Writes the IDs of the transactions of the blocks pruned from a height, the ones stored from this height are replaced and the expired ones (older than the first ID kept by the node) are deleted.
+
+        :param pruned_txids dict: Maps the ID of each transaction of the pruned blocks to the index of its block, in the order of the blocks.
+        :param start int: The index of the first block whose IDs are written.
+        :var rows list: The IDs and the indexes of the blocks written, read from the last pruned block so the older ones are not read.
+        :returns: None.
+        """
+
+        self.__connection.execute(
+            'DELETE FROM pruned_txids WHERE height >= ?', (start,))
+        rows = []
+        for (txid, height) in reversed(pruned_txids.items()):
+            if height < start:
+                break
+            rows.append((txid, height))
+        self.__connection.executemany(
+            'INSERT OR REPLACE INTO pruned_txids (txid, height) VALUES (?, ?)', rows)
+        self.__connection.execute('DELETE FROM pruned_txids WHERE height < ?',
+                                  (next(iter(pruned_txids.values()), start),))
+
+    def __save_mempool(self, mempool):
+        """
+        Writes the changes of the open transactions: the removed ones are deleted and the new ones appended, or all of them are written again if their order changed.
+
+        :param mempool list: The IDs and the open transactions, in order.
+        :var kept list: The IDs of the open transactions already stored, in their new order.
+        :returns: None.
+        """
+
+        txids = {txid for (txid, tx) in mempool}
+        saved = set(self.__saved_mempool)
+        kept = [txid for (txid, tx) in mempool if txid in saved]
+        if kept == [txid for txid in self.__saved_mempool if txid in txids] and [txid for (txid, tx) in mempool[:len(kept)]] == kept:
+            self.__connection.executemany('DELETE FROM mempool WHERE txid = ?', [
+                (txid,) for txid in self.__saved_mempool if txid not in txids])
+            new_transactions = mempool[len(kept):]
+        else:
+            self.__connection.execute('DELETE FROM mempool')
+            new_transactions = mempool
+        position = self.__connection.execute(
+            'SELECT COALESCE(MAX(position), -1) FROM mempool').fetchone()[0]
+        self.__connection.executemany('INSERT INTO mempool (position, txid, sender, recipient, amount, signature, scheme, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', [
+            (position + offset + 1,) + self.__transaction_row(txid, tx) for (offset, (txid, tx)) in enumerate(new_transactions)])
+
+    def __get_size(self):
+        """
+        Getter of the size of the database.
+
+        :returns int: The number of pages times the size of a page, in bytes.
+        """
+
+        page_count = self.__connection.execute('PRAGMA page_count').fetchone()[0]
+        page_size = self.__connection.execute('PRAGMA page_size').fetchone()[0]
+        return page_count * page_size
+
+    def load(self):
+        """
+        Reads the node data from the database.
+
+        :var chain list: The full blocks, with their transactions.
+        :var state dict: The height, block hash and hash of the stored state.
+        :returns tuple: The node data and the size of the database in bytes.
+        :raises IOError: If no block is stored (and nothing is stored by the fallback) or the database can't be read.
+        """
+
+        if self.fallback != None and len(self.__saved_hashes) == 0:
+            return self.fallback.load()
+        with self.__lock:
+            try:
+                headers = [{'index': height, 'previous_hash': previous_hash, 'timestamp': timestamp, 'proof': proof, 'hash': block_hash}
+                           for (height, block_hash, previous_hash, timestamp, proof) in self.__connection.execute('SELECT height, hash, previous_hash, timestamp, proof FROM blocks ORDER BY height')]
+                if len(headers) == 0:
+                    raise IOError('No block stored in {}'.format(self.path))
+                start = int(self.__get_meta('chain_start') or 0)
+                chain = [{'index': header['index'], 'previous_hash': header['previous_hash'], 'timestamp': header['timestamp'],
+                          'proof': header['proof'], 'transactions': []} for header in headers[start:]]
+                for (height, sender, recipient, signature, amount, scheme, timestamp) in self.__connection.execute('SELECT height, sender, recipient, signature, amount, scheme, timestamp FROM transactions WHERE height >= ? ORDER BY height, position', (start,)):
+                    chain[height - start]['transactions'].append(
+                        {'sender': sender, 'recipient': recipient, 'signature': signature, 'amount': amount, 'scheme': scheme, 'timestamp': timestamp})
+                open_transactions = [{'sender': sender, 'recipient': recipient, 'signature': signature, 'amount': amount, 'scheme': scheme, 'timestamp': timestamp}
+                                     for (sender, recipient, signature, amount, scheme, timestamp) in self.__connection.execute('SELECT sender, recipient, signature, amount, scheme, timestamp FROM mempool ORDER BY position')]
+                peers = [row[0] for row in self.__connection.execute(
+                    'SELECT node FROM peers ORDER BY node')]
+                state = json.loads(self.__get_meta('state') or 'null')
+                if state != None:
+                    state['balances'] = dict(self.__connection.execute(
+                        'SELECT address, balance FROM balances'))
+                base_state = json.loads(self.__get_meta('base_state') or 'null')
+                pruned_txids = dict(self.__connection.execute(
+                    'SELECT txid, height FROM pruned_txids ORDER BY height'))
+                size = self.__get_size()
+            except sqlite3.Error as error:
+                raise IOError(error)
+        data = {
+            'chain': chain,
+            'open_transactions': open_transactions,
+            'peers': peers,
+            'address_index': None,
+            'state': state,
+            'base_state': base_state,
+            'headers': headers,
+            'pruned_txids': pruned_txids
+        }
+        return (data, size)
+
+    def get_saved_tip(self):
+        """
+        Getter of the hash of the last block written by the last save of this storage, so the node knows if the stored data is the data it holds (a failed save leaves the previous data).
+
+        :var saved_hashes list: The hash of each stored block, replaced after each save.
+        :returns str: The hash of the last stored block, None if no block is stored.
+        """
+
+        saved_hashes = self.__saved_hashes
+        return saved_hashes[-1] if len(saved_hashes) > 0 else None
+
+    def get_balance(self, address):
+        """
+        Getter of the balance of an address after the last stored block.
+
+        :param address str: The address.
+        :returns float: The balance of the address, 0 if it is unknown.
+        """
+
+        with self.__lock:
+            row = self.__connection.execute(
+                'SELECT balance FROM balances WHERE address = ?', (address,)).fetchone()
+        return row[0] if row != None else 0
+
+    def get_history(self, address, limit=50, offset=0, start=0):
+        """
+        Getter of a page of the confirmed transactions of an address, oldest first.
+
+        :param address str: The address.
+        :param limit int: The maximum number of transactions. Default=50.
+        :param offset int: The number of transactions skipped. Default=0.
+        :param start int: The index of the first block whose transactions are given. Default=0.
+        :returns list: The height, position, ID, sender, recipient and amount of each transaction as dictionnaries.
+        """
+
+        with self.__lock:
+            rows = self.__connection.execute('SELECT height, position, txid, sender, recipient, amount FROM transactions WHERE sender = ? AND height >= ? UNION SELECT height, position, txid, sender, recipient, amount FROM transactions WHERE recipient = ? AND height >= ? ORDER BY height, position LIMIT ? OFFSET ?',
+                                             (address, start, address, start, limit, offset)).fetchall()
+        return [{'height': height, 'position': position, 'txid': txid, 'sender': sender, 'recipient': recipient, 'amount': amount}
+                for (height, position, txid, sender, recipient, amount) in rows]
+
+    def count_history(self, address, start=0):
+        """
+        Getter of the number of confirmed transactions of an address, the total of the pages of get_history.
+
+        :param address str: The address.
+        :param start int: The index of the first block whose transactions are counted. Default=0.
+        :returns int: The number of transactions.
+        """
+
+        with self.__lock:
+            return self.__connection.execute('SELECT COUNT(*) FROM (SELECT height, position FROM transactions WHERE sender = ? AND height >= ? UNION SELECT height, position FROM transactions WHERE recipient = ? AND height >= ?)',
+                                             (address, start, address, start)).fetchone()[0]
+
+    def get_transaction(self, txid):
+        """
+        Getter of a transaction by its ID, confirmed or open. The mining rewards are not looked up, the rewards of a miner have the same ID.
+
+        :param txid str: The ID of the transaction.
+        :returns dict: The transaction, with its height and position (None for an open transaction), None if it is unknown.
+        """
+
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT height, position, sender, recipient, amount, signature, scheme, timestamp FROM transactions WHERE txid = ? AND sender != 'MINING' ORDER BY height, position", (txid,)).fetchone()
+            if row == None:
+                row = self.__connection.execute(
+                    'SELECT NULL, NULL, sender, recipient, amount, signature, scheme, timestamp FROM mempool WHERE txid = ?', (txid,)).fetchone()
+        if row == None:
+            return None
+        (height, position, sender, recipient, amount, signature, scheme, timestamp) = row
+        return {'height': height, 'position': position, 'sender': sender, 'recipient': recipient, 'amount': amount, 'signature': signature, 'scheme': scheme, 'timestamp': timestamp}
+
+    def close(self):
+        """
+        Closes the connection to the database.
+
+        :returns: None.
+        """
+
+        with self.__lock:
+            self.__connection.close()
+
+
+STORAGE_BACKENDS = {'file': FileStorage, 'sqlite': SqliteStorage}
@@ -4,18 +4,32 @@ This module provides verification helper methods to verify the blockchain, the t
 :class Verification: Class of the verification mechanism.
 """
 
+import math
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
 from utility.hash_util import hash_block, hash_string_256
 from wallet import Wallet
 
+# Chains with fewer blocks are checked in the calling process, starting the worker processes would cost more than the check
+PARALLEL_MIN_BLOCKS = 2048
+# Maximum number of blocks checked by each task of the parallel validation, smaller tasks let the validation stop sooner at an invalid block
+VALIDATION_CHUNK_SIZE = 1024
+
 
 class Verification:
     """
     Verification class is used to create and use verfication mechanisms.
 
     :method: verify_chain(cls, blockchain)
+    :method: find_invalid_block(cls, blocks, previous=None)
+    :method: find_invalid_block_parallel(cls, blocks, workers=None, min_blocks=PARALLEL_MIN_BLOCKS)
     :method: verify_transactions(cls, open_transactions, get_balance) 
     :method: verify_transaction(transaction, get_balance,  check_funds=True)
     :method: valid_proof(transactions, last_hash, proof)
+    :method: find_proof(transactions, last_hash)
+    :method: verify_headers(headers)
     """
 
     @classmethod
@@ -38,6 +52,60 @@ class Verification:
                 return False
         return True
 
+    @classmethod
+    def find_invalid_block(cls, blocks, previous=None):
+        """
+        This classmethod method checks the link to the previous block and the proof of work of each block of a range. It only depends on its parameters, so it can run in another process.
+
+        :param cls: This method is accessed by class name.
+        :param blocks list: The blocks of the range, ordered by index.
+        :param previous Block: The block before the range. Default=None if the first block of the range is the first block of the chain, which is not checked.
+        :var previous_hash str: The hash of the block before the checked block, None for the first block of the chain.
+        :returns int: The index of the first invalid block of the range, None if all the blocks are valid.
+        """
+
+        previous_hash = hash_block(previous) if previous != None else None
+        for block in blocks:
+            if previous_hash != None:
+                if block.previous_hash != previous_hash:
+                    return block.index
+                if not cls.valid_proof(block.transactions[:-1], block.previous_hash, block.proof):
+                    return block.index
+            previous_hash = hash_block(block)
+        return None
+
+    @classmethod
+    def find_invalid_block_parallel(cls, blocks, workers=None, min_blocks=PARALLEL_MIN_BLOCKS):
+        """
+        This classmethod method checks the links and the proofs of work of a chain like find_invalid_block, with its ranges checked in worker processes. The ranges are read in the order of the chain, so the first invalid block is found whatever the range finishing first.
+
+        :param cls: This method is accessed by class name.
+        :param blocks list or ChainView: The blocks, ordered by index. The first one is not checked.
+        :param workers int: The number of worker processes. Default=None for the number of CPUs.
+        :param min_blocks int: The chains with fewer blocks are checked in the calling process. Default=PARALLEL_MIN_BLOCKS.
+        :var chunk_size int: The number of blocks of each range.
+        :var futures list: The results of the ranges, in the order of the chain.
+        :returns int: The index of the first invalid block, None if the chain is valid.
+        """
+
+        workers = workers if workers != None else (os.cpu_count() or 1)
+        if workers <= 1 or len(blocks) < max(2, min_blocks):
+            return cls.find_invalid_block(blocks)
+        chunk_size = min(VALIDATION_CHUNK_SIZE,
+                         math.ceil(len(blocks) / workers))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # The ranges are copied in lists, a slice of a chain view would send the whole shared list to the worker
+            futures = [executor.submit(cls.find_invalid_block, list(blocks[start:start + chunk_size]),
+                                       blocks[start - 1] if start > 0 else None)
+                       for start in range(0, len(blocks), chunk_size)]
+            for future in futures:
+                invalid_height = future.result()
+                if invalid_height != None:
+                    for other in futures:
+                        other.cancel()
+                    return invalid_height
+        return None
+
     @classmethod
     def verify_transactions(cls, open_transactions, get_balance):
         """
@@ -86,3 +154,35 @@ class Verification:
                      ) + str(last_hash) + str(proof)).encode()
         guess_hash = hash_string_256(guess)
         return guess_hash[0:2] == '00'
+
+    @classmethod
+    def find_proof(cls, transactions, last_hash):
+        """
+        This classmethod method searches the first proof of work which is valid for the transactions and the previous hash. It only depends on its parameters, so it can run in another process.
+
+        :param transactions: All of the transactions of the block.
+        :param last_hash: The hash of the previous block.
+        :var proof int: The proof number, initialised at 0.
+        :returns int: The first valid proof.
+        """
+
+        proof = 0
+        while not cls.valid_proof(transactions, last_hash, proof):
+            proof += 1
+        return proof
+
+    @staticmethod
+    def verify_headers(headers):
+        """
+        This staticmethod method verifies that a list of block headers is contiguous and that each header is linked to the hash of the previous one.
+
+        :param headers list: The headers to verify, ordered by index.
+        :returns bool: True if the headers are linked together, false if not.
+        """
+
+        for (position, header) in enumerate(headers):
+            if header['index'] != headers[0]['index'] + position:
+                return False
+            elif position > 0 and header['previous_hash'] != headers[position - 1]['hash']:
+                return False
+        return True
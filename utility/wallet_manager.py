@@ -0,0 +1,168 @@
+"""
+This module implements the hosting of many wallets by a single node: the wallets share the blockchain of the node, so choosing the wallet of a request doesn't load anything.
+
+:class WalletManager: Class of the hosted wallets.
+"""
+
+import hmac
+import json
+import secrets
+
+from threading import Lock
+
+from utility.hash_util import hash_string_256
+from wallet import Wallet
+
+# Maximum number of wallets hosted by a node
+MAX_WALLETS = 10000
+# Number of random bytes of the access token of a hosted wallet
+TOKEN_BYTES = 16
+
+
+class WalletManager:
+    """
+    WalletManager class is used to keep the keys of the hosted wallets by public key, and to save them in the 'wallets-<node_id>.txt' file, one JSON wallet per line.
+
+    Spending from a hosted wallet needs its access token, given once when the wallet is created. Only the SHA256 hash of the token is kept, so the file doesn't hold the tokens.
+
+    :method: __init__(self, node_id)
+    :method: __len__(self)
+    :method: create_wallet(self, scheme)
+    :method: get_wallet(self, public_key, token=None)
+    :method: get_public_keys(self)
+    :method: save_wallets(self)
+    :method: load_wallets(self)
+    """
+
+    def __init__(self, node_id):
+        """
+        Initialize the manager with the wallets saved by the node.
+
+        :param node_id str: Unique identifier of the node (designated by the port number).
+        :var wallets dict: Maps the public key of a hosted wallet to its wallet and to the hash of its access token.
+        :var lock Lock: Protects the wallets against the concurrent requests.
+        :returns WalletManager: Yields a manager's instance.
+        """
+
+        self.node_id = node_id
+        self.__wallets = {}
+        self.__lock = Lock()
+        self.load_wallets()
+
+    def __len__(self):
+        """
+        Getter of the number of hosted wallets.
+
+        :returns int: The number of wallets.
+        """
+
+        return len(self.__wallets)
+
+    def create_wallet(self, scheme):
+        """
+        Creates and saves a new hosted wallet.
+
+        :param scheme str: The tag of the signature scheme of the keys.
+        :var wallet Wallet: The new wallet.
+        :var token str: The access token of the wallet.
+        :returns (Wallet, str): The new wallet and its access token, (None, None) if the maximum number of wallets is reached or the wallets failed to be saved.
+        :raises ValueError: If the scheme is unknown.
+        """
+
+        wallet = Wallet(self.node_id, scheme)
+        wallet.create_keys()
+        token = secrets.token_hex(TOKEN_BYTES)
+        with self.__lock:
+            if len(self.__wallets) >= MAX_WALLETS:
+                return (None, None)
+            self.__wallets[wallet.public_key] = (
+                wallet, hash_string_256(token.encode()))
+            if not self.__save():
+                del self.__wallets[wallet.public_key]
+                return (None, None)
+        return (wallet, token)
+
+    def get_wallet(self, public_key, token=None):
+        """
+        Getter of a hosted wallet.
+
+        :param public_key str: The public key of the wallet.
+        :param token str: The access token of the wallet, needed to sign with it. Default=None to only read it.
+        :var entry tuple: The wallet and the hash of its access token.
+        :returns Wallet: The wallet, None if it is not hosted or if the token is given and wrong.
+        """
+
+        entry = self.__wallets.get(public_key)
+        if entry == None:
+            return None
+        if token != None and not hmac.compare_digest(hash_string_256(token.encode()), entry[1]):
+            return None
+        return entry[0]
+
+    def get_public_keys(self):
+        """
+        Getter of the public keys of the hosted wallets.
+
+        :returns list: The public keys, in the order of creation.
+        """
+
+        return list(self.__wallets)
+
+    def __save(self):
+        """
+        Writes the hosted wallets in the text file, must be called with the lock held.
+
+        :returns bool: True if the wallets are correctly saved, false if not.
+        :raises IOError: If the file is not correctly created or written into.
+        """
+
+        try:
+            with open('wallets-{}.txt'.format(self.node_id), mode='w') as file:
+                for (wallet, token_hash) in self.__wallets.values():
+                    file.write(json.dumps({'public_key': wallet.public_key, 'private_key': wallet.private_key,
+                                           'scheme': wallet.scheme, 'token_hash': token_hash}))
+                    file.write('\n')
+            return True
+        except IOError:
+            print('Saving wallets failed...')
+            return False
+
+    def save_wallets(self):
+        """
+        Saves the hosted wallets in the text file.
+
+        :returns bool: True if the wallets are correctly saved, false if not.
+        """
+
+        with self.__lock:
+            return self.__save()
+
+    def load_wallets(self):
+        """
+        Loads the hosted wallets from the text file, a missing file means no hosted wallets.
+
+        :var wallets dict: The loaded wallets.
+        :var values dict: The keys, the scheme and the hash of the access token of a wallet.
+        :returns bool: True if the wallets are correctly loaded, false if not.
+        :raises IOError: If the file doesn't exist.
+        :raises ValueError, KeyError: If a line of the file is not a valid wallet.
+        """
+
+        wallets = {}
+        try:
+            with open('wallets-{}.txt'.format(self.node_id), mode='r') as file:
+                for line in file:
+                    values = json.loads(line)
+                    wallet = Wallet(self.node_id, values['scheme'])
+                    wallet.public_key = values['public_key']
+                    wallet.private_key = values['private_key']
+                    wallets[wallet.public_key] = (
+                        wallet, values['token_hash'])
+        except IOError:
+            return False
+        except (ValueError, KeyError):
+            print('Loading wallets failed...')
+            return False
+        with self.__lock:
+            self.__wallets = wallets
+        return True
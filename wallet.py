@@ -1,46 +1,230 @@
 """
 This module implements the creation of a wallet (or of a node). It allows the user to create a wallet, to create the keys, to save them, to load them and to verify transactions.
 
+The keys and the signatures are made by a signature scheme: RSA (the default, used by all the transactions created before the schemes existed) or Ed25519, with shorter addresses and signatures and a faster signing. With pycryptodome, checking an Ed25519 signature is slower than checking an RSA signature: the verification of both schemes is made faster by caching the parsed public keys (VERIFIER_CACHE_SIZE), not by the choice of the scheme.
+
+:class RsaScheme: Class of the RSA signature scheme.
+:class Ed25519Scheme: Class of the Ed25519 signature scheme.
 :class Wallet: Class of the wallet.
+:var SIGNATURE_SCHEMES dict: Maps the tag of a scheme, carried by the transactions, to its class.
 """
 
-from Crypto.PublicKey import RSA
-from Crypto.Signature import PKCS1_v1_5
+from Crypto.PublicKey import RSA, ECC
+from Crypto.Signature import PKCS1_v1_5, eddsa
 from Crypto.Hash import SHA256
 import Crypto.Random
 import binascii
 
+from functools import lru_cache
+from time import perf_counter
+from transaction import DEFAULT_SCHEME, signed_payload
+from utility.metrics import metrics
+
+# Number of parsed public keys kept by each scheme, so verifying the transactions of a known sender doesn't parse its key again
+VERIFIER_CACHE_SIZE = 1024
+
+
+class RsaScheme:
+    """
+    RsaScheme class is used to generate RSA-1024 keys and to make and check PKCS#1 v1.5 signatures of the SHA256 hash of a payload.
+
+    The keys are the hexadecimal DER encoding of the RSA keys.
+
+    :method: generate_keys()
+    :method: load_signer(private_key)
+    :method: load_verifier(public_key)
+    :method: sign(signer, payload)
+    :method: verify(public_key, payload, signature)
+    """
+
+    @staticmethod
+    def generate_keys():
+        """
+        This staticmethod function generates a couple of keys.
+
+        :returns (str, str): A couple containing the private and public keys.
+        """
+
+        private_key = RSA.generate(1024, Crypto.Random.new().read)
+        public_key = private_key.publickey()
+        return binascii.hexlify(private_key.exportKey(format='DER')).decode('ascii'), binascii.hexlify(public_key.exportKey(format='DER')).decode('ascii')
+
+    @staticmethod
+    def load_signer(private_key):
+        """
+        This staticmethod function parses a private key into a signer.
+
+        :param private_key str: The private key.
+        :returns PKCS115_SigScheme: The signer of the private key.
+        :raises ValueError: If the private key can't be parsed.
+        """
+
+        return PKCS1_v1_5.new(RSA.importKey(binascii.unhexlify(private_key)))
+
+    @staticmethod
+    @lru_cache(maxsize=VERIFIER_CACHE_SIZE)
+    def load_verifier(public_key):
+        """
+        This staticmethod function parses a public key into a verifier, the last parsed keys are cached.
+
+        :param public_key str: The public key.
+        :returns PKCS115_SigScheme: The verifier of the public key.
+        :raises ValueError: If the public key can't be parsed.
+        """
+
+        return PKCS1_v1_5.new(RSA.importKey(binascii.unhexlify(public_key)))
+
+    @staticmethod
+    def sign(signer, payload):
+        """
+        This staticmethod function signs a payload.
+
+        :param signer PKCS115_SigScheme: The signer returned by load_signer.
+        :param payload bytes: The signed data.
+        :returns bytes: The signature.
+        """
+
+        return signer.sign(SHA256.new(payload))
+
+    @staticmethod
+    def verify(public_key, payload, signature):
+        """
+        This staticmethod function checks the signature of a payload.
+
+        :param public_key str: The public key of the signer.
+        :param payload bytes: The signed data.
+        :param signature bytes: The signature.
+        :returns bool: True if the signature is valid, false if not.
+        :raises ValueError: If the public key can't be parsed.
+        """
+
+        return RsaScheme.load_verifier(public_key).verify(SHA256.new(payload), signature)
+
+
+class Ed25519Scheme:
+    """
+    Ed25519Scheme class is used to generate Ed25519 keys and to make and check Ed25519 signatures (RFC 8032) of a payload.
+
+    The private key is the hexadecimal 32 bytes seed and the public key the hexadecimal 32 bytes encoded point, the signatures have 64 bytes.
+
+    :method: generate_keys()
+    :method: load_signer(private_key)
+    :method: load_verifier(public_key)
+    :method: sign(signer, payload)
+    :method: verify(public_key, payload, signature)
+    """
+
+    @staticmethod
+    def generate_keys():
+        """
+        This staticmethod function generates a couple of keys.
+
+        :returns (str, str): A couple containing the private and public keys.
+        """
+
+        private_key = ECC.generate(curve='Ed25519')
+        return binascii.hexlify(private_key.seed).decode('ascii'), binascii.hexlify(private_key.public_key().export_key(format='raw')).decode('ascii')
+
+    @staticmethod
+    def load_signer(private_key):
+        """
+        This staticmethod function parses a private key into a signer.
+
+        :param private_key str: The private key.
+        :returns EdDSASigScheme: The signer of the private key.
+        :raises ValueError: If the private key can't be parsed.
+        """
+
+        return eddsa.new(eddsa.import_private_key(binascii.unhexlify(private_key)), 'rfc8032')
+
+    @staticmethod
+    @lru_cache(maxsize=VERIFIER_CACHE_SIZE)
+    def load_verifier(public_key):
+        """
+        This staticmethod function parses a public key into a verifier, the last parsed keys are cached.
+
+        :param public_key str: The public key.
+        :returns EdDSASigScheme: The verifier of the public key.
+        :raises ValueError: If the public key can't be parsed.
+        """
+
+        return eddsa.new(eddsa.import_public_key(binascii.unhexlify(public_key)), 'rfc8032')
+
+    @staticmethod
+    def sign(signer, payload):
+        """
+        This staticmethod function signs a payload.
+
+        :param signer EdDSASigScheme: The signer returned by load_signer.
+        :param payload bytes: The signed data.
+        :returns bytes: The signature.
+        """
+
+        return signer.sign(payload)
+
+    @staticmethod
+    def verify(public_key, payload, signature):
+        """
+        This staticmethod function checks the signature of a payload.
+
+        :param public_key str: The public key of the signer.
+        :param payload bytes: The signed data.
+        :param signature bytes: The signature.
+        :returns bool: True if the signature is valid, false if not.
+        :raises ValueError: If the public key can't be parsed.
+        """
+
+        verifier = Ed25519Scheme.load_verifier(public_key)
+        try:
+            verifier.verify(payload, signature)
+            return True
+        except ValueError:
+            return False
+
+
+SIGNATURE_SCHEMES = {'rsa': RsaScheme, 'ed25519': Ed25519Scheme}
+
 
 class Wallet:
     """
     Wallet class is used to create a wallet, to generate its keys, to load them and to verify transactions.
 
-    :method: __init__(self, node_id)
+    :method: __init__(self, node_id, scheme=DEFAULT_SCHEME)
     :method: save_keys(self)
     :method: create_keys(self)
     :method: load_keys(self)
     :method: generate_keys(self)
-    :method: sign_transaction(self, sender, recipient, amount)
+    :method: sign_transaction(self, sender, recipient, amount, timestamp=None)
+    :method: sign_transactions(self, transactions)
     :method: verify_transaction(transaction)
     """
 
-    def __init__(self, node_id):
+    def __init__(self, node_id, scheme=DEFAULT_SCHEME):
         """
         Initialize the wallet with input values.
 
         :param node_id str: Unique identifier of the node (designated by the port number).
+        :param scheme str: The tag of the signature scheme of the keys created by the wallet, replaced by the one of the loaded keys. Default=DEFAULT_SCHEME.
         :var private_key str: The private key of the wallet. Default=None.
         :var public_key str: The public key of the wallet. Default=None.
+        :var signer object: The signer of the parsed private key, kept so signing doesn't parse the key again. Default=None.
+        :var signer_key tuple: The scheme and the private key the signer has been created from. Default=None.
         :returns Wallet: Yields a wallet's instance.
+        :raises ValueError: If the scheme is unknown.
         """
 
+        if scheme not in SIGNATURE_SCHEMES:
+            raise ValueError('Unknown signature scheme: {}'.format(scheme))
         self.private_key = None
         self.public_key = None
         self.node_id = node_id
+        self.scheme = scheme
+        self.__signer = None
+        self.__signer_key = None
 
     def save_keys(self):
         """
-        This function saves the keys of the wallet in a text file.
+        This function saves the keys of the wallet and their scheme in a text file.
 
         :returns bool: True if the keys are correctly saved, false if not.
         :raises IOError: If the file is not correctly created or written into.
@@ -53,6 +237,8 @@ class Wallet:
                     file.write(self.public_key)
                     file.write('\n')
                     file.write(self.private_key)
+                    file.write('\n')
+                    file.write(self.scheme)
                 return True
             except (IOError, IndexError):
                 print('Saving wallet failed...')
@@ -70,76 +256,116 @@ class Wallet:
         private_key, public_key = self.generate_keys()
         self.private_key = private_key
         self.public_key = public_key
+        self.__get_signer()
 
     def load_keys(self):
         """
-        This function loads the keys of the wallet from the text file.
+        This function loads the keys of the wallet from the text file, the files saved before the schemes existed have RSA keys.
 
         :var public_key str: The public key of the wallet.
         :var private_key str: The private key of the wallet.
+        :var scheme str: The tag of the scheme of the keys.
         :returns: True if the keys are correctly loaded, false if not.
         :raises IOError, IndexError: If the wallet failed to be loaded from text file.
+        :raises ValueError: If the scheme is unknown or the private key can't be parsed.
         """
 
         try:
             with open('wallet-{}.txt'.format(self.node_id), mode='r') as file:
                 keys = file.readlines()
                 public_key = keys[0][:-1]
-                private_key = keys[1]
+                private_key = keys[1].rstrip('\n')
+                scheme = keys[2].strip() if len(keys) > 2 else DEFAULT_SCHEME
+                if scheme not in SIGNATURE_SCHEMES:
+                    raise ValueError(
+                        'Unknown signature scheme: {}'.format(scheme))
                 self.public_key = public_key
                 self.private_key = private_key
+                self.scheme = scheme
+            self.__get_signer()
             return True
-        except (IOError, IndexError):
+        except (IOError, IndexError, ValueError):
             print('Loading wallet failed...')
             return False
 
     def generate_keys(self):
         """
-        This function generates the keys of the wallet.
+        This function generates the keys of the wallet with its signature scheme.
 
-        :var private_key str: The private key to be generated for the wallet.
-        :var public_key str: The public key to be generated for the wallet.
-        :returns (str, str): A couple containing the public and private keys.
+        :returns (str, str): A couple containing the private and public keys.
         """
 
-        private_key = RSA.generate(1024, Crypto.Random.new().read)
-        public_key = private_key.publickey()
-        return binascii.hexlify(private_key.exportKey(format='DER')).decode('ascii'), binascii.hexlify(public_key.exportKey(format='DER')).decode('ascii')
+        return SIGNATURE_SCHEMES[self.scheme].generate_keys()
+
+    def __get_signer(self):
+        """
+        This function gives the signer of the private key of the wallet, the key is parsed only when it changes.
+
+        :returns object: The signer of the private key, None if the wallet has no private key.
+        """
+
+        if self.private_key == None:
+            return None
+        if self.__signer_key != (self.scheme, self.private_key):
+            self.__signer = SIGNATURE_SCHEMES[self.scheme].load_signer(
+                self.private_key)
+            self.__signer_key = (self.scheme, self.private_key)
+        return self.__signer
 
-    def sign_transaction(self, sender, recipient, amount):
+    def sign_transaction(self, sender, recipient, amount, timestamp=None):
         """
-        This function signs the transaction for validation.
+        This function signs the transaction for validation, the transaction must carry the scheme of the wallet and the same time of creation.
 
         :param sender str: The sender of the transaction.
         :param recipient str: The recipient of the transaction.
         :param amount float: The amount of the transaction.
-        :var signer PKCS115_Cipher: Create a cipher for performing PKCS1 v1.5 descryption on the private key.
-        :var hash_payload SHA256: The hash of the transaction's sender, recipient and amount.
-        :var signature str: Signing the hash_payload var.
+        :param timestamp float: The time of creation of the transaction. Default=None for the payload without it, which the nodes don't admit anymore.
+        :var signer object: The cached signer of the private key.
+        :var payload bytes: The transaction's sender, recipient, amount and time of creation (see transaction.signed_payload).
+        :var signature str: Signing the payload var.
         :returns str: The signature of the transaction in ASCII.
         """
 
-        signer = PKCS1_v1_5.new(RSA.importKey(
-            binascii.unhexlify(self.private_key)))
-        hash_payload = SHA256.new(
-            (str(sender) + str(recipient) + str(amount)).encode('utf8'))
-        signature = signer.sign(hash_payload)
+        signer = self.__get_signer()
+        payload = signed_payload(sender, recipient, amount, timestamp)
+        signature = SIGNATURE_SCHEMES[self.scheme].sign(signer, payload)
         return binascii.hexlify(signature).decode('ascii')
 
+    def sign_transactions(self, transactions):
+        """
+        This function signs a batch of transactions with the private key of the wallet.
+
+        :param transactions list: The transactions to sign, as (sender, recipient, amount) or (sender, recipient, amount, timestamp) tuples.
+        :returns list: The signature of each transaction in ASCII, in the same order.
+        """
+
+        return [self.sign_transaction(*transaction) for transaction in transactions]
+
     @staticmethod
     def verify_transaction(transaction):
         """
-        This staticmethod function verifies a transaction.
+        This staticmethod function verifies a transaction with the signature scheme of its tag.
 
         :param transaction Transaction: The transaction to verify.
-        :var public_key str: Imports the public key from the sender's transaction.
-        :var verifier PKCS115_Cipher: Create a cipher for performing PKCS#1 v1.5 decryption on the public key.
-        :var h SHA256: The hash of the transaction's sender, recipient and amount.
+        :var scheme class: The signature scheme of the transaction, None if its tag is unknown.
+        :var payload bytes: The transaction's sender, recipient, amount and time of creation (see transaction.signed_payload).
+        :var is_valid bool: True if the signature matches the transaction, counted in the metrics.
         :returns bool: True if the transaction is verified, false if not.
         """
 
-        public_key = RSA.importKey(binascii.unhexlify(transaction.sender))
-        verifier = PKCS1_v1_5.new(public_key)
-        h = SHA256.new((str(transaction.sender) + str(transaction.recipient) +
-                        str(transaction.amount)).encode('utf8'))
-        return verifier.verify(h, binascii.unhexlify(transaction.signature))
+        start = perf_counter()
+        scheme = SIGNATURE_SCHEMES.get(
+            getattr(transaction, 'scheme', DEFAULT_SCHEME))
+        payload = signed_payload(transaction.sender, transaction.recipient,
+                                 transaction.amount, getattr(transaction, 'timestamp', None))
+        try:
+            is_valid = scheme != None and scheme.verify(
+                transaction.sender, payload, binascii.unhexlify(transaction.signature))
+        except (ValueError, TypeError):
+            # The sender is not a public key of the scheme or the signature is not hexadecimal
+            is_valid = False
+        metrics.observe('signature_verification_duration_seconds',
+                        perf_counter() - start)
+        metrics.inc('signature_verifications_total', labels={
+                    'result': 'valid' if is_valid else 'invalid'})
+        return is_valid